@@ -0,0 +1,602 @@
+import argparse
+import asyncio
+import gc
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Iterator, Optional
+
+from fake_zoho import FakeZoho
+from resources.composite_items import list_composite_items_async
+from resources.contacts import list_contacts_async, get_contact_async
+from resources.items import list_items_async, fetch_all_items_async, match_items_async, lookup_items_async
+from resources.salesorders import list_sales_orders_async, get_salesorder_async, aggregate_sales_orders_async
+from resources.stock import stock_report_async
+from resources.taxes import get_taxes_async
+from tools.salesorders import create_sales_order_async, create_sales_orders_bulk_async, attach_pdf_async
+from utils.auth import close_token_managers, token_manager
+from utils.cache import response_cache
+from utils.catalog import FIELDS, Catalog, reset_catalogs
+from utils.client import close_client, aclose_async_client
+from utils.coalesce import request_coalescer
+from utils.filelock import write_json_atomic
+from utils.ratelimit import rate_limiter
+from utils.search import reset_item_indexes
+from utils.setting import settings
+
+SRC = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CONCURRENCY = (1, 4, 16)
+METRICS = ("p50_ms", "p99_ms", "throughput", "result_kb")
+
+Scenario = Callable[[random.Random], Awaitable[Any]]
+
+
+def _scenarios(fake: FakeZoho, pdf_path: str) -> dict[str, Scenario]:
+    """One call of every MCP tool with random arguments drawn from the fake's data."""
+    items = fake.data["/items"]
+    contacts = fake.data["/contacts"]
+    orders = fake.data["/salesorders"]
+
+    def line_items(rnd: random.Random) -> list[dict[str, Any]]:
+        item = rnd.choice(items)
+        quantity = rnd.randint(1, 5)
+        return [{"item_id": item["item_id"], "quantity": quantity, "rate": item["rate"], "item_total": quantity * item["rate"], "tax_id": item["tax_id"]}]
+
+    return {
+        "list_items": lambda rnd: list_items_async(page=rnd.randint(1, 5), per_page=50),
+        "list_items_compact": lambda rnd: list_items_async(page=rnd.randint(1, 5), per_page=50, compact=True),
+        "list_contacts": lambda rnd: list_contacts_async(page=rnd.randint(1, 3), per_page=50),
+        "get_contact": lambda rnd: get_contact_async(rnd.choice(contacts)["contact_id"]),
+        "list_sales_orders": lambda rnd: list_sales_orders_async(page=rnd.randint(1, 5), per_page=50),
+        "list_sales_orders_fields": lambda rnd: list_sales_orders_async(page=rnd.randint(1, 5), per_page=50, fields=["salesorder_id", "customer_name", "total"]),
+        "get_salesorder": lambda rnd: get_salesorder_async(rnd.choice(orders)["salesorder_id"]),
+        "aggregate_sales_orders": lambda rnd: aggregate_sales_orders_async(group_by=["customer", "month"], date_start="2024-01-01", date_end="2024-03-31"),
+        "get_taxes": lambda rnd: get_taxes_async(),
+        "list_composite_items": lambda rnd: list_composite_items_async(per_page=50),
+        "fetch_all_items": lambda rnd: fetch_all_items_async(max_records=1000),
+        "match_items": lambda rnd: match_items_async([rnd.choice(items)["name"], rnd.choice(items)["sku"]]),
+        "lookup_items": lambda rnd: lookup_items_async(item_ids=[rnd.choice(items)["item_id"]], skus=[rnd.choice(items)["sku"]]),
+        "stock_report": lambda rnd: stock_report_async(days=3650, max_orders=20),
+        "create_sales_order": lambda rnd: create_sales_order_async(rnd.choice(contacts)["contact_id"], line_items(rnd)),
+        "create_sales_orders_bulk": lambda rnd: create_sales_orders_bulk_async(
+            [{"customer_id": rnd.choice(contacts)["contact_id"], "line_items": line_items(rnd)} for _ in range(5)]
+        ),
+        "attach_pdf": lambda rnd: attach_pdf_async(rnd.choice(orders)["salesorder_id"], pdf_path),
+    }
+
+
+def _percentile(values: list[float], percent: float) -> float:
+    ordered = sorted(values)
+    return ordered[max(math.ceil(percent / 100 * len(ordered)) - 1, 0)]
+
+
+def _failed(result: Any) -> bool:
+    return result is None or (isinstance(result, dict) and result.get("code", 0) != 0)
+
+
+async def _measure(scenario: Scenario, concurrency: int, calls: int, seed: int) -> dict[str, Any]:
+    """Make `calls` calls with `concurrency` of them in flight at a time."""
+    rnd = random.Random(seed)
+    latencies = []
+    sizes = []
+    errors = 0
+    remaining = calls
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            try:
+                result = await scenario(rnd)
+                failed = _failed(result)
+            except Exception:
+                result, failed = None, True
+            latencies.append(time.perf_counter() - start)
+            # the size of the result as the MCP server sends it, what the agent has to read
+            sizes.append(len(json.dumps(result, default=str)))
+            errors += failed
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return {
+        "calls": len(latencies),
+        "errors": errors,
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 2),
+        "p99_ms": round(_percentile(latencies, 99) * 1000, 2),
+        "throughput": round(len(latencies) / elapsed, 1),
+        "result_kb": round(sum(sizes) / len(sizes) / 1024, 2),
+    }
+
+
+async def _run(scenarios: dict[str, Scenario], concurrency: list[int], calls: int, seed: int) -> dict[str, dict[str, Any]]:
+    results = {}
+    try:
+        for name, scenario in scenarios.items():
+            # warm up the token, the connections and (for match_items) the item index
+            await scenario(random.Random(seed))
+            results[name] = {}
+            for level in concurrency:
+                response_cache.clear()
+                results[name][str(level)] = await _measure(scenario, level, calls, seed)
+    finally:
+        await aclose_async_client()
+    return results
+
+
+@contextmanager
+def _against_fake(fake: FakeZoho, cache: bool = False) -> Iterator[str]:
+    """Point the settings at a started fake Zoho, yields a temporary directory. Stops the fake and restores the settings on exit."""
+    overrides = {
+        "ZOHO_CLIENT_ID": "benchmark",
+        "ZOHO_CLIENT_SECRET": "benchmark",
+        "ZOHO_REFRESH_TOKEN": "benchmark",
+        "ZOHO_ORGANIZATION_ID": "fake-org",
+        "CACHE_ENABLED": cache,
+        # the fake doesn't limit calls, the client side limiter would only add waits
+        "RATE_LIMIT_PER_MINUTE": 0,
+        "TOKEN_BACKGROUND_REFRESH": False,
+    }
+    saved = {name: getattr(settings, name) for name in [*overrides, "ZOHO_API_BASE_URL", "ZOHO_AUTH_BASE_URL", "TOKEN_CACHE_FILE"]}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, value in overrides.items():
+            setattr(settings, name, value)
+        settings.ZOHO_API_BASE_URL = settings.ZOHO_AUTH_BASE_URL = fake.url
+        settings.TOKEN_CACHE_FILE = os.path.join(tmp, "token_cache.json")
+        _reset()
+        try:
+            yield tmp
+        finally:
+            _reset()
+            for name, value in saved.items():
+                setattr(settings, name, value)
+            fake.stop()
+
+
+def run_benchmarks(
+    tools: Optional[list[str]] = None,
+    concurrency: list[int] = DEFAULT_CONCURRENCY,
+    calls: int = 50,
+    latency: float = 0.02,
+    items: int = 2000,
+    cache: bool = False,
+    seed: int = 0,
+) -> dict[str, Any]:
+    """
+    Benchmark the MCP tools against a fake Zoho API.
+
+    Args:
+        tools (list[str], optional): The tools to benchmark, defaults to every tool.
+        concurrency (list[int]): The numbers of calls in flight at a time to measure.
+        calls (int): The calls made per tool and concurrency level.
+        latency (float): Seconds the fake adds to every response, roughly a real round trip.
+        items (int): The number of items the fake serves.
+        cache (bool): Keep the response cache on, off by default so every call reaches the fake.
+        seed (int): Seed of the fake's data and the tool arguments.
+
+    Returns:
+        dict[str, Any]: The configuration and, per tool and concurrency level, the calls, errors,
+            p50 and p99 latency in milliseconds, the throughput in calls a second and the mean size
+            of a result serialized as JSON in kilobytes.
+    """
+    fake = FakeZoho(items=items, latency=latency, organization_id="fake-org", seed=seed).start()
+    with _against_fake(fake, cache) as tmp:
+        pdf_path = os.path.join(tmp, "po.pdf")
+        with open(pdf_path, "wb") as f:
+            f.write(b"%PDF-1.4\n" + os.urandom(64 * 1024))
+        scenarios = _scenarios(fake, pdf_path)
+        unknown = [tool for tool in tools or [] if tool not in scenarios]
+        if unknown:
+            raise ValueError(f"Unknown tools: {', '.join(unknown)}. Supported tools are: {', '.join(scenarios)}")
+        if tools:
+            scenarios = {name: scenarios[name] for name in tools}
+        results = asyncio.run(_run(scenarios, list(concurrency), calls, seed))
+
+    return {
+        "config": {"calls": calls, "latency": latency, "items": items, "cache": cache, "seed": seed},
+        "results": results,
+    }
+
+
+async def _start_and_call(env: dict[str, str], think: float) -> tuple[float, float]:
+    """Start the stdio server, wait think seconds once it is initialized and call one tool."""
+    from mcp import ClientSession, StdioServerParameters
+    from mcp.client.stdio import stdio_client
+
+    params = StdioServerParameters(command=sys.executable, args=[os.path.join(SRC, "server.py")], env=env, cwd=SRC)
+    start = time.perf_counter()
+    async with stdio_client(params) as (read, write):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            ready = time.perf_counter() - start
+            # the agent reads the tool list and decides what to call
+            await asyncio.sleep(think)
+            start = time.perf_counter()
+            result = await session.call_tool("get_taxes", {})
+            first_call = time.perf_counter() - start
+    if result.isError or _failed(json.loads(result.content[0].text)):
+        raise RuntimeError(f"The first tool call failed: {result.content[0].text}")
+    return ready, first_call
+
+
+def run_startup_benchmark(runs: int = 5, latency: float = 0.02, think: float = 0.5) -> dict[str, Any]:
+    """
+    Benchmark how fast a new stdio server answers, with and without the background warm-up.
+
+    Every run starts server.py against a fake Zoho API with an empty token
+    cache, like an agent launching the server, and measures the time until
+    the MCP session is initialized and the latency of the first tool call.
+
+    Args:
+        runs (int): The servers started per mode.
+        latency (float): Seconds the fake adds to every response, roughly a real round trip.
+        think (float): Seconds between the initialization and the first call.
+
+    Returns:
+        dict[str, Any]: The configuration and, for "cold" and "warm" starts, the p50 milliseconds
+            until the session is ready and of the first tool call.
+    """
+    fake = FakeZoho(items=50, latency=latency, organization_id="fake-org").start()
+    results = {}
+    try:
+        for mode, warmup in (("cold", "false"), ("warm", "true")):
+            ready, first_call = [], []
+            for _ in range(runs):
+                with tempfile.TemporaryDirectory() as tmp:
+                    env = {
+                        **os.environ,
+                        "ZOHO_API_BASE_URL": fake.url,
+                        "ZOHO_AUTH_BASE_URL": fake.url,
+                        "ZOHO_CLIENT_ID": "benchmark",
+                        "ZOHO_CLIENT_SECRET": "benchmark",
+                        "ZOHO_REFRESH_TOKEN": "benchmark",
+                        "ZOHO_ORGANIZATION_ID": "fake-org",
+                        "ZOHO_TOKEN_CACHE_FILE": os.path.join(tmp, "token_cache.json"),
+                        "ZOHO_CACHE_ENABLED": "false",
+                        "ZOHO_MCP_TRANSPORT": "stdio",
+                        "ZOHO_WARMUP_ENABLED": warmup,
+                        "ZOHO_LOG_LEVEL": "WARNING",
+                    }
+                    seconds = asyncio.run(_start_and_call(env, think))
+                ready.append(seconds[0] * 1000)
+                first_call.append(seconds[1] * 1000)
+            results[mode] = {
+                "runs": runs,
+                "ready_ms": round(_percentile(ready, 50), 2),
+                "first_call_ms": round(_percentile(first_call, 50), 2),
+            }
+    finally:
+        fake.stop()
+    return {"config": {"runs": runs, "latency": latency, "think": think}, "results": results}
+
+
+def format_startup_report(report: dict[str, Any]) -> str:
+    lines = [f"{'start':<8}{'runs':>6}{'ready ms':>12}{'first call ms':>16}"]
+    for mode, result in report["results"].items():
+        lines.append(f"{mode:<8}{result['runs']:>6}{result['ready_ms']:>12.1f}{result['first_call_ms']:>16.1f}")
+    return "\n".join(lines)
+
+
+def _retained_bytes(build: Callable[[list[dict[str, Any]]], Any], payload: bytes) -> tuple[int, Any]:
+    """The memory build keeps of the records decoded from payload, measured after the records are dropped."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        records = json.loads(payload)
+        store = build(records)
+        del records
+        gc.collect()
+        return tracemalloc.get_traced_memory()[0] - before, store
+    finally:
+        tracemalloc.stop()
+
+
+def _lookup_ns(lookup: Callable[[str], Any], keys: list[str]) -> float:
+    start = time.perf_counter_ns()
+    for key in keys:
+        lookup(key)
+    return (time.perf_counter_ns() - start) / len(keys)
+
+
+def run_catalog_benchmark(items: int = 100000, lookups: int = 100000, seed: int = 0) -> dict[str, Any]:
+    """
+    Compare the memory and lookup time of the item catalog with plain dicts.
+
+    Three stores of the fake's items are built from the JSON Zoho would send: the Zoho records in a
+    dict by id, dicts of the catalog FIELDS in dicts by id and by SKU, and a :class:`utils.catalog.Catalog`.
+    Run it in a fresh process: the catalog interns its strings, and when the interpreter's table of interned
+    strings is already large, the one-off growth of that table is counted against the catalog.
+
+    Args:
+        items (int): The number of items.
+        lookups (int): The lookups timed per store and key.
+        seed (int): Seed of the fake's data and the looked up keys.
+
+    Returns:
+        dict[str, Any]: The configuration and per store the bytes kept per item, the total megabytes and the
+            mean nanoseconds of a lookup by id and by SKU.
+    """
+    fake = FakeZoho(items=items, contacts=0, salesorders=0, composite_items=0, seed=seed)
+    payload = json.dumps(fake.data["/items"]).encode()
+    rnd = random.Random(seed)
+    keys = [rnd.choice(fake.data["/items"]) for _ in range(lookups)]
+    ids, skus = [key["item_id"] for key in keys], [key["sku"] for key in keys]
+    del fake, keys
+
+    def zoho_records(records):
+        by_id = {record["item_id"]: record for record in records}
+        return by_id, {record["sku"]: record for record in records}
+
+    def field_dicts(records):
+        by_id = {record["item_id"]: {field: record.get(field) for field in FIELDS} for record in records}
+        return by_id, {record["sku"]: record for record in by_id.values()}
+
+    def catalog(records):
+        store = Catalog()
+        store.add(records)
+        return store
+
+    results = {}
+    for name, build in (("zoho_records", zoho_records), ("field_dicts", field_dicts), ("catalog", catalog)):
+        retained, store = _retained_bytes(build, payload)
+        if name == "catalog":
+            by_id, by_sku = store.get, store.get_by_sku
+        else:
+            by_id, by_sku = store[0].get, store[1].get
+        results[name] = {
+            "bytes_per_item": round(retained / items),
+            "total_mb": round(retained / 1024 / 1024, 1),
+            "lookup_id_ns": round(_lookup_ns(by_id, ids)),
+            "lookup_sku_ns": round(_lookup_ns(by_sku, skus)),
+        }
+        del store, by_id, by_sku
+    return {"config": {"items": items, "lookups": lookups, "seed": seed}, "results": results}
+
+
+def _call_failed(content: Any) -> bool:
+    """Whether the content of an MCP tool result is a failure, the tools return None or Zoho's error."""
+    text = "".join(getattr(block, "text", "") for block in content)
+    if not text:
+        return True
+    try:
+        return _failed(json.loads(text))
+    except ValueError:
+        return False
+
+
+async def _replay(mcp_server: Any, calls: list[dict[str, Any]], speed: Optional[float], concurrency: int) -> dict[str, dict[str, Any]]:
+    """
+    Make the recorded tool calls through the MCP server, at most `concurrency` of them in flight at a time.
+
+    A call starts at its recorded offset divided by speed, or right away if speed is None.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    measured: dict[str, list[tuple[float, bool, int]]] = {}
+    start = time.perf_counter()
+
+    async def replay(call: dict[str, Any]) -> None:
+        if speed:
+            delay = call["t"] / speed - (time.perf_counter() - start)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        async with semaphore:
+            began = time.perf_counter()
+            try:
+                content = await mcp_server.call_tool(call["tool"], call.get("args") or {})
+                # tools with an output schema also return the structured result
+                if isinstance(content, tuple):
+                    content = content[0]
+                failed, size = _call_failed(content), sum(len(getattr(block, "text", "")) for block in content)
+            except Exception:
+                failed, size = True, 0
+            measured.setdefault(call["tool"], []).append((time.perf_counter() - began, failed, size))
+
+    await asyncio.gather(*(replay(call) for call in calls))
+    elapsed = time.perf_counter() - start
+
+    recorded: dict[str, list[float]] = {}
+    for call in calls:
+        if "ms" in call:
+            recorded.setdefault(call["tool"], []).append(call["ms"])
+    groups = sorted(measured.items())
+    groups.append(("all", [sample for _, samples in groups for sample in samples]))
+    recorded["all"] = [latency for latencies in recorded.values() for latency in latencies]
+    results = {}
+    for tool, samples in groups:
+        latencies = [latency for latency, _, _ in samples]
+        results[tool] = {
+            "calls": len(samples),
+            "errors": sum(failed for _, failed, _ in samples),
+            "p50_ms": round(_percentile(latencies, 50) * 1000, 2),
+            "p99_ms": round(_percentile(latencies, 99) * 1000, 2),
+            "throughput": round(len(samples) / elapsed, 1),
+            "result_kb": round(sum(size for _, _, size in samples) / len(samples) / 1024, 2),
+            "recorded_p50_ms": round(_percentile(recorded[tool], 50), 2) if recorded.get(tool) else None,
+        }
+    return results
+
+
+def run_replay(trace: str, speed: Optional[float] = 1.0, concurrency: list[int] = DEFAULT_CONCURRENCY, latency: float = 0.02, items: int = 2000, cache: bool = False, seed: int = 0) -> dict[str, Any]:
+    """
+    Replay a trace recorded with ZOHO_MCP_RECORD_FILE against a fake Zoho API.
+
+    The recorded tool calls go through the tools of a new MCP server at their recorded pace, or
+    faster. The fake answers the Zoho requests of the trace with their recorded responses and every
+    other request with its generated data.
+
+    Args:
+        trace (str): The trace file.
+        speed (float, optional): How many times faster than recorded to start the calls, None for as fast as possible.
+        concurrency (list[int]): The numbers of calls in flight at a time to replay at, the trace is replayed once per level.
+        latency (float): Seconds the fake adds to every response.
+        items (int): The number of items the fake generates.
+        cache (bool): Keep the response cache on.
+        seed (int): Seed of the fake's data.
+
+    Returns:
+        dict[str, Any]: The configuration and, per tool (and "all") and concurrency level, the calls, errors, p50 and
+            p99 latency in milliseconds, the throughput in calls a second, the mean result size in kilobytes and
+            the p50 latency recorded in production, in the shape of :func:`run_benchmarks`.
+    """
+    from mcp.server.fastmcp import FastMCP
+    from server import register_resources, register_tools
+    from utils.recorder import read_trace
+
+    entries = list(read_trace(trace))
+    calls = sorted((entry for entry in entries if entry.get("type") == "tool"), key=lambda entry: entry["t"])
+    if not calls:
+        raise ValueError(f"{trace} holds no tool calls")
+
+    fake = FakeZoho(items=items, latency=latency, organization_id="fake-org", seed=seed)
+    recorded_responses = fake.load_recorded(entries)
+    del entries
+    fake.start()
+    with _against_fake(fake, cache):
+        mcp_server = FastMCP(name="replay")
+        register_tools(mcp_server)
+        register_resources(mcp_server)
+
+        async def run() -> dict[str, dict[str, Any]]:
+            results: dict[str, dict[str, Any]] = {}
+            try:
+                for level in concurrency:
+                    response_cache.clear()
+                    for tool, result in (await _replay(mcp_server, calls, speed, level)).items():
+                        results.setdefault(tool, {})[str(level)] = result
+            finally:
+                await aclose_async_client()
+            return results
+
+        results = asyncio.run(run())
+
+    return {
+        "config": {"trace": trace, "calls": len(calls), "recorded_responses": recorded_responses, "speed": speed, "latency": latency, "items": items, "cache": cache, "seed": seed},
+        "results": results,
+    }
+
+
+def format_replay_report(report: dict[str, Any], baseline: Optional[dict[str, Any]] = None) -> str:
+    config = report["config"]
+    speed = f"{config['speed']:g}x" if config["speed"] else "max"
+    lines = [f"replayed {config['calls']} calls at {speed} speed, {config['recorded_responses']} recorded Zoho responses", format_report(report, baseline)]
+    recorded = {tool: next(iter(levels.values()))["recorded_p50_ms"] for tool, levels in report["results"].items()}
+    lines.append("recorded p50 ms: " + ", ".join(f"{tool} {p50:.2f}" for tool, p50 in recorded.items() if p50 is not None))
+    return "\n".join(lines)
+
+
+def format_catalog_report(report: dict[str, Any]) -> str:
+    lines = [f"{'store':<14}{'B/item':>9}{'MB':>9}{'id ns':>9}{'sku ns':>9}"]
+    for name, result in report["results"].items():
+        lines.append(f"{name:<14}{result['bytes_per_item']:>9}{result['total_mb']:>9.1f}{result['lookup_id_ns']:>9}{result['lookup_sku_ns']:>9}")
+    return "\n".join(lines)
+
+
+def _reset() -> None:
+    token_manager.reset()
+    close_token_managers()
+    response_cache.clear()
+    request_coalescer.reset()
+    rate_limiter.reset()
+    reset_item_indexes()
+    reset_catalogs()
+    close_client()
+
+
+def load_baseline(path: str) -> dict[str, Any]:
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(report: dict[str, Any], baseline: dict[str, Any]) -> dict[str, dict[str, dict[str, Optional[float]]]]:
+    """The change of every metric against a baseline in percent, None where the baseline has no value."""
+    changes = {}
+    for tool, levels in report["results"].items():
+        for level, result in levels.items():
+            before = baseline.get("results", {}).get(tool, {}).get(level)
+            changes.setdefault(tool, {})[level] = {
+                metric: round((result[metric] - before[metric]) / before[metric] * 100, 1) if before and before.get(metric) else None
+                for metric in METRICS
+            }
+    return changes
+
+
+def format_report(report: dict[str, Any], baseline: Optional[dict[str, Any]] = None) -> str:
+    """A text table of the results, with the change against a baseline if one is given."""
+    changes = compare(report, baseline) if baseline else {}
+    lines = [f"{'tool':<26}{'conc':>5}{'calls':>7}{'errors':>7}{'p50 ms':>10}{'p99 ms':>10}{'calls/s':>10}{'KB':>9}"]
+    for tool, levels in report["results"].items():
+        for level, result in levels.items():
+            line = f"{tool:<26}{level:>5}{result['calls']:>7}{result['errors']:>7}{result['p50_ms']:>10.2f}{result['p99_ms']:>10.2f}{result['throughput']:>10.1f}{result.get('result_kb', 0):>9.2f}"
+            change = changes.get(tool, {}).get(level)
+            if change:
+                line += "   " + "  ".join(
+                    f"{metric} {value:+.1f}%" if value is not None else f"{metric} n/a" for metric, value in change.items()
+                )
+            lines.append(line)
+    return "\n".join(lines)
+
+
+def main(argv: list[str] = None):
+    """
+    Benchmark every MCP tool against a local fake of the Zoho API.
+
+    Usage:
+        python src/benchmark.py [--tools list_items,get_contact] [--concurrency 1,4,16] [--save FILE] [--compare FILE]
+        python src/benchmark.py --startup 5
+        python src/benchmark.py --catalog 200000
+        python src/benchmark.py --replay trace.jsonl.gz --speed 10 --concurrency 8
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the MCP tools against a local fake of the Zoho API.")
+    parser.add_argument("--tools", help="comma separated tools to benchmark, defaults to all")
+    parser.add_argument("--concurrency", default=",".join(map(str, DEFAULT_CONCURRENCY)), help="comma separated concurrency levels")
+    parser.add_argument("--calls", type=int, default=50, help="calls per tool and concurrency level")
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds the fake adds to every response")
+    parser.add_argument("--items", type=int, default=2000, help="items served by the fake")
+    parser.add_argument("--cache", action="store_true", help="keep the response cache on")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", metavar="FILE", help="save the results as a baseline")
+    parser.add_argument("--compare", metavar="FILE", help="compare the results with a saved baseline")
+    parser.add_argument("--startup", type=int, metavar="RUNS", help="benchmark the server startup and first call instead of the tools")
+    parser.add_argument("--catalog", type=int, metavar="ITEMS", help="benchmark the memory and lookups of the item catalog instead of the tools")
+    parser.add_argument("--replay", metavar="TRACE", help="replay a trace recorded with ZOHO_MCP_RECORD_FILE instead of the tools")
+    parser.add_argument("--speed", default="1", help="how many times faster than recorded to replay, or max")
+    args = parser.parse_args(argv)
+
+    if args.catalog:
+        print(format_catalog_report(run_catalog_benchmark(items=args.catalog, seed=args.seed)))
+        return
+    if args.startup:
+        print(format_startup_report(run_startup_benchmark(runs=args.startup, latency=args.latency)))
+        return
+    levels = [int(level) for level in args.concurrency.split(",")]
+    baseline = load_baseline(args.compare) if args.compare else None
+    if args.replay:
+        speed = None if args.speed == "max" else float(args.speed)
+        report = run_replay(args.replay, speed=speed, concurrency=levels, latency=args.latency, items=args.items, cache=args.cache, seed=args.seed)
+        print(format_replay_report(report, baseline))
+    else:
+        report = run_benchmarks(
+            tools=args.tools.split(",") if args.tools else None,
+            concurrency=levels,
+            calls=args.calls,
+            latency=args.latency,
+            items=args.items,
+            cache=args.cache,
+            seed=args.seed,
+        )
+        print(format_report(report, baseline))
+
+    if args.save:
+        write_json_atomic(args.save, report)
+        print(f"baseline saved to {args.save}")
+
+if __name__ == "__main__":
+        main()
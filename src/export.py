@@ -0,0 +1,49 @@
+import argparse
+import sys
+import time
+
+from utils.export import FORMATS, SOURCES, export
+
+
+def main(argv: list[str] = None):
+    """
+    Export every record of a Zoho list endpoint to a JSONL, CSV or Parquet file.
+
+    Usage:
+        python src/export.py [--format jsonl|csv|parquet] [--expand] [--param key=value ...] source path
+    """
+    parser = argparse.ArgumentParser(description="Export Zoho Inventory records to disk, resuming an interrupted export.")
+    parser.add_argument("source", choices=SOURCES, help="the records to export")
+    parser.add_argument("path", help="the output file, a directory of part files for parquet")
+    parser.add_argument("--format", choices=FORMATS, help="defaults to the extension of path, then jsonl")
+    parser.add_argument("--param", action="append", default=[], metavar="KEY=VALUE", help="a query parameter of the list endpoint, e.g. cf_region=north")
+    parser.add_argument("--expand", action="store_true", help="export every sales order with its details and line items")
+    parser.add_argument("--columns", help="comma separated columns of a csv or parquet export, defaults to the fields of the first page")
+    parser.add_argument("--per-page", type=int, help="records per page")
+    parser.add_argument("--concurrency", type=int, help="pages fetched in parallel")
+    parser.add_argument("--org", help="the organization to export from, defaults to the default organization")
+    parser.add_argument("--restart", action="store_true", help="start over instead of resuming an unfinished export to path")
+    args = parser.parse_args(argv)
+    params = {}
+    for param in args.param:
+        key, separator, value = param.partition("=")
+        if not separator or not key:
+            parser.error(f"--param must be KEY=VALUE, got {param}")
+        params[key] = value
+
+    start = time.perf_counter()
+    try:
+        result = export(args.source, args.path, args.format, params, args.expand, args.columns.split(",") if args.columns else None,
+                        args.per_page, args.concurrency, args.restart, args.org)
+    except ValueError as e:
+        parser.error(str(e))
+    except Exception as e:
+        sys.exit(f"export failed: {e}\nrun the same command again to resume")
+    elapsed = time.perf_counter() - start
+
+    if result["resumed_at"]:
+        print(f"resumed at page {result['resumed_at']}")
+    print(f"{args.source}: {result['records']} records written to {result['path']} ({result['format']}) in {elapsed:.1f}s")
+
+if __name__ == "__main__":
+        main()
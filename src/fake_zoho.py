@@ -0,0 +1,516 @@
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Iterable, Optional
+from urllib.parse import parse_qs, urlparse
+
+# list endpoint -> (list record key, get record key, id field, fields search_text looks in)
+COLLECTIONS: dict[str, tuple[str, str, str, tuple[str, ...]]] = {
+    "/items": ("items", "item", "item_id", ("name", "sku", "description")),
+    "/contacts": ("contacts", "contact", "contact_id", ("contact_name", "company_name", "email")),
+    "/salesorders": ("salesorders", "salesorder", "salesorder_id", ("salesorder_number", "reference_number", "customer_name")),
+    "/compositeitems": ("composite_items", "composite_item", "composite_item_id", ("name", "sku", "description")),
+    "/settings/taxes": ("taxes", "tax", "tax_id", ("tax_name",)),
+}
+
+# fields zoho leaves out of list responses, they are only returned by the get endpoints
+DETAIL_FIELDS = {"line_items", "mapped_items", "contact_persons", "documents"}
+
+_WORDS = (
+    "steel brass zinc nylon copper black white heavy duty compact hex flat round "
+    "bolt nut washer screw hinge bracket panel valve pipe flange cable clamp spring bearing seal gasket motor pump"
+).split()
+_FIRST_NAMES = "Sam Alex Jordan Taylor Morgan Casey Riley Jamie Avery Quinn".split()
+_LAST_NAMES = "Smith Jones Brown Garcia Miller Davis Wilson Moore Clark Lewis".split()
+_FILENAME = re.compile(rb'filename="([^"]*)"')
+
+
+def _collection(path: str) -> str:
+    """The list endpoint a path belongs to, e.g. /salesorders for /salesorders/1/attachment."""
+    parts = path.strip("/").split("/")
+    return "/" + "/".join(parts[:2]) if parts[0] == "settings" else "/" + parts[0]
+
+
+def _query_key(params: dict[str, Any]) -> tuple:
+    """A query as a key, the values as httpx sends them and without the organization."""
+    return tuple(sorted(
+        (key, str(value).lower() if isinstance(value, bool) else str(value))
+        for key, value in params.items() if key != "organization_id"
+    ))
+
+
+def _timestamp(moment: datetime) -> str:
+    return moment.strftime("%Y-%m-%dT%H:%M:%S+0000")
+
+
+class FakeZoho:
+    """
+    A local stand-in for the Zoho Inventory API, for benchmarks and offline testing.
+
+    Serves the endpoints this project uses, /items, /contacts, /salesorders
+    (with create and attachment upload), /settings/taxes, /compositeitems and
+    the OAuth /token, from generated data. Point ZOHO_API_BASE_URL and
+    ZOHO_AUTH_BASE_URL at url to use it.
+
+    Every response can be slowed down by latency (+ a random jitter). Pages
+    are capped at max_per_page, error_rate makes that share of requests fail
+    with a 500, rate_limit_per_minute answers 429 with Retry-After once more
+    calls than that were made in the last minute and fail_next() queues
+    specific failures. Access tokens expire after token_ttl seconds.
+    """
+
+    def __init__(
+        self,
+        items: int = 1000,
+        contacts: int = 200,
+        salesorders: int = 500,
+        composite_items: int = 50,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        max_per_page: int = 200,
+        include_total: bool = True,
+        error_rate: float = 0.0,
+        rate_limit_per_minute: int = 0,
+        token_ttl: int = 3600,
+        organization_id: str = "fake-org",
+        seed: int = 0,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.max_per_page = max_per_page
+        self.include_total = include_total
+        self.error_rate = error_rate
+        self.rate_limit_per_minute = rate_limit_per_minute
+        self.token_ttl = token_ttl
+        self.organization_id = organization_id
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._tokens: dict[str, float] = {}
+        self._failures: deque[tuple[int, Optional[str]]] = deque()
+        self._calls: deque[float] = deque()
+        self.requests: Counter = Counter()
+        self.errors: Counter = Counter()
+        self.attachments: dict[str, list[dict[str, Any]]] = {}
+        self._recorded: dict[tuple, tuple[int, Any]] = {}
+        self.data = self._generate(items, contacts, salesorders, composite_items)
+        self._by_id = {
+            collection: {record[COLLECTIONS[collection][2]]: record for record in records}
+            for collection, records in self.data.items()
+        }
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeZoho":
+        self._thread = threading.Thread(target=self._server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def serve_forever(self) -> None:
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+
+    def fail_next(self, count: int = 1, status: int = 500, path: Optional[str] = None) -> None:
+        """Fail the next `count` requests (to paths starting with `path`) with `status`."""
+        with self._lock:
+            self._failures.extend([(status, path)] * count)
+
+    def load_recorded(self, entries: Iterable[dict[str, Any]]) -> int:
+        """
+        Serve recorded Zoho responses, e.g. from a trace of :class:`utils.recorder.TraceRecorder`.
+
+        A request with the method, endpoint and query of a "zoho" entry that holds a response gets
+        that status and response instead of the generated data, the last one recorded wins.
+
+        Returns:
+            int: The number of responses loaded.
+        """
+        loaded = 0
+        with self._lock:
+            for entry in entries:
+                if entry.get("type") == "zoho" and "response" in entry and entry["response"] is not None:
+                    key = (entry["method"], entry["endpoint"], _query_key(entry.get("params") or {}))
+                    self._recorded[key] = (entry["status"], entry["response"])
+                    loaded += 1
+        return loaded
+
+    def expire_tokens(self) -> None:
+        """Expire every access token issued so far, the next call gets a 401."""
+        with self._lock:
+            self._tokens.clear()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {"requests": dict(self.requests), "errors": dict(self.errors)}
+
+    # data
+
+    def _generate(self, items: int, contacts: int, salesorders: int, composite_items: int) -> dict[str, list[dict[str, Any]]]:
+        rnd = self._random
+        start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+        def name(i: int) -> str:
+            return f"{rnd.choice(_WORDS).title()} {rnd.choice(_WORDS)} {rnd.choice(_WORDS)} {i}"
+
+        taxes = [
+            {"tax_id": f"9{i:06d}", "tax_name": f"Tax {rate}%", "tax_percentage": rate, "tax_type": "tax"}
+            for i, rate in enumerate((0, 5, 10, 15, 20))
+        ]
+        item_records = [
+            {
+                "item_id": f"1{i:08d}",
+                "name": name(i),
+                "sku": f"SKU-{i:06d}",
+                "description": " ".join(rnd.choice(_WORDS) for _ in range(6)),
+                "rate": round(rnd.uniform(0.5, 500), 2),
+                "unit": "pcs",
+                "status": "active",
+                "tax_id": rnd.choice(taxes)["tax_id"],
+                "stock_on_hand": rnd.randint(0, 1000),
+                "available_stock": rnd.randint(0, 1000),
+                "reorder_level": i % 5 * 50,
+                "last_modified_time": _timestamp(start + timedelta(minutes=i)),
+            }
+            for i in range(items)
+        ]
+        contact_records = []
+        for i in range(contacts):
+            first, last = rnd.choice(_FIRST_NAMES), rnd.choice(_LAST_NAMES)
+            contact_records.append({
+                "contact_id": f"2{i:08d}",
+                "contact_name": f"{first} {last} {i}",
+                "company_name": f"{last} {rnd.choice(_WORDS).title()} Co",
+                "first_name": first,
+                "last_name": last,
+                "email": f"{first.lower()}.{last.lower()}{i}@example.com",
+                "phone": f"555-{i:04d}",
+                "contact_type": "customer",
+                "status": "active",
+                "last_modified_time": _timestamp(start + timedelta(minutes=i)),
+            })
+        composite_records = [
+            {
+                "composite_item_id": f"3{i:08d}",
+                "name": f"Kit {name(i)}",
+                "sku": f"KIT-{i:05d}",
+                "description": "Assembled kit",
+                "rate": round(rnd.uniform(10, 1000), 2),
+                "status": "active",
+                "mapped_items": [
+                    {"item_id": item["item_id"], "name": item["name"], "quantity": rnd.randint(1, 4)}
+                    for item in rnd.sample(item_records, min(3, len(item_records)))
+                ],
+                "last_modified_time": _timestamp(start + timedelta(minutes=i)),
+            }
+            for i in range(composite_items)
+        ]
+        salesorder_records = []
+        for i in range(salesorders):
+            customer = rnd.choice(contact_records) if contact_records else {"contact_id": "", "contact_name": ""}
+            line_items = []
+            for item in rnd.sample(item_records, min(rnd.randint(1, 5), len(item_records))):
+                quantity = rnd.randint(1, 20)
+                line_items.append({
+                    "line_item_id": uuid.UUID(int=rnd.getrandbits(128)).hex[:12],
+                    "item_id": item["item_id"],
+                    "name": item["name"],
+                    "sku": item["sku"],
+                    "quantity": quantity,
+                    "rate": item["rate"],
+                    "item_total": round(quantity * item["rate"], 2),
+                    "tax_id": item["tax_id"],
+                })
+            date = start + timedelta(days=i % 365)
+            salesorder_records.append({
+                "salesorder_id": f"4{i:08d}",
+                "salesorder_number": f"SO-{i + 1:05d}",
+                "reference_number": f"PO-{rnd.randint(1000, 9999)}",
+                "customer_id": customer["contact_id"],
+                "customer_name": customer["contact_name"],
+                "date": date.strftime("%Y-%m-%d"),
+                "status": rnd.choice(["draft", "confirmed", "fulfilled"]),
+                "total": round(sum(line["item_total"] for line in line_items), 2),
+                "cf_po_number": f"PO-{i:05d}",
+                "line_items": line_items,
+                "last_modified_time": _timestamp(start + timedelta(minutes=i)),
+            })
+        return {
+            "/items": item_records,
+            "/contacts": contact_records,
+            "/salesorders": salesorder_records,
+            "/compositeitems": composite_records,
+            "/settings/taxes": taxes,
+        }
+
+    # request handling
+
+    def _before_request(self, path: str) -> Optional[tuple[int, dict[str, Any], dict[str, str]]]:
+        """Count the request and decide if it gets an injected error."""
+        with self._lock:
+            self.requests[_collection(path)] += 1
+            for index, (status, prefix) in enumerate(self._failures):
+                if prefix is None or path.startswith(prefix):
+                    del self._failures[index]
+                    self.errors[status] += 1
+                    return status, {"code": 1, "message": "Injected failure"}, {}
+            if self.rate_limit_per_minute and path != "/token":
+                now = time.monotonic()
+                while self._calls and now - self._calls[0] > 60:
+                    self._calls.popleft()
+                if len(self._calls) >= self.rate_limit_per_minute:
+                    self.errors[429] += 1
+                    retry_after = max(60 - (now - self._calls[0]), 0.1)
+                    return 429, {"code": 44, "message": "Too many requests"}, {"Retry-After": f"{retry_after:.1f}"}
+                self._calls.append(now)
+            if self.error_rate and self._random.random() < self.error_rate:
+                self.errors[500] += 1
+                return 500, {"code": 1, "message": "Internal error"}, {}
+        return None
+
+    def _token(self, query: dict[str, list[str]]) -> tuple[int, dict[str, Any]]:
+        if query.get("grant_type", [""])[0] != "refresh_token" or not query.get("refresh_token"):
+            return 400, {"error": "invalid_code"}
+        token = uuid.uuid4().hex
+        with self._lock:
+            self._tokens[token] = time.time() + self.token_ttl
+        return 200, {"access_token": token, "api_domain": self.url, "token_type": "Bearer", "expires_in": self.token_ttl}
+
+    def _authorized(self, headers) -> bool:
+        token = (headers.get("Authorization") or "").removeprefix("Zoho-oauthtoken ").strip()
+        with self._lock:
+            expires_at = self._tokens.get(token)
+        return expires_at is not None and expires_at > time.time()
+
+    def _route(self, method: str, path: str, query: dict[str, list[str]], body: bytes) -> tuple[int, dict[str, Any]]:
+        recorded = self._recorded.get((method, path, _query_key({key: values[0] for key, values in query.items()}))) if self._recorded else None
+        if recorded is not None:
+            return recorded
+        collection = _collection(path)
+        if collection not in self.data:
+            return 404, {"code": 5, "message": "Invalid URL Passed"}
+        _, record_key, _, _ = COLLECTIONS[collection]
+        rest = path[len(collection):].strip("/").split("/") if path.rstrip("/") != collection else []
+
+        if method == "GET" and not rest:
+            return 200, self._list(collection, query)
+        if method == "POST" and collection == "/salesorders" and not rest:
+            return self._create_salesorder(body)
+
+        record = self._find(collection, rest[0]) if rest else None
+        if record is None:
+            return 404, {"code": 1002, "message": f"{record_key.replace('_', ' ').capitalize()} does not exist."}
+        if method == "GET" and len(rest) == 1:
+            return 200, {"code": 0, "message": "success", record_key: record}
+        if method == "POST" and collection == "/salesorders" and rest[1:] == ["attachment"]:
+            return self._attach(record, body)
+        return 405, {"code": 5, "message": "Method not allowed"}
+
+    def _find(self, collection: str, record_id: str) -> Optional[dict[str, Any]]:
+        with self._lock:
+            return self._by_id[collection].get(record_id)
+
+    def _list(self, collection: str, query: dict[str, list[str]]) -> dict[str, Any]:
+        record_key, _, _, search_fields = COLLECTIONS[collection]
+        params = {key: values[0] for key, values in query.items()}
+        page = max(int(params.pop("page", 1)), 1)
+        per_page = min(max(int(params.pop("per_page", 200)), 1), self.max_per_page)
+        sort_column = params.pop("sort_column", None)
+        descending = params.pop("sort_order", "A") == "D"
+        search_text = params.pop("search_text", "").lower()
+        params.pop("organization_id", None)
+
+        with self._lock:
+            records = list(self.data[collection])
+        if search_text:
+            records = [r for r in records if any(search_text in str(r.get(field) or "").lower() for field in search_fields)]
+        for key, value in params.items():
+            if key.endswith("_contains"):
+                field = key.removesuffix("_contains")
+                records = [r for r in records if value.lower() in str(r.get(field) or "").lower()]
+            elif key.endswith("_startswith"):
+                field = key.removesuffix("_startswith")
+                records = [r for r in records if str(r.get(field) or "").lower().startswith(value.lower())]
+            elif key == "date_start":
+                records = [r for r in records if (r.get("date") or "") >= value]
+            elif key == "date_end":
+                records = [r for r in records if (r.get("date") or "") <= value]
+            elif key.endswith("_id") or key == "status":
+                records = [r for r in records if str(r.get(key) or "") == value]
+            else:
+                # like zoho's name and email filters, match a part of the field
+                records = [r for r in records if value.lower() in str(r.get(key) or "").lower()]
+        if sort_column:
+            records.sort(key=lambda r: (r.get(sort_column) is None, r.get(sort_column) or ""), reverse=descending)
+
+        chunk = records[(page - 1) * per_page:page * per_page]
+        page_context = {"page": page, "per_page": per_page, "has_more_page": page * per_page < len(records)}
+        if self.include_total:
+            page_context["total"] = len(records)
+        return {
+            "code": 0,
+            "message": "success",
+            record_key: [{k: v for k, v in r.items() if k not in DETAIL_FIELDS} for r in chunk],
+            "page_context": page_context,
+        }
+
+    def _create_salesorder(self, body: bytes) -> tuple[int, dict[str, Any]]:
+        try:
+            data = json.loads(body or b"{}")
+        except json.JSONDecodeError:
+            return 400, {"code": 4, "message": "Invalid value passed for JSONString"}
+        customer = self._find("/contacts", str(data.get("customer_id")))
+        if customer is None:
+            return 400, {"code": 3062, "message": "Customer does not exist."}
+        line_items = data.get("line_items") or []
+        if not line_items:
+            return 400, {"code": 36004, "message": "Line items cannot be empty."}
+        now = datetime.now(timezone.utc)
+        with self._lock:
+            number = len(self.data["/salesorders"]) + 1
+            record = {
+                "salesorder_id": f"5{uuid.uuid4().int % 10**12:012d}",
+                "salesorder_number": f"SO-{number:05d}",
+                "reference_number": "",
+                "customer_id": customer["contact_id"],
+                "customer_name": customer["contact_name"],
+                "date": now.strftime("%Y-%m-%d"),
+                "status": "draft",
+                "total": round(sum(float(line.get("item_total", 0)) for line in line_items), 2),
+                "custom_fields": data.get("custom_fields", []),
+                "line_items": line_items,
+                "last_modified_time": _timestamp(now),
+            }
+            self.data["/salesorders"].append(record)
+            self._by_id["/salesorders"][record["salesorder_id"]] = record
+        return 201, {"code": 0, "message": "Sales Order has been created.", "salesorder": record}
+
+    def _attach(self, record: dict[str, Any], body: bytes) -> tuple[int, dict[str, Any]]:
+        match = _FILENAME.search(body[:4096])
+        if match is None:
+            return 400, {"code": 33003, "message": "Attachment not found."}
+        with self._lock:
+            self.attachments.setdefault(record["salesorder_id"], []).append({"file_name": match.group(1).decode(), "size": len(body)})
+        return 200, {"code": 0, "message": "Your file has been attached."}
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # headers and body go out in separate writes, without this delayed ACKs add 40ms a response
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def _respond(self):
+                parsed = urlparse(self.path)
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                query = parse_qs(parsed.query)
+                delay = fake.latency + (fake._random.uniform(0, fake.jitter) if fake.jitter else 0)
+                if delay:
+                    time.sleep(delay)
+
+                headers = {}
+                injected = fake._before_request(parsed.path)
+                if injected is not None:
+                    status, payload, headers = injected
+                elif parsed.path == "/token" and self.command == "POST":
+                    status, payload = fake._token(query)
+                elif not fake._authorized(self.headers):
+                    status, payload = 401, {"code": 57, "message": "You are not authorized to perform this operation"}
+                elif query.get("organization_id", [None])[0] != fake.organization_id:
+                    status, payload = 400, {"code": 6041, "message": "This organization does not exist."}
+                else:
+                    status, payload = fake._route(self.command, parsed.path, query, body)
+
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json;charset=UTF-8")
+                self.send_header("Content-Length", str(len(data)))
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = _respond
+            do_POST = _respond
+            do_PUT = _respond
+            do_DELETE = _respond
+
+        return Handler
+
+
+def main(argv: list[str] = None):
+    """
+    Run the fake Zoho Inventory API.
+
+    Usage:
+        python src/fake_zoho.py [--port 8765] [--latency 0.05] [--items 5000] ...
+    """
+    parser = argparse.ArgumentParser(description="Serve a local stand-in for the Zoho Inventory API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--items", type=int, default=1000)
+    parser.add_argument("--contacts", type=int, default=200)
+    parser.add_argument("--salesorders", type=int, default=500)
+    parser.add_argument("--composite-items", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="random extra latency up to this many seconds")
+    parser.add_argument("--max-per-page", type=int, default=200)
+    parser.add_argument("--no-total", action="store_true", help="leave page_context.total out of list responses")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests failing with a 500")
+    parser.add_argument("--rate-limit", type=int, default=0, help="requests per minute before answering 429")
+    parser.add_argument("--token-ttl", type=int, default=3600)
+    parser.add_argument("--organization-id", default="fake-org")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    fake = FakeZoho(
+        items=args.items,
+        contacts=args.contacts,
+        salesorders=args.salesorders,
+        composite_items=args.composite_items,
+        latency=args.latency,
+        jitter=args.jitter,
+        max_per_page=args.max_per_page,
+        include_total=not args.no_total,
+        error_rate=args.error_rate,
+        rate_limit_per_minute=args.rate_limit,
+        token_ttl=args.token_ttl,
+        organization_id=args.organization_id,
+        seed=args.seed,
+        host=args.host,
+        port=args.port,
+    )
+    print(f"fake zoho listening on {fake.url}, use:")
+    print(f"  ZOHO_API_BASE_URL={fake.url} ZOHO_AUTH_BASE_URL={fake.url} ZOHO_ORGANIZATION_ID={args.organization_id}")
+    print("  ZOHO_CLIENT_ID=fake ZOHO_CLIENT_SECRET=fake ZOHO_REFRESH_TOKEN=fake")
+    try:
+        fake.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+        main()
@@ -0,0 +1,17 @@
+from typing import Any
+
+from utils.cache import response_cache
+from utils.coalesce import request_coalescer
+from utils.httpcache import http_cache
+
+
+def get_cache_stats() -> dict[str, Any]:
+    """
+    Report the hit, miss and eviction counts of the Zoho response cache and how many Zoho calls request coalescing saved.
+
+    Returns:
+        dict[str, Any]: The number of cached entries, their size in bytes and the cache counters, with the
+            upstream calls made and the identical in-flight GETs that shared them under "coalescing", and the entries
+            and 304 revalidations of the on-disk HTTP cache under "http_cache".
+    """
+    return {**response_cache.stats(), "coalescing": request_coalescer.stats(), "http_cache": http_cache.stats()}
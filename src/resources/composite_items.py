@@ -1,8 +1,14 @@
-from typing import Optional, Any
+import logging
+from typing import Optional, Any, AsyncIterator, Iterator, List
 
-from utils.api import zoho_api_request
+from utils.api import zoho_api_request, zoho_api_request_async
+from utils.mirror import mirror, check_source
+from utils.pager import iter_records, aiter_records, collect_records, acollect_records
+from utils.projection import check_fields, shape_records
 
-def list_composite_items(page: int = 1, per_page: int = 100, search_text: Optional[str] = None, sort_column: str = "name") -> dict[str, Any]:
+logger = logging.getLogger(__name__)
+
+def list_composite_items(page: int = 1, per_page: int = 100, search_text: Optional[str] = None, sort_column: str = "name", source: str = "remote", org: Optional[str] = None, fields: Optional[List[str]] = None, compact: bool = False) -> dict[str, Any]:
     """
     List all composite items in the Zoho Inventory account.
 
@@ -11,10 +17,45 @@ def list_composite_items(page: int = 1, per_page: int = 100, search_text: Option
         per_page (int): The number of items per page.
         search_text (str, optional): The text to filter items by name and description.
         sort_column (str): The column to sort by(name, sku, rate, purchase_rate).
+        source (str): "remote" to query Zoho or "local" to read the local mirror, which is much faster but only as fresh as its last sync.
+        org (str, optional): The organization to use, a name from list_organizations or a Zoho organization id, defaults to the default organization.
+        fields (List[str], optional): Only return these fields of every composite item, e.g. ["composite_item_id", "name", "rate"].
+        compact (bool): Return the composite items as {"columns": [...], "rows": [[...], ...]} with the given fields, or a few key fields, a fraction of the size of the full records.
 
     Returns:
         dict[str, Any]: A dictionary containing the list of composite items and pagination information.
     """
+    params = _list_composite_items_params(page, per_page, search_text, sort_column)
+    check_source(source, org)
+    check_fields(fields)
+
+    try:
+        if source == "local":
+            response = mirror.list_page("compositeitems", params)
+        else:
+            response = zoho_api_request("GET", "/compositeitems", params=params, org=org)
+        return _list_composite_items_result(response, page, per_page, fields, compact)
+    except Exception as e:
+        logger.error("Error listing composite items: %s", e)
+        return None
+
+async def list_composite_items_async(page: int = 1, per_page: int = 100, search_text: Optional[str] = None, sort_column: str = "name", source: str = "remote", org: Optional[str] = None, fields: Optional[List[str]] = None, compact: bool = False) -> dict[str, Any]:
+    """Async version of :func:`list_composite_items`."""
+    params = _list_composite_items_params(page, per_page, search_text, sort_column)
+    check_source(source, org)
+    check_fields(fields)
+
+    try:
+        if source == "local":
+            response = mirror.list_page("compositeitems", params)
+        else:
+            response = await zoho_api_request_async("GET", "/compositeitems", params=params, org=org)
+        return _list_composite_items_result(response, page, per_page, fields, compact)
+    except Exception as e:
+        logger.error("Error listing composite items: %s", e)
+        return None
+
+def _list_composite_items_params(page: int, per_page: int, search_text: Optional[str], sort_column: str) -> dict[str, Any]:
     #TODO Should sort columns be validated all the time? 
     params = {
         "page": page,
@@ -23,21 +64,73 @@ def list_composite_items(page: int = 1, per_page: int = 100, search_text: Option
     }
     if search_text:
         params["search_text"] = search_text
+    return params
+
+def _list_composite_items_result(response: dict[str, Any], page: int, per_page: int, fields: Optional[List[str]] = None, compact: bool = False) -> dict[str, Any]:
+    result = {
+        "page": page,
+        "per_page": per_page,
+        "has_more_page": response.get("page_context", {}).get("has_more_page", False),
+        "composite_items": shape_records(response.get("composite_items", []), "composite_items", fields, compact),
+        "message": response.get("message", ""),
+    }
+
+    if "page_context" in response and "total" in response["page_context"]:
+        result["total"] = response["page_context"]["total"]
+
+    return result
+
+
+def iter_composite_items(search_text: Optional[str] = None, sort_column: str = "name", org: Optional[str] = None) -> Iterator[dict[str, Any]]:
+    """
+    Iterate over all composite items in the Zoho Inventory account, fetching pages as needed.
+
+    Args:
+        search_text (str, optional): The text to filter items by name and description.
+        sort_column (str): The column to sort by(name, sku, rate, purchase_rate).
+        org (str, optional): The organization to use, a name from list_organizations or a Zoho organization id, defaults to the default organization.
+
+    Yields:
+        dict[str, Any]: One record at a time.
+    """
+    params = _list_composite_items_params(1, None, search_text, sort_column)
+    return iter_records("/compositeitems", "composite_items", params=params, org=org)
+
+def aiter_composite_items(search_text: Optional[str] = None, sort_column: str = "name", org: Optional[str] = None) -> AsyncIterator[dict[str, Any]]:
+    """Async version of :func:`iter_composite_items`."""
+    params = _list_composite_items_params(1, None, search_text, sort_column)
+    return aiter_records("/compositeitems", "composite_items", params=params, org=org)
+
+def fetch_all_composite_items(max_records: int = 1000, search_text: Optional[str] = None, sort_column: str = "name", org: Optional[str] = None, fields: Optional[List[str]] = None, compact: bool = False) -> dict[str, Any]:
+    """
+    Fetch all composite items across every page in a single call, up to max_records.
+    Use this instead of paging through the list tool when all records are needed.
+
+    Args:
+        max_records (int): The maximum number of records to return.
+        search_text (str, optional): The text to filter items by name and description.
+        sort_column (str): The column to sort by(name, sku, rate, purchase_rate).
+        org (str, optional): The organization to use, a name from list_organizations or a Zoho organization id, defaults to the default organization.
+        fields (List[str], optional): Only return these fields of every composite item, e.g. ["composite_item_id", "name", "rate"].
+        compact (bool): Return the composite items as {"columns": [...], "rows": [[...], ...]} with the given fields, or a few key fields, a fraction of the size of the full records.
+
+    Returns:
+        dict[str, Any]: A dictionary with the composite items, their count and whether the result was truncated at max_records.
+    """
+    check_fields(fields)
+    try:
+        records, truncated = collect_records(iter_composite_items(search_text, sort_column, org), max_records)
+        return {"composite_items": shape_records(records, "composite_items", fields, compact), "count": len(records), "truncated": truncated}
+    except Exception as e:
+        logger.error("Error fetching all composite items: %s", e)
+        return None
 
+async def fetch_all_composite_items_async(max_records: int = 1000, search_text: Optional[str] = None, sort_column: str = "name", org: Optional[str] = None, fields: Optional[List[str]] = None, compact: bool = False) -> dict[str, Any]:
+    """Async version of :func:`fetch_all_composite_items`."""
+    check_fields(fields)
     try:
-        response = zoho_api_request("GET", "/compositeitems", params=params)
-        result = {
-            "page": page,
-            "per_page": per_page,
-            "has_more_page": response.get("page_context", {}).get("has_more_page", False),
-            "composite_items": response.get("composite_items", []),
-            "message": response.get("message", ""),
-        }
-
-        if "page_context" in response and "total" in response["page_context"]:
-            result["total"] = response["page_context"]["total"]
-
-        return result
+        records, truncated = await acollect_records(aiter_composite_items(search_text, sort_column, org), max_records)
+        return {"composite_items": shape_records(records, "composite_items", fields, compact), "count": len(records), "truncated": truncated}
     except Exception as e:
-        print(f"Error listing composite items: {e}")
-        return None
\ No newline at end of file
+        logger.error("Error fetching all composite items: %s", e)
+        return None
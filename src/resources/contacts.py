@@ -1,9 +1,16 @@
 
-from utils.api import zoho_api_request
-from typing import Any
+import logging
 
+from utils.api import zoho_api_request, zoho_api_request_async
+from utils.mirror import mirror, check_source
+from utils.pager import iter_records, aiter_records, collect_records, acollect_records
+from utils.projection import check_fields, shape_record, shape_records
+from typing import Any, AsyncIterator, Iterator, List, Optional
 
-def list_contacts(page: int = 1, per_page: int = 100, sort_column: str = "contact_name", query_params: dict[str, str] = None) -> dict[str, Any]:
+logger = logging.getLogger(__name__)
+
+
+def list_contacts(page: int = 1, per_page: int = 100, sort_column: str = "contact_name", query_params: dict[str, str] = None, source: str = "remote", org: Optional[str] = None, fields: Optional[List[str]] = None, compact: bool = False) -> dict[str, Any]:
     """
     List all contacts in the Zoho Inventory account.
 
@@ -20,10 +27,45 @@ def list_contacts(page: int = 1, per_page: int = 100, sort_column: str = "contac
                 - 'phone': search contacts by phone. Maximum length [100]
                 - 'first_name': search contacts by first name. Maximum length [100]
                 - 'last_name': search contacts by last name. Maximum length [100]
+        source (str): "remote" to query Zoho or "local" to read the local mirror, which is much faster but only as fresh as its last sync.
+        org (str, optional): The organization to use, a name from list_organizations or a Zoho organization id, defaults to the default organization.
+        fields (List[str], optional): Only return these fields of every contact, e.g. ["contact_id", "contact_name", "email"].
+        compact (bool): Return the contacts as {"columns": [...], "rows": [[...], ...]} with the given fields, or a few key fields, a fraction of the size of the full records.
 
     Returns:
         dict[str, Any]: A dictionary containing the list of contacts and pagination information.
     """
+    params = _list_contacts_params(page, per_page, sort_column, query_params)
+    check_source(source, org)
+    check_fields(fields)
+
+    try:
+        if source == "local":
+            response = mirror.list_page("contacts", params)
+        else:
+            response= zoho_api_request('GET', '/contacts', params=params, org=org)
+        return _list_contacts_result(response, page, per_page, fields, compact)
+    except Exception as e:
+        logger.error("Error listing contacts: %s", e)
+        return None
+
+async def list_contacts_async(page: int = 1, per_page: int = 100, sort_column: str = "contact_name", query_params: dict[str, str] = None, source: str = "remote", org: Optional[str] = None, fields: Optional[List[str]] = None, compact: bool = False) -> dict[str, Any]:
+    """Async version of :func:`list_contacts`."""
+    params = _list_contacts_params(page, per_page, sort_column, query_params)
+    check_source(source, org)
+    check_fields(fields)
+
+    try:
+        if source == "local":
+            response = mirror.list_page("contacts", params)
+        else:
+            response= await zoho_api_request_async('GET', '/contacts', params=params, org=org)
+        return _list_contacts_result(response, page, per_page, fields, compact)
+    except Exception as e:
+        logger.error("Error listing contacts: %s", e)
+        return None
+
+def _list_contacts_params(page: int, per_page: int, sort_column: str, query_params: dict[str, str]) -> dict[str, Any]:
     params = {
             "page": page,
             "per_page": per_page,
@@ -68,28 +110,30 @@ def list_contacts(page: int = 1, per_page: int = 100, sort_column: str = "contac
             else:
                 params['last_name_contains'] = query_params['last_name']
 
-    try:
-        response= zoho_api_request('GET', '/contacts', params=params)
-        result = {
-            "page": page,
-            "per_page": per_page,
-            "has_more_page": response.get("page_context", {}).get("has_more_page", False),
-            "contacts": response.get("contacts", []),
-            "message": response.get("message", ""),
-        }
-        if "page_context" in response and "total" in response["page_context"]:
-            result["total"] = response["page_context"]["total"]
-        return result
-    except Exception as e:
-        print(f"Error listing contacts: {e}")
-        return None
+    return params
+
+def _list_contacts_result(response: dict[str, Any], page: int, per_page: int, fields: Optional[List[str]] = None, compact: bool = False) -> dict[str, Any]:
+    result = {
+        "page": page,
+        "per_page": per_page,
+        "has_more_page": response.get("page_context", {}).get("has_more_page", False),
+        "contacts": shape_records(response.get("contacts", []), "contacts", fields, compact),
+        "message": response.get("message", ""),
+    }
+    if "page_context" in response and "total" in response["page_context"]:
+        result["total"] = response["page_context"]["total"]
+    return result
 
-def get_contact(contact_id: str) -> dict[str, Any]:
+def get_contact(contact_id: str, source: str = "remote", org: Optional[str] = None, fields: Optional[List[str]] = None, compact: bool = False) -> dict[str, Any]:
     """
     Get detailed info about a specific contact with the id. 
 
     Args:
         contact_id (str): The ID of the contact to retrieve.
+        source (str): "remote" to query Zoho or "local" to read the local mirror, which is much faster but only as fresh as its last sync.
+        org (str, optional): The organization to use, a name from list_organizations or a Zoho organization id, defaults to the default organization.
+        fields (List[str], optional): Only return these fields of the contact, e.g. ["contact_id", "contact_name", "email"].
+        compact (bool): Only return a few key fields of the contact if no fields are given.
 
     Returns:
         dict[str, Any]: A dictionary containing the contact details.
@@ -97,17 +141,94 @@ def get_contact(contact_id: str) -> dict[str, Any]:
 
     if not isinstance(contact_id, str):
         raise TypeError("contact_id must be a string")
+    check_source(source, org)
+    check_fields(fields)
     try:
-       respone = zoho_api_request('GET', f'/contacts/{contact_id}')
+       if source == "local":
+           respone = {'contact': mirror.get_record("contacts", contact_id)}
+       else:
+           respone = zoho_api_request('GET', f'/contacts/{contact_id}', org=org)
+       return _get_contact_result(respone, fields, compact)
+    except Exception as e:
+        logger.error("Error getting contact: %s", e)
+        return None
 
-       if not respone.get('contact'):
-           raise ValueError("Contact not found")
+async def get_contact_async(contact_id: str, source: str = "remote", org: Optional[str] = None, fields: Optional[List[str]] = None, compact: bool = False) -> dict[str, Any]:
+    """Async version of :func:`get_contact`."""
+    if not isinstance(contact_id, str):
+        raise TypeError("contact_id must be a string")
+    check_source(source, org)
+    check_fields(fields)
+    try:
+       if source == "local":
+           respone = {'contact': mirror.get_record("contacts", contact_id)}
        else:
-           result ={
-            'contact': respone.get('contact'),
-            'message': respone.get('message', ''),
-           }
-           return result
+           respone = await zoho_api_request_async('GET', f'/contacts/{contact_id}', org=org)
+       return _get_contact_result(respone, fields, compact)
     except Exception as e:
-        print(f"Error getting contact: {e}")
-        return None
\ No newline at end of file
+        logger.error("Error getting contact: %s", e)
+        return None
+
+def _get_contact_result(respone: dict[str, Any], fields: Optional[List[str]] = None, compact: bool = False) -> dict[str, Any]:
+    if not respone.get('contact'):
+        raise ValueError("Contact not found")
+    result ={
+        'contact': shape_record(respone.get('contact'), "contacts", fields, compact),
+        'message': respone.get('message', ''),
+    }
+    return result
+
+
+def iter_contacts(sort_column: str = "contact_name", query_params: dict[str, str] = None, org: Optional[str] = None) -> Iterator[dict[str, Any]]:
+    """
+    Iterate over all contacts in the Zoho Inventory account, fetching pages as needed.
+
+    Args:
+        sort_column (str): The column to sort by(contact_name, created_time, last_modified_time).
+        query_params (dict[str, str], optional): Filters, accepts the same keys as list_contacts.
+        org (str, optional): The organization to use, a name from list_organizations or a Zoho organization id, defaults to the default organization.
+
+    Yields:
+        dict[str, Any]: One record at a time.
+    """
+    params = _list_contacts_params(1, None, sort_column, query_params)
+    return iter_records("/contacts", "contacts", params=params, org=org)
+
+def aiter_contacts(sort_column: str = "contact_name", query_params: dict[str, str] = None, org: Optional[str] = None) -> AsyncIterator[dict[str, Any]]:
+    """Async version of :func:`iter_contacts`."""
+    params = _list_contacts_params(1, None, sort_column, query_params)
+    return aiter_records("/contacts", "contacts", params=params, org=org)
+
+def fetch_all_contacts(max_records: int = 1000, sort_column: str = "contact_name", query_params: dict[str, str] = None, org: Optional[str] = None, fields: Optional[List[str]] = None, compact: bool = False) -> dict[str, Any]:
+    """
+    Fetch all contacts across every page in a single call, up to max_records.
+    Use this instead of paging through the list tool when all records are needed.
+
+    Args:
+        max_records (int): The maximum number of records to return.
+        sort_column (str): The column to sort by(contact_name, created_time, last_modified_time).
+        query_params (dict[str, str], optional): Filters, accepts the same keys as list_contacts.
+        org (str, optional): The organization to use, a name from list_organizations or a Zoho organization id, defaults to the default organization.
+        fields (List[str], optional): Only return these fields of every contact, e.g. ["contact_id", "contact_name", "email"].
+        compact (bool): Return the contacts as {"columns": [...], "rows": [[...], ...]} with the given fields, or a few key fields, a fraction of the size of the full records.
+
+    Returns:
+        dict[str, Any]: A dictionary with the contacts, their count and whether the result was truncated at max_records.
+    """
+    check_fields(fields)
+    try:
+        records, truncated = collect_records(iter_contacts(sort_column, query_params, org), max_records)
+        return {"contacts": shape_records(records, "contacts", fields, compact), "count": len(records), "truncated": truncated}
+    except Exception as e:
+        logger.error("Error fetching all contacts: %s", e)
+        return None
+
+async def fetch_all_contacts_async(max_records: int = 1000, sort_column: str = "contact_name", query_params: dict[str, str] = None, org: Optional[str] = None, fields: Optional[List[str]] = None, compact: bool = False) -> dict[str, Any]:
+    """Async version of :func:`fetch_all_contacts`."""
+    check_fields(fields)
+    try:
+        records, truncated = await acollect_records(aiter_contacts(sort_column, query_params, org), max_records)
+        return {"contacts": shape_records(records, "contacts", fields, compact), "count": len(records), "truncated": truncated}
+    except Exception as e:
+        logger.error("Error fetching all contacts: %s", e)
+        return None
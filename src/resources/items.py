@@ -1,10 +1,19 @@
 
-from typing import Optional, Any
+import asyncio
+import logging
+from typing import Optional, Any, AsyncIterator, Iterator, List
 
-from utils.api import zoho_api_request
+from utils.api import zoho_api_request, zoho_api_request_async
+from utils.mirror import mirror, check_source
+from utils.pager import iter_records, aiter_records, collect_records, acollect_records
+from utils.projection import check_fields, shape_records
+from utils.catalog import Catalog, get_catalog
+from utils.search import ItemIndex, get_item_index
 
+logger = logging.getLogger(__name__)
 
-def list_items(page:int = 1, per_page:int = 100, search_text: Optional[str] = None, sort_column: str = "name")-> dict[str, Any]:
+
+def list_items(page:int = 1, per_page:int = 100, search_text: Optional[str] = None, sort_column: str = "name", source: str = "remote", org: Optional[str] = None, fields: Optional[List[str]] = None, compact: bool = False)-> dict[str, Any]:
     """
     List all items in the Zoho Inventory account.
 
@@ -13,10 +22,45 @@ def list_items(page:int = 1, per_page:int = 100, search_text: Optional[str] = No
         per_page (int): The number of items per page.
         search_text (str, optional): The text to filter items by name and description.
         sort_column (str): The column to sort by(name, created_time, last_modified_time).
+        source (str): "remote" to query Zoho or "local" to read the local mirror, which is much faster but only as fresh as its last sync.
+        org (str, optional): The organization to use, a name from list_organizations or a Zoho organization id, defaults to the default organization.
+        fields (List[str], optional): Only return these fields of every item, e.g. ["item_id", "name", "rate"].
+        compact (bool): Return the items as {"columns": [...], "rows": [[...], ...]} with the given fields, or a few key fields, a fraction of the size of the full records.
 
     Returns:
         dict[str, Any]: A dictionary containing the list of items and pagination information.
     """
+    params = _list_items_params(page, per_page, search_text, sort_column)
+    check_source(source, org)
+    check_fields(fields)
+
+    try:
+        if source == "local":
+            response = mirror.list_page("items", params)
+        else:
+            response = zoho_api_request("GET", "/items", params=params, org=org)
+        return _list_items_result(response, page, per_page, fields, compact)
+    except Exception as e:
+        logger.error("Error listing items: %s", e)
+        return None
+
+async def list_items_async(page:int = 1, per_page:int = 100, search_text: Optional[str] = None, sort_column: str = "name", source: str = "remote", org: Optional[str] = None, fields: Optional[List[str]] = None, compact: bool = False)-> dict[str, Any]:
+    """Async version of :func:`list_items`."""
+    params = _list_items_params(page, per_page, search_text, sort_column)
+    check_source(source, org)
+    check_fields(fields)
+
+    try:
+        if source == "local":
+            response = mirror.list_page("items", params)
+        else:
+            response = await zoho_api_request_async("GET", "/items", params=params, org=org)
+        return _list_items_result(response, page, per_page, fields, compact)
+    except Exception as e:
+        logger.error("Error listing items: %s", e)
+        return None
+
+def _list_items_params(page: int, per_page: int, search_text: Optional[str], sort_column: str) -> dict[str, Any]:
     params = {
         "page": page,
         "per_page": per_page,
@@ -24,21 +68,176 @@ def list_items(page:int = 1, per_page:int = 100, search_text: Optional[str] = No
     }
     if search_text:
         params["search_text"] = search_text
+    return params
+
+def _list_items_result(response: dict[str, Any], page: int, per_page: int, fields: Optional[List[str]] = None, compact: bool = False) -> dict[str, Any]:
+    result = {
+        "page": page,
+        "per_page": per_page,
+        "has_more_page": response.get("page_context", {}).get("has_more_page", False),
+        "items": shape_records(response.get("items", []), "items", fields, compact),
+        "message": response.get("message", ""),
+    }
+
+    if "page_context" in response and "total" in response["page_context"]:
+        result["total"] = response["page_context"]["total"]
+
+    return result
+
+
+def iter_items(search_text: Optional[str] = None, sort_column: str = "name", org: Optional[str] = None) -> Iterator[dict[str, Any]]:
+    """
+    Iterate over all items in the Zoho Inventory account, fetching pages as needed.
+
+    Args:
+        search_text (str, optional): The text to filter items by name and description.
+        sort_column (str): The column to sort by(name, created_time, last_modified_time).
+        org (str, optional): The organization to use, a name from list_organizations or a Zoho organization id, defaults to the default organization.
+
+    Yields:
+        dict[str, Any]: One record at a time.
+    """
+    params = _list_items_params(1, None, search_text, sort_column)
+    return iter_records("/items", "items", params=params, org=org)
+
+def aiter_items(search_text: Optional[str] = None, sort_column: str = "name", org: Optional[str] = None) -> AsyncIterator[dict[str, Any]]:
+    """Async version of :func:`iter_items`."""
+    params = _list_items_params(1, None, search_text, sort_column)
+    return aiter_records("/items", "items", params=params, org=org)
+
+def fetch_all_items(max_records: int = 1000, search_text: Optional[str] = None, sort_column: str = "name", org: Optional[str] = None, fields: Optional[List[str]] = None, compact: bool = False) -> dict[str, Any]:
+    """
+    Fetch all items across every page in a single call, up to max_records.
+    Use this instead of paging through the list tool when all records are needed.
+
+    Args:
+        max_records (int): The maximum number of records to return.
+        search_text (str, optional): The text to filter items by name and description.
+        sort_column (str): The column to sort by(name, created_time, last_modified_time).
+        org (str, optional): The organization to use, a name from list_organizations or a Zoho organization id, defaults to the default organization.
+        fields (List[str], optional): Only return these fields of every item, e.g. ["item_id", "name", "rate"].
+        compact (bool): Return the items as {"columns": [...], "rows": [[...], ...]} with the given fields, or a few key fields, a fraction of the size of the full records.
+
+    Returns:
+        dict[str, Any]: A dictionary with the items, their count and whether the result was truncated at max_records.
+    """
+    check_fields(fields)
+    try:
+        records, truncated = collect_records(iter_items(search_text, sort_column, org), max_records)
+        return {"items": shape_records(records, "items", fields, compact), "count": len(records), "truncated": truncated}
+    except Exception as e:
+        logger.error("Error fetching all items: %s", e)
+        return None
+
+async def fetch_all_items_async(max_records: int = 1000, search_text: Optional[str] = None, sort_column: str = "name", org: Optional[str] = None, fields: Optional[List[str]] = None, compact: bool = False) -> dict[str, Any]:
+    """Async version of :func:`fetch_all_items`."""
+    check_fields(fields)
+    try:
+        records, truncated = await acollect_records(aiter_items(search_text, sort_column, org), max_records)
+        return {"items": shape_records(records, "items", fields, compact), "count": len(records), "truncated": truncated}
+    except Exception as e:
+        logger.error("Error fetching all items: %s", e)
+        return None
+
+def match_items(queries: List[str], limit: int = 5, min_score: float = 0.3, org: Optional[str] = None) -> dict[str, Any]:
+    """
+    Find the items best matching each of a batch of names, SKUs or descriptions, e.g. the lines of a purchase order.
+    Matching is fuzzy and runs against a local index of the item catalog, so send every variant to try in one call
+    instead of calling list_items with search_text for each guess.
+
+    Args:
+        queries (List[str]): The texts to match, each a name, SKU or description or a part of one.
+        limit (int): The maximum number of candidates per query.
+        min_score (float): The lowest score (0 to 1) of a candidate, 1 is an exact SKU match.
+        org (str, optional): The organization to use, a name from list_organizations or a Zoho organization id, defaults to the default organization.
+
+    Returns:
+        dict[str, Any]: A dictionary with the ranked candidates of every query and the number of indexed items.
+    """
+    _check_queries(queries)
+    item_index = get_item_index(org)
+
+    try:
+        item_index.ensure_fresh()
+        return _match_items_result(item_index, queries, limit, min_score)
+    except Exception as e:
+        logger.error("Error matching items: %s", e)
+        return None
+
+async def match_items_async(queries: List[str], limit: int = 5, min_score: float = 0.3, org: Optional[str] = None) -> dict[str, Any]:
+    """Async version of :func:`match_items`."""
+    _check_queries(queries)
+    item_index = get_item_index(org)
+
+    try:
+        await asyncio.to_thread(item_index.ensure_fresh)
+        return _match_items_result(item_index, queries, limit, min_score)
+    except Exception as e:
+        logger.error("Error matching items: %s", e)
+        return None
+
+def _check_queries(queries: List[str]) -> None:
+    if not isinstance(queries, list) or not all(isinstance(query, str) for query in queries):
+        raise ValueError("queries must be a list of strings")
+
+def _match_items_result(item_index: ItemIndex, queries: List[str], limit: int, min_score: float) -> dict[str, Any]:
+    result = {
+        "matches": [{"query": query, "candidates": item_index.match(query, limit, min_score)} for query in queries],
+        "indexed_items": len(item_index),
+    }
+    return result
+
+def lookup_items(item_ids: Optional[List[str]] = None, skus: Optional[List[str]] = None, org: Optional[str] = None) -> dict[str, Any]:
+    """
+    Look up items and composite items by exact id or SKU, e.g. to check the lines of a sales order before creating it.
+    Reads a local catalog of every item, so send all ids and SKUs in one call. Use match_items for inexact names.
+
+    Args:
+        item_ids (List[str], optional): Item or composite item ids.
+        skus (List[str], optional): SKUs, case and surrounding spaces are ignored.
+        org (str, optional): The organization to use, a name from list_organizations or a Zoho organization id, defaults to the default organization.
+
+    Returns:
+        dict[str, Any]: The found records (id, kind, name, SKU, rate, tax id, stock, unit, status and the components
+            of composite items) keyed by the requested id or SKU, the ids and SKUs not found and the catalog size.
+    """
+    _check_lookups(item_ids, skus)
+    catalog = get_catalog(org)
 
     try:
-        response = zoho_api_request("GET", "/items", params=params)
-        result = {
-            "page": page,
-            "per_page": per_page,
-            "has_more_page": response.get("page_context", {}).get("has_more_page", False),
-            "items": response.get("items", []),
-            "message": response.get("message", ""),
-        }
+        catalog.ensure_fresh()
+        return _lookup_items_result(catalog, item_ids, skus)
+    except Exception as e:
+        logger.error("Error looking up items: %s", e)
+        return None
 
-        if "page_context" in response and "total" in response["page_context"]:
-            result["total"] = response["page_context"]["total"]
+async def lookup_items_async(item_ids: Optional[List[str]] = None, skus: Optional[List[str]] = None, org: Optional[str] = None) -> dict[str, Any]:
+    """Async version of :func:`lookup_items`."""
+    _check_lookups(item_ids, skus)
+    catalog = get_catalog(org)
 
-        return result
+    try:
+        await asyncio.to_thread(catalog.ensure_fresh)
+        return _lookup_items_result(catalog, item_ids, skus)
     except Exception as e:
-        print (f"Error listing items: {e}")
-        return None
\ No newline at end of file
+        logger.error("Error looking up items: %s", e)
+        return None
+
+def _check_lookups(item_ids: Optional[List[str]], skus: Optional[List[str]]) -> None:
+    for name, values in (("item_ids", item_ids), ("skus", skus)):
+        if values is not None and (not isinstance(values, list) or not all(isinstance(value, str) for value in values)):
+            raise ValueError(f"{name} must be a list of strings")
+    if not item_ids and not skus:
+        raise ValueError("Give item_ids or skus to look up")
+
+def _lookup_items_result(catalog: Catalog, item_ids: Optional[List[str]], skus: Optional[List[str]]) -> dict[str, Any]:
+    by_id = {item_id: catalog.get(item_id) for item_id in item_ids or []}
+    by_sku = {sku: catalog.get_by_sku(sku) for sku in skus or []}
+    result = {
+        "by_id": {item_id: record for item_id, record in by_id.items() if record is not None},
+        "by_sku": {sku: record for sku, record in by_sku.items() if record is not None},
+        "missing_ids": [item_id for item_id, record in by_id.items() if record is None],
+        "missing_skus": [sku for sku, record in by_sku.items() if record is None],
+        "catalog_records": len(catalog),
+    }
+    return result
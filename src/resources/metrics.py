@@ -0,0 +1,14 @@
+from typing import Any
+
+from utils.metrics import metrics
+
+
+def get_server_metrics() -> dict[str, Any]:
+    """
+    Report where the server spends its time: the wall time of every tool, the latency, status codes
+    and bytes of the Zoho calls per endpoint, errors by kind, token refreshes and rate limit waits.
+
+    Returns:
+        dict[str, Any]: The counters and the p50/p95/p99 latencies in milliseconds since the server started.
+    """
+    return metrics.snapshot()
@@ -0,0 +1,23 @@
+import logging
+from typing import Any
+
+from utils.mirror import mirror
+from utils.webhooks import webhook_receiver
+
+logger = logging.getLogger(__name__)
+
+
+def get_mirror_status() -> dict[str, Any]:
+    """
+    Report how fresh the local mirror of items, contacts, sales orders and composite items is.
+    Use this to decide whether results read with source="local" are recent enough.
+
+    Returns:
+        dict[str, Any]: For every table the record count, the last sync time and the seconds since the last sync,
+            and under "webhooks" the record change events Zoho pushed and the last reconciliation.
+    """
+    try:
+        return {**mirror.status(), "webhooks": webhook_receiver.stats()}
+    except Exception as e:
+        logger.error("Error getting mirror status: %s", e)
+        return None
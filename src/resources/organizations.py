@@ -0,0 +1,21 @@
+import logging
+from typing import Any
+
+from utils.orgs import org_registry
+
+logger = logging.getLogger(__name__)
+
+
+def list_organizations() -> dict[str, Any]:
+    """
+    List the Zoho organizations this server can work with.
+    Pass the name or the organization_id of one as the org argument of the other tools, they default to the default organization.
+
+    Returns:
+        dict[str, Any]: A dictionary with the name, organization_id and API URL of every organization.
+    """
+    try:
+        return {"organizations": [organization.describe() for organization in org_registry.all()]}
+    except Exception as e:
+        logger.error("Error listing organizations: %s", e)
+        return None
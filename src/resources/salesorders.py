@@ -1,9 +1,22 @@
-from typing import Optional, Any
+import asyncio
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from typing import Optional, Any, AsyncIterator, Iterator, List
 
-from utils.api import zoho_api_request
+from utils.api import zoho_api_request, zoho_api_request_async
+from utils.mirror import mirror, check_source
+from utils.pager import iter_records, aiter_records, collect_records, acollect_records
+from utils.projection import check_fields, shape_record, shape_records
+from utils.aggregate import GROUPS, SalesOrderAggregator
+from utils.setting import settings
+from utils.stock import IGNORED_ORDER_STATUSES
 
+logger = logging.getLogger(__name__)
 
-def list_sales_orders(page: int = 1, per_page: int = 100, search_text: Optional[str] = None, sort_column: str = "date", search_params: Optional[dict] = None) -> dict[str, Any]:
+
+def list_sales_orders(page: int = 1, per_page: int = 100, search_text: Optional[str] = None, sort_column: str = "date", search_params: Optional[dict] = None, source: str = "remote", org: Optional[str] = None, fields: Optional[List[str]] = None, compact: bool = False) -> dict[str, Any]:
     """
     List all sales orders in the Zoho Inventory account.
 
@@ -13,11 +26,42 @@ def list_sales_orders(page: int = 1, per_page: int = 100, search_text: Optional[
         search_text (str, optional): The text to filter items by name and description.
         sort_column (str): The column to sort by(date, customer_name).
         params (dict, optional): Additional fields to search by that have been specified by the user. The key is the name of the custom field id and the value is what will be searched for. 
+        source (str): "remote" to query Zoho or "local" to read the local mirror, which is much faster but only as fresh as its last sync.
+        org (str, optional): The organization to use, a name from list_organizations or a Zoho organization id, defaults to the default organization.
+        fields (List[str], optional): Only return these fields of every sales order, e.g. ["salesorder_id", "salesorder_number", "customer_name", "total"].
+        compact (bool): Return the sales orders as {"columns": [...], "rows": [[...], ...]} with the given fields, or a few key fields, a fraction of the size of the full records.
 
     Returns:
         dict[str, Any]: A dictionary containing the list of sales orders and pagination information.
     """
 
+    params = _list_sales_orders_params(page, per_page, search_text, sort_column, search_params)
+    check_source(source, org)
+    check_fields(fields)
+    try:
+        if source == "local":
+            response = mirror.list_page("salesorders", params)
+        else:
+            response = zoho_api_request("GET", "/salesorders", params=params, org=org)
+        return _list_sales_orders_result(response, page, per_page, fields, compact)
+    except Exception as e:
+        logger.error("Error listing sales orders: %s", e)
+
+async def list_sales_orders_async(page: int = 1, per_page: int = 100, search_text: Optional[str] = None, sort_column: str = "date", search_params: Optional[dict] = None, source: str = "remote", org: Optional[str] = None, fields: Optional[List[str]] = None, compact: bool = False) -> dict[str, Any]:
+    """Async version of :func:`list_sales_orders`."""
+    params = _list_sales_orders_params(page, per_page, search_text, sort_column, search_params)
+    check_source(source, org)
+    check_fields(fields)
+    try:
+        if source == "local":
+            response = mirror.list_page("salesorders", params)
+        else:
+            response = await zoho_api_request_async("GET", "/salesorders", params=params, org=org)
+        return _list_sales_orders_result(response, page, per_page, fields, compact)
+    except Exception as e:
+        logger.error("Error listing sales orders: %s", e)
+
+def _list_sales_orders_params(page: int, per_page: int, search_text: Optional[str], sort_column: str, search_params: Optional[dict]) -> dict[str, Any]:
     params = {
         "page": page,
         "per_page": per_page,
@@ -29,40 +73,320 @@ def list_sales_orders(page: int = 1, per_page: int = 100, search_text: Optional[
         for key in search_params.keys():
             if key.startswith("cf_"):
                 params[key] = search_params[key]
-    try:
-        response = zoho_api_request("GET", "/salesorders", params=params)
-        result = {
-            "page": page,
-            "per_page": per_page,
-            "has_more_page": response.get("page_context", {}).get("has_more_page", False),
-            "sales_orders": response.get("salesorders", []),
-            "message": response.get("message", ""),
-        }
-        if "page_context" in response and "total" in response["page_context"]:
-            result["total"] = response["page_context"]["total"]
-        return result
-    except Exception as e:
-        print(f"Error listing sales orders: {e}")
+    return params
 
-def get_salesorder(salesorder_id: str) -> dict[str, Any]:
+def _list_sales_orders_result(response: dict[str, Any], page: int, per_page: int, fields: Optional[List[str]] = None, compact: bool = False) -> dict[str, Any]:
+    result = {
+        "page": page,
+        "per_page": per_page,
+        "has_more_page": response.get("page_context", {}).get("has_more_page", False),
+        "sales_orders": shape_records(response.get("salesorders", []), "salesorders", fields, compact),
+        "message": response.get("message", ""),
+    }
+    if "page_context" in response and "total" in response["page_context"]:
+        result["total"] = response["page_context"]["total"]
+    return result
+
+def get_salesorder(salesorder_id: str, source: str = "remote", org: Optional[str] = None, fields: Optional[List[str]] = None, compact: bool = False) -> dict[str, Any]:
     """
     Get a sales order by ID.
 
     Args:
         salesorder_id (str): The ID of the sales order to retrieve.
+        source (str): "remote" to query Zoho or "local" to read the local mirror, which is much faster but only as fresh as its last sync.
+        org (str, optional): The organization to use, a name from list_organizations or a Zoho organization id, defaults to the default organization.
+        fields (List[str], optional): Only return these fields of the sales order, e.g. ["salesorder_number", "status", "line_items"].
+        compact (bool): Only return a few key fields of the sales order if no fields are given.
 
     Returns:
         dict[str, Any]: A dictionary containing the sales order details.
     """
     if not isinstance(salesorder_id, str):
         raise ValueError("salesorder_id must be a string")
+    check_source(source, org)
+    check_fields(fields)
     try:
-        response = zoho_api_request("GET", f"/salesorders/{salesorder_id}")
-        result = {
-            "sales_order": response.get("salesorder", {}),
-            "message": response.get("message", ""),
-        }
-        return result
+        if source == "local":
+            response = {"salesorder": mirror.get_record("salesorders", salesorder_id) or {}}
+        else:
+            response = zoho_api_request("GET", f"/salesorders/{salesorder_id}", org=org)
+        return _get_salesorder_result(response, fields, compact)
     except Exception as e:
-        print(f"Error getting sales order: {e}")
-        return None
\ No newline at end of file
+        logger.error("Error getting sales order: %s", e)
+        return None
+
+async def get_salesorder_async(salesorder_id: str, source: str = "remote", org: Optional[str] = None, fields: Optional[List[str]] = None, compact: bool = False) -> dict[str, Any]:
+    """Async version of :func:`get_salesorder`."""
+    if not isinstance(salesorder_id, str):
+        raise ValueError("salesorder_id must be a string")
+    check_source(source, org)
+    check_fields(fields)
+    try:
+        if source == "local":
+            response = {"salesorder": mirror.get_record("salesorders", salesorder_id) or {}}
+        else:
+            response = await zoho_api_request_async("GET", f"/salesorders/{salesorder_id}", org=org)
+        return _get_salesorder_result(response, fields, compact)
+    except Exception as e:
+        logger.error("Error getting sales order: %s", e)
+        return None
+
+def _get_salesorder_result(response: dict[str, Any], fields: Optional[List[str]] = None, compact: bool = False) -> dict[str, Any]:
+    result = {
+        "sales_order": shape_record(response.get("salesorder", {}), "salesorders", fields, compact),
+        "message": response.get("message", ""),
+    }
+    return result
+
+
+def iter_sales_orders(search_text: Optional[str] = None, sort_column: str = "date", search_params: Optional[dict] = None, org: Optional[str] = None) -> Iterator[dict[str, Any]]:
+    """
+    Iterate over all sales orders in the Zoho Inventory account, fetching pages as needed.
+
+    Args:
+        search_text (str, optional): The text to filter sales orders by.
+        sort_column (str): The column to sort by(date, customer_name).
+        search_params (dict, optional): Custom field filters, keys must start with "cf_".
+        org (str, optional): The organization to use, a name from list_organizations or a Zoho organization id, defaults to the default organization.
+
+    Yields:
+        dict[str, Any]: One record at a time.
+    """
+    params = _list_sales_orders_params(1, None, search_text, sort_column, search_params)
+    return iter_records("/salesorders", "salesorders", params=params, org=org)
+
+def aiter_sales_orders(search_text: Optional[str] = None, sort_column: str = "date", search_params: Optional[dict] = None, org: Optional[str] = None) -> AsyncIterator[dict[str, Any]]:
+    """Async version of :func:`iter_sales_orders`."""
+    params = _list_sales_orders_params(1, None, search_text, sort_column, search_params)
+    return aiter_records("/salesorders", "salesorders", params=params, org=org)
+
+def fetch_all_sales_orders(max_records: int = 1000, search_text: Optional[str] = None, sort_column: str = "date", search_params: Optional[dict] = None, org: Optional[str] = None, fields: Optional[List[str]] = None, compact: bool = False) -> dict[str, Any]:
+    """
+    Fetch all sales orders across every page in a single call, up to max_records.
+    Use this instead of paging through the list tool when all records are needed.
+
+    Args:
+        max_records (int): The maximum number of records to return.
+        search_text (str, optional): The text to filter sales orders by.
+        sort_column (str): The column to sort by(date, customer_name).
+        search_params (dict, optional): Custom field filters, keys must start with "cf_".
+        org (str, optional): The organization to use, a name from list_organizations or a Zoho organization id, defaults to the default organization.
+        fields (List[str], optional): Only return these fields of every sales order, e.g. ["salesorder_id", "salesorder_number", "customer_name", "total"].
+        compact (bool): Return the sales orders as {"columns": [...], "rows": [[...], ...]} with the given fields, or a few key fields, a fraction of the size of the full records.
+
+    Returns:
+        dict[str, Any]: A dictionary with the sales orders, their count and whether the result was truncated at max_records.
+    """
+    check_fields(fields)
+    try:
+        records, truncated = collect_records(iter_sales_orders(search_text, sort_column, search_params, org), max_records)
+        return {"sales_orders": shape_records(records, "salesorders", fields, compact), "count": len(records), "truncated": truncated}
+    except Exception as e:
+        logger.error("Error fetching all sales orders: %s", e)
+        return None
+
+async def fetch_all_sales_orders_async(max_records: int = 1000, search_text: Optional[str] = None, sort_column: str = "date", search_params: Optional[dict] = None, org: Optional[str] = None, fields: Optional[List[str]] = None, compact: bool = False) -> dict[str, Any]:
+    """Async version of :func:`fetch_all_sales_orders`."""
+    check_fields(fields)
+    try:
+        records, truncated = await acollect_records(aiter_sales_orders(search_text, sort_column, search_params, org), max_records)
+        return {"sales_orders": shape_records(records, "salesorders", fields, compact), "count": len(records), "truncated": truncated}
+    except Exception as e:
+        logger.error("Error fetching all sales orders: %s", e)
+        return None
+
+
+def aggregate_sales_orders(group_by: Optional[List[str]] = None, date_start: Optional[str] = None, date_end: Optional[str] = None, statuses: Optional[List[str]] = None, search_params: Optional[dict] = None, limit: int = 100, max_orders: int = 10000, org: Optional[str] = None) -> dict[str, Any]:
+    """
+    Sum up sales orders by customer, item, status and/or month, e.g. revenue per customer last quarter.
+    Reads every matching order and returns only the summary table, use this instead of fetching orders to add them up.
+
+    Args:
+        group_by (List[str], optional): The dimensions to group by, any of "customer", "item", "status" and "month", defaults to ["customer"].
+            Grouping by item sums the line items and reads every order in detail, which takes a Zoho call per order.
+        date_start (str, optional): The first order date included, YYYY-MM-DD.
+        date_end (str, optional): The last order date included, YYYY-MM-DD.
+        statuses (List[str], optional): Only count orders with these statuses, defaults to all but draft and void orders.
+        search_params (dict, optional): Custom field filters, keys must start with "cf_".
+        limit (int): The most groups returned, the largest totals first.
+        max_orders (int): The most orders read, newest first.
+        org (str, optional): The organization to use, a name from list_organizations or a Zoho organization id, defaults to the default organization.
+
+    Returns:
+        dict[str, Any]: The summary table as {"columns": [...], "rows": [[...], ...]} with the group columns, the number
+            of orders and the total (and for items the quantity) of each group, the number of groups, the orders read,
+            their total, whether max_orders cut them short and "details_failed", the orders left out of an item
+            aggregate because their details couldn't be read.
+    """
+    group_by = _check_aggregate(group_by, date_start, date_end, statuses, limit, max_orders)
+    params = _aggregate_params(date_start, date_end, search_params)
+    try:
+        records = iter_records("/salesorders", "salesorders", params=params, org=org)
+        aggregator = SalesOrderAggregator(group_by)
+        truncated, failed = _fold_orders(aggregator, _select_orders(records, date_start, date_end, statuses), max_orders, org)
+        return _aggregate_result(aggregator, limit, truncated, failed)
+    except Exception as e:
+        logger.error("Error aggregating sales orders: %s", e)
+        return None
+
+async def aggregate_sales_orders_async(group_by: Optional[List[str]] = None, date_start: Optional[str] = None, date_end: Optional[str] = None, statuses: Optional[List[str]] = None, search_params: Optional[dict] = None, limit: int = 100, max_orders: int = 10000, org: Optional[str] = None) -> dict[str, Any]:
+    """Async version of :func:`aggregate_sales_orders`."""
+    group_by = _check_aggregate(group_by, date_start, date_end, statuses, limit, max_orders)
+    params = _aggregate_params(date_start, date_end, search_params)
+    try:
+        records = aiter_records("/salesorders", "salesorders", params=params, org=org)
+        aggregator = SalesOrderAggregator(group_by)
+        truncated, failed = await _afold_orders(aggregator, _aselect_orders(records, date_start, date_end, statuses), max_orders, org)
+        return _aggregate_result(aggregator, limit, truncated, failed)
+    except Exception as e:
+        logger.error("Error aggregating sales orders: %s", e)
+        return None
+
+def _check_aggregate(group_by: Optional[List[str]], date_start: Optional[str], date_end: Optional[str], statuses: Optional[List[str]], limit: int, max_orders: int) -> List[str]:
+    group_by = group_by or ["customer"]
+    if not isinstance(group_by, list) or not all(group in GROUPS for group in group_by) or len(set(group_by)) != len(group_by):
+        raise ValueError(f"group_by must be a list of distinct dimensions out of {', '.join(GROUPS)}")
+    for name, value in (("date_start", date_start), ("date_end", date_end)):
+        if value is not None:
+            try:
+                date.fromisoformat(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"{name} must be a date as YYYY-MM-DD") from None
+    if statuses is not None and (not isinstance(statuses, list) or not all(isinstance(status, str) for status in statuses)):
+        raise ValueError("statuses must be a list of strings")
+    if not isinstance(limit, int) or limit < 1:
+        raise ValueError("limit must be a positive number")
+    if not isinstance(max_orders, int) or max_orders < 1:
+        raise ValueError("max_orders must be a positive number")
+    return group_by
+
+def _aggregate_params(date_start: Optional[str], date_end: Optional[str], search_params: Optional[dict]) -> dict[str, Any]:
+    # newest first, so reading can stop at date_start even where Zoho doesn't filter by date
+    params = _list_sales_orders_params(1, None, None, "date", search_params)
+    params["sort_order"] = "D"
+    if date_start:
+        params["date_start"] = date_start
+    if date_end:
+        params["date_end"] = date_end
+    return params
+
+def _counted(record: dict[str, Any], date_start: Optional[str], date_end: Optional[str], statuses: Optional[List[str]]) -> Optional[bool]:
+    """Whether a sales order is aggregated, None once the orders are older than date_start."""
+    day = record.get("date") or ""
+    if date_start and day < date_start:
+        return None
+    if date_end and day > date_end:
+        return False
+    return record.get("status") in statuses if statuses else record.get("status") not in IGNORED_ORDER_STATUSES
+
+def _select_orders(records: Iterator[dict[str, Any]], date_start: Optional[str], date_end: Optional[str], statuses: Optional[List[str]]) -> Iterator[dict[str, Any]]:
+    try:
+        for record in records:
+            counted = _counted(record, date_start, date_end, statuses)
+            if counted is None:
+                return
+            if counted:
+                yield record
+    finally:
+        records.close()
+
+async def _aselect_orders(records: AsyncIterator[dict[str, Any]], date_start: Optional[str], date_end: Optional[str], statuses: Optional[List[str]]) -> AsyncIterator[dict[str, Any]]:
+    try:
+        async for record in records:
+            counted = _counted(record, date_start, date_end, statuses)
+            if counted is None:
+                return
+            if counted:
+                yield record
+    finally:
+        await records.aclose()
+
+def _get_order_details(record: dict[str, Any], org: Optional[str] = None) -> Optional[dict[str, Any]]:
+    """A sales order with its line items, which the list endpoint leaves out, None if it can't be read."""
+    response = zoho_api_request("GET", f"/salesorders/{record['salesorder_id']}", priority="bulk", org=org)
+    return _order_details(record, response)
+
+async def _get_order_details_async(record: dict[str, Any], org: Optional[str] = None) -> Optional[dict[str, Any]]:
+    response = await zoho_api_request_async("GET", f"/salesorders/{record['salesorder_id']}", priority="bulk", org=org)
+    return _order_details(record, response)
+
+def _order_details(record: dict[str, Any], response: Optional[dict[str, Any]]) -> Optional[dict[str, Any]]:
+    salesorder = (response or {}).get("salesorder")
+    if not salesorder:
+        logger.error("Error reading sales order %s: %s", record["salesorder_id"], (response or {}).get("message", ""))
+    return salesorder or None
+
+def _add_details(aggregator: SalesOrderAggregator, order: Optional[dict[str, Any]]) -> int:
+    """Add an order read in detail, the number of orders that couldn't be read (0 or 1)."""
+    if order is None:
+        return 1
+    aggregator.add(order)
+    return 0
+
+def _fold_orders(aggregator: SalesOrderAggregator, orders: Iterator[dict[str, Any]], max_orders: int, org: Optional[str]) -> tuple[bool, int]:
+    """
+    Add at most max_orders orders to the aggregator.
+
+    The details an item aggregate needs are fetched settings.BULK_CONCURRENCY
+    orders ahead and folded in order, so only those orders are held at once.
+
+    Returns:
+        tuple[bool, int]: Whether orders were left over, and the number of
+            orders left out because their details couldn't be read.
+    """
+    concurrency = max(settings.BULK_CONCURRENCY, 1)
+    pending = deque()
+    truncated = False
+    read = failed = 0
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        try:
+            for order in orders:
+                if read == max_orders:
+                    truncated = True
+                    break
+                read += 1
+                if not aggregator.by_item:
+                    aggregator.add(order)
+                    continue
+                pending.append(pool.submit(_get_order_details, order, org))
+                if len(pending) >= concurrency:
+                    failed += _add_details(aggregator, pending.popleft().result())
+            while pending:
+                failed += _add_details(aggregator, pending.popleft().result())
+        finally:
+            for future in pending:
+                future.cancel()
+            orders.close()
+    return truncated, failed
+
+async def _afold_orders(aggregator: SalesOrderAggregator, orders: AsyncIterator[dict[str, Any]], max_orders: int, org: Optional[str]) -> tuple[bool, int]:
+    """Async version of :func:`_fold_orders`."""
+    concurrency = max(settings.BULK_CONCURRENCY, 1)
+    pending = deque()
+    truncated = False
+    read = failed = 0
+    try:
+        async for order in orders:
+            if read == max_orders:
+                truncated = True
+                break
+            read += 1
+            if not aggregator.by_item:
+                aggregator.add(order)
+                continue
+            pending.append(asyncio.ensure_future(_get_order_details_async(order, org)))
+            if len(pending) >= concurrency:
+                failed += _add_details(aggregator, await pending.popleft())
+        while pending:
+            failed += _add_details(aggregator, await pending.popleft())
+    finally:
+        for task in pending:
+            task.cancel()
+        await orders.aclose()
+    return truncated, failed
+
+def _aggregate_result(aggregator: SalesOrderAggregator, limit: int, truncated: bool, failed: int) -> dict[str, Any]:
+    result = aggregator.result(limit)
+    result["truncated"] = truncated
+    result["details_failed"] = failed
+    return result
@@ -0,0 +1,136 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from functools import partial
+from typing import Any, Optional
+
+from utils.api import zoho_api_request, zoho_api_request_async
+from utils.catalog import get_catalog
+from utils.pager import iter_records, aiter_records
+from utils.setting import settings
+from utils.stock import IGNORED_ORDER_STATUSES, stock_report as compute_stock_report, units_sold
+
+logger = logging.getLogger(__name__)
+
+
+def stock_report(days: int = 30, cover_days: float = 14, limit: int = 50, max_orders: int = 200, org: Optional[str] = None) -> dict[str, Any]:
+    """
+    Report low stock across every item: items at or below their reorder level, items running out at the current
+    sales rate and the value of the stock on hand per warehouse. Computed locally over the whole catalog, only the
+    totals and the most urgent items come back, so use this instead of listing items to find what to reorder.
+
+    Args:
+        days (int): The sales rate is taken from the sales orders of the last `days` days.
+        cover_days (float): Items whose available stock lasts fewer days at the sales rate are reported as low on cover.
+        limit (int): The most items listed per finding, the counts cover every item.
+        max_orders (int): The most recent sales orders read for the sales rate. Each one costs a Zoho API call for its
+            line items, so raising it makes the report slower and uses more of the API quota.
+        org (str, optional): The organization to use, a name from list_organizations or a Zoho organization id, defaults to the default organization.
+
+    Returns:
+        dict[str, Any]: "below_reorder" (largest shortfall first) and "low_cover" (soonest out first), each with a count
+            and {"columns", "rows"} of the top items, "stock_value" with the total and per warehouse value of the stock
+            on hand, and "velocity" with the sales orders read, the ones whose details couldn't be read (their sales
+            are missing from the rate) and whether max_orders cut the window short.
+    """
+    _check_stock_report(days, cover_days, limit, max_orders)
+    catalog = get_catalog(org)
+
+    try:
+        catalog.ensure_fresh()
+        order_ids, truncated = _recent_order_ids(iter_records("/salesorders", "salesorders", params=_recent_orders_params(), org=org), days, max_orders)
+        orders = []
+        if order_ids:
+            with ThreadPoolExecutor(max_workers=min(max(settings.BULK_CONCURRENCY, 1), len(order_ids))) as pool:
+                orders = list(pool.map(partial(_get_order, org=org), order_ids))
+        return _stock_report_result(catalog.columns(), orders, days, cover_days, limit, truncated)
+    except Exception as e:
+        logger.error("Error building the stock report: %s", e)
+        return None
+
+async def stock_report_async(days: int = 30, cover_days: float = 14, limit: int = 50, max_orders: int = 200, org: Optional[str] = None) -> dict[str, Any]:
+    """Async version of :func:`stock_report`."""
+    _check_stock_report(days, cover_days, limit, max_orders)
+    catalog = get_catalog(org)
+
+    try:
+        await asyncio.to_thread(catalog.ensure_fresh)
+        order_ids, truncated = await _arecent_order_ids(aiter_records("/salesorders", "salesorders", params=_recent_orders_params(), org=org), days, max_orders)
+        semaphore = asyncio.Semaphore(max(settings.BULK_CONCURRENCY, 1))
+        orders = await asyncio.gather(*(_get_order_async(salesorder_id, semaphore, org) for salesorder_id in order_ids))
+        columns = await asyncio.to_thread(catalog.columns)
+        return _stock_report_result(columns, orders, days, cover_days, limit, truncated)
+    except Exception as e:
+        logger.error("Error building the stock report: %s", e)
+        return None
+
+def _check_stock_report(days: int, cover_days: float, limit: int, max_orders: int) -> None:
+    if not isinstance(days, int) or days < 1:
+        raise ValueError("days must be a positive number of days")
+    if not isinstance(cover_days, (int, float)) or cover_days <= 0:
+        raise ValueError("cover_days must be a positive number of days")
+    if not isinstance(limit, int) or limit < 0:
+        raise ValueError("limit must be zero or more")
+    if not isinstance(max_orders, int) or max_orders < 0:
+        raise ValueError("max_orders must be zero or more")
+
+def _recent_orders_params() -> dict[str, Any]:
+    return {"sort_column": "date", "sort_order": "D"}
+
+def _past_window(record: dict[str, Any], days: int) -> bool:
+    """Whether a sales order is older than the last `days` days, orders come newest first so the rest are too."""
+    return (record.get("date") or "") < (date.today() - timedelta(days=days)).isoformat()
+
+def _recent_order_ids(records, days: int, max_orders: int) -> tuple[list[str], bool]:
+    """The ids of the sales orders of the last `days` days that take stock and whether max_orders cut them short."""
+    order_ids = []
+    try:
+        for record in records:
+            if _past_window(record, days):
+                return order_ids, False
+            if len(order_ids) == max_orders:
+                return order_ids, True
+            if record.get("status") not in IGNORED_ORDER_STATUSES:
+                order_ids.append(record["salesorder_id"])
+        return order_ids, False
+    finally:
+        records.close()
+
+async def _arecent_order_ids(records, days: int, max_orders: int) -> tuple[list[str], bool]:
+    """Async version of :func:`_recent_order_ids`."""
+    order_ids = []
+    try:
+        async for record in records:
+            if _past_window(record, days):
+                return order_ids, False
+            if len(order_ids) == max_orders:
+                return order_ids, True
+            if record.get("status") not in IGNORED_ORDER_STATUSES:
+                order_ids.append(record["salesorder_id"])
+        return order_ids, False
+    finally:
+        await records.aclose()
+
+def _get_order(salesorder_id: str, org: Optional[str] = None) -> Optional[dict[str, Any]]:
+    """A sales order with its line items, which the list endpoint leaves out, None if it can't be read."""
+    return _order_details(salesorder_id, zoho_api_request("GET", f"/salesorders/{salesorder_id}", priority="bulk", org=org))
+
+async def _get_order_async(salesorder_id: str, semaphore: asyncio.Semaphore, org: Optional[str] = None) -> Optional[dict[str, Any]]:
+    """Async version of :func:`_get_order`, at most as many at a time as the semaphore allows."""
+    async with semaphore:
+        return _order_details(salesorder_id, await zoho_api_request_async("GET", f"/salesorders/{salesorder_id}", priority="bulk", org=org))
+
+def _order_details(salesorder_id: str, response: Optional[dict[str, Any]]) -> Optional[dict[str, Any]]:
+    salesorder = (response or {}).get("salesorder")
+    if not salesorder:
+        logger.error("Error reading sales order %s: %s", salesorder_id, (response or {}).get("message", ""))
+    return salesorder or None
+
+def _stock_report_result(columns: dict[str, Any], orders: list[Optional[dict[str, Any]]], days: int, cover_days: float, limit: int, truncated: bool) -> dict[str, Any]:
+    read = [order for order in orders if order is not None]
+    result = compute_stock_report(columns, units_sold(read), days, cover_days, limit)
+    result["velocity"]["orders_read"] = len(read)
+    result["velocity"]["orders_failed"] = len(orders) - len(read)
+    result["velocity"]["truncated"] = truncated
+    return result
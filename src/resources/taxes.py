@@ -1,32 +1,111 @@
 
 
-from utils.api import zoho_api_request
+import logging
+from typing import Any, AsyncIterator, Iterator, List, Optional
 
+from utils.api import zoho_api_request, zoho_api_request_async
+from utils.pager import iter_records, aiter_records, collect_records, acollect_records
+from utils.projection import check_fields, shape_records
 
-def get_taxes(page: int = 1, per_page: int = 100):
+logger = logging.getLogger(__name__)
+
+
+def get_taxes(page: int = 1, per_page: int = 100, org: Optional[str] = None, fields: Optional[List[str]] = None, compact: bool = False):
     """
     Get all taxes in the Zoho Inventory account.
     Args:
         page (int): The page number to retrieve for pagination.
         per_page (int): The number of items per page.
+        org (str, optional): The organization to use, a name from list_organizations or a Zoho organization id, defaults to the default organization.
+        fields (List[str], optional): Only return these fields of every tax, e.g. ["tax_id", "tax_percentage"].
+        compact (bool): Return the taxes as {"columns": [...], "rows": [[...], ...]} with the given fields, or a few key fields, a fraction of the size of the full records.
     Returns:
         dict[str, Any]: A dictionary containing the list of taxes and pagination information.
     """
+    check_fields(fields)
+    params = _get_taxes_params(page, per_page)
+    try:
+        response = zoho_api_request("GET", "/settings/taxes", params=params, org=org)
+        return _get_taxes_result(response, page, per_page, fields, compact)
+    except Exception as e:
+        logger.error("Error listing taxes: %s", e)
+
+async def get_taxes_async(page: int = 1, per_page: int = 100, org: Optional[str] = None, fields: Optional[List[str]] = None, compact: bool = False):
+    """Async version of :func:`get_taxes`."""
+    check_fields(fields)
+    params = _get_taxes_params(page, per_page)
+    try:
+        response = await zoho_api_request_async("GET", "/settings/taxes", params=params, org=org)
+        return _get_taxes_result(response, page, per_page, fields, compact)
+    except Exception as e:
+        logger.error("Error listing taxes: %s", e)
+
+def _get_taxes_params(page: int, per_page: int):
     params = {
         "page": page,
         "per_page": per_page,
     }
+    return params
+
+def _get_taxes_result(response, page: int, per_page: int, fields: Optional[List[str]] = None, compact: bool = False):
+    result = {
+        "page": page,
+        "per_page": per_page,
+        "has_more_page": response.get("page_context", {}).get("has_more_page", False),
+        "taxes": shape_records(response.get("taxes", []), "taxes", fields, compact),
+        "message": response.get("message", ""),
+    }
+    if "page_context" in response and "total" in response["page_context"]:
+        result["total"] = response["page_context"]["total"]
+    return result
+
+
+def iter_taxes(org: Optional[str] = None) -> Iterator[dict[str, Any]]:
+    """
+    Iterate over all taxes in the Zoho Inventory account, fetching pages as needed.
+
+    Args:
+        org (str, optional): The organization to use, a name from list_organizations or a Zoho organization id, defaults to the default organization.
+
+    Yields:
+        dict[str, Any]: One record at a time.
+    """
+    params = _get_taxes_params(1, None)
+    return iter_records("/settings/taxes", "taxes", params=params, org=org)
+
+def aiter_taxes(org: Optional[str] = None) -> AsyncIterator[dict[str, Any]]:
+    """Async version of :func:`iter_taxes`."""
+    params = _get_taxes_params(1, None)
+    return aiter_records("/settings/taxes", "taxes", params=params, org=org)
+
+def fetch_all_taxes(max_records: int = 1000, org: Optional[str] = None, fields: Optional[List[str]] = None, compact: bool = False) -> dict[str, Any]:
+    """
+    Fetch all taxes across every page in a single call, up to max_records.
+    Use this instead of paging through the list tool when all records are needed.
+
+    Args:
+        max_records (int): The maximum number of records to return.
+        org (str, optional): The organization to use, a name from list_organizations or a Zoho organization id, defaults to the default organization.
+        fields (List[str], optional): Only return these fields of every tax, e.g. ["tax_id", "tax_percentage"].
+        compact (bool): Return the taxes as {"columns": [...], "rows": [[...], ...]} with the given fields, or a few key fields, a fraction of the size of the full records.
+
+    Returns:
+        dict[str, Any]: A dictionary with the taxes, their count and whether the result was truncated at max_records.
+    """
+    check_fields(fields)
+    try:
+        records, truncated = collect_records(iter_taxes(org), max_records)
+        return {"taxes": shape_records(records, "taxes", fields, compact), "count": len(records), "truncated": truncated}
+    except Exception as e:
+        logger.error("Error fetching all taxes: %s", e)
+        return None
+
+async def fetch_all_taxes_async(max_records: int = 1000, org: Optional[str] = None, fields: Optional[List[str]] = None, compact: bool = False) -> dict[str, Any]:
+    """Async version of :func:`fetch_all_taxes`."""
+    check_fields(fields)
     try:
-        response = zoho_api_request("GET", "/settings/taxes", params=params)
-        result = {
-            "page": page,
-            "per_page": per_page,
-            "has_more_page": response.get("page_context", {}).get("has_more_page", False),
-            "taxes": response.get("taxes", []),
-            "message": response.get("message", ""),
-        }
-        if "page_context" in response and "total" in response["page_context"]:
-            result["total"] = response["page_context"]["total"]
-        return result
+        records, truncated = await acollect_records(aiter_taxes(org), max_records)
+        return {"taxes": shape_records(records, "taxes", fields, compact), "count": len(records), "truncated": truncated}
     except Exception as e:
-        print(f"Error listing taxes: {e}")
+        logger.error("Error fetching all taxes: %s", e)
+        return None
@@ -1,25 +1,91 @@
+# The start time is taken before the other imports so the "ready" startup metric counts them,
+# the imports after it are the one intended exception to E402.
+# ruff: noqa: E402
+import time
+
+_STARTED = time.perf_counter()
+
+import logging
+import sys
+from contextlib import asynccontextmanager
+
 from mcp.server.fastmcp import FastMCP
 
-from tools.salesorders import create_sales_order, attach_pdf
-from resources.salesorders import list_sales_orders, get_salesorder
-from resources.taxes import get_taxes
-from resources.items import list_items
-from resources.contacts import list_contacts, get_contact
-from resources.composite_items import list_composite_items
-from transport import initialize_transport
+from transport import build_http_app, initialize_transport, run_transport, run_workers, session_limiter
+from utils.auth import close_token_managers
+from utils.client import close_client, aclose_async_client
+from utils.metrics import instrument, metrics, start_metrics_server
+from utils.mirror import mirror
+from utils.recorder import trace_recorder
+from utils.setting import settings
+from utils.warmup import warm_up_in_background
+from utils.webhooks import start_webhook_server, webhook_receiver
+
+logger = logging.getLogger(__name__)
+
+def _add_async_tool(mcp_server: FastMCP, async_fn, sync_fn):
+    """Register the async version of a tool under the sync tool's name and docs."""
+    mcp_server.add_tool(instrument(sync_fn.__name__, session_limiter.wrap(trace_recorder.wrap(sync_fn.__name__, async_fn))), name=sync_fn.__name__, description=sync_fn.__doc__)
+
+def _add_tool(mcp_server: FastMCP, fn):
+    """Register a tool that only has a sync version."""
+    mcp_server.add_tool(instrument(fn.__name__, trace_recorder.wrap(fn.__name__, fn)))
 
+# the tool modules are imported when they are registered, the worker supervisor never loads them
 def register_tools(mcp_server: FastMCP):
-    mcp_server.add_tool(create_sales_order)
-    mcp_server.add_tool(attach_pdf)
+    from tools.salesorders import create_sales_order, attach_pdf, create_sales_order_async, attach_pdf_async, create_sales_orders_bulk, create_sales_orders_bulk_async, attach_files, attach_files_async
+
+    _add_async_tool(mcp_server, create_sales_order_async, create_sales_order)
+    _add_async_tool(mcp_server, create_sales_orders_bulk_async, create_sales_orders_bulk)
+    _add_async_tool(mcp_server, attach_pdf_async, attach_pdf)
+    _add_async_tool(mcp_server, attach_files_async, attach_files)
 
 def register_resources(mcp_server: FastMCP):
-    mcp_server.add_tool(list_sales_orders)
-    mcp_server.add_tool(get_salesorder)
-    mcp_server.add_tool(get_taxes)
-    mcp_server.add_tool(list_items)
-    mcp_server.add_tool(list_contacts)
-    mcp_server.add_tool(get_contact)
-    mcp_server.add_tool(list_composite_items)
+    from resources.salesorders import list_sales_orders, get_salesorder, list_sales_orders_async, get_salesorder_async, fetch_all_sales_orders, fetch_all_sales_orders_async, aggregate_sales_orders, aggregate_sales_orders_async
+    from resources.taxes import get_taxes, get_taxes_async, fetch_all_taxes, fetch_all_taxes_async
+    from resources.items import list_items, list_items_async, fetch_all_items, fetch_all_items_async, match_items, match_items_async, lookup_items, lookup_items_async
+    from resources.contacts import list_contacts, get_contact, list_contacts_async, get_contact_async, fetch_all_contacts, fetch_all_contacts_async
+    from resources.composite_items import list_composite_items, list_composite_items_async, fetch_all_composite_items, fetch_all_composite_items_async
+    from resources.stock import stock_report, stock_report_async
+    from resources.cache import get_cache_stats
+    from resources.metrics import get_server_metrics
+    from resources.mirror import get_mirror_status
+    from resources.organizations import list_organizations
+
+    _add_async_tool(mcp_server, list_sales_orders_async, list_sales_orders)
+    _add_async_tool(mcp_server, get_salesorder_async, get_salesorder)
+    _add_async_tool(mcp_server, get_taxes_async, get_taxes)
+    _add_async_tool(mcp_server, list_items_async, list_items)
+    _add_async_tool(mcp_server, list_contacts_async, list_contacts)
+    _add_async_tool(mcp_server, get_contact_async, get_contact)
+    _add_async_tool(mcp_server, list_composite_items_async, list_composite_items)
+    _add_async_tool(mcp_server, fetch_all_sales_orders_async, fetch_all_sales_orders)
+    _add_async_tool(mcp_server, aggregate_sales_orders_async, aggregate_sales_orders)
+    _add_async_tool(mcp_server, fetch_all_taxes_async, fetch_all_taxes)
+    _add_async_tool(mcp_server, fetch_all_items_async, fetch_all_items)
+    _add_async_tool(mcp_server, fetch_all_contacts_async, fetch_all_contacts)
+    _add_async_tool(mcp_server, fetch_all_composite_items_async, fetch_all_composite_items)
+    _add_async_tool(mcp_server, match_items_async, match_items)
+    _add_async_tool(mcp_server, lookup_items_async, lookup_items)
+    _add_async_tool(mcp_server, stock_report_async, stock_report)
+    _add_tool(mcp_server, get_mirror_status)
+    _add_tool(mcp_server, get_cache_stats)
+    _add_tool(mcp_server, get_server_metrics)
+    _add_tool(mcp_server, list_organizations)
+
+@asynccontextmanager
+async def server_lifespan(mcp_server: FastMCP):
+    """Warm up in the background while the client connects and close the async zoho client on the server's event loop when it stops."""
+    # over HTTP this runs for every client session, the warm-up and the shared
+    # client belong to the HTTP app, see transport.build_http_app
+    if settings.MCP_TRANSPORT != "stdio":
+        yield {}
+        return
+    try:
+        async with warm_up_in_background():
+            yield {}
+    finally:
+        await aclose_async_client()
 
 def conigure_server(args: dict[str, str]):
     """configuer server based on args"""
@@ -31,10 +97,25 @@ def conigure_server(args: dict[str, str]):
     #server config
     server_config={
         "name": "zoho-inventory",
-        "verison": "1.0.0",
+        "lifespan": server_lifespan,
+        "host": settings.MCP_HOST,
+        "port": settings.MCP_PORT,
+        "stateless_http": settings.MCP_STATELESS_HTTP,
     }
     return server_config
 
+def _configure_logging():
+    #stdout is the stdio channel so logs go to stderr
+    logging.basicConfig(level=settings.LOG_LEVEL, stream=sys.stderr, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+def create_http_app():
+    """Build the server and its HTTP app, called by every worker process in worker mode."""
+    _configure_logging()
+    mcp_server = FastMCP(**conigure_server(args={}))
+    register_tools(mcp_server)
+    register_resources(mcp_server)
+    return build_http_app(mcp_server, settings.MCP_TRANSPORT)
+
 def main():
     """
     main entroy point for mcp server 
@@ -43,6 +124,25 @@ def main():
     #test the auth save in .env
 
     #start logs
+    _configure_logging()
+
+    if settings.MCP_WORKERS > 1:
+        if settings.MCP_TRANSPORT != "streamable-http":
+            raise ValueError("ZOHO_MCP_WORKERS > 1 needs ZOHO_MCP_TRANSPORT=streamable-http")
+        if settings.METRICS_PORT:
+            logger.warning("ZOHO_METRICS_PORT is ignored with several workers, use get_server_metrics to read a worker's metrics")
+        if settings.WEBHOOK_PORT:
+            logger.warning("ZOHO_WEBHOOK_PORT is ignored with several workers, the workers' caches expire on their own")
+        if settings.RECORD_FILE:
+            logger.warning("ZOHO_MCP_RECORD_FILE is ignored with several workers, record with a single process")
+        if settings.MIRROR_SYNC_INTERVAL > 0:
+            mirror.start_background_sync(settings.MIRROR_SYNC_INTERVAL)
+        try:
+            run_workers("server:create_http_app", settings.MCP_WORKERS, settings.MCP_HOST, settings.MCP_PORT)
+        finally:
+            mirror.stop_background_sync()
+            mirror.close()
+        return
 
     server_config = conigure_server(args={})
 
@@ -54,9 +154,41 @@ def main():
     #register resources
     register_resources(mcp_server)
 
-    print('staring mcp server')
-
-    mcp_server.run('stdio')
+    if settings.MIRROR_SYNC_INTERVAL > 0:
+        mirror.start_background_sync(settings.MIRROR_SYNC_INTERVAL)
+
+    metrics_server = None
+    if settings.METRICS_PORT:
+        metrics_server = start_metrics_server(settings.METRICS_PORT, settings.METRICS_HOST)
+
+    webhook_server = None
+    if settings.WEBHOOK_PORT:
+        webhook_server = start_webhook_server(settings.WEBHOOK_PORT, settings.WEBHOOK_HOST)
+        if settings.WEBHOOK_RECONCILE_INTERVAL > 0:
+            webhook_receiver.start_reconcile(settings.WEBHOOK_RECONCILE_INTERVAL)
+
+    if settings.RECORD_FILE:
+        trace_recorder.start(settings.RECORD_FILE)
+
+    logger.info('staring mcp server')
+
+    initialize_transport(mcp_server, settings.MCP_TRANSPORT, transport_config={})
+    metrics.observe_startup("ready", time.perf_counter() - _STARTED)
+
+    try:
+        run_transport(mcp_server, settings.MCP_TRANSPORT)
+    finally:
+        #stop background work and release pooled zoho connections
+        mirror.stop_background_sync()
+        if metrics_server is not None:
+            metrics_server.shutdown()
+        if webhook_server is not None:
+            webhook_receiver.stop_reconcile()
+            webhook_server.shutdown()
+        trace_recorder.stop()
+        close_token_managers()
+        close_client()
+        mirror.close()
 
 if __name__ == "__main__":
         main()
\ No newline at end of file
@@ -0,0 +1,32 @@
+import argparse
+import time
+
+from utils.mirror import TABLES, mirror
+
+
+def main(argv: list[str] = None):
+    """
+    Sync the local SQLite mirror from Zoho.
+
+    Usage:
+        python src/sync.py [--full] [table ...]
+    """
+    parser = argparse.ArgumentParser(description="Sync the local mirror of Zoho Inventory data.")
+    parser.add_argument("tables", nargs="*", help=f"tables to sync ({', '.join(TABLES)}), defaults to all")
+    parser.add_argument("--full", action="store_true", help="replace the tables instead of an incremental sync")
+    args = parser.parse_args(argv)
+    unknown = [table for table in args.tables if table not in TABLES]
+    if unknown:
+        parser.error(f"unknown tables: {', '.join(unknown)}")
+
+    start = time.perf_counter()
+    written = mirror.sync(args.tables or None, full=args.full)
+    elapsed = time.perf_counter() - start
+
+    for table, count in written.items():
+        print(f"{table}: {count} records written")
+    print(f"synced in {elapsed:.1f}s")
+    mirror.close()
+
+if __name__ == "__main__":
+        main()
@@ -1,8 +1,21 @@
-from typing import List, Dict, Any
+import asyncio
+import base64
+import binascii
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import List, Dict, Any, Optional, Tuple
 
-from utils.api import zoho_api_request
+from utils.api import zoho_api_request, zoho_api_request_async
+from utils.orgs import org_registry
+from utils.setting import settings
+from utils.upload import Upload
 
-def create_sales_order(customer_id: str, line_items: List[Dict[str, Any]], po_number: str= None) -> Dict[str, Any]:
+logger = logging.getLogger(__name__)
+
+BULK_ORDER_KEYS = ("customer_id", "line_items", "po_number")
+
+def create_sales_order(customer_id: str, line_items: List[Dict[str, Any]], po_number: str= None, org: Optional[str] = None) -> Dict[str, Any]:
     """
     Create a sales order in Zoho Inventory.
 
@@ -16,10 +29,134 @@ def create_sales_order(customer_id: str, line_items: List[Dict[str, Any]], po_nu
                 - item_total: The total amount for the item.
                 - tax_id: The ID of the tax.
         po_number (str, optional): The purchase order number. Defaults to None.
+        org (str, optional): The organization to use, a name from list_organizations or a Zoho organization id, defaults to the default organization.
 
     Returns:
         Dict[str, Any]: The response from Zoho Books API.
     """
+    data = _sales_order_data(customer_id, line_items, po_number)
+
+    try:
+        response = zoho_api_request('POST', '/salesorders', json_data=data, org=org)
+        return _sales_order_result(response)
+    except Exception as e:
+        logger.error("Error creating sales order: %s", e)
+        return None
+
+async def create_sales_order_async(customer_id: str, line_items: List[Dict[str, Any]], po_number: str= None, org: Optional[str] = None) -> Dict[str, Any]:
+    """Async version of :func:`create_sales_order`."""
+    data = _sales_order_data(customer_id, line_items, po_number)
+
+    try:
+        response = await zoho_api_request_async('POST', '/salesorders', json_data=data, org=org)
+        return _sales_order_result(response)
+    except Exception as e:
+        logger.error("Error creating sales order: %s", e)
+        return None
+
+def create_sales_orders_bulk(orders: List[Dict[str, Any]], dry_run: bool = False, concurrency: int = None, org: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Create many sales orders in Zoho Inventory in one call.
+
+    Every order is validated before any of them is sent. The valid orders are
+    then created by a pool of workers, an order that fails doesn't stop the others.
+
+    Args:
+        orders (List[Dict[str, Any]]): The sales orders to create, each a dictionary with the
+            create_sales_order arguments:
+                - customer_id: The ID of the customer.
+                - line_items: The line items of the sales order.
+                - po_number (optional): The purchase order number.
+        dry_run (bool, optional): Only validate the orders, nothing is sent to Zoho. Defaults to False.
+        concurrency (int, optional): Orders created in parallel, defaults to settings.BULK_CONCURRENCY.
+        org (str, optional): The organization to use, a name from list_organizations or a Zoho organization id, defaults to the default organization.
+
+    Returns:
+        Dict[str, Any]: "results" with one entry per order in the given order, holding its index,
+            status ("created", "failed", "invalid" or, in a dry run, "valid") and the sales order
+            or the error, and "summary" with the number of orders per status.
+    """
+    # an unknown organization fails the whole call before anything is sent
+    org_registry.get(org)
+    results, pending = _validate_orders(orders)
+
+    if pending and not dry_run:
+        concurrency = min(max(concurrency or settings.BULK_CONCURRENCY, 1), len(pending))
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for index, result in zip(pending, pool.map(partial(_create_bulk_order, org=org), pending.keys(), pending.values()), strict=True):
+                results[index] = result
+
+    return _bulk_result(results)
+
+async def create_sales_orders_bulk_async(orders: List[Dict[str, Any]], dry_run: bool = False, concurrency: int = None, org: Optional[str] = None) -> Dict[str, Any]:
+    """Async version of :func:`create_sales_orders_bulk`."""
+    # an unknown organization fails the whole call before anything is sent
+    org_registry.get(org)
+    results, pending = _validate_orders(orders)
+
+    if pending and not dry_run:
+        semaphore = asyncio.Semaphore(max(concurrency or settings.BULK_CONCURRENCY, 1))
+
+        async def create(index: int, data: Dict[str, Any]) -> Dict[str, Any]:
+            async with semaphore:
+                return await _create_bulk_order_async(index, data, org)
+
+        created = await asyncio.gather(*(create(index, data) for index, data in pending.items()))
+        for index, result in zip(pending, created, strict=True):
+            results[index] = result
+
+    return _bulk_result(results)
+
+def _validate_orders(orders: List[Dict[str, Any]]) -> Tuple[List[Optional[Dict[str, Any]]], Dict[int, Dict[str, Any]]]:
+    """
+    Validate every order of a bulk request.
+
+    Returns:
+        The per order results, "valid" or "invalid" for now, and the request bodies of the valid orders by index.
+    """
+    if not isinstance(orders, list):
+        raise ValueError("orders must be a list")
+
+    results = []
+    pending = {}
+    for index, order in enumerate(orders):
+        try:
+            if not isinstance(order, dict):
+                raise ValueError("Each order must be a dictionary")
+            unexpected = sorted(set(order) - set(BULK_ORDER_KEYS))
+            if unexpected:
+                raise ValueError(f"Unexpected keys in order: {', '.join(unexpected)}")
+            if not isinstance(order.get("customer_id"), str) or not order["customer_id"]:
+                raise ValueError("customer_id must be a non empty string")
+            pending[index] = _sales_order_data(order["customer_id"], order.get("line_items"), order.get("po_number"))
+            results.append({"index": index, "status": "valid"})
+        except ValueError as e:
+            results.append({"index": index, "status": "invalid", "error": str(e)})
+    return results, pending
+
+def _create_bulk_order(index: int, data: Dict[str, Any], org: Optional[str] = None) -> Dict[str, Any]:
+    response = zoho_api_request('POST', '/salesorders', json_data=data, priority="bulk", org=org)
+    return _bulk_order_result(index, response)
+
+async def _create_bulk_order_async(index: int, data: Dict[str, Any], org: Optional[str] = None) -> Dict[str, Any]:
+    response = await zoho_api_request_async('POST', '/salesorders', json_data=data, priority="bulk", org=org)
+    return _bulk_order_result(index, response)
+
+def _bulk_order_result(index: int, response: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    if response is None:
+        return {"index": index, "status": "failed", "error": "The request to Zoho failed"}
+    if response.get("code", 0) != 0:
+        return {"index": index, "status": "failed", "error": response.get("message", "")}
+    return {"index": index, "status": "created", **_sales_order_result(response)}
+
+def _bulk_result(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    summary = {}
+    for result in results:
+        summary[result["status"]] = summary.get(result["status"], 0) + 1
+    return {"results": results, "summary": summary}
+
+def _validate_line_items(line_items: List[Dict[str, Any]]) -> None:
+    """Raise a ValueError if the line items are not valid for a sales order."""
     #validate line_items
     if not isinstance(line_items, list):
         raise ValueError("line_items must be a list")
@@ -46,7 +183,11 @@ def create_sales_order(customer_id: str, line_items: List[Dict[str, Any]], po_nu
                     raise ValueError("item_total must be equal to quantity * rate")
             elif key == "tax_id":
                 if not isinstance(item[key], str):
-                    raise ValueError("tax_id must be a string")                    
+                    raise ValueError("tax_id must be a string")
+
+def _sales_order_data(customer_id: str, line_items: List[Dict[str, Any]], po_number: str= None) -> Dict[str, Any]:
+    """Validate the line items and build the sales order request body."""
+    _validate_line_items(line_items)
 
     data = {
         "customer_id": customer_id,
@@ -56,32 +197,143 @@ def create_sales_order(customer_id: str, line_items: List[Dict[str, Any]], po_nu
          "value": po_number if po_number else "",
         }]
     }
+    return data
 
-    try:
-        response = zoho_api_request('POST', '/salesorders', json_data=data)
-        result = {
-            "sales_order": response.get("salesorder", {}),
-            "message": response.get("message", ""),
-        }
-        return result
-    except Exception as e:
-        print(f"Error creating sales order: {e}")
-        return None
+def _sales_order_result(response: Dict[str, Any]) -> Dict[str, Any]:
+    result = {
+        "sales_order": response.get("salesorder", {}),
+        "message": response.get("message", ""),
+    }
+    return result
 
     
-def attach_pdf(salerorder_id: str, file_path: str) -> Dict[str, Any]:
+def attach_pdf(salerorder_id: str, file_path: str, org: Optional[str] = None) -> Dict[str, Any]:
     """
     Attach a PDF file to a sales order. 
 
     Args:
         salesorder_id (str): The ID of the sales order.
         file_path (str): The path to the PDF file to attach.
+        org (str, optional): The organization to use, a name from list_organizations or a Zoho organization id, defaults to the default organization.
     Returns:
         Dict[str, Any]: The response from Zoho Inventory API.
     
     """
     try:
-        response = zoho_api_request('POST', f'/salesorders/{salerorder_id}/attachment', json_data={"file_path": file_path})
-        return response
-    except Exception as e:  
+        with Upload(file_path) as upload:
+            return zoho_api_request('POST', f'/salesorders/{salerorder_id}/attachment', files={"attachment": upload}, org=org)
+    except Exception as e:
+        logger.error("Error attaching file: %s", e)
         return None
+
+
+async def attach_pdf_async(salerorder_id: str, file_path: str, org: Optional[str] = None) -> Dict[str, Any]:
+    """Async version of :func:`attach_pdf`."""
+    try:
+        with Upload(file_path) as upload:
+            return await zoho_api_request_async('POST', f'/salesorders/{salerorder_id}/attachment', files={"attachment": upload}, org=org)
+    except Exception as e:
+        logger.error("Error attaching file: %s", e)
+        return None
+
+
+def attach_files(attachments: List[Dict[str, str]], concurrency: int = None, org: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Attach many files to one or more sales orders in one call.
+
+    Files are streamed from disk, only the files being uploaded are open at
+    any time and a file that fails doesn't stop the others.
+
+    Args:
+        attachments (List[Dict[str, str]]): The files to attach, each a dictionary with:
+                - salesorder_id: The ID of the sales order.
+                - file_path: The path to the file to attach, or
+                - content_base64 and file_name: The base64 encoded file and its name.
+                - content_type (optional): Defaults to a guess from the file name or content.
+        concurrency (int, optional): Files uploaded in parallel, defaults to settings.UPLOAD_CONCURRENCY.
+        org (str, optional): The organization to use, a name from list_organizations or a Zoho organization id, defaults to the default organization.
+
+    Returns:
+        Dict[str, Any]: "results" with one entry per file in the given order, holding its index,
+            salesorder_id, status ("attached", "failed" or "invalid") and the Zoho message or
+            the error, and "summary" with the number of files per status.
+    """
+    # an unknown organization fails the whole call before anything is sent
+    org_registry.get(org)
+    results, pending = _validate_attachments(attachments)
+
+    if pending:
+        concurrency = min(max(concurrency or settings.UPLOAD_CONCURRENCY, 1), len(pending))
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for index, result in zip(pending, pool.map(partial(_attach_file, org=org), pending.keys(), pending.values()), strict=True):
+                results[index] = result
+
+    return _bulk_result(results)
+
+async def attach_files_async(attachments: List[Dict[str, str]], concurrency: int = None, org: Optional[str] = None) -> Dict[str, Any]:
+    """Async version of :func:`attach_files`."""
+    # an unknown organization fails the whole call before anything is sent
+    org_registry.get(org)
+    results, pending = _validate_attachments(attachments)
+
+    if pending:
+        semaphore = asyncio.Semaphore(max(concurrency or settings.UPLOAD_CONCURRENCY, 1))
+
+        async def attach(index: int, attachment: Tuple[str, Upload]) -> Dict[str, Any]:
+            async with semaphore:
+                return await _attach_file_async(index, attachment, org)
+
+        attached = await asyncio.gather(*(attach(index, attachment) for index, attachment in pending.items()))
+        for index, result in zip(pending, attached, strict=True):
+            results[index] = result
+
+    return _bulk_result(results)
+
+def _validate_attachments(attachments: List[Dict[str, str]]) -> Tuple[List[Optional[Dict[str, Any]]], Dict[int, Tuple[str, Upload]]]:
+    """Check every attachment of an attach_files call, the uploads are opened later one at a time."""
+    if not isinstance(attachments, list):
+        raise ValueError("attachments must be a list")
+
+    results = []
+    pending = {}
+    for index, attachment in enumerate(attachments):
+        salesorder_id = attachment.get("salesorder_id") if isinstance(attachment, dict) else None
+        try:
+            if not isinstance(attachment, dict):
+                raise ValueError("Each attachment must be a dictionary")
+            if not isinstance(salesorder_id, str) or not salesorder_id:
+                raise ValueError("salesorder_id must be a non empty string")
+            if attachment.get("file_path"):
+                upload = Upload(attachment["file_path"], content_type=attachment.get("content_type"))
+            elif attachment.get("content_base64") and attachment.get("file_name"):
+                try:
+                    content = base64.b64decode(attachment["content_base64"], validate=True)
+                except binascii.Error:
+                    raise ValueError("content_base64 is not valid base64") from None
+                upload = Upload(content, attachment["file_name"], attachment.get("content_type"))
+            else:
+                raise ValueError("Each attachment needs a file_path, or content_base64 and file_name")
+            pending[index] = (salesorder_id, upload)
+            results.append({"index": index, "salesorder_id": salesorder_id, "status": "valid"})
+        except ValueError as e:
+            results.append({"index": index, "salesorder_id": salesorder_id, "status": "invalid", "error": str(e)})
+    return results, pending
+
+def _attach_file(index: int, attachment: Tuple[str, Upload], org: Optional[str] = None) -> Dict[str, Any]:
+    salesorder_id, upload = attachment
+    with upload:
+        response = zoho_api_request('POST', f'/salesorders/{salesorder_id}/attachment', files={"attachment": upload}, priority="bulk", org=org)
+    return _attachment_result(index, salesorder_id, response)
+
+async def _attach_file_async(index: int, attachment: Tuple[str, Upload], org: Optional[str] = None) -> Dict[str, Any]:
+    salesorder_id, upload = attachment
+    with upload:
+        response = await zoho_api_request_async('POST', f'/salesorders/{salesorder_id}/attachment', files={"attachment": upload}, priority="bulk", org=org)
+    return _attachment_result(index, salesorder_id, response)
+
+def _attachment_result(index: int, salesorder_id: str, response: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    if response is None:
+        return {"index": index, "salesorder_id": salesorder_id, "status": "failed", "error": "The request to Zoho failed"}
+    if response.get("code", 0) != 0:
+        return {"index": index, "salesorder_id": salesorder_id, "status": "failed", "error": response.get("message", "")}
+    return {"index": index, "salesorder_id": salesorder_id, "status": "attached", "message": response.get("message", "")}
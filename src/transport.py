@@ -1,5 +1,24 @@
+import asyncio
+import functools
+import logging
+import os
+import weakref
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Optional, cast
+
+import anyio
 from mcp.server.fastmcp import FastMCP
-from typing import Any, cast, Callable
+from mcp.server.lowlevel.server import request_ctx
+from starlette.applications import Starlette
+
+from utils.client import aclose_async_client
+from utils.warmup import warm_up_in_background
+from utils.setting import settings, shared_cache_path, rate_limit_state_path
+
+logger = logging.getLogger(__name__)
+
+HTTP_TRANSPORTS = ("sse", "streamable-http")
+
 
 def _setup_stdio_transport(mcp_server: FastMCP, **kwargs:Any) -> None:
     """
@@ -8,18 +27,65 @@ def _setup_stdio_transport(mcp_server: FastMCP, **kwargs:Any) -> None:
     """
 
     try:
-        print("Setting up stdio transport...")
+        logger.info("Setting up stdio transport...")
         getattr(mcp_server, 'run_stdio_async')
     except AttributeError:
         raise RuntimeError("Transport layer not initialized. Please call initialize_transport() first.")
 
+def _setup_http_transport(mcp_server: FastMCP, transport_type: str, **kwargs: Any) -> None:
+    """
+    Setup an HTTP transport (sse or streamable-http) for the FastMCP server.
+    The host, port and paths come from the server settings, see :func:`server.conigure_server`.
+    """
+    try:
+        import uvicorn  # noqa: F401
+    except ImportError as e:
+        raise RuntimeError(f"The {transport_type} transport needs uvicorn, install the mcp package with its server extras") from e
+    logger.info("Setting up %s transport on http://%s:%s", transport_type, mcp_server.settings.host, mcp_server.settings.port)
+
+def build_http_app(mcp_server: FastMCP, transport_type: str) -> Starlette:
+    """
+    The ASGI app of an HTTP transport.
+
+    Args:
+        mcp_server (FastMCP): The FastMCP server instance.
+        transport_type (str): 'sse' or 'streamable-http'.
+
+    Returns:
+        Starlette: The app. FastMCP runs the server lifespan once per session, so the app's
+            lifespan warms up once when the HTTP server starts and closes the shared Zoho
+            client when it stops.
+    """
+    if transport_type == "sse":
+        app = mcp_server.sse_app()
+    elif transport_type == "streamable-http":
+        app = mcp_server.streamable_http_app()
+    else:
+        raise ValueError(f"Unsupported HTTP transport type: {transport_type}. Supported types are: {', '.join(HTTP_TRANSPORTS)}")
+
+    app_lifespan = app.router.lifespan_context
+
+    @asynccontextmanager
+    async def lifespan(app):
+        async with app_lifespan(app) as state:
+            try:
+                async with warm_up_in_background():
+                    yield state
+            finally:
+                await aclose_async_client()
+
+    app.router.lifespan_context = lifespan
+    return app
+
 def _get_transport_handler(transport_type: str) -> Any:
     """
     Get the transport handler based on the transport type.
     """
 
     transport_handlers ={
-        'stdio': _setup_stdio_transport
+        'stdio': _setup_stdio_transport,
+        'sse': functools.partial(_setup_http_transport, transport_type='sse'),
+        'streamable-http': functools.partial(_setup_http_transport, transport_type='streamable-http'),
     }
     if transport_type not in transport_handlers:
         supported_types = ', '.join(transport_handlers.keys())
@@ -27,21 +93,115 @@ def _get_transport_handler(transport_type: str) -> Any:
     handler = cast(Callable[[FastMCP], None],
                    transport_handlers[transport_type])
     return handler
-    
+
 
 def initialize_transport(mcp_server : FastMCP, transport_type: str, transport_config: dict[str,Any]) -> None:
     """
     Initialize the transport layer.
     Args:
         mcp_server (FastMCP): The FastMCP server instance.
-        transport_type (str): The type of transport to use (e.g., 'stdio').
+        transport_type (str): The type of transport to use ('stdio', 'sse' or 'streamable-http').
         transport_config (dict[str, Any]): Configuration for the transport layer.
     """
     handler = _get_transport_handler(transport_type)
 
     try:
         handler(mcp_server, **transport_config)
-    except Exception as e:  
+    except Exception as e:
         raise RuntimeError(f"Failed to initialize transport: {e}") from e
 
 
+def run_transport(mcp_server: FastMCP, transport_type: str) -> None:
+    """
+    Serve the server on an initialized transport until it stops.
+
+    Over HTTP every agent connects to this one process, so all sessions share
+    the token, the response cache, the rate limiter and the pooled
+    connections to Zoho.
+    """
+    if transport_type not in HTTP_TRANSPORTS:
+        mcp_server.run(transport_type)
+        return
+
+    import uvicorn
+
+    config = uvicorn.Config(
+        build_http_app(mcp_server, transport_type),
+        host=mcp_server.settings.host,
+        port=mcp_server.settings.port,
+        log_level=mcp_server.settings.log_level.lower(),
+    )
+    anyio.run(uvicorn.Server(config).serve)
+
+
+def run_workers(app_factory: str, workers: int, host: str, port: int) -> None:
+    """
+    Serve streamable HTTP from several worker processes behind one listener.
+
+    uvicorn binds the socket once and starts the workers, each one imports
+    app_factory and accepts connections from the shared socket. A session
+    could land on any worker, so the workers run stateless streamable HTTP.
+    The workers share the OAuth token through the token cache file, the
+    response cache through a SQLite file and the Zoho rate limit through the
+    rate limit state file, so more workers don't mean more Zoho calls. Files
+    not configured in the environment default to the config directory.
+
+    Args:
+        app_factory (str): "module:function" returning the ASGI app of a worker.
+        workers (int): The number of worker processes.
+        host (str): The interface to listen on.
+        port (int): The port to listen on.
+    """
+    import uvicorn
+
+    # the workers are new interpreters that read their settings from the environment
+    os.environ["ZOHO_MCP_TRANSPORT"] = "streamable-http"
+    os.environ["ZOHO_MCP_STATELESS_HTTP"] = "true"
+    os.environ["ZOHO_TOKEN_CACHE_FILE"] = settings.TOKEN_CACHE_FILE
+    os.environ["ZOHO_ORGS_FILE"] = settings.ORGS_FILE
+    os.environ["ZOHO_CACHE_SHARED_FILE"] = settings.CACHE_SHARED_FILE or shared_cache_path
+    os.environ["ZOHO_RATE_LIMIT_STATE_FILE"] = settings.RATE_LIMIT_STATE_FILE or rate_limit_state_path
+    logger.info("Starting %s workers on http://%s:%s", workers, host, port)
+    uvicorn.run(app_factory, factory=True, workers=workers, host=host, port=port, log_level=settings.LOG_LEVEL.lower())
+
+
+class SessionLimiter:
+    """
+    Caps the tool calls one MCP session runs at the same time.
+
+    With many agents on one HTTP server a single agent firing dozens of
+    calls at once would take the whole rate limit and connection pool.
+    Calls above the limit wait for one of the session's earlier calls to
+    finish, other sessions are not held up. Sessions are tracked weakly
+    and forgotten when they close. A stateless HTTP server makes a new
+    session per request, so there the limit has no effect.
+    """
+
+    def __init__(self):
+        self._semaphores: "weakref.WeakKeyDictionary[Any, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+    def semaphore(self, session: Any) -> Optional[asyncio.Semaphore]:
+        limit = settings.MCP_SESSION_MAX_CONCURRENCY
+        if limit <= 0 or session is None:
+            return None
+        semaphore = self._semaphores.get(session)
+        if semaphore is None:
+            semaphore = self._semaphores[session] = asyncio.Semaphore(limit)
+        return semaphore
+
+    def wrap(self, fn: Callable) -> Callable:
+        """Wrap an async tool so it holds a slot of the calling session while it runs."""
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            context = request_ctx.get(None)
+            semaphore = self.semaphore(context.session if context is not None else None)
+            if semaphore is None:
+                return await fn(*args, **kwargs)
+            async with semaphore:
+                return await fn(*args, **kwargs)
+
+        return wrapper
+
+
+session_limiter = SessionLimiter()
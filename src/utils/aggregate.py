@@ -0,0 +1,93 @@
+from typing import Any, Iterable, Optional
+
+# group by dimension -> the columns it adds to the summary table
+GROUPS = {
+    "customer": ("customer_id", "customer_name"),
+    "item": ("item_id", "item_name"),
+    "status": ("status",),
+    "month": ("month",),
+}
+
+
+def _number(value: Any) -> float:
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class SalesOrderAggregator:
+    """
+    Folds sales orders into sums per group, one order at a time.
+
+    Only the running sums of every group are kept, so the memory depends on
+    the number of groups and not on the number of orders read. Grouping by
+    item sums the line items of the orders instead of the order totals,
+    the orders need their line_items for that.
+    """
+
+    def __init__(self, group_by: list[str]):
+        self.group_by = group_by
+        self.by_item = "item" in group_by
+        self.orders = 0
+        self.total = 0.0
+        # group key -> [orders, quantity, total, the number of the last order counted]
+        self._groups: dict[tuple, list[float]] = {}
+        # the names shown for customer and item ids, the latest one read wins
+        self._names: dict[tuple[str, Any], Any] = {}
+
+    def add(self, order: dict[str, Any]) -> None:
+        self.orders += 1
+        self.total += _number(order.get("total"))
+        customer_id = order.get("customer_id")
+        if "customer" in self.group_by:
+            self._names["customer", customer_id] = order.get("customer_name")
+        values = {"customer": customer_id, "status": order.get("status"), "month": (order.get("date") or "")[:7] or None}
+        if not self.by_item:
+            self._fold(tuple(values[group] for group in self.group_by), 0.0, _number(order.get("total")))
+            return
+        for line in order.get("line_items") or []:
+            values["item"] = line.get("item_id")
+            self._names["item", values["item"]] = line.get("name")
+            self._fold(tuple(values[group] for group in self.group_by), _number(line.get("quantity")), _number(line.get("item_total")))
+
+    def add_all(self, orders: Iterable[dict[str, Any]]) -> None:
+        for order in orders:
+            self.add(order)
+
+    def _fold(self, key: tuple, quantity: float, total: float) -> None:
+        sums = self._groups.get(key)
+        if sums is None:
+            sums = self._groups[key] = [0, 0.0, 0.0, 0]
+        # an order counts once per group, even with the same item on several lines
+        if sums[3] != self.orders:
+            sums[0] += 1
+            sums[3] = self.orders
+        sums[1] += quantity
+        sums[2] += total
+
+    def result(self, limit: Optional[int] = None) -> dict[str, Any]:
+        """
+        The summary table.
+
+        Args:
+            limit (int, optional): The most groups returned, the largest totals first.
+
+        Returns:
+            dict[str, Any]: "columns" and "rows" with a row per group, holding the group's columns of GROUPS
+                and its orders, (for items) quantity and total, plus the number of groups, the orders read and
+                their total.
+        """
+        columns = [column for group in self.group_by for column in GROUPS[group]]
+        columns += ["orders", "quantity", "total"] if self.by_item else ["orders", "total"]
+        groups = sorted(self._groups.items(), key=lambda entry: entry[1][2], reverse=True)
+        rows = []
+        for key, (orders, quantity, total, _) in groups[:limit]:
+            row = []
+            for group, value in zip(self.group_by, key, strict=True):
+                row.append(value)
+                if group in ("customer", "item"):
+                    row.append(self._names.get((group, value)))
+            row += [orders, round(quantity, 3), round(total, 2)] if self.by_item else [orders, round(total, 2)]
+            rows.append(row)
+        return {"columns": columns, "rows": rows, "groups": len(self._groups), "orders": self.orders, "total": round(self.total, 2)}
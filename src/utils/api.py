@@ -1,15 +1,118 @@
 
-import json 
-import time 
+import asyncio
+import json
+import logging
+import time
 import httpx
-from typing import Dict, Optional
+from functools import partial
+from typing import Any, Dict, Optional
 
+from utils.auth import token_manager, token_manager_for, _save_token_to_cache, _load_token_from_cache  # noqa: F401
+from utils.cache import response_cache
+from utils.coalesce import request_coalescer
+from utils.client import get_client, get_async_client
+from utils.httpcache import Stored, http_cache
+from utils.metrics import metrics
+from utils.orgs import Organization, default_organization, org_registry
+from utils.ratelimit import rate_limiter, retry_delay
+from utils.recorder import trace_recorder
 from utils.setting import settings
+from utils.upload import Upload, upload_timeout
 
+logger = logging.getLogger(__name__)
 
-def zoho_api_request(method: str, endpoint: str, params: Optional[Dict[str, any]] = None , json_data: Optional[Dict[str, any]] = None, headers: Optional[Dict[str, str]] = None, retry_auth: bool = True):
+
+def _build_request(method: str, endpoint: str, params: Optional[Dict[str, any]], json_data: Optional[Dict[str, any]], headers: Optional[Dict[str, str]], access_token: Optional[str], files: Optional[Dict[str, Upload]] = None, organization: Optional[Organization] = None) -> Dict[str, Any]:
+    """Build the keyword arguments for an httpx request to the Zoho API."""
+
+    if organization is None:
+        organization = default_organization()
+
+    if params is None:
+        params = {}
+
+    if "organization_id" not in params:
+        params["organization_id"] = organization.organization_id
+
+    if not endpoint.startswith('/'):
+        endpoint = '/' + endpoint
+
+    url = f"{organization.api_base_url}{endpoint}"
+
+    request_headers = {
+        "Authorization": f"Zoho-oauthtoken {access_token}",
+    }
+    if files:
+        # httpx sets the multipart content type and streams the open files
+        timeout = upload_timeout(sum(upload.size for upload in files.values()))
+        files = {name: upload.field() for name, upload in files.items()}
+    else:
+        request_headers["Content-Type"] = "application/json"
+        timeout = settings.HTTP_TIMEOUT
+
+    if headers:
+        request_headers.update(headers)
+
+    return {
+        "method": method,
+        "url": url,
+        "params": params,
+        "json": json_data,
+        "headers": request_headers,
+        "files": files,
+        "timeout": timeout,
+    }
+
+def _parse_response(response: httpx.Response):
+    """Decode the JSON body of a Zoho response."""
+    try:
+        result = response.json()
+        return result
+    except json.JSONDecodeError:
+        logger.error("Error decoding JSON response")
+        metrics.count_error("exception", "JSONDecodeError")
+        return None
+
+def _cache_key(method: str, endpoint: str, params: Optional[Dict[str, any]], organization: Organization) -> Optional[tuple]:
+    """The response cache key of a GET, None if the request can't be cached."""
+    if method.upper() != "GET" or not settings.CACHE_ENABLED:
+        return None
+    params = dict(params or {})
+    params.setdefault("organization_id", organization.organization_id)
+    return response_cache.key(method, '/' + endpoint.lstrip('/'), params)
+
+def _flight_key(method: str, endpoint: str, params: Optional[Dict[str, any]], json_data, headers, files, organization: Organization) -> Optional[tuple]:
+    """The request coalescing key of a GET, None if its response can't be shared with other callers."""
+    if method.upper() != "GET" or json_data or headers or files or not settings.COALESCE_ENABLED:
+        return None
+    params = dict(params or {})
+    params.setdefault("organization_id", organization.organization_id)
+    return (organization.name, *response_cache.key(method, '/' + endpoint.lstrip('/'), params))
+
+def _stored_response(cache_key: Optional[tuple], request: Dict[str, Any]) -> Optional[Stored]:
+    """The response of a GET on disk, see :class:`utils.httpcache.HttpCache`, the request is made conditional on it."""
+    if not cache_key or not http_cache.enabled:
+        return None
+    stored = http_cache.get(cache_key)
+    request["headers"].update(http_cache.conditional_headers(stored))
+    return stored
+
+def _update_cache(method: str, endpoint: str, cache_key: Optional[tuple], response: httpx.Response, result, organization_id: str) -> None:
+    """Store a successful GET in the cache, or invalidate the collection a write changed in the organization."""
+    if cache_key:
+        if response.status_code == 200 and isinstance(result, dict) and result.get("code", 0) == 0:
+            response_cache.set(cache_key, cache_key[1], response.content)
+    elif method.upper() != "GET" and response.status_code < 400:
+        response_cache.invalidate('/' + endpoint.lstrip('/'), organization_id)
+
+def _count_zoho_error(result) -> None:
+    """Count the error code of a Zoho error body, e.g. 1002 for a missing record."""
+    if isinstance(result, dict) and result.get("code", 0) != 0:
+        metrics.count_error("zoho", str(result.get("code")))
+
+def zoho_api_request(method: str, endpoint: str, params: Optional[Dict[str, any]] = None , json_data: Optional[Dict[str, any]] = None, headers: Optional[Dict[str, str]] = None, retry_auth: bool = True, use_cache: bool = True, priority: str = "interactive", files: Optional[Dict[str, Upload]] = None, org: Optional[str] = None):
     """Make a request to the Zoho API.
-    
+
     Args:
     method (str): The HTTP method to use (GET, POST, PUT, DELETE).
     endpoint (str): The API endpoint to call.
@@ -17,144 +120,167 @@ def zoho_api_request(method: str, endpoint: str, params: Optional[Dict[str, any]
     json_data (dict, optional): JSON data to include in the request body.
     headers (dict, optional): Additional headers to include in the request.
     retry_auth (bool): Whether to retry the request if authentication fails.
-    """
+    use_cache (bool): Whether a GET may be served from (and stored in) the response cache.
+    priority (str): "interactive" or "bulk", bulk requests can't use the rate limit reserve.
+    files (dict, optional): Open :class:`utils.upload.Upload` objects by field name, sent as a multipart body instead of json_data.
+    org (str, optional): The organization to call, see :class:`utils.orgs.OrgRegistry`. Each organization has its own
+        connection pool, access token, rate limit and cache entries. Defaults to the default organization.
 
-    if params is None:
-        params = {}
+    A GET with the same endpoint, params and org as one already in flight waits for that one
+    instead of calling Zoho again and gets its own copy of the result, see :class:`utils.coalesce.RequestCoalescer`.
 
-    if "organization_id" not in params:
-        params["organization_id"] = settings.ZOHO_ORGANIZATION_ID
-    
-    if not endpoint.startswith('/'):
-        endpoint = '/' + endpoint
-    
+    Raises:
+    ValueError: If org is not a configured organization.
+    """
 
-    url = f"{settings.ZOHO_API_BASE_URL}{endpoint}"
+    organization = org_registry.get(org)
+    cache_key = _cache_key(method, endpoint, params, organization) if use_cache else None
+    if cache_key:
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            return cached
 
+    send = partial(_send, method, endpoint, params, json_data, headers, retry_auth, cache_key, priority, files, organization)
+    flight_key = _flight_key(method, endpoint, params, json_data, headers, files, organization)
+    if flight_key:
+        # identical GETs in flight share one upstream call
+        return request_coalescer.run(flight_key, send)
+    return send()
+
+def _send(method: str, endpoint: str, params: Optional[Dict[str, any]], json_data: Optional[Dict[str, any]], headers: Optional[Dict[str, str]], retry_auth: bool, cache_key: Optional[tuple], priority: str, files: Optional[Dict[str, Upload]], organization: Organization):
+    """Send a request of :func:`zoho_api_request` to Zoho, retried once with a fresh token on a 401."""
+    tokens = token_manager_for(organization)
     try:
+        access_token = None
         try:
-            access_token = _get_access_token()
+            access_token = tokens.get_token()
         except Exception as e:
-            print(f"Error getting access token: {e}")
-        
-        # if json data has a file path then don't include content type 
-        # and set files to be  & timeout needs to be set appropriately
-        """{attachment": (
-            "#1182.pdf", 
-            open("./POs/#1182.pdf", "rb"), 
-            "application/pdf"
-        )
-            }"""
-        if json_data and "file_path" in json_data:
-            request_headers = {
-                "Authorization": f"Zoho-oauthtoken {access_token}",
-            }
-            timeout = 60
-            #this may be os dependent
-            files = {
-                "attachment": (
-                    json_data["file_path"].split("/")[-1], 
-                    open(json_data["file_path"], "rb"), 
-                    "application/pdf"
-                )
-            }
-            json_data = None  # Clear json_data since we're using files
-        else:
-            request_headers = {
-                "Authorization": f"Zoho-oauthtoken {access_token}",
-                "Content-Type": "application/json",
-        }
-            timeout = 10
-            files = None
-
-        if headers:
-            request_headers.update(headers)
-        
-        with httpx.Client() as client:
-            response = client.request(method, url, params=params, json=json_data, headers=request_headers, files = files, timeout=timeout)
-
-            if response.status_code >= 400:
-                if response.status_code == 401 and retry_auth:
-                    # If the access token is expired, refresh it and retry the request
-                    access_token = _get_access_token()
-                    return zoho_api_request(method, endpoint, params, json_data, headers, retry_auth=False)
-
-            try:
-                result = response.json()
-                return result
-            except json.JSONDecodeError:
-                print("Error decoding JSON response")
-                return None
-    except Exception as e:
-        print(f"Error getting access token: {e}")
-        return None
+            logger.error("Error getting access token: %s", e)
 
+        request = _build_request(method, endpoint, params, json_data, headers, access_token, files, organization)
 
-    return None
+        stored = _stored_response(cache_key, request)
+        bucket = rate_limiter.bucket(request["params"]["organization_id"])
+        client = get_client(None if organization.is_default else organization.name)
+        started = time.perf_counter()
+        attempt = 0
+        while True:
+            if bucket:
+                waited = time.perf_counter()
+                bucket.acquire(priority)
+                metrics.observe_rate_limit_wait(time.perf_counter() - waited)
+            sent = time.perf_counter()
+            response = client.request(**request)
+            metrics.observe_response(method, endpoint, response, time.perf_counter() - sent)
+            delay = retry_delay(response, attempt, method)
+            if delay is None:
+                break
+            if response.status_code == 429 and bucket:
+                # hold back every caller of this org, not just this one
+                bucket.pause(delay)
+            else:
+                time.sleep(delay)
+            attempt += 1
 
-def _get_access_token():
-    """Get the access token from the cache or refresh it if expired."""
-
-    token_data = _load_token_from_cache()
-
-    if token_data and "access_token" in token_data:
-        # Check if the token is expired
-        if time.time() < token_data["expires_at"]:
-            return token_data["access_token"]
-
-    # If the token is not in the cache or expired, refresh it
-    
-    refresh_token = settings.ZOHO_REFRESH_TOKEN
-    client_id = settings.ZOHO_CLIENT_ID
-    client_secret = settings.ZOHO_CLIENT_SECRET
-    
-    params = {
-        "refresh_token": refresh_token,
-        "client_id": client_id,
-        "client_secret": client_secret,
-        "grant_type": "refresh_token",
-    }
+        if stored is not None:
+            response = http_cache.revalidated_response(cache_key, stored, response)
+        if response.status_code >= 400:
+            if response.status_code == 401 and retry_auth:
+                # If the access token is expired, drop it so the retry uses a fresh one
+                tokens.invalidate(access_token)
+                return _send(method, endpoint, params, json_data, headers, False, cache_key, priority, files, organization)
 
-    url = f"{settings.ZOHO_AUTH_BASE_URL}/token"
+        result = _parse_response(response)
+        trace_recorder.record_zoho(method, endpoint, params, json_data, None if organization.is_default else organization.name, response.status_code, time.perf_counter() - started, result)
+        _count_zoho_error(result)
+        if cache_key and http_cache.enabled:
+            http_cache.store(cache_key, stored, response, result)
+        _update_cache(method, endpoint, cache_key, response, result, request["params"]["organization_id"])
+        return result
+    except Exception as e:
+        logger.error("Error calling %s %s: %s", method, endpoint, e)
+        metrics.count_error("exception", type(e).__name__)
+        return None
 
+async def zoho_api_request_async(method: str, endpoint: str, params: Optional[Dict[str, any]] = None , json_data: Optional[Dict[str, any]] = None, headers: Optional[Dict[str, str]] = None, retry_auth: bool = True, use_cache: bool = True, priority: str = "interactive", files: Optional[Dict[str, Upload]] = None, org: Optional[str] = None):
+    """Make a request to the Zoho API without blocking the event loop.
 
-    try:
-        response = httpx.post(url, params=params)
-        response.raise_for_status()
-
-        token_data = response.json()
-
-        if "access_token" not in token_data:
-            # Save the new token data to cache
-            print("Access token not found in response")
-            return None
-        
-        token_data = {
-            "access_token": token_data["access_token"],
-            "expires_at": time.time() + token_data["expires_in"],
-        }
-        _save_token_to_cache(token_data)
-        return token_data["access_token"]
-    except httpx.HTTPStatusError as e:
-        print(f"HTTP error occurred: {e.response.status_code} - {e.response.text}")
-        return None
+    Takes the same arguments as :func:`zoho_api_request`.
+    """
 
+    organization = org_registry.get(org)
+    cache_key = _cache_key(method, endpoint, params, organization) if use_cache else None
+    if cache_key:
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            return cached
 
+    send = partial(_send_async, method, endpoint, params, json_data, headers, retry_auth, cache_key, priority, files, organization)
+    flight_key = _flight_key(method, endpoint, params, json_data, headers, files, organization)
+    if flight_key:
+        return await request_coalescer.run_async(flight_key, send)
+    return await send()
 
+async def _send_async(method: str, endpoint: str, params: Optional[Dict[str, any]], json_data: Optional[Dict[str, any]], headers: Optional[Dict[str, str]], retry_auth: bool, cache_key: Optional[tuple], priority: str, files: Optional[Dict[str, Upload]], organization: Organization):
+    """The async version of :func:`_send`."""
+    tokens = token_manager_for(organization)
+    try:
+        access_token = None
+        try:
+            access_token = await tokens.get_token_async()
+        except Exception as e:
+            logger.error("Error getting access token: %s", e)
 
+        request = _build_request(method, endpoint, params, json_data, headers, access_token, files, organization)
 
-def _save_token_to_cache(token_data):
-    """Save the token data to a cache file."""
+        # the disk cache is SQLite, keep it off the event loop
+        stored = await asyncio.to_thread(_stored_response, cache_key, request) if cache_key and http_cache.enabled else None
+        bucket = rate_limiter.bucket(request["params"]["organization_id"])
+        client = get_async_client(None if organization.is_default else organization.name)
+        started = time.perf_counter()
+        attempt = 0
+        while True:
+            if bucket:
+                waited = time.perf_counter()
+                await bucket.acquire_async(priority)
+                metrics.observe_rate_limit_wait(time.perf_counter() - waited)
+            sent = time.perf_counter()
+            response = await client.request(**request)
+            metrics.observe_response(method, endpoint, response, time.perf_counter() - sent)
+            delay = retry_delay(response, attempt, method)
+            if delay is None:
+                break
+            if response.status_code == 429 and bucket:
+                # hold back every caller of this org, not just this one
+                bucket.pause(delay)
+            else:
+                await asyncio.sleep(delay)
+            attempt += 1
 
-    with open(settings.TOKEN_CACHE_FILE, "w") as f:
-        json.dump(token_data, f)
+        if stored is not None:
+            response = await asyncio.to_thread(http_cache.revalidated_response, cache_key, stored, response)
+        if response.status_code >= 400:
+            if response.status_code == 401 and retry_auth:
+                # If the access token is expired, drop it so the retry uses a fresh one
+                tokens.invalidate(access_token)
+                return await _send_async(method, endpoint, params, json_data, headers, False, cache_key, priority, files, organization)
 
-def _load_token_from_cache():
-    """Load the token data from a cache file."""
-    try:
-        with open(settings.TOKEN_CACHE_FILE, "r") as f:
-            return json.load(f)
-    except FileNotFoundError:
+        result = _parse_response(response)
+        trace_recorder.record_zoho(method, endpoint, params, json_data, None if organization.is_default else organization.name, response.status_code, time.perf_counter() - started, result)
+        _count_zoho_error(result)
+        if cache_key and http_cache.enabled:
+            await asyncio.to_thread(http_cache.store, cache_key, stored, response, result)
+        _update_cache(method, endpoint, cache_key, response, result, request["params"]["organization_id"])
+        return result
+    except Exception as e:
+        logger.error("Error calling %s %s: %s", method, endpoint, e)
+        metrics.count_error("exception", type(e).__name__)
         return None
-    except json.JSONDecodeError:
-        return None
\ No newline at end of file
+
+def _get_access_token():
+    """Get the access token from memory, the cache or refresh it if expired."""
+    return token_manager.get_token()
+
+async def _get_access_token_async():
+    """Get the access token without blocking the event loop."""
+    return await token_manager.get_token_async()
@@ -0,0 +1,247 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+
+from utils.client import get_client
+from utils.filelock import file_lock, write_json_atomic
+from utils.metrics import metrics
+from utils.orgs import Organization, default_organization
+from utils.setting import settings
+
+# treat a token as expired slightly early so it isn't rejected in flight
+_EXPIRY_SKEW = 10
+
+logger = logging.getLogger(__name__)
+
+
+class TokenManager:
+    """
+    Keeps the Zoho access token in memory and refreshes it on demand.
+
+    - Callers read the token from memory, the cache file is only read when the
+      token is missing or about to expire.
+    - Refreshes are single-flight: concurrent callers (threads or coroutines)
+      wait for the one refresh in progress instead of each calling Zoho.
+    - The cache file is written atomically under a file lock, so several server
+      processes can share one token. A process that gets the lock after
+      another one refreshed picks up the new token from the file.
+    - When background refresh is enabled the token is renewed
+      TOKEN_REFRESH_MARGIN seconds before it expires.
+
+    Without an organization the manager uses the ZOHO_* credentials, see
+    :func:`token_manager_for` for the managers of other organizations.
+    """
+
+    def __init__(self, organization: Optional[Organization] = None):
+        self.organization = organization
+        self._lock = threading.Lock()
+        self._access_token: Optional[str] = None
+        self._expires_at: float = 0
+        self._rejected_token: Optional[str] = None
+        self._timer: Optional[threading.Timer] = None
+        self.refresh_count = 0
+
+    def get_token(self) -> Optional[str]:
+        """Get a valid access token, refreshing it if needed."""
+        token = self._valid_token()
+        if token:
+            return token
+        return self.refresh()
+
+    async def get_token_async(self) -> Optional[str]:
+        """Get a valid access token without blocking the event loop."""
+        token = self._valid_token()
+        if token:
+            return token
+        return await asyncio.to_thread(self.refresh)
+
+    def invalidate(self, access_token: Optional[str]) -> None:
+        """Mark a token Zoho rejected (401) so the next call refreshes it."""
+        with self._lock:
+            self._rejected_token = access_token
+            if access_token is None or access_token == self._access_token:
+                self._access_token = None
+                self._expires_at = 0
+
+    def refresh(self, min_ttl: float = 0) -> Optional[str]:
+        """
+        Refresh the token unless a token with at least min_ttl seconds left is
+        already in memory or in the cache file.
+
+        Args:
+            min_ttl (float): The minimum remaining lifetime to accept a token.
+
+        Returns:
+            Optional[str]: The access token or None if the refresh failed.
+        """
+        with self._lock:
+            token = self._valid_token(min_ttl)
+            if token:
+                return token
+
+            cache_file = self._cache_file()
+            with _cache_file_lock(cache_file):
+                token_data = _load_token_from_cache(cache_file)
+                if self._accept(token_data, min_ttl):
+                    self._set(token_data)
+                    return self._access_token
+
+                token_data = self._request_token()
+                if token_data is None:
+                    return None
+                _save_token_to_cache(token_data, cache_file)
+                self._set(token_data)
+                return self._access_token
+
+    def close(self) -> None:
+        """Stop the background renewal timer."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+    def reset(self) -> None:
+        """Forget the in-memory token and stop background renewal."""
+        self.close()
+        with self._lock:
+            self._access_token = None
+            self._expires_at = 0
+            self._rejected_token = None
+
+    def _cache_file(self) -> str:
+        return (self.organization or default_organization()).token_cache_file
+
+    def _valid_token(self, min_ttl: float = 0) -> Optional[str]:
+        if self._access_token and time.time() < self._expires_at - max(min_ttl, _EXPIRY_SKEW):
+            return self._access_token
+        return None
+
+    def _accept(self, token_data: Optional[Dict[str, Any]], min_ttl: float) -> bool:
+        if not token_data or "access_token" not in token_data:
+            return False
+        if token_data["access_token"] == self._rejected_token:
+            return False
+        return time.time() < token_data.get("expires_at", 0) - max(min_ttl, _EXPIRY_SKEW)
+
+    def _set(self, token_data: Dict[str, Any]) -> None:
+        self._access_token = token_data["access_token"]
+        self._expires_at = token_data["expires_at"]
+        self._schedule_renewal()
+
+    def _request_token(self) -> Optional[Dict[str, Any]]:
+        """Exchange the refresh token for a new access token."""
+
+        account = self.organization or default_organization()
+        params = {
+            "refresh_token": account.refresh_token,
+            "client_id": account.client_id,
+            "client_secret": account.client_secret,
+            "grant_type": "refresh_token",
+        }
+
+        url = f"{account.auth_base_url}/token"
+
+        try:
+            start = time.perf_counter()
+            response = get_client().post(url, params=params)
+            metrics.observe_response("POST", "/token", response, time.perf_counter() - start)
+            response.raise_for_status()
+        except httpx.HTTPStatusError as e:
+            logger.error("HTTP error occurred: %s - %s", e.response.status_code, e.response.text)
+            return None
+
+        token_data = response.json()
+
+        if "access_token" not in token_data:
+            logger.error("Access token not found in response")
+            metrics.count_error("auth", "no_access_token")
+            return None
+
+        self.refresh_count += 1
+        metrics.count_token_refresh()
+        return {
+            "access_token": token_data["access_token"],
+            "expires_at": time.time() + token_data["expires_in"],
+        }
+
+    def _schedule_renewal(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not settings.TOKEN_BACKGROUND_REFRESH:
+            return
+
+        margin = settings.TOKEN_REFRESH_MARGIN
+        delay = self._expires_at - margin - time.time()
+        if delay <= 0:
+            # tokens shorter lived than the margin are refreshed on demand
+            return
+        self._timer = threading.Timer(delay, self._renew, args=(margin,))
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _renew(self, margin: float) -> None:
+        try:
+            # min_ttl makes sure we only call zoho if no other process renewed already
+            self.refresh(min_ttl=margin)
+        except Exception as e:
+            logger.error("Error renewing access token: %s", e)
+
+
+def _cache_file_lock(cache_file: Optional[str] = None):
+    """Hold an exclusive lock shared by every process using the token cache."""
+    return file_lock((cache_file or settings.TOKEN_CACHE_FILE) + ".lock")
+
+
+def _save_token_to_cache(token_data, cache_file: Optional[str] = None):
+    """Atomically save the token data to the cache file."""
+    write_json_atomic(cache_file or settings.TOKEN_CACHE_FILE, token_data)
+
+
+def _load_token_from_cache(cache_file: Optional[str] = None):
+    """Load the token data from a cache file."""
+    try:
+        with open(cache_file or settings.TOKEN_CACHE_FILE, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except json.JSONDecodeError:
+        return None
+
+
+token_manager = TokenManager()
+
+_managers: dict[tuple, TokenManager] = {}
+_managers_lock = threading.Lock()
+
+
+def token_manager_for(organization: Organization) -> TokenManager:
+    """
+    The token manager of an organization.
+
+    Organizations of the same account share a manager and so one access
+    token, the default organization's account uses :data:`token_manager`.
+    """
+    if organization.account == default_organization().account:
+        return token_manager
+    with _managers_lock:
+        manager = _managers.get(organization.account)
+        if manager is None:
+            manager = _managers[organization.account] = TokenManager(organization)
+        return manager
+
+
+def close_token_managers() -> None:
+    """Stop the background renewal of every token and forget the managers of other accounts."""
+    token_manager.close()
+    with _managers_lock:
+        managers = list(_managers.values())
+        _managers.clear()
+    for manager in managers:
+        manager.close()
+
@@ -0,0 +1,272 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+from utils.setting import settings
+
+# seconds a GET response is served from the cache, by endpoint prefix (longest match wins)
+DEFAULT_TTLS: dict[str, float] = {
+    "/settings/taxes": 86400,
+    "/compositeitems": 300,
+    "/contacts": 300,
+    "/items": 120,
+    "/salesorders": 60,
+}
+
+
+def _parse_ttls(value: str) -> dict[str, float]:
+    """Parse "/items=60,/contacts=600" into a prefix -> ttl mapping."""
+    ttls = {}
+    for entry in filter(None, (part.strip() for part in value.split(","))):
+        prefix, _, ttl = entry.partition("=")
+        ttls[prefix.strip()] = float(ttl)
+    return ttls
+
+
+def _collection(endpoint: str) -> str:
+    """The top level collection of an endpoint, e.g. /salesorders for /salesorders/1/attachment."""
+    return "/" + endpoint.strip("/").split("/")[0]
+
+
+def _organization_id(key: tuple) -> Optional[str]:
+    """The organization of a cache key, the namespace its entry lives in."""
+    return dict(key[2]).get("organization_id")
+
+
+class SharedStore:
+    """
+    Cache entries in a SQLite file shared by every process using it.
+
+    Used instead of the in memory entries when settings.CACHE_SHARED_FILE
+    is set, so server workers serve each other's responses and a write in
+    one worker invalidates the collection for all of them. Expiry uses wall
+    clock time since it is compared across processes. Reads don't write, so
+    the byte budget evicts the entries closest to expiry instead of the
+    least recently used ones.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._path: Optional[str] = None
+        self._pid: Optional[int] = None
+
+    def connection(self) -> sqlite3.Connection:
+        """Open (once per process) and return the connection to settings.CACHE_SHARED_FILE."""
+        if self._conn is None or self._path != settings.CACHE_SHARED_FILE or self._pid != os.getpid():
+            self.close()
+            self._path, self._pid = settings.CACHE_SHARED_FILE, os.getpid()
+            self._conn = sqlite3.connect(self._path, check_same_thread=False, isolation_level=None, timeout=5)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, organization_id TEXT, collection TEXT NOT NULL, "
+                "expires_at REAL NOT NULL, size INTEGER NOT NULL, body BLOB NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_collection ON responses (collection)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_expires_at ON responses (expires_at)")
+        return self._conn
+
+    def close(self) -> None:
+        if self._conn is not None:
+            # a connection inherited from the parent process must not be used or closed
+            if self._pid == os.getpid():
+                self._conn.close()
+            self._conn = None
+
+    def get(self, key: tuple) -> tuple[Optional[bytes], bool]:
+        """The body of a live entry and whether an expired one was found."""
+        with self._lock:
+            row = self.connection().execute("SELECT expires_at, body FROM responses WHERE key = ?", (json.dumps(key),)).fetchone()
+        if row is None:
+            return None, False
+        if time.time() >= row[0]:
+            return None, True
+        return row[1], False
+
+    def set(self, key: tuple, endpoint: str, body: bytes, ttl: float) -> int:
+        """Store an entry and return the number of entries evicted to stay in the byte budget."""
+        now = time.time()
+        with self._lock:
+            conn = self.connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                    (json.dumps(key), _organization_id(key), _collection(endpoint), now + ttl, len(body), body),
+                )
+                conn.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+                size = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+                evicted = 0
+                if size > settings.CACHE_MAX_BYTES:
+                    rows = conn.execute("SELECT key, size FROM responses ORDER BY expires_at").fetchall()
+                    drop = []
+                    for cached_key, cached_size in rows:
+                        if size <= settings.CACHE_MAX_BYTES:
+                            break
+                        drop.append((cached_key,))
+                        size -= cached_size
+                    conn.executemany("DELETE FROM responses WHERE key = ?", drop)
+                    evicted = len(drop)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return evicted
+
+    def invalidate(self, collection: str, organization_id: Optional[str] = None) -> int:
+        with self._lock:
+            if organization_id is None:
+                return self.connection().execute("DELETE FROM responses WHERE collection = ?", (collection,)).rowcount
+            return self.connection().execute(
+                "DELETE FROM responses WHERE collection = ? AND organization_id = ?", (collection, organization_id)
+            ).rowcount
+
+    def clear(self) -> None:
+        with self._lock:
+            self.connection().execute("DELETE FROM responses")
+
+    def stats(self) -> tuple[int, int]:
+        """The number of live entries and their size in bytes."""
+        with self._lock:
+            return self.connection().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses WHERE expires_at > ?", (time.time(),)
+            ).fetchone()
+
+
+class ResponseCache:
+    """
+    A TTL + LRU cache of Zoho GET responses.
+
+    Entries are keyed by method, endpoint and the sorted query params (which
+    include organization_id) and hold the raw response body, so the memory
+    budget (settings.CACHE_MAX_BYTES) is measured in response bytes and every
+    hit returns a fresh copy. Writes to an endpoint invalidate every cached
+    entry of its collection in the same organization.
+
+    With settings.CACHE_SHARED_FILE set the entries live in a :class:`SharedStore`
+    instead, shared by every process using the same file.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._shared = SharedStore()
+        self._entries: OrderedDict[tuple, tuple[float, str, bytes]] = OrderedDict()
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def key(method: str, endpoint: str, params: Optional[dict[str, Any]]) -> tuple:
+        normalized = tuple(sorted((str(k), str(v)) for k, v in (params or {}).items() if v is not None))
+        return (method.upper(), endpoint, normalized)
+
+    def ttl(self, endpoint: str) -> float:
+        ttls = {**DEFAULT_TTLS, **_parse_ttls(settings.CACHE_TTLS)}
+        matches = [prefix for prefix in ttls if endpoint.startswith(prefix)]
+        if not matches:
+            return settings.CACHE_DEFAULT_TTL
+        return ttls[max(matches, key=len)]
+
+    def get(self, key: tuple) -> Optional[Any]:
+        if settings.CACHE_SHARED_FILE:
+            return self._shared_get(key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, _, body = entry
+            if time.monotonic() >= expires_at:
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return json.loads(body)
+
+    def set(self, key: tuple, endpoint: str, body: bytes) -> None:
+        ttl = self.ttl(endpoint)
+        if ttl <= 0 or len(body) > settings.CACHE_MAX_BYTES:
+            return
+        if settings.CACHE_SHARED_FILE:
+            evicted = self._shared.set(key, endpoint, body, ttl)
+            with self._lock:
+                self.evictions += evicted
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + ttl, endpoint, body)
+            self._size += len(body)
+            while self._size > settings.CACHE_MAX_BYTES:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self, endpoint: str, organization_id: Optional[str] = None) -> int:
+        """Drop every entry of the endpoint's collection, of one organization if given, returns the number dropped."""
+        collection = _collection(endpoint)
+        if settings.CACHE_SHARED_FILE:
+            dropped = self._shared.invalidate(collection, organization_id)
+            with self._lock:
+                self.invalidations += dropped
+            return dropped
+        with self._lock:
+            keys = [
+                key for key, (_, cached, _) in self._entries.items()
+                if _collection(cached) == collection and (organization_id is None or _organization_id(key) == organization_id)
+            ]
+            for key in keys:
+                self._remove(key)
+            self.invalidations += len(keys)
+        return len(keys)
+
+    def clear(self) -> None:
+        if settings.CACHE_SHARED_FILE:
+            self._shared.clear()
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+            self.hits = self.misses = self.evictions = self.expirations = self.invalidations = 0
+
+    def stats(self) -> dict[str, Any]:
+        entries, size = self._shared.stats() if settings.CACHE_SHARED_FILE else (None, None)
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries) if entries is None else entries,
+                "bytes": self._size if size is None else size,
+                "max_bytes": settings.CACHE_MAX_BYTES,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+    def _shared_get(self, key: tuple) -> Optional[Any]:
+        body, expired = self._shared.get(key)
+        with self._lock:
+            if body is None:
+                self.misses += 1
+                self.expirations += expired
+                return None
+            self.hits += 1
+        return json.loads(body)
+
+    def _remove(self, key: tuple) -> None:
+        _, _, body = self._entries.pop(key)
+        self._size -= len(body)
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,355 @@
+import logging
+import math
+import sys
+import threading
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Iterable, Optional
+
+from utils.api import zoho_api_request
+from utils.orgs import org_registry
+from utils.pager import iter_records
+from utils.setting import settings
+
+# what the catalog keeps of a record, by kind: (endpoint, record key, id field)
+SOURCES = {
+    "item": ("/items", "items", "item_id"),
+    "composite_item": ("/compositeitems", "composite_items", "composite_item_id"),
+}
+
+# fields of a catalog record, the numeric ones are held in arrays of doubles, composite items also get their components
+FIELDS = ("item_id", "kind", "name", "sku", "rate", "tax_id", "stock_on_hand", "available_stock", "committed_stock",
+          "reorder_level", "unit", "status")
+# the number columns, in the order of :meth:`Catalog.columns`
+NUMBER_FIELDS = ("rate", "stock_on_hand", "available_stock", "committed_stock", "reorder_level")
+_MISSING = math.nan
+
+logger = logging.getLogger(__name__)
+
+
+def _intern(value: Any) -> Optional[str]:
+    return sys.intern(str(value)) if value is not None else None
+
+
+def _number(value: Any) -> float:
+    try:
+        return float(value) if value is not None and value != "" else _MISSING
+    except (TypeError, ValueError):
+        return _MISSING
+
+
+class Catalog:
+    """
+    The items and composite items of an organization in a compact column store.
+
+    Zoho's records carry dozens of fields and a dict per record costs a few
+    kilobytes, far too much for a catalog of hundreds of thousands of SKUs.
+    The catalog keeps only FIELDS, one column per field: the numbers in
+    arrays of doubles (NaN when missing) and the strings in lists, interned
+    so repeated values like tax ids, units and the item ids referenced by
+    composite items are stored once. Lookups by id or by SKU go through a
+    dict of row numbers, keyed by the strings the columns hold, and build
+    the record on demand. A removed record is replaced by the last row, so the
+    columns never have holes.
+
+    refresh() is incremental like the item index: it reads /items and
+    /compositeitems newest first by last_modified_time and stops at the
+    previous refresh. The list of composite items leaves out their
+    components, so every new or changed composite item is read in detail,
+    see :meth:`with_components`. Every organization has its own catalog,
+    see :func:`get_catalog`.
+    """
+
+    def __init__(self, org: Optional[str] = None):
+        self.org = org
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._clear()
+
+    def _clear(self) -> None:
+        self._ids: list[str] = []
+        self._kinds = bytearray()
+        self._names: list[Optional[str]] = []
+        self._skus: list[Optional[str]] = []
+        self._tax_ids: list[Optional[str]] = []
+        self._units: list[Optional[str]] = []
+        self._statuses: list[Optional[str]] = []
+        self._rates = array("d")
+        self._stock_on_hand = array("d")
+        self._available_stock = array("d")
+        self._committed_stock = array("d")
+        self._reorder_levels = array("d")
+        # composite item id -> its (item_id, quantity) components
+        self._components: dict[str, tuple[tuple[str, float], ...]] = {}
+        # item id -> its (warehouse name, stock on hand) for records that list their warehouses
+        self._warehouses: dict[str, tuple[tuple[str, float], ...]] = {}
+        self._row_by_id: dict[str, int] = {}
+        self._row_by_sku: dict[str, int] = {}
+        self.last_modified_time: dict[str, Optional[str]] = {kind: None for kind in SOURCES}
+        self.refreshed_at: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, item_id: str) -> bool:
+        return str(item_id) in self._row_by_id
+
+    def reset(self) -> None:
+        with self._lock:
+            self._clear()
+
+    def add(self, records: Iterable[dict[str, Any]], kind: str = "item") -> int:
+        """Store records of a kind of SOURCES, replacing earlier versions of the same ids."""
+        id_field = SOURCES[kind][2]
+        added = 0
+        with self._lock:
+            for record in records:
+                self._add(record, kind, id_field)
+                added += 1
+        return added
+
+    def _add(self, record: dict[str, Any], kind: str, id_field: str) -> None:
+        item_id = _intern(record[id_field])
+        sku = (record.get("sku") or "").strip() or None
+        row = self._row_by_id.get(item_id)
+        if row is None:
+            row = len(self._ids)
+            self._row_by_id[item_id] = row
+            self._ids.append(item_id)
+            self._kinds.append(0)
+            for column in (self._names, self._skus, self._tax_ids, self._units, self._statuses):
+                column.append(None)
+            for column in self._numbers():
+                column.append(_MISSING)
+        else:
+            self._drop_sku(row)
+
+        self._kinds[row] = kind == "composite_item"
+        self._names[row] = _intern(record.get("name"))
+        self._skus[row] = _intern(sku)
+        self._tax_ids[row] = _intern(record.get("tax_id") or None)
+        self._units[row] = _intern(record.get("unit") or None)
+        self._statuses[row] = _intern(record.get("status") or None)
+        self._rates[row] = _number(record.get("rate"))
+        self._stock_on_hand[row] = _number(record.get("stock_on_hand"))
+        self._available_stock[row] = _number(record.get("available_stock"))
+        self._committed_stock[row] = _number(record.get("committed_stock"))
+        self._reorder_levels[row] = _number(record.get("reorder_level"))
+        if sku:
+            self._row_by_sku[sku] = row
+        components = record.get("mapped_items")
+        if components:
+            self._components[item_id] = tuple((_intern(part.get("item_id")), _number(part.get("quantity"))) for part in components)
+        else:
+            self._components.pop(item_id, None)
+        warehouses = record.get("warehouses")
+        if warehouses:
+            self._warehouses[item_id] = tuple(
+                (_intern(warehouse.get("warehouse_name") or warehouse.get("warehouse_id")), _number(warehouse.get("warehouse_stock_on_hand")))
+                for warehouse in warehouses
+            )
+        elif warehouses is not None:
+            self._warehouses.pop(item_id, None)
+
+        modified = record.get("last_modified_time")
+        if modified and (self.last_modified_time[kind] is None or modified > self.last_modified_time[kind]):
+            self.last_modified_time[kind] = modified
+
+    def with_components(self, records: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """
+        Composite item records with their mapped_items, which the /compositeitems list leaves out.
+
+        Every record without mapped_items is read from /compositeitems/{id}, settings.BULK_CONCURRENCY
+        at a time at bulk priority. A record whose details can't be read is kept without components.
+        """
+        missing = [index for index, record in enumerate(records) if "mapped_items" not in record]
+        if not missing:
+            return records
+        records = list(records)
+        with ThreadPoolExecutor(max_workers=min(max(settings.BULK_CONCURRENCY, 1), len(missing))) as pool:
+            details = pool.map(lambda index: self._composite_item(records[index]["composite_item_id"]), missing)
+            for index, detail in zip(missing, details, strict=True):
+                if detail is not None:
+                    records[index] = {**records[index], "mapped_items": detail.get("mapped_items") or []}
+        return records
+
+    def _composite_item(self, composite_item_id: str) -> Optional[dict[str, Any]]:
+        response = zoho_api_request("GET", f"/compositeitems/{composite_item_id}", use_cache=False, priority="bulk", org=self.org)
+        detail = (response or {}).get("composite_item")
+        if not detail:
+            logger.error("Error reading the components of composite item %s: %s", composite_item_id, (response or {}).get("message", ""))
+        return detail
+
+    def remove(self, item_id: str) -> bool:
+        """Drop a record, returns False if the catalog doesn't hold it."""
+        with self._lock:
+            row = self._row_by_id.pop(str(item_id), None)
+            if row is None:
+                return False
+            self._drop_sku(row)
+            self._components.pop(str(item_id), None)
+            self._warehouses.pop(str(item_id), None)
+            last = len(self._ids) - 1
+            if row != last:
+                # move the last row into the hole
+                moved = self._ids[last]
+                for column in self._columns():
+                    column[row] = column[last]
+                self._row_by_id[moved] = row
+                sku = self._skus[row]
+                if sku and self._row_by_sku.get(sku) == last:
+                    self._row_by_sku[sku] = row
+            for column in self._columns():
+                column.pop()
+            return True
+
+    def _columns(self) -> tuple:
+        return (self._ids, self._kinds, self._names, self._skus, self._tax_ids, self._units, self._statuses, *self._numbers())
+
+    def _numbers(self) -> tuple:
+        return (self._rates, self._stock_on_hand, self._available_stock, self._committed_stock, self._reorder_levels)
+
+    def _drop_sku(self, row: int) -> None:
+        sku = self._skus[row]
+        if sku and self._row_by_sku.get(sku) == row:
+            del self._row_by_sku[sku]
+
+    def get(self, item_id: str) -> Optional[dict[str, Any]]:
+        """The record of an item or composite item id, None if the catalog doesn't hold it."""
+        with self._lock:
+            row = self._row_by_id.get(item_id)
+            return None if row is None else self._record(row)
+
+    def get_by_sku(self, sku: str) -> Optional[dict[str, Any]]:
+        """The record with a SKU, surrounding spaces are ignored, None if there is none."""
+        with self._lock:
+            row = self._row_by_sku.get(sku.strip())
+            return None if row is None else self._record(row)
+
+    def _record(self, row: int) -> dict[str, Any]:
+        item_id = self._ids[row]
+        rate, stock_on_hand, available_stock, committed_stock, reorder_level = (column[row] for column in self._numbers())
+        record = {
+            "item_id": item_id,
+            "kind": "composite_item" if self._kinds[row] else "item",
+            "name": self._names[row],
+            "sku": self._skus[row],
+            # NaN is the only value not equal to itself
+            "rate": rate if rate == rate else None,
+            "tax_id": self._tax_ids[row],
+            "stock_on_hand": stock_on_hand if stock_on_hand == stock_on_hand else None,
+            "available_stock": available_stock if available_stock == available_stock else None,
+            "committed_stock": committed_stock if committed_stock == committed_stock else None,
+            "reorder_level": reorder_level if reorder_level == reorder_level else None,
+            "unit": self._units[row],
+            "status": self._statuses[row],
+        }
+        components = self._components.get(item_id)
+        if components is not None:
+            record["components"] = [{"item_id": part_id, "quantity": quantity} for part_id, quantity in components]
+        return record
+
+    def columns(self) -> dict[str, Any]:
+        """
+        A copy of the columns for computations over the whole catalog.
+
+        Returns:
+            dict[str, Any]: "item_id", "name" and "sku" as lists, the NUMBER_FIELDS as arrays of doubles
+                (NaN when missing), all with one entry per row, and "warehouses" with the
+                (warehouse, stock on hand) pairs of the items whose records list their warehouses.
+        """
+        with self._lock:
+            columns = {"item_id": list(self._ids), "name": list(self._names), "sku": list(self._skus)}
+            for field, column in zip(NUMBER_FIELDS, self._numbers(), strict=True):
+                columns[field] = array("d", column)
+            columns["warehouses"] = dict(self._warehouses)
+            return columns
+
+    def refresh(self, full: bool = False) -> int:
+        """
+        Update the catalog from Zoho.
+
+        Args:
+            full (bool): Reload every item and composite item instead of reading only changed ones.
+                A full refresh also drops records deleted in Zoho.
+
+        Returns:
+            int: The number of records read.
+        """
+        with self._refresh_lock:
+            return self._refresh(full)
+
+    def ensure_fresh(self, max_age: Optional[float] = None) -> None:
+        """Refresh the catalog if it was never loaded or is older than max_age seconds."""
+        max_age = settings.CATALOG_MAX_AGE if max_age is None else max_age
+        with self._refresh_lock:
+            if self.refreshed_at is None:
+                self._refresh(full=True)
+            elif max_age > 0 and time.time() - self.refreshed_at > max_age:
+                self._refresh(full=False)
+
+    def _refresh(self, full: bool) -> int:
+        incremental = not full and self.refreshed_at is not None
+        started = time.time()
+        params = {"sort_column": "last_modified_time", "sort_order": "D"}
+        changes = {}
+        for kind, (endpoint, record_key, _) in SOURCES.items():
+            watermark = self.last_modified_time[kind] if incremental else None
+            records = changes[kind] = []
+            for record in iter_records(endpoint, record_key, params=params, use_cache=False, org=self.org):
+                # records are newest first, once we pass the watermark we have every change
+                if watermark and (record.get("last_modified_time") or "") < watermark:
+                    break
+                records.append(record)
+        changes["composite_item"] = self.with_components(changes["composite_item"])
+
+        with self._lock:
+            if not incremental:
+                self._clear()
+            for kind, records in changes.items():
+                for record in records:
+                    self._add(record, kind, SOURCES[kind][2])
+            self.refreshed_at = started
+        return sum(len(records) for records in changes.values())
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "records": len(self._ids),
+                "composite_items": sum(self._kinds),
+                "skus": len(self._row_by_sku),
+                "last_modified_time": dict(self.last_modified_time),
+                "refreshed_at": self.refreshed_at,
+            }
+
+
+catalog = Catalog()
+
+_catalogs: dict[str, Catalog] = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_catalog(org: Optional[str] = None) -> Catalog:
+    """The catalog of an organization, :data:`catalog` for the default one."""
+    organization = org_registry.get(org)
+    if organization.is_default:
+        return catalog
+    with _catalogs_lock:
+        result = _catalogs.get(organization.name)
+        if result is None:
+            result = _catalogs[organization.name] = Catalog(organization.name)
+        return result
+
+
+def catalogs() -> list[Catalog]:
+    """The catalogs of every organization that has one."""
+    with _catalogs_lock:
+        return [catalog, *_catalogs.values()]
+
+
+def reset_catalogs() -> None:
+    """Empty the catalogs of every organization."""
+    catalog.reset()
+    with _catalogs_lock:
+        _catalogs.clear()
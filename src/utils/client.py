@@ -0,0 +1,127 @@
+import asyncio
+import logging
+import threading
+from typing import Any, Optional
+
+import httpx
+
+from utils.setting import settings
+
+logger = logging.getLogger(__name__)
+
+# one pool per organization, so a slow or rate limited org can't take the connections of the others
+_clients: dict[Optional[str], httpx.Client] = {}
+_client_lock = threading.Lock()
+
+_async_clients: dict[Optional[str], httpx.AsyncClient] = {}
+_async_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _http2_available() -> bool:
+    """Check if HTTP/2 is requested and the optional h2 package is installed."""
+    if not settings.HTTP2:
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        logger.warning("ZOHO_HTTP2 is enabled but the 'h2' package is not installed, falling back to HTTP/1.1")
+        return False
+    return True
+
+
+def _client_options() -> dict[str, Any]:
+    """Build the connection pool options from the settings."""
+    return {
+        "limits": httpx.Limits(
+            max_connections=settings.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+        ),
+        "timeout": httpx.Timeout(settings.HTTP_TIMEOUT),
+        "http2": _http2_available(),
+    }
+
+
+def get_client(org: Optional[str] = None) -> httpx.Client:
+    """
+    Get the process wide HTTP client of an organization.
+
+    The client is created on first use and keeps its connections to Zoho alive
+    between calls so requests don't pay for a new TCP and TLS handshake.
+
+    Args:
+        org (str, optional): The organization name, None for the default organization.
+
+    Returns:
+        httpx.Client: The shared client.
+    """
+    client = _clients.get(org)
+    if client is None or client.is_closed:
+        with _client_lock:
+            client = _clients.get(org)
+            if client is None or client.is_closed:
+                client = _clients[org] = httpx.Client(**_client_options())
+    return client
+
+
+def close_client() -> None:
+    """Close the shared HTTP clients and release their pooled connections."""
+    with _client_lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        client.close()
+
+
+def get_async_client(org: Optional[str] = None) -> httpx.AsyncClient:
+    """
+    Get the shared async HTTP client of an organization for the running event loop.
+
+    An async client is bound to the loop it was created on, so new ones are
+    created if the loop has changed (e.g. between separate asyncio.run calls).
+
+    Args:
+        org (str, optional): The organization name, None for the default organization.
+
+    Returns:
+        httpx.AsyncClient: The shared async client.
+    """
+    global _async_client_loop
+    loop = asyncio.get_running_loop()
+    if _async_client_loop is not loop:
+        _async_clients.clear()
+        _async_client_loop = loop
+    client = _async_clients.get(org)
+    if client is None or client.is_closed:
+        client = _async_clients[org] = httpx.AsyncClient(**_client_options())
+    return client
+
+
+async def aclose_async_client() -> None:
+    """Close the shared async HTTP clients and release their pooled connections."""
+    global _async_client_loop
+    clients, loop = list(_async_clients.values()), _async_client_loop
+    _async_clients.clear()
+    _async_client_loop = None
+    # clients from a loop that has since closed can't be awaited anymore
+    if loop is asyncio.get_running_loop():
+        for client in clients:
+            await client.aclose()
+
+
+async def preconnect_async(url: str, org: Optional[str] = None) -> None:
+    """
+    Open a pooled connection to the host of url ahead of the first request.
+
+    The DNS lookup and the TCP and TLS handshakes happen now instead of in
+    the first tool call. The request carries no token, so Zoho answers it
+    with an error and it doesn't count against the API limits.
+
+    Args:
+        url (str): A URL on the host to connect to.
+        org (str, optional): The organization whose connection pool to use, None for the default organization.
+    """
+    try:
+        await get_async_client(org).get(url)
+    except httpx.HTTPError as e:
+        logger.warning("Could not connect to %s ahead of time: %s", url, e)
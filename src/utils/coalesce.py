@@ -0,0 +1,116 @@
+import asyncio
+import copy
+import threading
+from typing import Any, Awaitable, Callable, Optional
+
+
+class _Flight:
+    """One upstream call and the callers waiting for its result."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.done = threading.Event()
+        self.task: Optional[asyncio.Future] = None
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 1
+
+
+class RequestCoalescer:
+    """
+    Single-flight for identical Zoho GETs in flight at the same time.
+
+    The first caller of a key makes the upstream call, callers of the same
+    key arriving before it finishes wait for it instead of sending their
+    own. Every caller gets its own copy of the result, so one caller
+    changing it doesn't change it for the others, the last one to collect
+    the result takes the original. Sync callers (threads) and async callers
+    (per event loop) are coalesced separately, an async call runs as its
+    own task so a cancelled caller doesn't cancel it for the others.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: dict[tuple, _Flight] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    def run(self, key: tuple, fn: Callable[[], Any]) -> Any:
+        """Call fn, or wait for the call of another thread with the same key in flight."""
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.calls += 1
+            else:
+                flight.waiters += 1
+                self.coalesced += 1
+        if leader:
+            try:
+                flight.result = fn()
+            except BaseException as e:
+                flight.error = e
+            finally:
+                with self._lock:
+                    del self._flights[key]
+                flight.done.set()
+        else:
+            flight.done.wait()
+        return self._collect(flight)
+
+    async def run_async(self, key: tuple, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """The async version of :meth:`run`, fn is only called by the first caller of the key."""
+        key = (asyncio.get_running_loop(), *key)
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = _Flight()
+                flight.task = asyncio.ensure_future(fn())
+                flight.task.add_done_callback(lambda _: self._land(key))
+                self.calls += 1
+            else:
+                flight.waiters += 1
+                self.coalesced += 1
+        try:
+            flight.result = await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if not flight.task.cancelled():
+                # this caller was cancelled, the call goes on for the others
+                with flight.lock:
+                    flight.waiters -= 1
+                raise
+            flight.error = asyncio.CancelledError()
+        except Exception as e:
+            flight.error = e
+        return self._collect(flight)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            requests = self.calls + self.coalesced
+            return {
+                "in_flight": len(self._flights),
+                "upstream_calls": self.calls,
+                "coalesced": self.coalesced,
+                "saved_rate": round(self.coalesced / requests, 3) if requests else None,
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self.calls = self.coalesced = 0
+
+    def _land(self, key: tuple) -> None:
+        with self._lock:
+            self._flights.pop(key, None)
+
+    def _collect(self, flight: _Flight) -> Any:
+        """The result of a finished flight for one of its callers."""
+        if flight.error is not None:
+            raise flight.error
+        # copied under the lock, the last caller may change the original as soon as it has it
+        with flight.lock:
+            flight.waiters -= 1
+            return flight.result if flight.waiters == 0 else copy.deepcopy(flight.result)
+
+
+request_coalescer = RequestCoalescer()
@@ -0,0 +1,247 @@
+import csv
+import io
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from utils.api import zoho_api_request
+from utils.filelock import write_json_atomic
+from utils.mirror import TABLES
+from utils.pager import iter_pages
+from utils.setting import settings
+
+logger = logging.getLogger(__name__)
+
+# what can be exported: name -> (endpoint, record key)
+SOURCES = {name: (table["endpoint"], table["record_key"]) for name, table in TABLES.items()}
+SOURCES["taxes"] = ("/settings/taxes", "taxes")
+
+FORMATS = ("jsonl", "csv", "parquet")
+PARQUET_ROWS_PER_PART = 50000
+
+
+def state_path(path: str) -> str:
+    """The file an export keeps its progress in until it completes."""
+    return os.path.abspath(path).rstrip(os.sep) + ".export.json"
+
+
+def _cell(value: Any) -> Any:
+    """A CSV or Parquet value, nested records and lists are stored as JSON."""
+    return json.dumps(value) if isinstance(value, (dict, list)) else value
+
+
+def _columns(records: list[dict[str, Any]]) -> list[str]:
+    """The fields of a batch of records in the order they first appear."""
+    return list(dict.fromkeys(field for record in records for field in record))
+
+
+class JsonlWriter:
+    """One JSON record per line, committed after every page."""
+
+    def __init__(self, path: str, state: Optional[dict[str, Any]] = None, columns: Optional[list[str]] = None):
+        if state is None:
+            self._file = open(path, "wb")
+        else:
+            # drop whatever was written after the last commit
+            self._file = open(path, "r+b")
+            self._file.truncate(state["position"])
+            self._file.seek(state["position"])
+
+    def write(self, records: list[dict[str, Any]]) -> None:
+        self._file.write(b"".join(json.dumps(record).encode() + b"\n" for record in records))
+
+    def commit(self) -> Optional[dict[str, Any]]:
+        """Make everything written so far durable, returns the state to resume from."""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        return {"position": self._file.tell()}
+
+    def finish(self) -> Optional[dict[str, Any]]:
+        return self.commit()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class CsvWriter(JsonlWriter):
+    """
+    CSV with a header row, committed after every page.
+
+    The columns are the fields of the first page, fields only later records
+    have are left out, nested values are written as JSON.
+    """
+
+    def __init__(self, path: str, state: Optional[dict[str, Any]] = None, columns: Optional[list[str]] = None):
+        super().__init__(path, state, columns)
+        self._columns = state["columns"] if state else columns
+        # the header is written with the columns
+        self._header = bool(state and state["columns"])
+
+    def write(self, records: list[dict[str, Any]]) -> None:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if self._columns is None:
+            if not records:
+                return
+            self._columns = _columns(records)
+        if not self._header:
+            writer.writerow(self._columns)
+            self._header = True
+        writer.writerows([_cell(record.get(column)) for column in self._columns] for record in records)
+        self._file.write(buffer.getvalue().encode())
+
+    def commit(self) -> Optional[dict[str, Any]]:
+        state = super().commit()
+        state["columns"] = self._columns
+        return state
+
+
+class ParquetWriter:
+    """
+    A directory of Parquet part files of `rows_per_part` rows each.
+
+    A Parquet file can't be appended to once written, so the rows are
+    buffered and written as a new part file whenever the buffer is full,
+    an export resumes after the last complete part. The schema is taken
+    from the first part, columns without values there are strings. Needs
+    pyarrow.
+    """
+
+    def __init__(self, path: str, state: Optional[dict[str, Any]] = None, columns: Optional[list[str]] = None, rows_per_part: int = PARQUET_ROWS_PER_PART):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise RuntimeError("Parquet exports need pyarrow, install the package with its parquet extras") from e
+        self._pa, self._pq = pa, pq
+        self._path = path
+        self._rows_per_part = rows_per_part
+        self._rows: list[dict[str, Any]] = []
+        self._parts = state["parts"] if state else 0
+        self._columns = state["columns"] if state else columns
+        self._schema = pq.read_schema(self._part(0)) if self._parts else None
+        os.makedirs(path, exist_ok=True)
+        # parts after the last commit are incomplete
+        for name in os.listdir(path):
+            if name.startswith("part-") and name.endswith(".parquet") and int(name[5:-8]) >= self._parts:
+                os.remove(os.path.join(path, name))
+
+    def _part(self, number: int) -> str:
+        return os.path.join(self._path, f"part-{number:05d}.parquet")
+
+    def write(self, records: list[dict[str, Any]]) -> None:
+        if self._columns is None and records:
+            self._columns = _columns(records)
+        self._rows.extend({column: _cell(record.get(column)) for column in self._columns} for record in records)
+
+    def commit(self) -> Optional[dict[str, Any]]:
+        if len(self._rows) < self._rows_per_part:
+            return None
+        return self.finish()
+
+    def finish(self) -> Optional[dict[str, Any]]:
+        """Write the buffered rows as a part, returns the state to resume from."""
+        if self._rows:
+            pa = self._pa
+            table = pa.Table.from_pylist(self._rows, schema=self._schema)
+            if self._schema is None:
+                self._schema = pa.schema([field.with_type(pa.string()) if pa.types.is_null(field.type) else field for field in table.schema])
+                table = table.cast(self._schema)
+            self._pq.write_table(table, self._part(self._parts))
+            self._parts += 1
+            self._rows = []
+        return {"parts": self._parts, "columns": self._columns}
+
+    def close(self) -> None:
+        self._rows = []
+
+
+WRITERS: dict[str, Callable[..., Any]] = {"jsonl": JsonlWriter, "csv": CsvWriter, "parquet": ParquetWriter}
+
+
+def _expand_salesorder(record: dict[str, Any], org: Optional[str] = None) -> dict[str, Any]:
+    """A sales order with its line items and the rest of its details, which the list endpoint leaves out."""
+    salesorder_id = record["salesorder_id"]
+    response = zoho_api_request("GET", f"/salesorders/{salesorder_id}", use_cache=False, priority="bulk", org=org)
+    salesorder = (response or {}).get("salesorder")
+    if not salesorder:
+        raise RuntimeError(f"Error reading sales order {salesorder_id}: {(response or {}).get('message', '')}")
+    return salesorder
+
+
+def export(source: str, path: str, format: Optional[str] = None, params: Optional[dict[str, Any]] = None, expand: bool = False, columns: Optional[list[str]] = None,
+           per_page: Optional[int] = None, concurrency: Optional[int] = None, restart: bool = False, org: Optional[str] = None) -> dict[str, Any]:
+    """
+    Write every record of a list endpoint to disk, page by page.
+
+    Pages are fetched `concurrency` ahead and written as they arrive, so
+    only a few pages are in memory at a time. After every page that made it
+    to disk, every part for Parquet, the progress is saved next to the output
+    (see :func:`state_path`), an export that stopped halfway continues after
+    that page when it is run again with the same arguments. The progress file is removed once the
+    export completes.
+
+    Args:
+        source (str): A name of SOURCES, e.g. "salesorders".
+        path (str): The output file, a directory for Parquet.
+        format (str, optional): One of FORMATS, defaults to the extension of path and then to jsonl.
+        params (dict, optional): Query parameters of the list endpoint, e.g. {"status": "active"} or custom field filters.
+        expand (bool): Replace every sales order with its details, e.g. to get its line items. Each one takes a
+            Zoho call, settings.BULK_CONCURRENCY of them at a time.
+        columns (list[str], optional): The columns of a CSV or Parquet export, defaults to the fields of the first page.
+        per_page (int, optional): Records per page, defaults to settings.PAGER_PER_PAGE.
+        concurrency (int, optional): Pages fetched in parallel, defaults to settings.PAGER_CONCURRENCY.
+        restart (bool): Start over instead of resuming an unfinished export to the same path.
+        org (str, optional): The organization to export from, defaults to the default organization.
+
+    Returns:
+        dict[str, Any]: The output path and format, the records and pages written and the page the export resumed at,
+            None if it started from the beginning.
+
+    Raises:
+        ValueError: If the arguments are invalid or an unfinished export to path was started with other arguments.
+    """
+    if source not in SOURCES:
+        raise ValueError(f"Unknown source {source}, use one of {', '.join(SOURCES)}")
+    format = format or next((name for name in FORMATS if path.lower().endswith("." + name)), "jsonl")
+    if format not in FORMATS:
+        raise ValueError(f"Unknown format {format}, use one of {', '.join(FORMATS)}")
+    if expand and source != "salesorders":
+        raise ValueError("Only sales orders can be expanded")
+    endpoint, record_key = SOURCES[source]
+    per_page = per_page or settings.PAGER_PER_PAGE
+    job = {"source": source, "format": format, "params": params or {}, "expand": expand, "columns": columns, "per_page": per_page, "org": org}
+
+    progress_path = state_path(path)
+    state = None
+    if os.path.exists(progress_path) and not restart:
+        with open(progress_path) as f:
+            state = json.load(f)
+        if state["job"] != job:
+            raise ValueError(f"An unfinished export to {path} was started with other arguments, run it again with those or restart it")
+
+    writer = WRITERS[format](path, state and state["writer"], columns)
+    first_page = state["page"] + 1 if state else 1
+    written = state["records"] if state else 0
+    pages = 0
+    try:
+        with ThreadPoolExecutor(max_workers=max(settings.BULK_CONCURRENCY, 1)) as pool:
+            for page, records in iter_pages(endpoint, record_key, params, per_page, concurrency, use_cache=False, first_page=first_page, org=org):
+                if expand:
+                    records = list(pool.map(lambda record: _expand_salesorder(record, org), records))
+                writer.write(records)
+                written += len(records)
+                pages += 1
+                committed = writer.commit()
+                if committed is not None:
+                    write_json_atomic(progress_path, {"job": job, "page": page, "records": written, "writer": committed})
+        writer.finish()
+    finally:
+        writer.close()
+
+    if os.path.exists(progress_path):
+        os.remove(progress_path)
+    logger.info("Exported %s %s records to %s", written, source, path)
+    return {"path": path, "format": format, "records": written, "pages": pages, "resumed_at": first_page if state else None}
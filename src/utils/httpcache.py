@@ -0,0 +1,175 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Optional
+
+import httpx
+
+from utils.setting import settings
+
+# a cached response: (etag, last modified, sha256 of the body, body)
+Stored = tuple[Optional[str], Optional[str], str, bytes]
+
+
+def _digest(body: bytes) -> str:
+    return hashlib.sha256(body).hexdigest()
+
+
+class HttpCache:
+    """
+    Zoho GET responses on disk, revalidated with conditional requests.
+
+    Sits under the in memory :class:`utils.cache.ResponseCache`: when an
+    entry there expired, the request is sent with the ETag and Last-Modified
+    of the stored response (If-None-Match, If-Modified-Since) and a 304 is
+    answered with the stored body instead of downloading it again. The
+    entries live in the SQLite file settings.HTTP_CACHE_FILE, so they outlive
+    the process and are shared by workers using the same file.
+
+    Zoho doesn't send validators on every endpoint. For those the body is
+    still downloaded, but its hash is compared with the stored one and an
+    unchanged page only has its entry touched instead of rewritten. The
+    entries are kept under settings.HTTP_CACHE_MAX_BYTES of bodies, the
+    least recently used are evicted first.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._path: Optional[str] = None
+        self._pid: Optional[int] = None
+        self.revalidated = 0
+        self.unchanged = 0
+        self.stores = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(settings.HTTP_CACHE_FILE)
+
+    def connection(self) -> sqlite3.Connection:
+        """Open (once per process) and return the connection to settings.HTTP_CACHE_FILE."""
+        if self._conn is None or self._path != settings.HTTP_CACHE_FILE or self._pid != os.getpid():
+            self.close()
+            self._path, self._pid = settings.HTTP_CACHE_FILE, os.getpid()
+            self._conn = sqlite3.connect(self._path, check_same_thread=False, isolation_level=None, timeout=5)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS http_responses (key TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, "
+                "digest TEXT NOT NULL, used_at REAL NOT NULL, size INTEGER NOT NULL, body BLOB NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_http_responses_used_at ON http_responses (used_at)")
+        return self._conn
+
+    def close(self) -> None:
+        if self._conn is not None:
+            # a connection inherited from the parent process must not be used or closed
+            if self._pid == os.getpid():
+                self._conn.close()
+            self._conn = None
+
+    def get(self, key: tuple) -> Optional[Stored]:
+        """The stored response of a cache key, see :meth:`utils.cache.ResponseCache.key`."""
+        with self._lock:
+            return self.connection().execute(
+                "SELECT etag, last_modified, digest, body FROM http_responses WHERE key = ?", (json.dumps(key),)
+            ).fetchone()
+
+    @staticmethod
+    def conditional_headers(stored: Optional[Stored]) -> dict[str, str]:
+        """The headers that make a request conditional on the stored response having changed."""
+        if stored is None:
+            return {}
+        etag, last_modified, _, _ = stored
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        return headers
+
+    def revalidated_response(self, key: tuple, stored: Optional[Stored], response: httpx.Response) -> httpx.Response:
+        """The response to a GET sent with :meth:`conditional_headers`, a 304 becomes a 200 with the stored body."""
+        if response.status_code != 304 or stored is None:
+            return response
+        self._touch(key)
+        with self._lock:
+            self.revalidated += 1
+        # the stored body is already decoded, the 304's content headers don't describe it
+        return httpx.Response(200, headers={"Content-Type": "application/json"}, content=stored[3], request=response.request)
+
+    def store(self, key: tuple, stored: Optional[Stored], response: httpx.Response, result: Any) -> None:
+        """Store a successful response, only touch the entry if the body hashes the same as the stored one."""
+        if response.status_code != 200 or not isinstance(result, dict) or result.get("code", 0) != 0:
+            return
+        etag, last_modified = response.headers.get("ETag"), response.headers.get("Last-Modified")
+        digest = _digest(response.content)
+        if stored is not None and stored[2] == digest:
+            self._touch(key, etag, last_modified)
+            with self._lock:
+                self.unchanged += 1
+        elif len(response.content) <= settings.HTTP_CACHE_MAX_BYTES:
+            self._store(key, etag, last_modified, digest, response.content)
+
+    def _touch(self, key: tuple, etag: Optional[str] = None, last_modified: Optional[str] = None) -> None:
+        with self._lock:
+            self.connection().execute(
+                "UPDATE http_responses SET used_at = ?, etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified) WHERE key = ?",
+                (time.time(), etag, last_modified, json.dumps(key)),
+            )
+
+    def _store(self, key: tuple, etag: Optional[str], last_modified: Optional[str], digest: str, body: bytes) -> None:
+        with self._lock:
+            conn = self.connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO http_responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (json.dumps(key), etag, last_modified, digest, time.time(), len(body), body),
+                )
+                size = conn.execute("SELECT COALESCE(SUM(size), 0) FROM http_responses").fetchone()[0]
+                drop = []
+                if size > settings.HTTP_CACHE_MAX_BYTES:
+                    for cached_key, cached_size in conn.execute("SELECT key, size FROM http_responses ORDER BY used_at").fetchall():
+                        if size <= settings.HTTP_CACHE_MAX_BYTES:
+                            break
+                        drop.append((cached_key,))
+                        size -= cached_size
+                    conn.executemany("DELETE FROM http_responses WHERE key = ?", drop)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            self.stores += 1
+            self.evictions += len(drop)
+
+    def clear(self) -> None:
+        if self.enabled:
+            with self._lock:
+                self.connection().execute("DELETE FROM http_responses")
+        with self._lock:
+            self.revalidated = self.unchanged = self.stores = self.evictions = 0
+
+    def stats(self) -> dict[str, Any]:
+        entries, size = (0, 0)
+        if self.enabled:
+            with self._lock:
+                entries, size = self.connection().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM http_responses").fetchone()
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "entries": entries,
+                "bytes": size,
+                "max_bytes": settings.HTTP_CACHE_MAX_BYTES,
+                "revalidated": self.revalidated,
+                "unchanged": self.unchanged,
+                "stores": self.stores,
+                "evictions": self.evictions,
+            }
+
+
+http_cache = HttpCache()
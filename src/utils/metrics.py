@@ -0,0 +1,319 @@
+import functools
+import inspect
+import logging
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from typing import TYPE_CHECKING, Any, Callable
+
+import httpx
+
+from utils.setting import settings
+
+if TYPE_CHECKING:
+    from http.server import ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+# upper bounds in seconds, the last bucket takes everything slower
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# zoho ids are long numbers, they are replaced so every record shares one endpoint label
+_ID = re.compile(r"/\d+(?=/|$)")
+
+
+def endpoint_label(endpoint: str) -> str:
+    """The endpoint with ids replaced, e.g. /salesorders/{id}/attachment."""
+    return _ID.sub("/{id}", "/" + endpoint.lstrip("/"))
+
+
+class Histogram:
+    """
+    A fixed bucket histogram of durations.
+
+    Observing is a bisect and two additions, quantiles are estimated by
+    interpolating inside the bucket they fall in. Not thread safe on its own,
+    :class:`Metrics` holds its lock around every call.
+    """
+
+    __slots__ = ("counts", "count", "sum", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = BUCKETS[index - 1] if index else 0.0
+                upper = BUCKETS[index] if index < len(BUCKETS) else self.max
+                return min(lower + (upper - lower) * (rank - seen) / count, self.max)
+            seen += count
+        return self.max
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "total_ms": round(self.sum * 1000, 2),
+            "mean_ms": round(self.sum / self.count * 1000, 2) if self.count else 0.0,
+            "p50_ms": round(self.quantile(0.5) * 1000, 2),
+            "p95_ms": round(self.quantile(0.95) * 1000, 2),
+            "p99_ms": round(self.quantile(0.99) * 1000, 2),
+            "max_ms": round(self.max * 1000, 2),
+        }
+
+
+class Metrics:
+    """
+    Counters and latency histograms of the server.
+
+    - tools: wall time and errors of every MCP tool call
+    - requests: Zoho calls, latency, status codes and bytes per endpoint
+    - errors: exceptions, HTTP error statuses and Zoho error codes
+    - token refreshes and rate limit waits
+    - startup: seconds to import, to get ready, to warm up and of the first tool call
+
+    Everything lives in memory, the overhead of a call is a lock and a few
+    additions. Set ZOHO_METRICS_ENABLED=false to turn it off.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._started = time.time()
+            self._tools: dict[str, Histogram] = {}
+            self._tool_errors: Counter = Counter()
+            self._requests: dict[tuple[str, str], Histogram] = {}
+            self._statuses: Counter = Counter()
+            self._bytes_sent: Counter = Counter()
+            self._bytes_received: Counter = Counter()
+            self._errors: Counter = Counter()
+            self._token_refreshes = 0
+            self._rate_limit_wait = Histogram()
+            self._startup: dict[str, float] = {}
+
+    def observe_tool(self, name: str, seconds: float, failed: bool = False) -> None:
+        if not settings.METRICS_ENABLED:
+            return
+        with self._lock:
+            histogram = self._tools.get(name)
+            if histogram is None:
+                histogram = self._tools[name] = Histogram()
+            histogram.observe(seconds)
+            if failed:
+                self._tool_errors[name] += 1
+            self._startup.setdefault("first_tool_call", seconds)
+
+    def observe_response(self, method: str, endpoint: str, response: httpx.Response, seconds: float) -> None:
+        """Record one HTTP exchange with Zoho, retries are recorded one by one."""
+        if not settings.METRICS_ENABLED:
+            return
+        key = (method.upper(), endpoint_label(endpoint))
+        sent = int(response.request.headers.get("Content-Length") or 0)
+        with self._lock:
+            histogram = self._requests.get(key)
+            if histogram is None:
+                histogram = self._requests[key] = Histogram()
+            histogram.observe(seconds)
+            self._statuses[(*key, response.status_code)] += 1
+            self._bytes_sent[key] += sent
+            self._bytes_received[key] += response.num_bytes_downloaded
+            if response.status_code >= 400:
+                self._errors[("http", str(response.status_code))] += 1
+
+    def count_error(self, source: str, kind: str) -> None:
+        """Count an error, source is "exception", "http", "zoho" or "auth" and kind the class, status or code."""
+        if not settings.METRICS_ENABLED:
+            return
+        with self._lock:
+            self._errors[(source, kind)] += 1
+
+    def count_token_refresh(self) -> None:
+        if not settings.METRICS_ENABLED:
+            return
+        with self._lock:
+            self._token_refreshes += 1
+
+    def observe_rate_limit_wait(self, seconds: float) -> None:
+        if not settings.METRICS_ENABLED:
+            return
+        with self._lock:
+            self._rate_limit_wait.observe(seconds)
+
+    def observe_startup(self, phase: str, seconds: float) -> None:
+        """Record how long a startup phase took, "import", "ready" or "warmup"."""
+        if not settings.METRICS_ENABLED:
+            return
+        with self._lock:
+            self._startup[phase] = seconds
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            endpoints = {}
+            for (method, endpoint), histogram in sorted(self._requests.items()):
+                key = (method, endpoint)
+                endpoints[f"{method} {endpoint}"] = {
+                    **histogram.summary(),
+                    "statuses": {str(status): count for (m, e, status), count in sorted(self._statuses.items()) if (m, e) == key},
+                    "bytes_sent": self._bytes_sent[key],
+                    "bytes_received": self._bytes_received[key],
+                }
+            return {
+                "uptime_seconds": round(time.time() - self._started, 1),
+                "tools": {name: {**histogram.summary(), "errors": self._tool_errors[name]} for name, histogram in sorted(self._tools.items())},
+                "zoho_requests": endpoints,
+                "errors": {f"{source}:{kind}": count for (source, kind), count in sorted(self._errors.items())},
+                "token_refreshes": self._token_refreshes,
+                "rate_limit_wait": self._rate_limit_wait.summary(),
+                "startup_seconds": {phase: round(seconds, 4) for phase, seconds in self._startup.items()},
+            }
+
+    def prometheus(self) -> str:
+        """The metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            _histogram_lines(lines, "zoho_mcp_tool_duration_seconds", "Wall time of MCP tool calls.",
+                             [({"tool": name}, histogram) for name, histogram in sorted(self._tools.items())])
+            _counter_lines(lines, "zoho_mcp_tool_errors_total", "MCP tool calls that failed or returned nothing.",
+                           [({"tool": name}, count) for name, count in sorted(self._tool_errors.items())])
+            _histogram_lines(lines, "zoho_api_request_duration_seconds", "Latency of Zoho API calls.",
+                             [({"method": method, "endpoint": endpoint}, histogram) for (method, endpoint), histogram in sorted(self._requests.items())])
+            _counter_lines(lines, "zoho_api_responses_total", "Zoho API responses by status code.",
+                           [({"method": m, "endpoint": e, "status": str(s)}, count) for (m, e, s), count in sorted(self._statuses.items())])
+            _counter_lines(lines, "zoho_api_sent_bytes_total", "Request bytes sent to Zoho.",
+                           [({"method": m, "endpoint": e}, count) for (m, e), count in sorted(self._bytes_sent.items())])
+            _counter_lines(lines, "zoho_api_received_bytes_total", "Response bytes received from Zoho.",
+                           [({"method": m, "endpoint": e}, count) for (m, e), count in sorted(self._bytes_received.items())])
+            _counter_lines(lines, "zoho_errors_total", "Errors by source and kind.",
+                           [({"source": source, "kind": kind}, count) for (source, kind), count in sorted(self._errors.items())])
+            _counter_lines(lines, "zoho_token_refreshes_total", "Access token refreshes.", [({}, self._token_refreshes)])
+            _histogram_lines(lines, "zoho_rate_limit_wait_seconds", "Time spent waiting for the rate limiter.", [({}, self._rate_limit_wait)])
+            _gauge_lines(lines, "zoho_mcp_startup_seconds", "Duration of the startup phases and of the first tool call.",
+                         [({"phase": phase}, seconds) for phase, seconds in self._startup.items()])
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels: dict[str, str], **extra: str) -> str:
+    labels = {**labels, **extra}
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels.items()) + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _counter_lines(lines: list[str], name: str, help_text: str, samples: list[tuple[dict[str, str], int]]) -> None:
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} counter")
+    lines.extend(f"{name}{_labels(labels)} {value}" for labels, value in samples)
+
+
+def _gauge_lines(lines: list[str], name: str, help_text: str, samples: list[tuple[dict[str, str], float]]) -> None:
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} gauge")
+    lines.extend(f"{name}{_labels(labels)} {value:.6f}" for labels, value in samples)
+
+
+def _histogram_lines(lines: list[str], name: str, help_text: str, samples: list[tuple[dict[str, str], Histogram]]) -> None:
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} histogram")
+    for labels, histogram in samples:
+        cumulative = 0
+        for bound, count in zip(BUCKETS, histogram.counts[:-1], strict=True):
+            cumulative += count
+            lines.append(f"{name}_bucket{_labels(labels, le=str(bound))} {cumulative}")
+        lines.append(f"{name}_bucket{_labels(labels, le='+Inf')} {histogram.count}")
+        lines.append(f"{name}_sum{_labels(labels)} {histogram.sum:.6f}")
+        lines.append(f"{name}_count{_labels(labels)} {histogram.count}")
+
+
+def _failed(result: Any) -> bool:
+    """Tools return None when they fail and pass Zoho error bodies through."""
+    return result is None or (isinstance(result, dict) and result.get("code", 0) != 0)
+
+
+def instrument(name: str, fn: Callable) -> Callable:
+    """Wrap a tool so every call records its wall time under `name`."""
+    if inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def async_wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            failed = True
+            try:
+                result = await fn(*args, **kwargs)
+                failed = _failed(result)
+                return result
+            finally:
+                metrics.observe_tool(name, time.perf_counter() - start, failed)
+        return async_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        failed = True
+        try:
+            result = fn(*args, **kwargs)
+            failed = _failed(result)
+            return result
+        finally:
+            metrics.observe_tool(name, time.perf_counter() - start, failed)
+    return wrapper
+
+
+def start_metrics_server(port: int, host: str = "127.0.0.1") -> "ThreadingHTTPServer":
+    """
+    Serve the metrics in the Prometheus text format on http://host:port/metrics.
+
+    Args:
+        port (int): The port to listen on, 0 picks a free one.
+        host (str): The interface to listen on.
+
+    Returns:
+        ThreadingHTTPServer: The server, call shutdown() to stop it.
+    """
+    # only servers with a metrics port pay for the import
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics.prometheus().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    logger.info("Serving metrics on http://%s:%s/metrics", host, server.server_address[1])
+    return server
+
+
+metrics = Metrics()
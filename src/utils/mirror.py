@@ -0,0 +1,330 @@
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+from utils.orgs import org_registry
+from utils.pager import iter_records
+from utils.setting import settings
+
+logger = logging.getLogger(__name__)
+
+# table name -> how to sync it from zoho and which columns get their own (indexed) column
+TABLES: dict[str, dict[str, Any]] = {
+    "items": {
+        "endpoint": "/items",
+        "record_key": "items",
+        "id": "item_id",
+        "columns": ["name", "sku", "status", "description"],
+        "indexes": ["name", "sku"],
+        "search": ["name", "sku", "description"],
+    },
+    "contacts": {
+        "endpoint": "/contacts",
+        "record_key": "contacts",
+        "id": "contact_id",
+        "columns": ["contact_name", "company_name", "email", "phone", "first_name", "last_name"],
+        "indexes": ["contact_name", "email"],
+        "search": ["contact_name", "company_name"],
+    },
+    "salesorders": {
+        "endpoint": "/salesorders",
+        "record_key": "salesorders",
+        "id": "salesorder_id",
+        "columns": ["salesorder_number", "reference_number", "customer_id", "customer_name", "date", "status"],
+        "indexes": ["customer_id", "customer_name", "date"],
+        "search": ["salesorder_number", "reference_number", "customer_name"],
+    },
+    "compositeitems": {
+        "endpoint": "/compositeitems",
+        "record_key": "composite_items",
+        "id": "composite_item_id",
+        "columns": ["name", "sku", "status", "description"],
+        "indexes": ["name", "sku"],
+        "search": ["name", "sku", "description"],
+    },
+}
+
+_BATCH_SIZE = 500
+_NAME = re.compile(r"^[a-z0-9_]+$")
+
+
+def _column_sql(table: str, name: str) -> str:
+    """SQL for a record field, using the real column when there is one."""
+    if not _NAME.match(name):
+        raise ValueError(f"Invalid field name: {name}")
+    if name in TABLES[table]["columns"] or name in ("last_modified_time",):
+        return name
+    return f"json_extract(data, '$.{name}')"
+
+
+class Mirror:
+    """
+    An on-disk SQLite replica of the Zoho list endpoints in TABLES.
+
+    Records are stored as JSON with the fields used for filtering copied to
+    indexed columns. sync() does an incremental refresh: it reads records
+    newest first by last_modified_time and stops once it reaches records older
+    than the last sync. A full sync replaces the table, which also drops
+    records deleted in Zoho.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._path: Optional[str] = None
+        self._sync_thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def connection(self) -> sqlite3.Connection:
+        """Open (once) and return the connection to settings.MIRROR_DB_FILE."""
+        with self._lock:
+            if self._conn is None or self._path != settings.MIRROR_DB_FILE:
+                self.close()
+                self._path = settings.MIRROR_DB_FILE
+                self._conn = sqlite3.connect(self._path, check_same_thread=False)
+                self._conn.row_factory = sqlite3.Row
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute("PRAGMA synchronous=NORMAL")
+                self._create_tables(self._conn)
+            return self._conn
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _create_tables(self, conn: sqlite3.Connection) -> None:
+        with conn:
+            for table, config in TABLES.items():
+                columns = ", ".join(f"{column} TEXT" for column in config["columns"])
+                conn.execute(
+                    f"CREATE TABLE IF NOT EXISTS {table} (id TEXT PRIMARY KEY, {columns}, "
+                    "last_modified_time TEXT, data TEXT NOT NULL)"
+                )
+                for column in config["indexes"] + ["last_modified_time"]:
+                    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_{column} ON {table} ({column} COLLATE NOCASE)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sync_state (table_name TEXT PRIMARY KEY, last_synced_at REAL, "
+                "last_full_sync_at REAL, last_modified_time TEXT)"
+            )
+
+    def sync(self, tables: Optional[list[str]] = None, full: bool = False) -> dict[str, Any]:
+        """
+        Sync tables from Zoho.
+
+        Args:
+            tables (list[str], optional): The tables to sync, defaults to all of TABLES.
+            full (bool): Replace the tables instead of fetching only changed records.
+
+        Returns:
+            dict[str, Any]: The number of records written per table.
+        """
+        result = {}
+        for table in tables or TABLES:
+            if table not in TABLES:
+                raise ValueError(f"Unknown mirror table: {table}. Supported tables are: {', '.join(TABLES)}")
+            result[table] = self._sync_table(table, full)
+        return result
+
+    def _sync_table(self, table: str, full: bool) -> int:
+        config = TABLES[table]
+        state = self._state(table)
+        watermark = None if full or state is None else state["last_modified_time"]
+        full = full or state is None
+
+        # a full sync fills a staging table and swaps it in at the end, so reads
+        # keep being served from the old data while zoho is paged through
+        target = f"{table}_staging" if full else table
+        conn = self.connection()
+        if full:
+            with self._lock, conn:
+                conn.execute(f"DROP TABLE IF EXISTS temp.{target}")
+                conn.execute(f"CREATE TEMP TABLE {target} AS SELECT * FROM {table} WHERE 0")
+
+        params = {"sort_column": "last_modified_time", "sort_order": "D"}
+        started = time.time()
+        newest = watermark
+        written = 0
+        batch = []
+        for record in iter_records(config["endpoint"], config["record_key"], params=params, use_cache=False):
+            modified = record.get("last_modified_time") or ""
+            # records are newest first, once we pass the watermark we have every change
+            if watermark and modified < watermark:
+                break
+            batch.append(record)
+            if newest is None or modified > newest:
+                newest = modified
+            if len(batch) >= _BATCH_SIZE:
+                written += self._write_batch(conn, target, table, batch)
+                batch = []
+        written += self._write_batch(conn, target, table, batch)
+
+        with self._lock, conn:
+            if full:
+                conn.execute(f"DELETE FROM {table}")
+                conn.execute(f"INSERT OR REPLACE INTO {table} SELECT * FROM temp.{target}")
+                conn.execute(f"DROP TABLE temp.{target}")
+            conn.execute(
+                "INSERT INTO sync_state (table_name, last_synced_at, last_full_sync_at, last_modified_time) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(table_name) DO UPDATE SET last_synced_at = excluded.last_synced_at, "
+                "last_full_sync_at = COALESCE(excluded.last_full_sync_at, sync_state.last_full_sync_at), "
+                "last_modified_time = excluded.last_modified_time",
+                (table, started, started if full else None, newest),
+            )
+        return written
+
+    def _write_batch(self, conn: sqlite3.Connection, target: str, table: str, records: list[dict[str, Any]]) -> int:
+        with self._lock, conn:
+            return self._upsert(conn, table, records, target=target)
+
+    def _upsert(self, conn: sqlite3.Connection, table: str, records: list[dict[str, Any]], target: Optional[str] = None) -> int:
+        if not records:
+            return 0
+        config = TABLES[table]
+        columns = ["id"] + config["columns"] + ["last_modified_time", "data"]
+        placeholders = ", ".join("?" for _ in columns)
+        rows = [
+            [record.get(config["id"])]
+            + [record.get(column) for column in config["columns"]]
+            + [record.get("last_modified_time"), json.dumps(record)]
+            for record in records
+        ]
+        conn.executemany(f"INSERT OR REPLACE INTO {target or table} ({', '.join(columns)}) VALUES ({placeholders})", rows)
+        return len(rows)
+
+    def upsert(self, table: str, records: list[dict[str, Any]]) -> int:
+        """Write records into a table without touching the sync state."""
+        conn = self.connection()
+        with self._lock, conn:
+            return self._upsert(conn, table, records)
+
+    def delete(self, table: str, record_id: str) -> None:
+        """Remove one record from a table."""
+        conn = self.connection()
+        with self._lock, conn:
+            conn.execute(f"DELETE FROM {table} WHERE id = ?", (record_id,))
+
+    def synced(self, table: str) -> bool:
+        """Whether the table was synced at least once, an unsynced table is not served or kept up to date."""
+        return self._state(table) is not None
+
+    def _state(self, table: str) -> Optional[sqlite3.Row]:
+        with self._lock:
+            return self.connection().execute("SELECT * FROM sync_state WHERE table_name = ?", (table,)).fetchone()
+
+    def list_page(self, table: str, params: dict[str, Any]) -> dict[str, Any]:
+        """
+        Serve a list request from the mirror.
+
+        params are the same query parameters the resource would send to Zoho:
+        page, per_page, sort_column, sort_order, search_text, *_contains filters
+        and cf_* custom field filters. The response is shaped like Zoho's.
+        """
+        config = TABLES[table]
+        page = int(params.get("page") or 1)
+        per_page = int(params.get("per_page") or 200)
+
+        where, args = [], []
+        for key, value in params.items():
+            if value is None or value == "":
+                continue
+            if key == "search_text":
+                where.append("(" + " OR ".join(f"{_column_sql(table, c)} LIKE ?" for c in config["search"]) + ")")
+                args.extend([f"%{value}%"] * len(config["search"]))
+            elif key.endswith("_contains"):
+                where.append(f"{_column_sql(table, key[:-len('_contains')])} LIKE ?")
+                args.append(f"%{value}%")
+            elif key.startswith("cf_"):
+                where.append(f"{_column_sql(table, key)} = ?")
+                args.append(value)
+
+        where_sql = f" WHERE {' AND '.join(where)}" if where else ""
+        sort_column = _column_sql(table, params.get("sort_column") or config["search"][0])
+        order = "DESC" if params.get("sort_order") == "D" else "ASC"
+
+        with self._lock:
+            conn = self.connection()
+            total = conn.execute(f"SELECT COUNT(*) FROM {table}{where_sql}", args).fetchone()[0]
+            rows = conn.execute(
+                f"SELECT data FROM {table}{where_sql} ORDER BY {sort_column} COLLATE NOCASE {order}, id LIMIT ? OFFSET ?",
+                args + [per_page, (page - 1) * per_page],
+            ).fetchall()
+
+        return {
+            "code": 0,
+            "message": "success",
+            config["record_key"]: [json.loads(row["data"]) for row in rows],
+            "page_context": {
+                "page": page,
+                "per_page": per_page,
+                "has_more_page": page * per_page < total,
+                "total": total,
+            },
+        }
+
+    def get_record(self, table: str, record_id: str) -> Optional[dict[str, Any]]:
+        """Get one record by its Zoho ID, None if it isn't mirrored."""
+        with self._lock:
+            row = self.connection().execute(f"SELECT data FROM {table} WHERE id = ?", (record_id,)).fetchone()
+        return json.loads(row["data"]) if row else None
+
+    def status(self) -> dict[str, Any]:
+        """Report the size and staleness of every mirrored table."""
+        now = time.time()
+        result = {}
+        with self._lock:
+            conn = self.connection()
+            for table in TABLES:
+                count = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                state = self._state(table)
+                result[table] = {
+                    "records": count,
+                    "last_synced_at": _isoformat(state["last_synced_at"]) if state else None,
+                    "last_full_sync_at": _isoformat(state["last_full_sync_at"]) if state else None,
+                    "stale_seconds": round(now - state["last_synced_at"], 1) if state else None,
+                    "last_modified_time": state["last_modified_time"] if state else None,
+                }
+        return result
+
+    def start_background_sync(self, interval: float) -> None:
+        """Run an incremental sync of every table every interval seconds."""
+        if self._sync_thread is not None:
+            return
+        self._stop.clear()
+
+        def run():
+            while not self._stop.wait(interval):
+                try:
+                    self.sync()
+                except Exception as e:
+                    logger.error("Error syncing mirror: %s", e)
+
+        self._sync_thread = threading.Thread(target=run, name="zoho-mirror-sync", daemon=True)
+        self._sync_thread.start()
+
+    def stop_background_sync(self) -> None:
+        self._stop.set()
+        self._sync_thread = None
+
+
+def _isoformat(timestamp: Optional[float]) -> Optional[str]:
+    if timestamp is None:
+        return None
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).isoformat()
+
+
+def check_source(source: str, org: Optional[str] = None) -> None:
+    """Validate the source and org arguments of the resource functions, the mirror only holds the default organization."""
+    if source not in ("local", "remote"):
+        raise ValueError(f"Unsupported source: {source}. Supported sources are: local, remote")
+    if not org_registry.get(org).is_default and source == "local":
+        raise ValueError(f"The local mirror only holds the default organization, use source='remote' for {org}")
+
+
+mirror = Mirror()
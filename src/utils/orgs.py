@@ -0,0 +1,143 @@
+import json
+import os
+import threading
+from typing import Any, Optional
+
+from utils.setting import settings
+
+DEFAULT_ORG = "default"
+
+# fields of an organization in ZOHO_ORGS_FILE, the ones left out are taken from the default organization
+ORG_FIELDS = ("organization_id", "client_id", "client_secret", "refresh_token", "api_base_url", "auth_base_url", "token_cache_file")
+
+
+class Organization:
+    """
+    The connection settings of one Zoho organization.
+
+    Organizations of the same Zoho account share its OAuth client and
+    refresh token, and so its access token, the token cache file is only
+    separate for organizations with their own credentials.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        organization_id: str,
+        client_id: Optional[str],
+        client_secret: Optional[str],
+        refresh_token: Optional[str],
+        api_base_url: str,
+        auth_base_url: str,
+        token_cache_file: str,
+    ):
+        self.name = name
+        self.organization_id = organization_id
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.refresh_token = refresh_token
+        self.api_base_url = api_base_url
+        self.auth_base_url = auth_base_url
+        self.token_cache_file = token_cache_file
+
+    @property
+    def is_default(self) -> bool:
+        return self.name == DEFAULT_ORG
+
+    @property
+    def account(self) -> tuple:
+        """The credentials identifying the access token of the organization."""
+        return (self.auth_base_url, self.client_id, self.refresh_token, self.token_cache_file)
+
+    def describe(self) -> dict[str, Any]:
+        """The organization without its secrets."""
+        return {"name": self.name, "organization_id": self.organization_id, "api_base_url": self.api_base_url}
+
+
+def default_organization() -> Organization:
+    """The organization configured by the ZOHO_* settings."""
+    return Organization(
+        DEFAULT_ORG,
+        settings.ZOHO_ORGANIZATION_ID,
+        settings.ZOHO_CLIENT_ID,
+        settings.ZOHO_CLIENT_SECRET,
+        settings.ZOHO_REFRESH_TOKEN,
+        settings.ZOHO_API_BASE_URL,
+        settings.ZOHO_AUTH_BASE_URL,
+        settings.TOKEN_CACHE_FILE,
+    )
+
+
+class OrgRegistry:
+    """
+    The organizations one server serves, the default one from the ZOHO_*
+    settings and any number more from the JSON file settings.ORGS_FILE:
+
+        {"eu-shop": {"organization_id": "20071234", "api_base_url": "https://www.zohoapis.eu/inventory/v1"}}
+
+    Tools take an `org` argument naming one of them, by name or by Zoho
+    organization id, and default to the default organization. The file is
+    read again when it changes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._configs: dict[str, dict[str, Any]] = {}
+        self._loaded: Optional[tuple] = None
+
+    def get(self, org: Optional[str] = None) -> Organization:
+        """
+        Resolve an org argument.
+
+        Args:
+            org (str, optional): A name from the orgs file or a Zoho organization id, None for the default organization.
+
+        Returns:
+            Organization: The organization.
+
+        Raises:
+            ValueError: If the organization is not configured.
+        """
+        default = default_organization()
+        if not org or org == DEFAULT_ORG:
+            return default
+        configs = self._read()
+        name = org if org in configs else next((name for name, config in configs.items() if str(config.get("organization_id")) == str(org)), None)
+        if name is not None:
+            return self._organization(name, configs[name], default)
+        if str(org) == str(default.organization_id):
+            return default
+        raise ValueError(f"Unknown organization: {org}. Configured organizations are: {', '.join([DEFAULT_ORG, *configs])}")
+
+    def all(self) -> list[Organization]:
+        default = default_organization()
+        return [default, *(self._organization(name, config, default) for name, config in self._read().items())]
+
+    def _organization(self, name: str, config: dict[str, Any], default: Organization) -> Organization:
+        values = {field: config.get(field) or getattr(default, field) for field in ORG_FIELDS}
+        own_account = any(config.get(field) for field in ("client_id", "refresh_token", "auth_base_url"))
+        if own_account and not config.get("token_cache_file"):
+            root, extension = os.path.splitext(default.token_cache_file)
+            values["token_cache_file"] = f"{root}.{name}{extension}"
+        return Organization(name, **values)
+
+    def _read(self) -> dict[str, dict[str, Any]]:
+        path = settings.ORGS_FILE
+        try:
+            version = (path, os.stat(path).st_mtime_ns)
+        except (OSError, TypeError):
+            return {}
+        with self._lock:
+            if self._loaded != version:
+                with open(path) as f:
+                    configs = json.load(f)
+                if not isinstance(configs, dict) or not all(isinstance(config, dict) and config.get("organization_id") for config in configs.values()):
+                    raise ValueError(f"{path} must map organization names to objects with an organization_id")
+                unknown = {field for config in configs.values() for field in config} - set(ORG_FIELDS)
+                if unknown:
+                    raise ValueError(f"Unknown organization fields in {path}: {', '.join(sorted(unknown))}")
+                self._configs, self._loaded = configs, version
+            return self._configs
+
+
+org_registry = OrgRegistry()
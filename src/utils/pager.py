@@ -0,0 +1,185 @@
+import asyncio
+import math
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Any, AsyncIterator, Iterator, Optional
+
+from utils.api import zoho_api_request, zoho_api_request_async
+from utils.setting import settings
+
+
+def _page_params(params: Optional[dict[str, Any]], page: int, per_page: int) -> dict[str, Any]:
+    page_params = dict(params or {})
+    page_params["page"] = page
+    page_params["per_page"] = per_page
+    return page_params
+
+
+def _check_page(response: Optional[dict[str, Any]], endpoint: str, page: int) -> dict[str, Any]:
+    """Raise if a page could not be fetched, a partial result would be silently wrong."""
+    if response is None:
+        raise RuntimeError(f"Error fetching page {page} of {endpoint}")
+    if response.get("code", 0) != 0:
+        raise RuntimeError(f"Error fetching page {page} of {endpoint}: {response.get('message', '')}")
+    return response
+
+
+def _remaining_pages(response: dict[str, Any], per_page: int) -> Optional[int]:
+    """Get the last page number from page_context.total, None if it is unknown."""
+    page_context = response.get("page_context", {})
+    if not page_context.get("has_more_page", False):
+        return 1
+    total = page_context.get("total")
+    if total is None:
+        return None
+    return max(math.ceil(total / per_page), 2)
+
+
+def _fetch_page(endpoint: str, params: Optional[dict[str, Any]], page: int, per_page: int, use_cache: bool = True, org: Optional[str] = None) -> dict[str, Any]:
+    response = zoho_api_request("GET", endpoint, params=_page_params(params, page, per_page), use_cache=use_cache, priority="bulk", org=org)
+    return _check_page(response, endpoint, page)
+
+
+async def _fetch_page_async(endpoint: str, params: Optional[dict[str, Any]], page: int, per_page: int, use_cache: bool = True, org: Optional[str] = None) -> dict[str, Any]:
+    response = await zoho_api_request_async("GET", endpoint, params=_page_params(params, page, per_page), use_cache=use_cache, priority="bulk", org=org)
+    return _check_page(response, endpoint, page)
+
+
+def iter_pages(endpoint: str, record_key: str, params: Optional[dict[str, Any]] = None, per_page: Optional[int] = None, concurrency: Optional[int] = None, use_cache: bool = True, first_page: int = 1, org: Optional[str] = None) -> Iterator[tuple[int, list[dict[str, Any]]]]:
+    """
+    Lazily yield the pages of a Zoho list endpoint from first_page on.
+
+    The first page is fetched on its own. If it reports page_context.total the
+    remaining pages are fetched concurrently, at most `concurrency` pages
+    ahead of the consumer, so memory stays bounded to a few pages. Otherwise
+    pages are fetched one by one until has_more_page is false. Pages are
+    yielded in order.
+
+    Args:
+        endpoint (str): The list endpoint, e.g. "/items".
+        record_key (str): The key holding the records in the response, e.g. "items".
+        params (dict, optional): Extra query parameters for every page.
+        per_page (int, optional): Page size, defaults to settings.PAGER_PER_PAGE.
+        concurrency (int, optional): Pages fetched in parallel, defaults to settings.PAGER_CONCURRENCY.
+        use_cache (bool): Whether pages may be served from the response cache.
+        first_page (int): The page to start at, e.g. to resume after the last page read.
+        org (str, optional): The organization to read from, defaults to the default organization.
+
+    Yields:
+        tuple[int, list[dict[str, Any]]]: The page number and the records of the page.
+    """
+    per_page = per_page or settings.PAGER_PER_PAGE
+    concurrency = max(concurrency or settings.PAGER_CONCURRENCY, 1)
+
+    response = _fetch_page(endpoint, params, first_page, per_page, use_cache, org)
+    yield first_page, response.get(record_key, [])
+    last_page = _remaining_pages(response, per_page)
+
+    if last_page is None:
+        page = first_page
+        while response.get("page_context", {}).get("has_more_page", False):
+            page += 1
+            response = _fetch_page(endpoint, params, page, per_page, use_cache, org)
+            yield page, response.get(record_key, [])
+        return
+
+    pending = deque()
+    next_page = first_page + 1
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        try:
+            while pending or next_page <= last_page:
+                while next_page <= last_page and len(pending) < concurrency:
+                    pending.append((next_page, pool.submit(_fetch_page, endpoint, params, next_page, per_page, use_cache, org)))
+                    next_page += 1
+                page, future = pending.popleft()
+                yield page, future.result().get(record_key, [])
+        finally:
+            # the consumer may stop early, don't fetch pages nobody will read
+            for _, future in pending:
+                future.cancel()
+
+
+def iter_records(endpoint: str, record_key: str, params: Optional[dict[str, Any]] = None, per_page: Optional[int] = None, concurrency: Optional[int] = None, use_cache: bool = True, org: Optional[str] = None) -> Iterator[dict[str, Any]]:
+    """
+    Lazily yield every record of a Zoho list endpoint across all pages, see :func:`iter_pages`.
+
+    Args:
+        endpoint (str): The list endpoint, e.g. "/items".
+        record_key (str): The key holding the records in the response, e.g. "items".
+        params (dict, optional): Extra query parameters for every page.
+        per_page (int, optional): Page size, defaults to settings.PAGER_PER_PAGE.
+        concurrency (int, optional): Pages fetched in parallel, defaults to settings.PAGER_CONCURRENCY.
+        use_cache (bool): Whether pages may be served from the response cache.
+        org (str, optional): The organization to read from, defaults to the default organization.
+
+    Yields:
+        dict[str, Any]: One record at a time.
+    """
+    pages = iter_pages(endpoint, record_key, params, per_page, concurrency, use_cache, org=org)
+    try:
+        for _, records in pages:
+            yield from records
+    finally:
+        pages.close()
+
+
+async def aiter_records(endpoint: str, record_key: str, params: Optional[dict[str, Any]] = None, per_page: Optional[int] = None, concurrency: Optional[int] = None, use_cache: bool = True, org: Optional[str] = None) -> AsyncIterator[dict[str, Any]]:
+    """Async version of :func:`iter_records`."""
+    per_page = per_page or settings.PAGER_PER_PAGE
+    concurrency = max(concurrency or settings.PAGER_CONCURRENCY, 1)
+
+    response = await _fetch_page_async(endpoint, params, 1, per_page, use_cache, org)
+    for record in response.get(record_key, []):
+        yield record
+    last_page = _remaining_pages(response, per_page)
+
+    if last_page is None:
+        page = 1
+        while response.get("page_context", {}).get("has_more_page", False):
+            page += 1
+            response = await _fetch_page_async(endpoint, params, page, per_page, use_cache, org)
+            for record in response.get(record_key, []):
+                yield record
+        return
+
+    pending = deque()
+    next_page = 2
+    try:
+        while pending or next_page <= last_page:
+            while next_page <= last_page and len(pending) < concurrency:
+                pending.append(asyncio.ensure_future(_fetch_page_async(endpoint, params, next_page, per_page, use_cache, org)))
+                next_page += 1
+            response = await pending.popleft()
+            for record in response.get(record_key, []):
+                yield record
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+def collect_records(records: Iterator[dict[str, Any]], max_records: int) -> tuple[list[dict[str, Any]], bool]:
+    """
+    Collect at most max_records records.
+
+    Returns:
+        tuple[list, bool]: The records and whether more records were available.
+    """
+    collected = list(islice(records, max_records + 1))
+    close = getattr(records, "close", None)
+    if close:
+        close()
+    return collected[:max_records], len(collected) > max_records
+
+
+async def acollect_records(records: AsyncIterator[dict[str, Any]], max_records: int) -> tuple[list[dict[str, Any]], bool]:
+    """Async version of :func:`collect_records`."""
+    collected = []
+    try:
+        async for record in records:
+            collected.append(record)
+            if len(collected) > max_records:
+                break
+    finally:
+        await records.aclose()
+    return collected[:max_records], len(collected) > max_records
@@ -0,0 +1,53 @@
+from typing import Any, Optional, Union
+
+# the fields a compact result keeps when the caller doesn't pick any
+COMPACT_FIELDS = {
+    "items": ["item_id", "name", "sku", "rate", "stock_on_hand", "unit", "status"],
+    "composite_items": ["composite_item_id", "name", "sku", "rate", "stock_on_hand", "status"],
+    "contacts": ["contact_id", "contact_name", "company_name", "email", "phone", "status"],
+    "salesorders": ["salesorder_id", "salesorder_number", "date", "customer_id", "customer_name", "status", "total"],
+    "taxes": ["tax_id", "tax_name", "tax_percentage"],
+}
+
+
+def check_fields(fields: Optional[list[str]]) -> None:
+    """Validate the fields argument of the list and get tools."""
+    if fields is None:
+        return
+    if not isinstance(fields, list) or not all(isinstance(field, str) and field for field in fields):
+        raise ValueError("fields must be a list of field names")
+
+
+def shape_records(records: list[dict[str, Any]], collection: str, fields: Optional[list[str]] = None, compact: bool = False) -> Union[list[dict[str, Any]], dict[str, list]]:
+    """
+    Cut the records of a list result down to what the caller asked for.
+
+    Zoho records carry dozens of fields, most of which an agent never reads,
+    and every one of them is serialized, sent and read as tokens.
+
+    Args:
+        records (list[dict[str, Any]]): The records as Zoho returned them.
+        collection (str): The key of COMPACT_FIELDS for the records, e.g. "items".
+        fields (list[str], optional): The fields to keep, all of them if not given.
+        compact (bool): Keep fields, or COMPACT_FIELDS[collection] if no fields are given, and
+            encode the records as {"columns": [...], "rows": [[...], ...]} so the field names
+            are sent once instead of once per record.
+
+    Returns:
+        The records unchanged, projected to fields or in the columnar encoding.
+    """
+    if compact:
+        columns = fields or COMPACT_FIELDS[collection]
+        return {"columns": columns, "rows": [[record.get(column) for column in columns] for record in records]}
+    if fields:
+        return [{field: record[field] for field in fields if field in record} for record in records]
+    return records
+
+
+def shape_record(record: Optional[dict[str, Any]], collection: str, fields: Optional[list[str]] = None, compact: bool = False) -> Optional[dict[str, Any]]:
+    """The single record version of :func:`shape_records`, a compact record stays a dictionary."""
+    if compact and not fields:
+        fields = COMPACT_FIELDS[collection]
+    if not fields or not record:
+        return record
+    return {field: record[field] for field in fields if field in record}
@@ -0,0 +1,226 @@
+import asyncio
+import json
+import random
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from typing import Any, Iterator, Optional
+
+import httpx
+
+from utils.filelock import file_lock, write_json_atomic
+from utils.setting import settings
+
+PRIORITIES = ("interactive", "bulk")
+
+
+class RateLimitError(RuntimeError):
+    """Raised when the daily Zoho API quota of an organization is used up."""
+
+
+def _parse_limits(value: str) -> dict[str, tuple[float, int]]:
+    """Parse "org1=100/10000,org2=50" into org -> (per minute, per day)."""
+    limits = {}
+    for entry in filter(None, (part.strip() for part in value.split(","))):
+        org, _, limit = entry.partition("=")
+        per_minute, _, per_day = limit.partition("/")
+        limits[org.strip()] = (float(per_minute), int(per_day or 0))
+    return limits
+
+
+class TokenBucket:
+    """
+    A token bucket for the Zoho calls of one organization.
+
+    The bucket refills at per_minute / 60 tokens a second up to `burst`
+    tokens, and also counts calls per (UTC) day against per_day. Bulk callers
+    can't take the last `reserve` fraction of the bucket, so interactive
+    lookups still go through while a pagination job drains it.
+
+    If state_file is set the bucket state lives in that file under an flock,
+    so every process using the same file shares one budget.
+    """
+
+    def __init__(self, key: str, per_minute: float, burst: int, per_day: int = 0, reserve: float = 0.2, state_file: Optional[str] = None):
+        self.key = key
+        self.rate = per_minute / 60
+        self.burst = max(burst, 1)
+        self.per_day = per_day
+        self.reserve = self.burst * reserve
+        self.state_file = state_file
+        self._lock = threading.Lock()
+        self._state = self._new_state()
+
+    def _new_state(self) -> dict[str, Any]:
+        return {"tokens": float(self.burst), "updated": time.time(), "day": _today(), "day_count": 0, "blocked_until": 0.0}
+
+    @contextmanager
+    def _locked_state(self) -> Iterator[dict[str, Any]]:
+        with self._lock:
+            if not self.state_file:
+                yield self._state
+                return
+            with file_lock(self.state_file + ".lock"):
+                states = _read_states(self.state_file)
+                state = states.get(self.key) or self._new_state()
+                yield state
+                states[self.key] = state
+                _write_states(self.state_file, states)
+
+    def try_acquire(self, priority: str = "interactive") -> float:
+        """
+        Take a token if one is available.
+
+        Returns:
+            float: 0 if a token was taken, otherwise the seconds to wait before trying again.
+        """
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unsupported priority: {priority}. Supported priorities are: {', '.join(PRIORITIES)}")
+        with self._locked_state() as state:
+            now = time.time()
+            if state["blocked_until"] > now:
+                return state["blocked_until"] - now
+
+            state["tokens"] = min(self.burst, state["tokens"] + (now - state["updated"]) * self.rate)
+            state["updated"] = now
+
+            today = _today()
+            if state["day"] != today:
+                state["day"], state["day_count"] = today, 0
+            if self.per_day and state["day_count"] >= self.per_day:
+                raise RateLimitError(f"Daily Zoho API limit of {self.per_day} calls reached for organization {self.key}")
+
+            floor = self.reserve if priority == "bulk" else 0
+            if state["tokens"] - 1 >= floor:
+                state["tokens"] -= 1
+                state["day_count"] += 1
+                return 0
+            return (floor + 1 - state["tokens"]) / self.rate
+
+    def acquire(self, priority: str = "interactive") -> None:
+        """Block until a token is available."""
+        while True:
+            wait = self.try_acquire(priority)
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+    async def acquire_async(self, priority: str = "interactive") -> None:
+        """Wait for a token without blocking the event loop."""
+        while True:
+            wait = self.try_acquire(priority)
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        """Hold every caller of this bucket back, e.g. after Zoho answered 429."""
+        with self._locked_state() as state:
+            state["blocked_until"] = max(state["blocked_until"], time.time() + seconds)
+            state["tokens"] = 0.0
+
+    def stats(self) -> dict[str, Any]:
+        with self._locked_state() as state:
+            return {
+                "tokens": round(min(self.burst, state["tokens"] + (time.time() - state["updated"]) * self.rate), 2),
+                "calls_today": state["day_count"] if state["day"] == _today() else 0,
+                "per_minute": self.rate * 60,
+                "per_day": self.per_day,
+            }
+
+
+class RateLimiter:
+    """The token buckets of every organization, created from the settings on first use."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets: dict[str, TokenBucket] = {}
+
+    def bucket(self, organization_id: Optional[str]) -> Optional[TokenBucket]:
+        """Get the bucket of an organization, None if rate limiting is disabled."""
+        key = str(organization_id or settings.ZOHO_ORGANIZATION_ID)
+        per_minute, per_day = _parse_limits(settings.RATE_LIMITS).get(key, (settings.RATE_LIMIT_PER_MINUTE, settings.RATE_LIMIT_PER_DAY))
+        if per_minute <= 0:
+            return None
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = TokenBucket(
+                    key,
+                    per_minute,
+                    settings.RATE_LIMIT_BURST,
+                    per_day,
+                    settings.RATE_LIMIT_RESERVE,
+                    settings.RATE_LIMIT_STATE_FILE or None,
+                )
+                self._buckets[key] = bucket
+            return bucket
+
+    def reset(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            buckets = dict(self._buckets)
+        return {key: bucket.stats() for key, bucket in buckets.items()}
+
+
+# methods whose requests can be sent again after a server error without changing the outcome
+IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS", "PUT", "DELETE")
+
+
+def retry_delay(response: httpx.Response, attempt: int, method: str = "GET") -> Optional[float]:
+    """
+    How long to wait before retrying a response, None if it shouldn't be retried.
+
+    429 responses are retried for every method, Zoho rejected those before
+    processing them. 5xx responses are only retried for IDEMPOTENT_METHODS,
+    a POST may have been committed before the error and sending it again
+    could create a duplicate. Retries stop after settings.RETRY_MAX_ATTEMPTS.
+    A Retry-After header is honored, otherwise the delay is exponential
+    backoff with jitter.
+    """
+    if response.status_code != 429 and (response.status_code < 500 or method.upper() not in IDEMPOTENT_METHODS):
+        return None
+    if attempt >= settings.RETRY_MAX_ATTEMPTS:
+        return None
+
+    retry_after = _retry_after(response.headers.get("Retry-After"))
+    if retry_after is not None:
+        return min(retry_after, settings.RETRY_BACKOFF_MAX)
+    backoff = min(settings.RETRY_BACKOFF_MAX, settings.RETRY_BACKOFF_BASE * 2 ** attempt)
+    return random.uniform(backoff / 2, backoff)
+
+
+def _retry_after(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0)
+    except (TypeError, ValueError):
+        return None
+
+
+def _today() -> str:
+    return time.strftime("%Y-%m-%d", time.gmtime())
+
+
+def _read_states(path: str) -> dict[str, Any]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _write_states(path: str, states: dict[str, Any]) -> None:
+    write_json_atomic(path, states)
+
+
+rate_limiter = RateLimiter()
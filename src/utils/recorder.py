@@ -0,0 +1,181 @@
+import functools
+import gzip
+import inspect
+import itertools
+import json
+import logging
+import re
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Iterator, Optional
+
+from utils.metrics import _failed
+from utils.setting import settings
+
+logger = logging.getLogger(__name__)
+
+TRACE_VERSION = 1
+REDACTED = "***"
+# fields whose values are never written to a trace, matched anywhere in the field name
+SECRET_FIELDS = re.compile(r"token|secret|password|passwd|authorization|api_?key|client_id|credential", re.IGNORECASE)
+
+# the recorded tool call the current Zoho requests belong to
+_current_call: ContextVar[Optional[int]] = ContextVar("zoho_mcp_recorded_call", default=None)
+
+
+def redact(value: Any) -> Any:
+    """A copy of value with the values of every SECRET_FIELDS field, at any depth, replaced by REDACTED."""
+    if isinstance(value, dict):
+        return {key: REDACTED if isinstance(key, str) and SECRET_FIELDS.search(key) else redact(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [redact(item) for item in value]
+    return value
+
+
+def _open(path: str, mode: str):
+    """Traces ending in .gz are gzip compressed."""
+    return gzip.open(path, mode + "t", encoding="utf-8") if path.endswith(".gz") else open(path, mode, encoding="utf-8")
+
+
+def read_trace(path: str) -> Iterator[dict[str, Any]]:
+    """Yield the entries of a trace file, a "trace" header, then "tool" and "zoho" entries."""
+    with _open(path, "r") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+class TraceRecorder:
+    """
+    Records the tool calls of a running server and the Zoho requests they make.
+
+    Every tool call becomes a "tool" entry with its arguments, its start
+    time relative to the start of the recording, its duration, whether it
+    failed and the size of its result. Every request that reaches Zoho
+    (cache hits and coalesced calls don't) becomes a "zoho" entry with the
+    id of the tool call that made it, its query and body, the status, the
+    duration and, with settings.RECORD_RESPONSES, the response. Fields
+    that look like credentials are redacted, the access token is sent as a
+    header and never recorded. The entries are JSON lines, gzip compressed
+    if the path ends in .gz, and can be replayed with
+    ``python src/benchmark.py --replay``.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._file = None
+        self._started = 0.0
+        self._ids = itertools.count(1)
+        self.path: Optional[str] = None
+
+    @property
+    def recording(self) -> bool:
+        return self._file is not None
+
+    def start(self, path: str) -> None:
+        """Start writing a new trace to path."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+            self._file = _open(path, "w")
+            self._started = time.perf_counter()
+            self._ids = itertools.count(1)
+            self.path = path
+            self._write({"type": "trace", "version": TRACE_VERSION, "started_at": time.time(), "responses": settings.RECORD_RESPONSES})
+        logger.info("Recording tool calls to %s", path)
+
+    def stop(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+            self._file = None
+
+    def _write(self, entry: dict[str, Any]) -> None:
+        self._file.write(json.dumps(entry, separators=(",", ":"), default=str) + "\n")
+        self._file.flush()
+
+    def _offset(self) -> float:
+        return round(time.perf_counter() - self._started, 6)
+
+    def wrap(self, name: str, fn: Callable) -> Callable:
+        """Wrap a tool so its calls are recorded while a recording runs."""
+        signature = inspect.signature(fn)
+
+        def begin(args, kwargs) -> tuple[int, dict[str, Any]]:
+            try:
+                arguments = dict(signature.bind_partial(*args, **kwargs).arguments)
+            except TypeError:
+                arguments = dict(kwargs)
+            call_id = next(self._ids)
+            return call_id, {"type": "tool", "id": call_id, "tool": name, "args": redact(arguments), "t": self._offset()}
+
+        def end(entry: dict[str, Any], start: float, result: Any, failed: bool) -> None:
+            entry["ms"] = round((time.perf_counter() - start) * 1000, 3)
+            entry["ok"] = not failed
+            entry["bytes"] = len(json.dumps(result, default=str)) if not failed else 0
+            with self._lock:
+                if self._file is not None:
+                    self._write(entry)
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                if self._file is None:
+                    return await fn(*args, **kwargs)
+                call_id, entry = begin(args, kwargs)
+                token = _current_call.set(call_id)
+                start = time.perf_counter()
+                result, failed = None, True
+                try:
+                    result = await fn(*args, **kwargs)
+                    failed = _failed(result)
+                    return result
+                finally:
+                    _current_call.reset(token)
+                    end(entry, start, result, failed)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if self._file is None:
+                return fn(*args, **kwargs)
+            call_id, entry = begin(args, kwargs)
+            token = _current_call.set(call_id)
+            start = time.perf_counter()
+            result, failed = None, True
+            try:
+                result = fn(*args, **kwargs)
+                failed = _failed(result)
+                return result
+            finally:
+                _current_call.reset(token)
+                end(entry, start, result, failed)
+        return wrapper
+
+    def record_zoho(self, method: str, endpoint: str, params: Optional[dict[str, Any]], json_data: Any, org: Optional[str], status: int, seconds: float, result: Any) -> None:
+        """Record a request that reached Zoho, a no-op unless a recording runs."""
+        if self._file is None:
+            return
+        entry = {
+            "type": "zoho",
+            "call": _current_call.get(),
+            # when the request was sent
+            "t": round(self._offset() - seconds, 6),
+            "method": method,
+            "endpoint": endpoint,
+            "params": redact(params or {}),
+            "org": org,
+            "status": status,
+            "ms": round(seconds * 1000, 3),
+        }
+        if json_data is not None:
+            entry["body"] = redact(json_data)
+        if settings.RECORD_RESPONSES:
+            entry["response"] = redact(result)
+        with self._lock:
+            if self._file is not None:
+                self._write(entry)
+
+
+trace_recorder = TraceRecorder()
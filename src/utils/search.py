@@ -0,0 +1,284 @@
+import re
+import threading
+import time
+from array import array
+from collections import Counter, defaultdict
+from functools import partial
+from operator import itemgetter
+from typing import Any, Iterable, Optional
+
+from utils.orgs import org_registry
+from utils.pager import iter_records
+from utils.setting import settings
+
+# item fields returned with every match
+RESULT_FIELDS = ("item_id", "name", "sku", "rate", "unit", "status")
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+# only the start of long descriptions is indexed
+_DESCRIPTION_CHARS = 200
+# posting entries read per query, the rarest trigrams are read first
+_POSTING_BUDGET = 2000
+# candidates rescored per query
+_RESCORE = 16
+
+
+def _normalize(text: Optional[str]) -> str:
+    return _NON_ALNUM.sub(" ", str(text or "").lower()).strip()
+
+
+def _compact(text: Optional[str]) -> str:
+    """SKUs compared without separators, so "K10-00040" matches "k10 00040"."""
+    return _NON_ALNUM.sub("", str(text or "").lower())
+
+
+def _trigrams(normalized: str) -> set[str]:
+    """The trigrams of a normalized string padded with a space, grams across two words keep some word order."""
+    padded = f" {normalized} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)} if normalized else set()
+
+
+def _similarity(query: set[str], field: set[str]) -> float:
+    """The mean of how much of the query the field contains and their dice coefficient."""
+    if not query or not field:
+        return 0.0
+    shared = len(query & field)
+    return (shared / len(query) + 2 * shared / (len(query) + len(field))) / 2
+
+
+class ItemIndex:
+    """
+    An in memory trigram index over the name, SKU and description of every item.
+
+    Each item gets a slot, the posting list of a trigram holds the slots of
+    the items containing it. A query reads the posting lists of its rarest
+    trigrams to find candidates and rescores the best of them against the
+    name, the SKU and the description. An updated item gets a new slot and
+    its old slot is marked dead, the index is rebuilt once a quarter of the
+    slots are dead.
+
+    refresh() is incremental like the mirror sync: it reads /items newest
+    first by last_modified_time and stops at the previous refresh.
+    Every organization has its own index, see :func:`get_item_index`.
+    """
+
+    def __init__(self, org: Optional[str] = None):
+        self.org = org
+        self._lock = threading.RLock()
+        self._refresh_lock = threading.Lock()
+        self._clear()
+
+    def _clear(self) -> None:
+        self._postings: defaultdict[str, array] = defaultdict(partial(array, "I"))
+        # slot -> (result, normalized name, compact sku, normalized description), None once dead
+        self._slots: list[Optional[tuple]] = []
+        self._slot_by_id: dict[str, int] = {}
+        # compact sku -> slots, exact SKU matches don't depend on the posting budget
+        self._slots_by_sku: dict[str, list[int]] = {}
+        self._dead = 0
+        self.last_modified_time: Optional[str] = None
+        self.refreshed_at: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self._slot_by_id)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._clear()
+
+    def add(self, records: Iterable[dict[str, Any]]) -> int:
+        """Index records, replacing earlier versions of the same items."""
+        added = 0
+        with self._lock:
+            for record in records:
+                self._add(record)
+                added += 1
+            if self._dead > max(len(self._slot_by_id), 1000) / 4:
+                self._rebuild()
+        return added
+
+    def _add(self, record: dict[str, Any]) -> None:
+        item_id = str(record["item_id"])
+        old = self._slot_by_id.get(item_id)
+        if old is not None:
+            self._slots[old] = None
+            self._dead += 1
+
+        name = _normalize(record.get("name"))
+        sku = _compact(record.get("sku"))
+        description = _normalize(record.get("description"))[:_DESCRIPTION_CHARS]
+        result = {field: record.get(field) for field in RESULT_FIELDS}
+        self._add_slot(result, name, sku, description)
+
+        modified = record.get("last_modified_time")
+        if modified and (self.last_modified_time is None or modified > self.last_modified_time):
+            self.last_modified_time = modified
+
+    def remove(self, item_id: str) -> None:
+        with self._lock:
+            slot = self._slot_by_id.pop(str(item_id), None)
+            if slot is not None:
+                self._slots[slot] = None
+                self._dead += 1
+
+    def _rebuild(self) -> None:
+        """Drop the dead slots by indexing the live items again."""
+        live = [slot for slot in self._slots if slot is not None]
+        last_modified_time, refreshed_at = self.last_modified_time, self.refreshed_at
+        self._clear()
+        for result, name, sku, description in live:
+            self._add_slot(result, name, sku, description)
+        self.last_modified_time, self.refreshed_at = last_modified_time, refreshed_at
+
+    def _add_slot(self, result: dict[str, Any], name: str, sku: str, description: str) -> None:
+        slot = len(self._slots)
+        self._slots.append((result, name, sku, description))
+        self._slot_by_id[str(result["item_id"])] = slot
+        if sku:
+            self._slots_by_sku.setdefault(sku, []).append(slot)
+        postings = self._postings
+        for gram in _trigrams(name) | _trigrams(sku) | _trigrams(description):
+            postings[gram].append(slot)
+
+    def refresh(self, full: bool = False) -> int:
+        """
+        Update the index from Zoho.
+
+        Args:
+            full (bool): Rebuild the index from every item instead of reading only changed items.
+                A full refresh also drops items deleted in Zoho.
+
+        Returns:
+            int: The number of items read.
+        """
+        with self._refresh_lock:
+            return self._refresh(full)
+
+    def ensure_fresh(self, max_age: Optional[float] = None) -> None:
+        """Refresh the index if it was never built or is older than max_age seconds."""
+        max_age = settings.ITEM_INDEX_MAX_AGE if max_age is None else max_age
+        with self._refresh_lock:
+            if self.refreshed_at is None:
+                self._refresh(full=True)
+            elif max_age > 0 and time.time() - self.refreshed_at > max_age:
+                self._refresh(full=False)
+
+    def _refresh(self, full: bool) -> int:
+        watermark = None if full or self.refreshed_at is None else self.last_modified_time
+        started = time.time()
+        params = {"sort_column": "last_modified_time", "sort_order": "D"}
+        records = []
+        for record in iter_records("/items", "items", params=params, use_cache=False, org=self.org):
+            # items are newest first, once we pass the watermark we have every change
+            if watermark and (record.get("last_modified_time") or "") < watermark:
+                break
+            records.append(record)
+
+        with self._lock:
+            if watermark is None:
+                self._clear()
+            self.add(records)
+            self.refreshed_at = started
+        return len(records)
+
+    def match(self, query: str, limit: int = 5, min_score: float = 0.3) -> list[dict[str, Any]]:
+        """
+        Find the items best matching a query.
+
+        Args:
+            query (str): A name, SKU or description, or any part of them.
+            limit (int): The maximum number of candidates.
+            min_score (float): The lowest score (0 to 1) returned.
+
+        Returns:
+            list[dict[str, Any]]: The candidates, best first, with their score.
+        """
+        normalized = _normalize(query)
+        tokens = normalized.split()
+        compact = _compact(query)
+        query_grams = _trigrams(normalized)
+        sku_grams = _trigrams(compact)
+        if not query_grams:
+            return []
+
+        with self._lock:
+            postings = self._postings
+            lists = [posting for posting in map(postings.get, query_grams | sku_grams) if posting]
+            lists.sort(key=len)
+            # the grams of one word mostly share their posting lists, so the
+            # rarest list of every word is read before the rest
+            firsts = []
+            for word in set(tokens) | {compact}:
+                word_lists = [posting for posting in map(postings.get, _trigrams(word)) if posting]
+                if word_lists:
+                    firsts.append(min(word_lists, key=len))
+            firsts.sort(key=len)
+            seen = {id(posting) for posting in firsts}
+            lists = firsts + [posting for posting in lists if id(posting) not in seen]
+            counts = Counter()
+            budget = _POSTING_BUDGET
+            for posting in lists:
+                if budget <= 0:
+                    break
+                counts.update(posting[:budget] if len(posting) > budget else posting)
+                budget -= len(posting)
+
+            candidates = [slot for slot, _ in sorted(counts.items(), key=itemgetter(1), reverse=True)[:_RESCORE]]
+            candidates.extend(self._slots_by_sku.get(compact, ()))
+            matches = []
+            for slot in set(candidates):
+                entry = self._slots[slot]
+                if entry is None:
+                    continue
+                result, name, sku, description = entry
+                score = max(
+                    _similarity(query_grams, _trigrams(name)),
+                    1.0 if compact == sku else _similarity(sku_grams, _trigrams(sku)),
+                    0.5 * sum(token in description for token in tokens) / len(tokens),
+                )
+                if score >= min_score:
+                    matches.append((score, slot, result))
+
+        matches.sort(key=lambda match: (-match[0], match[1]))
+        return [{**result, "score": round(score, 3)} for score, _, result in matches[:limit]]
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "items": len(self._slot_by_id),
+                "dead_slots": self._dead,
+                "trigrams": len(self._postings),
+                "last_modified_time": self.last_modified_time,
+                "refreshed_at": self.refreshed_at,
+            }
+
+
+item_index = ItemIndex()
+
+_indexes: dict[str, ItemIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_item_index(org: Optional[str] = None) -> ItemIndex:
+    """The item index of an organization, :data:`item_index` for the default one."""
+    organization = org_registry.get(org)
+    if organization.is_default:
+        return item_index
+    with _indexes_lock:
+        index = _indexes.get(organization.name)
+        if index is None:
+            index = _indexes[organization.name] = ItemIndex(organization.name)
+        return index
+
+
+def item_indexes() -> list[ItemIndex]:
+    """The item indexes of every organization that has one."""
+    with _indexes_lock:
+        return [item_index, *_indexes.values()]
+
+
+def reset_item_indexes() -> None:
+    """Empty the item indexes of every organization."""
+    item_index.reset()
+    with _indexes_lock:
+        _indexes.clear()
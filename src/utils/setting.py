@@ -1,3 +1,4 @@
+import logging
 import os
 from typing import Dict, Any
 from dotenv import load_dotenv
@@ -7,12 +8,21 @@ env_path = config_path +  "/.env"
 
 
 token_cache_path = config_path + "/token_cach.json"
+mirror_db_path = config_path + "/mirror.sqlite3"
+shared_cache_path = config_path + "/cache.sqlite3"
+rate_limit_state_path = config_path + "/rate_limit_state.json"
+orgs_path = config_path + "/orgs.json"
+
+
+def _env_bool(name: str, default: str = "false") -> bool:
+    """Read a boolean flag from the environment."""
+    return os.getenv(name, default).strip().lower() in ("1", "true", "yes", "on")
 
 
 if os.path.exists(env_path):
     load_dotenv(env_path)
 else:
-    print(".env file not found, loading default environment variables")
+    logging.getLogger(__name__).info(".env file not found, loading default environment variables")
     load_dotenv()
 
 
@@ -22,6 +32,8 @@ class Settings:
     ZOHO_CLIENT_SECRET:str = os.getenv("ZOHO_CLIENT_SECRET")
     ZOHO_REFRESH_TOKEN:str = os.getenv("ZOHO_REFRESH_TOKEN")
     ZOHO_ORGANIZATION_ID:str = os.getenv("ZOHO_ORGANIZATION_ID")
+    # more organizations served next to the default one, see utils.orgs
+    ORGS_FILE = os.getenv("ZOHO_ORGS_FILE", orgs_path)
 
     # ZOHO API URLs
     ZOHO_API_BASE_URL = os.getenv(
@@ -31,7 +43,104 @@ class Settings:
         "ZOHO_AUTH_BASE_URL", f"https://accounts.zoho.com/oauth/v2"
     )
 
-    TOKEN_CACHE_FILE = token_cache_path
+    TOKEN_CACHE_FILE = os.getenv("ZOHO_TOKEN_CACHE_FILE", token_cache_path)
+    # renew the access token this many seconds before it expires
+    TOKEN_REFRESH_MARGIN = float(os.getenv("ZOHO_TOKEN_REFRESH_MARGIN", "300"))
+    TOKEN_BACKGROUND_REFRESH = _env_bool("ZOHO_TOKEN_BACKGROUND_REFRESH", "true")
+
+    # HTTP connection pool shared by every Zoho request
+    HTTP_MAX_CONNECTIONS = int(os.getenv("ZOHO_HTTP_MAX_CONNECTIONS", "20"))
+    HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("ZOHO_HTTP_MAX_KEEPALIVE_CONNECTIONS", "10"))
+    HTTP_KEEPALIVE_EXPIRY = float(os.getenv("ZOHO_HTTP_KEEPALIVE_EXPIRY", "60"))
+    HTTP_TIMEOUT = float(os.getenv("ZOHO_HTTP_TIMEOUT", "10"))
+    HTTP2 = _env_bool("ZOHO_HTTP2")
+
+    # Auto pagination
+    PAGER_PER_PAGE = int(os.getenv("ZOHO_PAGER_PER_PAGE", "200"))
+    PAGER_CONCURRENCY = int(os.getenv("ZOHO_PAGER_CONCURRENCY", "4"))
+
+    # Sales orders created in parallel by create_sales_orders_bulk
+    BULK_CONCURRENCY = int(os.getenv("ZOHO_BULK_CONCURRENCY", "4"))
+
+    # Attachment uploads, the timeout grows with the file size at this minimum expected upload speed
+    UPLOAD_MIN_BYTES_PER_SECOND = int(os.getenv("ZOHO_UPLOAD_MIN_BYTES_PER_SECOND", str(128 * 1024)))
+    UPLOAD_CONCURRENCY = int(os.getenv("ZOHO_UPLOAD_CONCURRENCY", "4"))
+
+    # In memory cache of GET responses, ZOHO_CACHE_TTLS overrides the ttl per endpoint prefix e.g. "/items=60,/contacts=600"
+    CACHE_ENABLED = _env_bool("ZOHO_CACHE_ENABLED", "true")
+    CACHE_MAX_BYTES = int(os.getenv("ZOHO_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+    CACHE_DEFAULT_TTL = float(os.getenv("ZOHO_CACHE_DEFAULT_TTL", "60"))
+    CACHE_TTLS = os.getenv("ZOHO_CACHE_TTLS", "")
+    # SQLite file holding the cache instead of memory, shared by every process using it (workers share one)
+    CACHE_SHARED_FILE = os.getenv("ZOHO_CACHE_SHARED_FILE", "")
+    # SQLite file keeping GET responses across restarts, revalidated with If-None-Match/If-Modified-Since once
+    # their in memory entry expired (needs CACHE_ENABLED), least recently used evicted past HTTP_CACHE_MAX_BYTES
+    HTTP_CACHE_FILE = os.getenv("ZOHO_HTTP_CACHE_FILE", "")
+    HTTP_CACHE_MAX_BYTES = int(os.getenv("ZOHO_HTTP_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+    # Identical GETs in flight at the same time share one Zoho call
+    COALESCE_ENABLED = _env_bool("ZOHO_COALESCE_ENABLED", "true")
+
+    # Zoho API quota per organization, ZOHO_RATE_LIMITS overrides it per org e.g. "org1=100/10000,org2=50/5000"
+    # set ZOHO_RATE_LIMIT_STATE_FILE to share the budget between processes
+    RATE_LIMIT_PER_MINUTE = float(os.getenv("ZOHO_RATE_LIMIT_PER_MINUTE", "100"))
+    RATE_LIMIT_PER_DAY = int(os.getenv("ZOHO_RATE_LIMIT_PER_DAY", "0"))
+    RATE_LIMIT_BURST = int(os.getenv("ZOHO_RATE_LIMIT_BURST", "10"))
+    # fraction of the burst only interactive requests may use
+    RATE_LIMIT_RESERVE = float(os.getenv("ZOHO_RATE_LIMIT_RESERVE", "0.2"))
+    RATE_LIMITS = os.getenv("ZOHO_RATE_LIMITS", "")
+    RATE_LIMIT_STATE_FILE = os.getenv("ZOHO_RATE_LIMIT_STATE_FILE", "")
+
+    # Retries of 429 and 5xx responses
+    RETRY_MAX_ATTEMPTS = int(os.getenv("ZOHO_RETRY_MAX_ATTEMPTS", "4"))
+    RETRY_BACKOFF_BASE = float(os.getenv("ZOHO_RETRY_BACKOFF_BASE", "0.5"))
+    RETRY_BACKOFF_MAX = float(os.getenv("ZOHO_RETRY_BACKOFF_MAX", "30"))
+
+    # In memory fuzzy index of the items used by match_items, refreshed incrementally once older than this many seconds
+    ITEM_INDEX_MAX_AGE = float(os.getenv("ZOHO_ITEM_INDEX_MAX_AGE", "300"))
+    # In memory column store of the items and composite items used by lookup_items, refreshed like the item index
+    CATALOG_MAX_AGE = float(os.getenv("ZOHO_CATALOG_MAX_AGE", "300"))
+
+    # Local SQLite mirror, synced every MIRROR_SYNC_INTERVAL seconds while the server runs (0 disables)
+    MIRROR_DB_FILE = os.getenv("ZOHO_MIRROR_DB_FILE", mirror_db_path)
+    MIRROR_SYNC_INTERVAL = float(os.getenv("ZOHO_MIRROR_SYNC_INTERVAL", "0"))
+
+    # Zoho webhooks pushing record changes to http://WEBHOOK_HOST:WEBHOOK_PORT/WEBHOOK_PATH (0 disables the endpoint), they
+    # invalidate the response cache and update the mirror and item index. Requests must carry WEBHOOK_SECRET, as an
+    # X-Zoho-Webhook-Signature HMAC-SHA256 of the body or as the token query parameter
+    WEBHOOK_PORT = int(os.getenv("ZOHO_WEBHOOK_PORT", "0"))
+    WEBHOOK_HOST = os.getenv("ZOHO_WEBHOOK_HOST", "127.0.0.1")
+    WEBHOOK_PATH = os.getenv("ZOHO_WEBHOOK_PATH", "/webhooks/zoho")
+    WEBHOOK_SECRET = os.getenv("ZOHO_WEBHOOK_SECRET", "")
+    # seconds between the full syncs catching the changes whose webhook never arrived (0 disables them)
+    WEBHOOK_RECONCILE_INTERVAL = float(os.getenv("ZOHO_WEBHOOK_RECONCILE_INTERVAL", "21600"))
+
+    # MCP transport: stdio, sse or streamable-http. The HTTP transports serve many agents from one process
+    MCP_TRANSPORT = os.getenv("ZOHO_MCP_TRANSPORT", "stdio")
+    MCP_HOST = os.getenv("ZOHO_MCP_HOST", "127.0.0.1")
+    MCP_PORT = int(os.getenv("ZOHO_MCP_PORT", "8000"))
+    MCP_STATELESS_HTTP = _env_bool("ZOHO_MCP_STATELESS_HTTP", "false")
+    # tool calls one session may run at the same time, the rest wait (0 disables the limit)
+    MCP_SESSION_MAX_CONCURRENCY = int(os.getenv("ZOHO_MCP_SESSION_MAX_CONCURRENCY", "8"))
+    # worker processes behind one streamable-http listener, they share the token, cache and rate limit through files in config/
+    MCP_WORKERS = int(os.getenv("ZOHO_MCP_WORKERS", "1"))
+
+    # Logs go to stderr, stdout is the MCP stdio channel
+    LOG_LEVEL = os.getenv("ZOHO_LOG_LEVEL", "INFO").upper()
+
+    # In memory latency metrics, also served for Prometheus on METRICS_PORT (0 disables the endpoint)
+    METRICS_ENABLED = _env_bool("ZOHO_METRICS_ENABLED", "true")
+    METRICS_PORT = int(os.getenv("ZOHO_METRICS_PORT", "0"))
+    METRICS_HOST = os.getenv("ZOHO_METRICS_HOST", "127.0.0.1")
+
+    # Once the server listens it loads the tokens and connects to Zoho in the background, so the first
+    # tool call doesn't pay for them. WARMUP_ENDPOINTS are GETs that also prime the response cache, with the query of the tool call they stand in for, e.g. /settings/taxes?page=1&per_page=100
+    WARMUP_ENABLED = _env_bool("ZOHO_WARMUP_ENABLED", "true")
+    WARMUP_ENDPOINTS = os.getenv("ZOHO_WARMUP_ENDPOINTS", "")
+
+    # Record every tool call and the Zoho requests it makes to a JSON lines trace (.gz compresses it) for
+    # python src/benchmark.py --replay. Credentials are redacted, RECORD_RESPONSES also keeps the Zoho responses
+    RECORD_FILE = os.getenv("ZOHO_MCP_RECORD_FILE", "")
+    RECORD_RESPONSES = _env_bool("ZOHO_MCP_RECORD_RESPONSES", "true")
 
     def as_dict(self) -> Dict[str, Any]:
         """Return settings as a dictionary."""
@@ -0,0 +1,120 @@
+import heapq
+import math
+from array import array
+from typing import Any, Iterable
+
+# sales order statuses that don't take stock
+IGNORED_ORDER_STATUSES = ("draft", "void")
+
+REORDER_COLUMNS = ["item_id", "sku", "name", "available", "reorder_level", "shortfall", "days_of_cover"]
+COVER_COLUMNS = ["item_id", "sku", "name", "available", "units_per_day", "days_of_cover"]
+UNALLOCATED = "unallocated"
+
+
+def units_sold(orders: Iterable[dict[str, Any]]) -> dict[str, float]:
+    """The quantities of the line items of sales orders summed by item id, orders with an IGNORED_ORDER_STATUSES are skipped."""
+    sold: dict[str, float] = {}
+    for order in orders:
+        if order.get("status") in IGNORED_ORDER_STATUSES:
+            continue
+        for line in order.get("line_items") or []:
+            item_id = line.get("item_id")
+            try:
+                quantity = float(line.get("quantity") or 0)
+            except (TypeError, ValueError):
+                continue
+            if item_id and quantity:
+                sold[item_id] = sold.get(item_id, 0.0) + quantity
+    return sold
+
+
+def _round(value: float):
+    return round(value, 2) if value == value and not math.isinf(value) else None
+
+
+def stock_report(columns: dict[str, Any], sold: dict[str, float], days: int, cover_days: float, limit: int) -> dict[str, Any]:
+    """
+    Compute the stock analytics of a whole catalog in a few passes over its columns.
+
+    Every figure is computed column at a time from :meth:`Catalog.columns`,
+    one comprehension per column, instead of building a record per item,
+    so a catalog of 100k items takes a fraction of a second. Only the
+    counts, the totals and the `limit` most urgent items are returned.
+
+    Args:
+        columns (dict[str, Any]): The columns of the catalog.
+        sold (dict[str, float]): The units sold per item id in the last `days` days, see :func:`units_sold`.
+        days (int): The days the sales cover.
+        cover_days (float): Items whose available stock lasts fewer days at the current sales rate are low on cover.
+        limit (int): The most items listed per finding.
+
+    Returns:
+        dict[str, Any]: "below_reorder" with the items whose available stock is at or below their reorder level,
+            largest shortfall first, "low_cover" with the items running out within cover_days, soonest first, both
+            as {"count", "columns", "rows"}, "stock_value" with the value of the stock on hand at the item rates in
+            total and by warehouse, and "velocity" with the items and units sold.
+    """
+    ids, names, skus = columns["item_id"], columns["name"], columns["sku"]
+    rates, on_hand, available, committed, reorder_level = (columns[field] for field in ("rate", "stock_on_hand", "available_stock", "committed_stock", "reorder_level"))
+
+    # Zoho sends available stock, fall back to stock on hand less committed stock; missing values stay NaN
+    free = array("d", (stock if stock == stock else total - (taken if taken == taken else 0.0)
+                       for stock, total, taken in zip(available, on_hand, committed, strict=True)))
+    row_by_id = {item_id: row for row, item_id in enumerate(ids)}
+    per_day = {row_by_id[item_id]: quantity / days for item_id, quantity in sold.items() if item_id in row_by_id}
+
+    def cover(row: int) -> float:
+        rate = per_day.get(row)
+        return max(free[row], 0.0) / rate if rate and rate > 0 else math.inf
+
+    # comparisons with NaN are false, so items without a reorder level or stock figure drop out
+    below = [row for row, (level, stock) in enumerate(zip(reorder_level, free, strict=True)) if level > 0 and stock <= level]
+    low = [row for row in per_day if free[row] == free[row] and cover(row) < cover_days]
+
+    values = [total * rate for total, rate in zip(on_hand, rates, strict=True) if total > 0 and rate > 0]
+    by_warehouse: dict[str, float] = {}
+    warehouses = columns["warehouses"]
+    for item_id, total, rate in zip(ids, on_hand, rates, strict=True):
+        if not rate > 0:
+            continue
+        stock = warehouses.get(item_id)
+        if stock is None:
+            if total > 0:
+                by_warehouse[UNALLOCATED] = by_warehouse.get(UNALLOCATED, 0.0) + total * rate
+            continue
+        for warehouse, quantity in stock:
+            if quantity > 0:
+                by_warehouse[warehouse] = by_warehouse.get(warehouse, 0.0) + quantity * rate
+
+    def rows(selected: list[int], fields) -> list[list[Any]]:
+        return [[field(row) for field in fields] for row in selected]
+
+    return {
+        "items": len(ids),
+        "below_reorder": {
+            "count": len(below),
+            "columns": REORDER_COLUMNS,
+            "rows": rows(heapq.nlargest(limit, below, key=lambda row: reorder_level[row] - free[row]), (
+                ids.__getitem__, skus.__getitem__, names.__getitem__, lambda row: _round(free[row]),
+                lambda row: _round(reorder_level[row]), lambda row: _round(reorder_level[row] - free[row]),
+                lambda row: _round(cover(row)),
+            )),
+        },
+        "low_cover": {
+            "count": len(low),
+            "columns": COVER_COLUMNS,
+            "rows": rows(heapq.nsmallest(limit, low, key=cover), (
+                ids.__getitem__, skus.__getitem__, names.__getitem__, lambda row: _round(free[row]),
+                lambda row: _round(per_day[row]), lambda row: _round(cover(row)),
+            )),
+        },
+        "stock_value": {
+            "total": round(math.fsum(values), 2),
+            "by_warehouse": {warehouse: round(value, 2) for warehouse, value in sorted(by_warehouse.items())},
+        },
+        "velocity": {
+            "days": days,
+            "items_sold": len(per_day),
+            "units_sold": _round(math.fsum(sold.values())),
+        },
+    }
@@ -0,0 +1,101 @@
+import io
+import mimetypes
+import os
+from typing import BinaryIO, Optional, Tuple, Union
+
+import httpx
+
+from utils.setting import settings
+
+# magic numbers of the files we get sent, for names without a known extension
+_SIGNATURES = (
+    (b"%PDF-", "application/pdf"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF8", "image/gif"),
+    (b"II*\x00", "image/tiff"),
+    (b"MM\x00*", "image/tiff"),
+    (b"PK\x03\x04", "application/zip"),
+)
+
+
+class Upload:
+    """
+    A file sent to Zoho as a multipart field, read from disk or from bytes.
+
+    Use it as a context manager, the file is opened on enter and always
+    closed on exit. httpx streams the open file in chunks, so large files
+    are never loaded into memory, and rewinds it when a request is retried.
+
+        with Upload("./POs/#1182.pdf") as upload:
+            zoho_api_request("POST", endpoint, files={"attachment": upload})
+    """
+
+    def __init__(self, source: Union[str, bytes], filename: Optional[str] = None, content_type: Optional[str] = None):
+        if not isinstance(source, (str, bytes)):
+            raise ValueError("source must be a file path or bytes")
+        if isinstance(source, str) and not os.path.isfile(source):
+            raise ValueError(f"File not found: {source}")
+        self.source = source
+        self.filename = filename or (os.path.basename(source) if isinstance(source, str) else "attachment")
+        self._content_type = content_type
+        self._file: Optional[BinaryIO] = None
+
+    @property
+    def size(self) -> int:
+        if isinstance(self.source, bytes):
+            return len(self.source)
+        return os.path.getsize(self.source)
+
+    @property
+    def content_type(self) -> str:
+        """The content type given, else guessed from the file name, else from the first bytes."""
+        if self._content_type is None:
+            self._content_type = mimetypes.guess_type(self.filename)[0] or _sniff_content_type(self._head())
+        return self._content_type
+
+    def _head(self) -> bytes:
+        if isinstance(self.source, bytes):
+            return self.source[:16]
+        with open(self.source, "rb") as f:
+            return f.read(16)
+
+    def __enter__(self) -> "Upload":
+        self._file = io.BytesIO(self.source) if isinstance(self.source, bytes) else open(self.source, "rb")
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    @property
+    def closed(self) -> bool:
+        return self._file is None
+
+    def field(self) -> Tuple[str, BinaryIO, str]:
+        """The (filename, file, content type) tuple httpx expects for a multipart file."""
+        if self._file is None:
+            raise ValueError(f"Upload {self.filename} is not open, use it as a context manager")
+        return (self.filename, self._file, self.content_type)
+
+
+def _sniff_content_type(head: bytes) -> str:
+    for signature, content_type in _SIGNATURES:
+        if head.startswith(signature):
+            return content_type
+    return "application/octet-stream"
+
+
+def upload_timeout(size: int) -> httpx.Timeout:
+    """
+    The timeout of a request sending `size` bytes.
+
+    On top of the usual HTTP_TIMEOUT the write and read timeouts allow for
+    sending the body at UPLOAD_MIN_BYTES_PER_SECOND, big files get more time.
+    """
+    transfer = settings.HTTP_TIMEOUT + size / max(settings.UPLOAD_MIN_BYTES_PER_SECOND, 1)
+    return httpx.Timeout(transfer, connect=settings.HTTP_TIMEOUT)
@@ -0,0 +1,58 @@
+import asyncio
+import contextlib
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+from urllib.parse import parse_qsl
+
+from utils.api import zoho_api_request_async
+from utils.auth import token_manager_for
+from utils.client import preconnect_async
+from utils.metrics import metrics
+from utils.orgs import org_registry
+from utils.setting import settings
+
+logger = logging.getLogger(__name__)
+
+
+async def warm_up() -> None:
+    """
+    Get the server ready for its first tool call, run in the background once it listens.
+
+    For every organization the access token is loaded (from the cache file
+    or refreshed), a connection to the Zoho API is opened in the
+    organization's pool and the settings.WARMUP_ENDPOINTS are fetched into
+    the response cache. An endpoint is cached with its query, so it has to
+    carry the parameters of the tool call it stands in for, e.g.
+    /settings/taxes?page=1&per_page=100 for get_taxes(). Failures are
+    logged, the tool calls retry anyway.
+    The time it took is recorded as the "warmup" startup metric.
+    """
+    start = time.perf_counter()
+    endpoints = [endpoint.strip() for endpoint in settings.WARMUP_ENDPOINTS.split(",") if endpoint.strip()]
+    try:
+        for organization in org_registry.all():
+            org = None if organization.is_default else organization.name
+            await token_manager_for(organization).get_token_async()
+            await preconnect_async(organization.api_base_url, org)
+            for endpoint in endpoints:
+                path, _, query = endpoint.partition("?")
+                await zoho_api_request_async("GET", path, params=dict(parse_qsl(query)), priority="bulk", org=org)
+    except Exception as e:
+        logger.warning("Warm-up failed: %s", e)
+    finally:
+        metrics.observe_startup("warmup", time.perf_counter() - start)
+
+
+@asynccontextmanager
+async def warm_up_in_background() -> AsyncIterator[Optional[asyncio.Task]]:
+    """Run :func:`warm_up` next to the body of the with block unless disabled, it is cancelled if still running at the end."""
+    task = asyncio.create_task(warm_up()) if settings.WARMUP_ENABLED else None
+    try:
+        yield task
+    finally:
+        if task is not None and not task.done():
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
@@ -0,0 +1,290 @@
+import hashlib
+import hmac
+import json
+import logging
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Optional
+from urllib.parse import parse_qs, urlparse
+
+from utils.cache import response_cache
+from utils.catalog import catalogs, get_catalog
+from utils.mirror import TABLES, _isoformat, mirror
+from utils.orgs import org_registry
+from utils.search import get_item_index, item_indexes
+from utils.setting import settings
+
+if TYPE_CHECKING:
+    from http.server import ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+# record key of a webhook payload -> the mirror table of the record
+EVENT_RECORDS = {
+    "item": "items",
+    "contact": "contacts",
+    "salesorder": "salesorders",
+    "composite_item": "compositeitems",
+}
+
+SIGNATURE_HEADER = "X-Zoho-Webhook-Signature"
+MAX_BODY_BYTES = 1024 * 1024
+
+
+def sign(body: bytes, secret: str) -> str:
+    """The HMAC-SHA256 hex digest a webhook body is signed with."""
+    return hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+def verify(body: bytes, signature: Optional[str] = None, token: Optional[str] = None) -> bool:
+    """
+    Check that a webhook comes from Zoho.
+
+    Zoho workflow webhooks can't compute a signature, but they can send a
+    fixed parameter, so a request is accepted if it carries a valid
+    signature or the secret itself as the token query parameter.
+
+    Args:
+        body (bytes): The raw request body.
+        signature (str, optional): The SIGNATURE_HEADER of the request.
+        token (str, optional): The token query parameter of the request.
+
+    Returns:
+        bool: True if the request carries settings.WEBHOOK_SECRET, False if it doesn't or no secret is set.
+    """
+    secret = settings.WEBHOOK_SECRET
+    if not secret:
+        return False
+    # compared as bytes, compare_digest raises TypeError on str with non-ASCII characters
+    if signature and hmac.compare_digest(signature.strip().lower().encode(), sign(body, secret).encode()):
+        return True
+    return bool(token) and hmac.compare_digest(token.encode(), secret.encode())
+
+
+def parse_payload(body: bytes, content_type: Optional[str] = None) -> dict[str, Any]:
+    """Decode a webhook body, JSON or a form with the JSON in its JSONString field."""
+    if (content_type or "").startswith("application/x-www-form-urlencoded"):
+        fields = parse_qs(body.decode())
+        body = (fields.get("JSONString") or ["{}"])[0].encode()
+    payload = json.loads(body)
+    if not isinstance(payload, dict):
+        raise ValueError("The webhook payload must be a JSON object")
+    return payload
+
+
+class WebhookReceiver:
+    """
+    Applies Zoho record change events to everything the server keeps locally.
+
+    An event drops the cached responses of the record's collection in its
+    organization and writes the record into (or deletes it from) the mirror,
+    the item index and the catalog where they are in use, so they stay
+    current without polling Zoho. Events can get lost, reconcile() catches
+    up with a full sync of the mirrored tables, the built item indexes and
+    the loaded catalogs and runs every
+    settings.WEBHOOK_RECONCILE_INTERVAL seconds once started.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reconcile_thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._received = 0
+            self._rejected = 0
+            self._invalid = 0
+            self._applied: dict[str, int] = {}
+            self._last_event_at: Optional[float] = None
+            self._last_reconcile_at: Optional[float] = None
+
+    def apply(self, payload: dict[str, Any], org: Optional[str] = None) -> dict[str, Any]:
+        """
+        Apply one webhook event.
+
+        Args:
+            payload (dict[str, Any]): The event, holding the changed record under its record key, e.g.
+                {"event_type": "item_updated", "item": {...}}. An event_type (or event) containing
+                "delete" removes the record instead.
+            org (str, optional): The organization of the event, defaults to the payload's organization_id
+                and then to the default organization.
+
+        Returns:
+            dict[str, Any]: The table, record id and whether the record was deleted.
+
+        Raises:
+            ValueError: If the payload holds no known record or the organization is not configured.
+        """
+        organization = org_registry.get(org or payload.get("organization_id"))
+        kind = next((key for key in EVENT_RECORDS if isinstance(payload.get(key), dict)), None)
+        if kind is None:
+            raise ValueError(f"The webhook payload has none of the records {', '.join(EVENT_RECORDS)}")
+        table = EVENT_RECORDS[kind]
+        record = payload[kind]
+        record_id = record.get(TABLES[table]["id"])
+        if not record_id:
+            raise ValueError(f"The {kind} of the webhook payload has no {TABLES[table]['id']}")
+        deleted = "delete" in str(payload.get("event_type") or payload.get("event") or "").lower()
+
+        response_cache.invalidate(TABLES[table]["endpoint"], organization.organization_id)
+        if organization.is_default and mirror.synced(table):
+            if deleted:
+                mirror.delete(table, record_id)
+            else:
+                mirror.upsert(table, [record])
+        org_name = None if organization.is_default else organization.name
+        # an index or catalog that was never built reads every item when it is first used
+        if table == "items":
+            index = get_item_index(org_name)
+            if index.refreshed_at is not None:
+                if deleted:
+                    index.remove(record_id)
+                else:
+                    index.add([record])
+        if table in ("items", "compositeitems"):
+            catalog = get_catalog(org_name)
+            if catalog.refreshed_at is not None:
+                if deleted:
+                    catalog.remove(record_id)
+                else:
+                    catalog.add(catalog.with_components([record]) if kind == "composite_item" else [record], kind)
+
+        with self._lock:
+            self._applied[table] = self._applied.get(table, 0) + 1
+            self._last_event_at = time.time()
+        return {"table": table, "id": record_id, "deleted": deleted}
+
+    def reconcile(self) -> dict[str, Any]:
+        """
+        Catch up on changes whose webhook never arrived.
+
+        Returns:
+            dict[str, Any]: The records written per mirrored table, the items read per built item index
+                and, once a catalog is loaded, the records read per catalog.
+        """
+        tables = [table for table in TABLES if mirror.synced(table)]
+        result = {"mirror": mirror.sync(tables, full=True) if tables else {}, "item_indexes": {}}
+        for index in item_indexes():
+            if index.refreshed_at is not None:
+                result["item_indexes"][index.org or "default"] = index.refresh(full=True)
+        for catalog in catalogs():
+            if catalog.refreshed_at is not None:
+                result.setdefault("catalogs", {})[catalog.org or "default"] = catalog.refresh(full=True)
+        with self._lock:
+            self._last_reconcile_at = time.time()
+        return result
+
+    def start_reconcile(self, interval: float) -> None:
+        """Run reconcile() every interval seconds."""
+        if self._reconcile_thread is not None:
+            return
+        self._stop.clear()
+
+        def run():
+            while not self._stop.wait(interval):
+                try:
+                    self.reconcile()
+                except Exception as e:
+                    logger.error("Error reconciling webhook changes: %s", e)
+
+        self._reconcile_thread = threading.Thread(target=run, name="zoho-webhook-reconcile", daemon=True)
+        self._reconcile_thread.start()
+
+    def stop_reconcile(self) -> None:
+        self._stop.set()
+        self._reconcile_thread = None
+
+    def count_request(self, rejected: bool = False, invalid: bool = False) -> None:
+        with self._lock:
+            self._received += 1
+            self._rejected += rejected
+            self._invalid += invalid
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": bool(settings.WEBHOOK_PORT),
+                "received": self._received,
+                "rejected": self._rejected,
+                "invalid": self._invalid,
+                "applied": dict(self._applied),
+                "last_event_at": _isoformat(self._last_event_at),
+                "last_reconcile_at": _isoformat(self._last_reconcile_at),
+            }
+
+
+def start_webhook_server(port: int, host: str = "127.0.0.1") -> "ThreadingHTTPServer":
+    """
+    Receive Zoho webhooks on http://host:port/settings.WEBHOOK_PATH.
+
+    A request without a valid signature or token gets 401, one without a
+    known record 400. The organization of an event can be given with the
+    org query parameter, otherwise it is read from the payload.
+
+    Args:
+        port (int): The port to listen on, 0 picks a free one.
+        host (str): The interface to listen on.
+
+    Returns:
+        ThreadingHTTPServer: The server, call shutdown() to stop it.
+
+    Raises:
+        ValueError: If settings.WEBHOOK_SECRET is not set.
+    """
+    if not settings.WEBHOOK_SECRET:
+        raise ValueError("ZOHO_WEBHOOK_SECRET must be set to receive webhooks")
+
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            if url.path != settings.WEBHOOK_PATH:
+                self._reply(404, {"message": "Not found"})
+                return
+            length = int(self.headers.get("Content-Length") or 0)
+            if length > MAX_BODY_BYTES:
+                self._reply(413, {"message": "Payload too large"})
+                return
+            body = self.rfile.read(length)
+            query = parse_qs(url.query)
+            if not verify(body, self.headers.get(SIGNATURE_HEADER), (query.get("token") or [None])[0]):
+                webhook_receiver.count_request(rejected=True)
+                self._reply(401, {"message": "Invalid signature"})
+                return
+            try:
+                payload = parse_payload(body, self.headers.get("Content-Type"))
+                result = webhook_receiver.apply(payload, (query.get("org") or [None])[0])
+            except ValueError as e:
+                webhook_receiver.count_request(invalid=True)
+                self._reply(400, {"message": str(e)})
+                return
+            except Exception as e:
+                logger.error("Error applying webhook: %s", e)
+                webhook_receiver.count_request(invalid=True)
+                self._reply(500, {"message": "Error applying the webhook"})
+                return
+            webhook_receiver.count_request()
+            self._reply(200, result)
+
+        def _reply(self, status: int, result: dict[str, Any]) -> None:
+            body = json.dumps(result).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="webhook-server", daemon=True).start()
+    logger.info("Receiving webhooks on http://%s:%s%s", host, server.server_address[1], settings.WEBHOOK_PATH)
+    return server
+
+
+webhook_receiver = WebhookReceiver()
@@ -0,0 +1,51 @@
+import pytest
+
+from utils.auth import close_token_managers, token_manager
+from utils.cache import response_cache
+from utils.catalog import reset_catalogs
+from utils.client import close_client
+from utils.coalesce import request_coalescer
+from utils.metrics import metrics
+from utils.mirror import mirror
+from utils.ratelimit import rate_limiter
+from utils.search import reset_item_indexes
+from utils.setting import settings
+from zoho_stub import ZohoStub
+
+
+@pytest.fixture
+def zoho_stub(monkeypatch, tmp_path):
+    """Point the api layer at a local Zoho stub with its own token cache."""
+    stub = ZohoStub().start()
+    close_client()
+    token_manager.reset()
+    close_token_managers()
+    response_cache.clear()
+    request_coalescer.reset()
+    rate_limiter.reset()
+    reset_item_indexes()
+    reset_catalogs()
+    metrics.reset()
+    # tests that exercise the rate limiter turn it back on
+    monkeypatch.setattr(settings, "RATE_LIMIT_PER_MINUTE", 0)
+    monkeypatch.setattr(settings, "ZOHO_API_BASE_URL", stub.url)
+    monkeypatch.setattr(settings, "ZOHO_AUTH_BASE_URL", stub.url)
+    monkeypatch.setattr(settings, "ZOHO_ORGANIZATION_ID", "stub-org")
+    monkeypatch.setattr(settings, "TOKEN_CACHE_FILE", str(tmp_path / "token_cach.json"))
+    yield stub
+    token_manager.reset()
+    close_token_managers()
+    response_cache.clear()
+    rate_limiter.reset()
+    reset_item_indexes()
+    reset_catalogs()
+    close_client()
+    stub.stop()
+
+
+@pytest.fixture
+def mirror_db(monkeypatch, tmp_path):
+    """Use an empty mirror database for the test."""
+    monkeypatch.setattr(settings, "MIRROR_DB_FILE", str(tmp_path / "mirror.sqlite3"))
+    yield mirror
+    mirror.close()
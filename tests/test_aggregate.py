@@ -0,0 +1,109 @@
+import asyncio
+
+import pytest
+
+from resources.salesorders import aggregate_sales_orders, aggregate_sales_orders_async
+from utils.aggregate import SalesOrderAggregator
+from utils.cache import response_cache
+from zoho_stub import paged_route
+
+
+def _orders():
+    return [
+        {"salesorder_id": "1", "date": "2024-03-30", "customer_id": "c1", "customer_name": "Acme", "status": "confirmed", "total": 100.0, "cf_region": "north",
+         "line_items": [{"item_id": "i1", "name": "Bolt", "quantity": 10, "item_total": 40.0}, {"item_id": "i2", "name": "Nut", "quantity": 60, "item_total": 60.0}]},
+        {"salesorder_id": "2", "date": "2024-02-10", "customer_id": "c2", "customer_name": "Globex", "status": "fulfilled", "total": 250.0, "cf_region": "south",
+         "line_items": [{"item_id": "i1", "name": "Bolt", "quantity": 20, "item_total": 80.0}, {"item_id": "i1", "name": "Bolt", "quantity": 5, "item_total": 20.0},
+                        {"item_id": "i3", "name": "Washer", "quantity": 300, "item_total": 150.0}]},
+        {"salesorder_id": "3", "date": "2024-02-01", "customer_id": "c1", "customer_name": "Acme", "status": "confirmed", "total": 50.0, "cf_region": "north",
+         "line_items": [{"item_id": "i2", "name": "Nut", "quantity": 50, "item_total": 50.0}]},
+        {"salesorder_id": "4", "date": "2024-01-20", "customer_id": "c2", "customer_name": "Globex", "status": "draft", "total": 999.0, "cf_region": "south", "line_items": []},
+        {"salesorder_id": "5", "date": "2023-12-31", "customer_id": "c1", "customer_name": "Acme", "status": "confirmed", "total": 70.0, "cf_region": "north", "line_items": []},
+    ]
+
+
+def _stub(zoho_stub, orders):
+    # the list leaves out the line items, like Zoho
+    zoho_stub.routes[("GET", "/salesorders")] = paged_route([{key: value for key, value in order.items() if key != "line_items"} for order in orders], "salesorders")
+    for order in orders:
+        zoho_stub.routes[("GET", f"/salesorders/{order['salesorder_id']}")] = {"code": 0, "salesorder": order}
+
+
+def test_aggregator_groups_orders_and_line_items():
+    by_customer = SalesOrderAggregator(["customer", "month"])
+    by_customer.add_all(_orders()[:3])
+    assert by_customer.result() == {
+        "columns": ["customer_id", "customer_name", "month", "orders", "total"],
+        "rows": [["c2", "Globex", "2024-02", 1, 250.0], ["c1", "Acme", "2024-03", 1, 100.0], ["c1", "Acme", "2024-02", 1, 50.0]],
+        "groups": 3, "orders": 3, "total": 400.0,
+    }
+
+    by_item = SalesOrderAggregator(["item"])
+    by_item.add_all(_orders()[:3])
+    result = by_item.result(limit=2)
+    assert result["columns"] == ["item_id", "item_name", "orders", "quantity", "total"]
+    # order 2 has Bolt on two lines, it still counts as one order
+    assert result["rows"] == [["i3", "Washer", 1, 300.0, 150.0], ["i1", "Bolt", 2, 35.0, 140.0]]
+    assert result["groups"] == 3
+
+
+def test_aggregator_memory_depends_on_groups_only():
+    aggregator = SalesOrderAggregator(["status"])
+    aggregator.add_all({"status": ("confirmed", "fulfilled")[i % 2], "total": 1} for i in range(100000))
+    assert aggregator.result()["rows"] == [["confirmed", 50000, 50000.0], ["fulfilled", 50000, 50000.0]]
+    assert len(aggregator._groups) == 2
+
+
+def test_aggregate_sales_orders(zoho_stub):
+    _stub(zoho_stub, _orders())
+
+    result = aggregate_sales_orders(date_start="2024-01-01", date_end="2024-03-31")
+
+    # the draft and the order before date_start are left out
+    assert result["rows"] == [["c2", "Globex", 1, 250.0], ["c1", "Acme", 2, 150.0]]
+    assert result["orders"] == 3 and not result["truncated"]
+    query = zoho_stub.requests[-1]["query"]
+    assert query["date_start"] == ["2024-01-01"] and query["sort_column"] == ["date"] and query["sort_order"] == ["D"]
+    assert zoho_stub.count("GET", "/salesorders/1") == 0, "Only an item aggregate reads the orders in detail"
+
+    by_status = aggregate_sales_orders(group_by=["status"], statuses=["draft", "confirmed"], search_params={"cf_region": "south", "ignored": "x"})
+    assert zoho_stub.requests[-1]["query"]["cf_region"] == ["south"] and "ignored" not in zoho_stub.requests[-1]["query"]
+    # the stub doesn't filter by custom fields, Zoho does
+    assert by_status["columns"] == ["status", "orders", "total"]
+    assert by_status["rows"][0] == ["draft", 1, 999.0]
+
+
+def test_aggregate_sales_orders_by_item(zoho_stub):
+    _stub(zoho_stub, _orders())
+
+    result = asyncio.run(aggregate_sales_orders_async(group_by=["item"], date_start="2024-01-01"))
+
+    assert [row[0] for row in result["rows"]] == ["i3", "i1", "i2"]
+    assert result["rows"][2] == ["i2", "Nut", 2, 110.0, 110.0]
+    assert all(zoho_stub.count("GET", f"/salesorders/{salesorder_id}") == 1 for salesorder_id in ("1", "2", "3"))
+    assert aggregate_sales_orders(group_by=["item"], date_start="2024-01-01") == result
+
+    zoho_stub.routes[("GET", "/salesorders/2")] = lambda path, query, body: (404, {"code": 1002, "message": "missing"})
+    response_cache.clear()
+    failed = aggregate_sales_orders(group_by=["item"], date_start="2024-01-01")
+    assert failed["details_failed"] == 1 and failed["orders"] == 2, "An order that can't be read is left out, not counted without items"
+    response_cache.clear()
+    assert asyncio.run(aggregate_sales_orders_async(group_by=["item"], date_start="2024-01-01")) == failed
+    assert result["details_failed"] == 0
+
+    truncated = aggregate_sales_orders(group_by=["customer"], max_orders=2)
+    assert truncated["orders"] == 2 and truncated["truncated"]
+    assert asyncio.run(aggregate_sales_orders_async(max_orders=2)) == truncated
+
+
+def test_aggregate_sales_orders_checks_arguments():
+    with pytest.raises(ValueError):
+        aggregate_sales_orders(group_by=["region"])
+    with pytest.raises(ValueError):
+        aggregate_sales_orders(group_by=["customer", "customer"])
+    with pytest.raises(ValueError):
+        aggregate_sales_orders(date_start="31/03/2024")
+    with pytest.raises(ValueError):
+        aggregate_sales_orders(statuses="confirmed")
+    with pytest.raises(ValueError):
+        aggregate_sales_orders(max_orders=0)
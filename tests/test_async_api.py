@@ -0,0 +1,58 @@
+import asyncio
+import time
+
+from mcp.server.fastmcp import FastMCP
+
+from resources.contacts import get_contact_async
+from resources.items import list_items_async
+from server import register_resources, register_tools
+from utils.api import zoho_api_request_async
+
+
+def test_zoho_api_request_async(zoho_stub):
+    zoho_stub.routes[("GET", "/contacts")] = {"code": 0, "contacts": [{"contact_id": "1"}]}
+
+    response = asyncio.run(zoho_api_request_async("GET", "/contacts"))
+
+    assert response["code"] == 0, "Response code should be 0"
+    assert response["contacts"] == [{"contact_id": "1"}]
+    request = zoho_stub.requests[-1]
+    assert request["query"]["organization_id"] == ["stub-org"]
+    assert request["headers"]["Authorization"] == "Zoho-oauthtoken stub-token"
+
+
+def test_async_resources(zoho_stub):
+    zoho_stub.routes[("GET", "/items")] = {"code": 0, "items": [{"item_id": "1"}], "page_context": {"has_more_page": True, "total": 20}}
+    zoho_stub.routes[("GET", "/contacts/42")] = {"code": 0, "contact": {"contact_id": "42"}, "message": "success"}
+
+    async def run():
+        return await asyncio.gather(list_items_async(page=1, per_page=1), get_contact_async("42"))
+
+    items, contact = asyncio.run(run())
+
+    assert items["items"] == [{"item_id": "1"}]
+    assert items["has_more_page"] is True
+    assert items["total"] == 20
+    assert contact["contact"]["contact_id"] == "42"
+
+
+def test_concurrent_tool_calls(zoho_stub):
+    delay = 0.3
+    calls = 6
+    zoho_stub.routes[("GET", "/items")] = {"code": 0, "items": [], "page_context": {"has_more_page": False}}
+    # fetch the token before the stub gets slow
+    asyncio.run(zoho_api_request_async("GET", "/items"))
+    zoho_stub.delay = delay
+
+    mcp_server = FastMCP("test")
+    register_tools(mcp_server)
+    register_resources(mcp_server)
+
+    async def run():
+        start = time.perf_counter()
+        await asyncio.gather(*(mcp_server.call_tool("list_items", {"page": page}) for page in range(calls)))
+        return time.perf_counter() - start
+
+    elapsed = asyncio.run(run())
+
+    assert elapsed < delay * 2, f"{calls} concurrent calls took {elapsed:.2f}s, expected about {delay}s"
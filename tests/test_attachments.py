@@ -0,0 +1,156 @@
+import asyncio
+import base64
+import os
+import threading
+import time
+from email.parser import BytesParser
+from email.policy import HTTP
+
+import pytest
+
+from tools.salesorders import attach_pdf, attach_pdf_async, attach_files
+from utils.api import _build_request
+from utils.setting import settings
+from utils.upload import Upload
+
+
+def _parts(request):
+    """Decode the multipart body the stub received into {field: (filename, content type, content)}."""
+    header = f"Content-Type: {request['headers']['Content-Type']}\r\n\r\n".encode()
+    message = BytesParser(policy=HTTP).parsebytes(header + request["body"])
+    return {
+        part.get_param("name", header="content-disposition"): (part.get_filename(), part.get_content_type(), part.get_payload(decode=True))
+        for part in message.iter_parts()
+    }
+
+
+def _attachment_requests(zoho_stub):
+    return [r for r in zoho_stub.requests if r["path"].endswith("/attachment")]
+
+
+def _open_fds():
+    return len(os.listdir("/proc/self/fd"))
+
+
+def test_attach_pdf_streams_the_file(zoho_stub, tmp_path):
+    content = b"%PDF-1.4\n" + os.urandom(3 * 1024 * 1024)
+    pdf = tmp_path / "#1182.pdf"
+    pdf.write_bytes(content)
+    zoho_stub.routes[("POST", "/salesorders/1/attachment")] = {"code": 0, "message": "Your file has been attached."}
+
+    response = attach_pdf("1", str(pdf))
+
+    assert response["message"] == "Your file has been attached."
+    request = _attachment_requests(zoho_stub)[0]
+    assert request["headers"]["Content-Type"].startswith("multipart/form-data")
+    assert _parts(request)["attachment"] == ("#1182.pdf", "application/pdf", content)
+
+
+def test_attach_pdf_async(zoho_stub, tmp_path):
+    pdf = tmp_path / "po.pdf"
+    pdf.write_bytes(b"%PDF-1.4 async")
+    zoho_stub.routes[("POST", "/salesorders/1/attachment")] = {"code": 0, "message": "Your file has been attached."}
+
+    response = asyncio.run(attach_pdf_async("1", str(pdf)))
+
+    assert response["code"] == 0
+    assert _parts(_attachment_requests(zoho_stub)[0])["attachment"][2] == b"%PDF-1.4 async"
+
+
+def test_file_handles_are_closed(zoho_stub, tmp_path):
+    pdf = tmp_path / "po.pdf"
+    pdf.write_bytes(b"%PDF-1.4")
+    zoho_stub.routes[("POST", "/salesorders/1/attachment")] = lambda path, query, body: (400, {"code": 1, "message": "boom"})
+    attach_pdf("1", str(pdf))
+    fds = _open_fds()
+
+    for _ in range(20):
+        attach_pdf("1", str(pdf))
+
+    assert _open_fds() <= fds
+
+
+def test_retries_resend_the_whole_file(zoho_stub, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "RETRY_BACKOFF_BASE", 0.01)
+    content = b"%PDF-1.4" + b"x" * 100_000
+    pdf = tmp_path / "po.pdf"
+    pdf.write_bytes(content)
+    attempts = []
+
+    def attachment(path, query, body):
+        attempts.append(body)
+        # a POST is only retried after a 429, a 5xx might have attached it already
+        if len(attempts) == 1:
+            return 429, {"code": 44, "message": "too many requests"}
+        return {"code": 0, "message": "Your file has been attached."}
+
+    zoho_stub.routes[("POST", "/salesorders/1/attachment")] = attachment
+
+    assert attach_pdf("1", str(pdf))["code"] == 0
+    assert len(attempts) == 2
+    assert all(_parts(r)["attachment"][2] == content for r in _attachment_requests(zoho_stub))
+
+
+def test_content_type_detection(tmp_path):
+    scan = tmp_path / "scan"
+    scan.write_bytes(b"\x89PNG\r\n\x1a\n....")
+
+    assert Upload(str(scan)).content_type == "image/png"
+    assert Upload(b"%PDF-1.7", "PO 12").content_type == "application/pdf"
+    assert Upload(b"%PDF-1.7", "po.pdf", content_type="application/x-pdf").content_type == "application/x-pdf"
+    assert Upload(b"hello", "notes.txt").content_type == "text/plain"
+    assert Upload(b"\x00\x01", "blob").content_type == "application/octet-stream"
+    with pytest.raises(ValueError):
+        Upload(str(tmp_path / "missing.pdf"))
+
+
+def test_timeout_scales_with_size(monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_MIN_BYTES_PER_SECOND", 1024 * 1024)
+
+    with Upload(b"x" * 10) as small, Upload(b"x" * 50 * 1024 * 1024, "big.pdf") as big:
+        small_timeout = _build_request("POST", "/a", None, None, None, "t", {"attachment": small})["timeout"]
+        big_timeout = _build_request("POST", "/a", None, None, None, "t", {"attachment": big})["timeout"]
+
+    assert small_timeout.write == pytest.approx(settings.HTTP_TIMEOUT, abs=0.01)
+    assert big_timeout.write == pytest.approx(settings.HTTP_TIMEOUT + 50)
+    assert big_timeout.connect == settings.HTTP_TIMEOUT
+    assert small.closed and big.closed
+
+
+def test_attach_files_to_many_salesorders(zoho_stub, tmp_path):
+    lock = threading.Lock()
+    state = {"active": 0, "max_active": 0}
+
+    def attachment(path, query, body):
+        with lock:
+            state["active"] += 1
+            state["max_active"] = max(state["max_active"], state["active"])
+        time.sleep(0.05)
+        with lock:
+            state["active"] -= 1
+        if path.startswith("/salesorders/missing/"):
+            return 404, {"code": 1002, "message": "Sales order does not exist"}
+        return {"code": 0, "message": "Your file has been attached."}
+
+    for salesorder_id in ("1", "2", "missing"):
+        zoho_stub.routes[("POST", f"/salesorders/{salesorder_id}/attachment")] = attachment
+    attachments = []
+    for i in range(6):
+        pdf = tmp_path / f"po-{i}.pdf"
+        pdf.write_bytes(b"%PDF-1.4 " + str(i).encode())
+        attachments.append({"salesorder_id": "1" if i % 2 else "2", "file_path": str(pdf)})
+    attachments.append({"salesorder_id": "missing", "file_path": str(tmp_path / "po-0.pdf")})
+    attachments.append({"salesorder_id": "1", "file_path": str(tmp_path / "nope.pdf")})
+    attachments.append({"salesorder_id": "2", "file_name": "label.png", "content_base64": base64.b64encode(b"\x89PNG\r\n\x1a\nlabel").decode()})
+
+    response = attach_files(attachments, concurrency=3)
+
+    statuses = [result["status"] for result in response["results"]]
+    assert statuses == ["attached"] * 6 + ["failed", "invalid", "attached"]
+    assert response["results"][6]["error"] == "Sales order does not exist"
+    assert response["results"][7]["error"].startswith("File not found")
+    assert response["summary"] == {"attached": 7, "failed": 1, "invalid": 1}
+    assert state["max_active"] <= 3
+    assert zoho_stub.count("POST", "/salesorders/1/attachment") == 3
+    label = [r for r in _attachment_requests(zoho_stub) if _parts(r)["attachment"][0] == "label.png"]
+    assert _parts(label[0])["attachment"][1:] == ("image/png", b"\x89PNG\r\n\x1a\nlabel")
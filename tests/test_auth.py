@@ -0,0 +1,100 @@
+import asyncio
+import itertools
+import os
+import threading
+import time
+
+from utils import auth
+from utils.api import zoho_api_request
+from utils.auth import token_manager, _save_token_to_cache, _load_token_from_cache
+from utils.setting import settings
+
+
+def _counting_token_route(zoho_stub, expires_in=3600):
+    counter = itertools.count(1)
+
+    def token(path, query, body):
+        # slow enough that concurrent callers overlap with the refresh
+        time.sleep(0.05)
+        return {"access_token": f"token-{next(counter)}", "expires_in": expires_in}
+
+    zoho_stub.routes[("POST", "/token")] = token
+
+
+def test_token_is_kept_in_memory(zoho_stub):
+    _counting_token_route(zoho_stub)
+
+    assert token_manager.get_token() == "token-1"
+    os.remove(settings.TOKEN_CACHE_FILE)
+
+    assert token_manager.get_token() == "token-1", "Token should be served from memory"
+    assert zoho_stub.count("POST", "/token") == 1
+
+
+def test_concurrent_refresh_is_single_flight(zoho_stub):
+    _counting_token_route(zoho_stub)
+    tokens = []
+
+    threads = [threading.Thread(target=lambda: tokens.append(token_manager.get_token())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    async def run():
+        return await asyncio.gather(*(token_manager.get_token_async() for _ in range(8)))
+
+    tokens.extend(asyncio.run(run()))
+
+    assert set(tokens) == {"token-1"}
+    assert zoho_stub.count("POST", "/token") == 1, "Only one refresh should reach Zoho"
+
+
+def test_token_shared_through_cache_file(zoho_stub):
+    _save_token_to_cache({"access_token": "from-other-process", "expires_at": time.time() + 3600})
+
+    assert token_manager.get_token() == "from-other-process"
+    assert zoho_stub.count("POST", "/token") == 0
+
+
+def test_cache_file_written_atomically(zoho_stub):
+    _counting_token_route(zoho_stub)
+
+    token_manager.get_token()
+
+    assert _load_token_from_cache()["access_token"] == "token-1"
+    leftovers = [name for name in os.listdir(os.path.dirname(settings.TOKEN_CACHE_FILE)) if name.endswith(".tmp")]
+    assert leftovers == [], "Temporary token files should be renamed into place"
+
+
+def test_unauthorized_request_uses_refreshed_token(zoho_stub):
+    _counting_token_route(zoho_stub)
+
+    def items(path, query, body):
+        return {"code": 0, "items": []}
+
+    def auth_items(path, query, body):
+        auth = zoho_stub.requests[-1]["headers"]["Authorization"]
+        if auth.endswith("token-1"):
+            return 401, {"code": 57, "message": "You are not authorized to perform this operation"}
+        return items(path, query, body)
+
+    zoho_stub.routes[("GET", "/items")] = auth_items
+
+    response = zoho_api_request("GET", "/items")
+
+    assert response == {"code": 0, "items": []}
+    assert zoho_stub.count("POST", "/token") == 2
+    assert zoho_stub.requests[-1]["headers"]["Authorization"] == "Zoho-oauthtoken token-2"
+
+
+def test_background_renewal(zoho_stub, monkeypatch):
+    _counting_token_route(zoho_stub, expires_in=3)
+    monkeypatch.setattr(settings, "TOKEN_REFRESH_MARGIN", 2)
+    monkeypatch.setattr(auth, "_EXPIRY_SKEW", 0)
+
+    assert token_manager.get_token() == "token-1"
+    time.sleep(1.5)
+
+    assert zoho_stub.count("POST", "/token") == 2, "Token should be renewed before it expires"
+    assert token_manager.get_token() == "token-2"
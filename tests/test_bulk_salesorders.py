@@ -0,0 +1,95 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+
+from tools.salesorders import create_sales_orders_bulk, create_sales_orders_bulk_async
+
+
+def _order(customer_id, po_number=None, quantity=2):
+    order = {
+        "customer_id": customer_id,
+        "line_items": [{"item_id": "1", "quantity": quantity, "rate": 2.5, "item_total": quantity * 2.5, "tax_id": "t"}],
+    }
+    if po_number:
+        order["po_number"] = po_number
+    return order
+
+
+@pytest.fixture
+def salesorders_route(zoho_stub):
+    """Create sales orders on the stub, customer "bad" is rejected by Zoho."""
+    lock = threading.Lock()
+    state = {"active": 0, "max_active": 0, "created": []}
+
+    def create(path, query, body):
+        data = json.loads(body)
+        with lock:
+            state["active"] += 1
+            state["max_active"] = max(state["max_active"], state["active"])
+        time.sleep(0.05)
+        with lock:
+            state["active"] -= 1
+            if data["customer_id"] == "bad":
+                return 400, {"code": 3062, "message": "Customer does not exist"}
+            state["created"].append(data)
+            salesorder_id = str(len(state["created"]))
+        return {"code": 0, "message": "Sales Order has been created.", "salesorder": {"salesorder_id": salesorder_id, "customer_id": data["customer_id"]}}
+
+    zoho_stub.routes[("POST", "/salesorders")] = create
+    return state
+
+
+def test_bulk_creates_orders_with_per_order_results(salesorders_route):
+    orders = [_order("c1", "PO-1"), _order("bad"), _order("c2"), {"customer_id": "c3", "line_items": "nope"}]
+
+    response = create_sales_orders_bulk(orders, concurrency=2)
+
+    statuses = [result["status"] for result in response["results"]]
+    assert statuses == ["created", "failed", "created", "invalid"]
+    assert [result["index"] for result in response["results"]] == [0, 1, 2, 3]
+    assert response["results"][0]["sales_order"]["customer_id"] == "c1"
+    assert response["results"][1]["error"] == "Customer does not exist"
+    assert response["results"][3]["error"] == "line_items must be a list"
+    assert response["summary"] == {"created": 2, "failed": 1, "invalid": 1}
+    po_numbers = sorted(order["custom_fields"][0]["value"] for order in salesorders_route["created"])
+    assert po_numbers == ["", "PO-1"]
+
+
+def test_bulk_concurrency_is_bounded(salesorders_route):
+    orders = [_order(f"c{i}") for i in range(12)]
+
+    start = time.perf_counter()
+    response = create_sales_orders_bulk(orders, concurrency=4)
+    elapsed = time.perf_counter() - start
+
+    assert response["summary"] == {"created": 12}
+    assert salesorders_route["max_active"] <= 4
+    assert elapsed < 12 * 0.05, f"12 orders took {elapsed:.2f}s"
+
+
+def test_bulk_async(salesorders_route):
+    orders = [_order(f"c{i}") for i in range(6)] + [_order("bad")]
+
+    response = asyncio.run(create_sales_orders_bulk_async(orders, concurrency=3))
+
+    assert response["summary"] == {"created": 6, "failed": 1}
+    assert salesorders_route["max_active"] <= 3
+
+
+def test_bulk_dry_run_only_validates(zoho_stub, salesorders_route):
+    orders = [_order("c1"), {"customer_id": "c2", "line_items": [{"item_id": "1", "quantity": 2, "rate": 2.5, "item_total": 4, "tax_id": "t"}]}, {"customer": "c3"}]
+
+    response = create_sales_orders_bulk(orders, dry_run=True)
+
+    assert [result["status"] for result in response["results"]] == ["valid", "invalid", "invalid"]
+    assert response["results"][1]["error"] == "item_total must be equal to quantity * rate"
+    assert response["results"][2]["error"] == "Unexpected keys in order: customer"
+    assert zoho_stub.count("POST", "/salesorders") == 0
+
+
+def test_bulk_orders_must_be_a_list():
+    with pytest.raises(ValueError):
+        create_sales_orders_bulk({"customer_id": "c1"})
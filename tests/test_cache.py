@@ -0,0 +1,98 @@
+import time
+
+from resources.cache import get_cache_stats
+from resources.salesorders import list_sales_orders, get_salesorder
+from resources.taxes import get_taxes
+from tools.salesorders import create_sales_order, attach_pdf
+from utils.api import zoho_api_request
+from utils.cache import ResponseCache, response_cache
+from utils.setting import settings
+
+
+def test_cache_key_normalizes_params():
+    key1 = ResponseCache.key("get", "/items", {"page": 1, "per_page": 10, "search_text": None})
+    key2 = ResponseCache.key("GET", "/items", {"per_page": "10", "page": "1"})
+
+    assert key1 == key2
+
+
+def test_ttl_per_endpoint(monkeypatch):
+    monkeypatch.setattr(settings, "CACHE_TTLS", "/items=5")
+
+    assert response_cache.ttl("/settings/taxes") == 86400
+    assert response_cache.ttl("/items") == 5
+    assert response_cache.ttl("/contacts/1") == 300
+    assert response_cache.ttl("/unknown") == settings.CACHE_DEFAULT_TTL
+
+
+def test_get_is_served_from_cache(zoho_stub):
+    zoho_stub.routes[("GET", "/settings/taxes")] = {"code": 0, "taxes": [{"tax_id": "1"}]}
+
+    first = get_taxes()
+    first["taxes"].append({"tax_id": "mutated"})
+    second = get_taxes()
+
+    assert second["taxes"] == [{"tax_id": "1"}], "Hits should not share objects with earlier results"
+    assert zoho_stub.count("GET", "/settings/taxes") == 1
+    assert get_cache_stats()["hits"] == 1
+
+    get_taxes(per_page=10)
+    assert zoho_stub.count("GET", "/settings/taxes") == 2, "Different params should miss"
+
+
+def test_errors_are_not_cached(zoho_stub):
+    zoho_stub.routes[("GET", "/salesorders/1")] = {"code": 1002, "message": "Sales order does not exist"}
+
+    get_salesorder("1")
+    get_salesorder("1")
+
+    assert zoho_stub.count("GET", "/salesorders/1") == 2
+
+
+def test_entries_expire(zoho_stub, monkeypatch):
+    monkeypatch.setattr(settings, "CACHE_TTLS", "/items=0.1")
+    zoho_stub.routes[("GET", "/items")] = {"code": 0, "items": []}
+
+    zoho_api_request("GET", "/items")
+    time.sleep(0.15)
+    zoho_api_request("GET", "/items")
+
+    assert zoho_stub.count("GET", "/items") == 2
+    assert response_cache.stats()["expirations"] == 1
+
+
+def test_lru_memory_budget(zoho_stub, monkeypatch):
+    zoho_stub.routes[("GET", "/items")] = lambda path, query, body: {"code": 0, "items": ["x" * 1000], "page": query["page"][0]}
+    monkeypatch.setattr(settings, "CACHE_MAX_BYTES", 3500)
+
+    for page in range(1, 5):
+        zoho_api_request("GET", "/items", params={"page": page})
+    zoho_api_request("GET", "/items", params={"page": 1})
+
+    stats = response_cache.stats()
+    assert stats["bytes"] <= 3500
+    assert stats["evictions"] >= 1
+    assert zoho_stub.count("GET", "/items") == 5, "The least recently used page should have been evicted"
+
+
+def test_writes_invalidate_salesorders(zoho_stub, tmp_path):
+    zoho_stub.routes[("GET", "/salesorders")] = {"code": 0, "salesorders": []}
+    zoho_stub.routes[("GET", "/settings/taxes")] = {"code": 0, "taxes": []}
+    zoho_stub.routes[("POST", "/salesorders")] = {"code": 0, "message": "Sales Order has been created.", "salesorder": {"salesorder_id": "1"}}
+    zoho_stub.routes[("POST", "/salesorders/1/attachment")] = {"code": 0, "message": "Your file has been attached."}
+
+    list_sales_orders()
+    get_taxes()
+    create_sales_order("customer", [{"item_id": "1", "quantity": 1, "rate": 2.0, "item_total": 2.0, "tax_id": "t"}])
+    list_sales_orders()
+
+    assert zoho_stub.count("GET", "/salesorders") == 2
+
+    pdf = tmp_path / "po.pdf"
+    pdf.write_bytes(b"%PDF-1.4")
+    attach_pdf("1", str(pdf))
+    list_sales_orders()
+    get_taxes()
+
+    assert zoho_stub.count("GET", "/salesorders") == 3
+    assert zoho_stub.count("GET", "/settings/taxes") == 1, "Unrelated entries should stay cached"
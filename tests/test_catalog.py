@@ -0,0 +1,145 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from resources.items import lookup_items, lookup_items_async
+from utils.catalog import Catalog, catalog
+from utils.webhooks import webhook_receiver
+from zoho_stub import paged_route
+
+SRC = os.path.join(os.path.dirname(__file__), "..", "src")
+
+
+def _items():
+    return [
+        {"item_id": "1", "name": "Hex Bolt M8", "sku": "HB-M8", "rate": 0.4, "tax_id": "9", "stock_on_hand": 120, "unit": "pcs", "status": "active", "description": "dropped", "last_modified_time": "2024-01-01T00:00:01+0000"},
+        {"item_id": "2", "name": "Hex Nut M8", "sku": "HN-M8", "rate": 0.1, "tax_id": "9", "stock_on_hand": 300, "unit": "pcs", "status": "active", "last_modified_time": "2024-01-01T00:00:02+0000"},
+        {"item_id": "3", "name": "Flat Washer M8", "sku": " FW-M8 ", "rate": "", "unit": "pcs", "status": "inactive", "last_modified_time": "2024-01-01T00:00:03+0000"},
+    ]
+
+
+def _composite_items():
+    return [
+        {"composite_item_id": "10", "name": "Bolt Kit", "sku": "KIT-1", "rate": 1.2, "status": "active",
+         "mapped_items": [{"item_id": "1", "quantity": 4}, {"item_id": "2", "quantity": 4}], "last_modified_time": "2024-01-01T00:00:04+0000"},
+    ]
+
+
+def test_add_get_update_and_remove():
+    store = Catalog()
+    store.add(_items())
+    store.add(_composite_items(), "composite_item")
+
+    assert len(store) == 4
+    assert store.get("1") == {
+        "item_id": "1", "kind": "item", "name": "Hex Bolt M8", "sku": "HB-M8", "rate": 0.4, "tax_id": "9",
+        "stock_on_hand": 120.0, "available_stock": None, "committed_stock": None, "reorder_level": None,
+        "unit": "pcs", "status": "active",
+    }
+    assert store.get_by_sku("FW-M8")["rate"] is None, "SKUs are stored without surrounding spaces and a missing rate is None"
+    assert store.get_by_sku(" KIT-1")["components"] == [{"item_id": "1", "quantity": 4.0}, {"item_id": "2", "quantity": 4.0}]
+    assert store.get("10")["kind"] == "composite_item"
+    assert store.get("missing") is None and store.get_by_sku("missing") is None
+
+    store.add([{**_items()[1], "sku": "HN-M8-Z", "stock_on_hand": 0}])
+    assert len(store) == 4
+    assert store.get_by_sku("HN-M8") is None
+    assert store.get_by_sku("HN-M8-Z")["stock_on_hand"] == 0
+
+    assert store.remove("1")
+    assert not store.remove("1")
+    assert "1" not in store and store.get_by_sku("HB-M8") is None
+    # the last row took the removed row's place
+    assert store.get_by_sku("KIT-1")["name"] == "Bolt Kit"
+    assert [store.get(item_id)["name"] for item_id in ("2", "3", "10")] == ["Hex Nut M8", "Flat Washer M8", "Bolt Kit"]
+    assert store.stats()["records"] == 3
+    assert store.stats()["skus"] == 3
+
+
+def test_refresh_reads_items_and_composite_items(zoho_stub):
+    items, composite_items = _items(), _composite_items()
+    zoho_stub.routes[("GET", "/items")] = paged_route(items, "items")
+    zoho_stub.routes[("GET", "/compositeitems")] = paged_route(composite_items, "composite_items")
+
+    assert catalog.refresh() == 4
+    items.append({"item_id": "4", "name": "Spring Washer", "sku": "SW-M8", "last_modified_time": "2024-01-02T00:00:00+0000"})
+    # the new item and the newest record of each endpoint, read again at the watermark
+    assert catalog.refresh() == 3, "An incremental refresh should only read changed records"
+    assert catalog.get_by_sku("SW-M8")["item_id"] == "4"
+
+    del items[0]
+    catalog.refresh(full=True)
+    assert "1" not in catalog
+    assert len(catalog) == 4
+
+
+def test_refresh_reads_the_components_of_composite_items(zoho_stub):
+    composite_items = _composite_items()
+    # the list leaves the components out like Zoho does, they come from the details
+    listed = [{k: v for k, v in record.items() if k != "mapped_items"} for record in composite_items]
+    listed.append({"composite_item_id": "11", "name": "Broken Kit", "sku": "KIT-2", "last_modified_time": "2024-01-01T00:00:05+0000"})
+    zoho_stub.routes[("GET", "/items")] = paged_route(_items(), "items")
+    zoho_stub.routes[("GET", "/compositeitems")] = paged_route(listed, "composite_items")
+    zoho_stub.routes[("GET", "/compositeitems/10")] = {"code": 0, "composite_item": composite_items[0]}
+    zoho_stub.routes[("GET", "/compositeitems/11")] = lambda path, query, body: (404, {"code": 1002, "message": "missing"})
+
+    catalog.refresh()
+
+    assert catalog.get_by_sku("KIT-1")["components"] == [{"item_id": "1", "quantity": 4.0}, {"item_id": "2", "quantity": 4.0}]
+    assert "components" not in catalog.get_by_sku("KIT-2"), "A composite item whose details fail is kept without components"
+    assert zoho_stub.count("GET", "/compositeitems/10") == 1
+
+    webhook_receiver.apply({"composite_item": {**listed[0], "rate": 1.5}})
+    assert catalog.get("10")["rate"] == 1.5
+    assert catalog.get("10")["components"][0] == {"item_id": "1", "quantity": 4.0}
+    assert zoho_stub.count("GET", "/compositeitems/10") == 2, "A webhook without components reads the details"
+
+
+def test_lookup_items(zoho_stub):
+    zoho_stub.routes[("GET", "/items")] = paged_route(_items(), "items")
+    zoho_stub.routes[("GET", "/compositeitems")] = paged_route(_composite_items(), "composite_items")
+
+    result = lookup_items(item_ids=["1", "99"], skus=["KIT-1", "NOPE"])
+
+    assert result["by_id"]["1"]["sku"] == "HB-M8"
+    assert result["by_sku"]["KIT-1"]["item_id"] == "10"
+    assert result["missing_ids"] == ["99"]
+    assert result["missing_skus"] == ["NOPE"]
+    assert result["catalog_records"] == 4
+
+    requests = zoho_stub.count("GET", "/items")
+    assert asyncio.run(lookup_items_async(skus=["HN-M8"]))["by_sku"]["HN-M8"]["item_id"] == "2"
+    assert zoho_stub.count("GET", "/items") == requests, "Lookups should not call Zoho while the catalog is fresh"
+
+    with pytest.raises(ValueError):
+        lookup_items()
+    with pytest.raises(ValueError):
+        lookup_items(skus="HB-M8")
+
+
+def test_webhooks_update_a_loaded_catalog(zoho_stub):
+    zoho_stub.routes[("GET", "/items")] = paged_route(_items(), "items")
+    zoho_stub.routes[("GET", "/compositeitems")] = paged_route([], "composite_items")
+    catalog.refresh()
+
+    webhook_receiver.apply({"item": {"item_id": "2", "name": "Hex Nut M8", "sku": "HN-M8", "rate": 0.15}})
+    webhook_receiver.apply({"event_type": "item_deleted", "item": {"item_id": "3"}})
+
+    assert catalog.get("2")["rate"] == 0.15
+    assert "3" not in catalog
+
+
+def test_catalog_benchmark():
+    # in a fresh interpreter and with enough items that the one-off growth of the table of interned strings, which
+    # the other tests leave large, doesn't outweigh what the catalog keeps per item
+    script = "import json; from benchmark import run_catalog_benchmark; print(json.dumps(run_catalog_benchmark(items=20000, lookups=500)))"
+    report = json.loads(subprocess.run([sys.executable, "-c", script], cwd=SRC, capture_output=True, check=True, text=True).stdout)
+
+    results = report["results"]
+    assert results["catalog"]["bytes_per_item"] < results["field_dicts"]["bytes_per_item"] * 0.7
+    assert results["catalog"]["bytes_per_item"] < results["zoho_records"]["bytes_per_item"] / 2
+    assert all(result["lookup_id_ns"] > 0 and result["lookup_sku_ns"] > 0 for result in results.values())
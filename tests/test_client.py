@@ -0,0 +1,39 @@
+from resources.items import list_items
+from utils.client import get_client, close_client
+from utils.setting import settings
+
+
+def test_get_client_is_shared():
+    client1 = get_client()
+    client2 = get_client()
+
+    assert client1 is client2, "The client should be reused between calls"
+
+    close_client()
+    assert client1.is_closed, "close_client should close the pooled client"
+    assert get_client() is not client1, "A new client should be created after closing"
+    close_client()
+
+
+def test_client_uses_pool_settings(monkeypatch):
+    monkeypatch.setattr(settings, "HTTP_MAX_CONNECTIONS", 7)
+    monkeypatch.setattr(settings, "HTTP_MAX_KEEPALIVE_CONNECTIONS", 3)
+    close_client()
+
+    pool = get_client()._transport._pool
+
+    assert pool._max_connections == 7
+    assert pool._max_keepalive_connections == 3
+    close_client()
+
+
+def test_requests_reuse_connection(zoho_stub):
+    zoho_stub.routes[("GET", "/items")] = {"code": 0, "items": [], "page_context": {"has_more_page": False}}
+
+    for page in range(1, 4):
+        response = list_items(page=page, per_page=10)
+        assert response is not None, "Response should not be None"
+
+    clients = {r["client"] for r in zoho_stub.requests}
+    assert len(zoho_stub.requests) == 4, "Expected one token refresh and three item requests"
+    assert len(clients) == 1, "All requests should share one keep-alive connection"
@@ -0,0 +1,108 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from resources.cache import get_cache_stats
+from resources.contacts import get_contact_async
+from utils.api import zoho_api_request, zoho_api_request_async
+from utils.coalesce import RequestCoalescer
+from utils.setting import settings
+
+
+@pytest.fixture
+def slow_stub(zoho_stub, monkeypatch):
+    """A stub slow enough for concurrent calls to overlap, with the cache off so only coalescing saves calls."""
+    monkeypatch.setattr(settings, "CACHE_ENABLED", False)
+    zoho_stub.routes[("GET", "/contacts/1")] = {"code": 0, "contact": {"contact_id": "1", "tags": []}}
+    zoho_stub.routes[("GET", "/items")] = {"code": 0, "items": [{"item_id": "1"}]}
+    zoho_stub.delay = 0.2
+    return zoho_stub
+
+
+def test_concurrent_gets_share_one_call(slow_stub):
+    async def main():
+        return await asyncio.gather(*(get_contact_async("1") for _ in range(5)))
+
+    results = asyncio.run(main())
+
+    assert slow_stub.count("GET", "/contacts/1") == 1
+    assert all(result == results[0] for result in results)
+    assert len({id(result) for result in results}) == 5, "Every caller should get its own copy"
+    results[0]["contact"]["tags"].append("changed")
+    assert results[1]["contact"]["tags"] == []
+    stats = get_cache_stats()["coalescing"]
+    assert stats["upstream_calls"] == 1
+    assert stats["coalesced"] == 4
+    assert stats["saved_rate"] == 0.8
+    assert stats["in_flight"] == 0
+
+
+def test_concurrent_sync_gets_share_one_call(slow_stub):
+    with ThreadPoolExecutor(4) as pool:
+        results = list(pool.map(lambda _: zoho_api_request("GET", "/items", params={"page": 1}), range(4)))
+
+    assert slow_stub.count("GET", "/items") == 1
+    assert all(result == {"code": 0, "items": [{"item_id": "1"}]} for result in results)
+    assert len({id(result) for result in results}) == 4
+
+
+def test_only_identical_gets_are_coalesced(slow_stub, monkeypatch):
+    slow_stub.routes[("POST", "/contacts")] = {"code": 0, "contact": {"contact_id": "2"}}
+
+    async def main():
+        await asyncio.gather(
+            zoho_api_request_async("GET", "/items", params={"page": 1}),
+            zoho_api_request_async("GET", "/items", params={"page": 2}),
+            zoho_api_request_async("POST", "/contacts", json_data={"contact_name": "A"}),
+            zoho_api_request_async("POST", "/contacts", json_data={"contact_name": "A"}),
+        )
+
+    asyncio.run(main())
+    assert slow_stub.count("GET", "/items") == 2
+    assert slow_stub.count("POST", "/contacts") == 2
+
+    monkeypatch.setattr(settings, "COALESCE_ENABLED", False)
+
+    async def disabled():
+        await asyncio.gather(*(zoho_api_request_async("GET", "/items") for _ in range(2)))
+
+    asyncio.run(disabled())
+    assert slow_stub.count("GET", "/items") == 4
+
+
+def test_a_cancelled_caller_leaves_the_call_to_the_others():
+    coalescer = RequestCoalescer()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.1)
+        return {"items": []}
+
+    async def main():
+        first = asyncio.ensure_future(coalescer.run_async(("GET", "/items"), fetch))
+        second = asyncio.ensure_future(coalescer.run_async(("GET", "/items"), fetch))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second, first
+
+    result, first = asyncio.run(main())
+
+    assert result == {"items": []}
+    assert first.cancelled()
+    assert calls == [1]
+    assert coalescer.stats()["coalesced"] == 1
+
+
+def test_errors_reach_every_caller():
+    coalescer = RequestCoalescer()
+
+    async def fail():
+        await asyncio.sleep(0.05)
+        raise ValueError("boom")
+
+    async def main():
+        return await asyncio.gather(*(coalescer.run_async(("GET", "/items"), fail) for _ in range(3)), return_exceptions=True)
+
+    assert [type(result) for result in asyncio.run(main())] == [ValueError] * 3
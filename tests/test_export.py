@@ -0,0 +1,101 @@
+import csv
+import json
+import os
+
+import pytest
+
+from export import main
+from utils.export import export, state_path
+from zoho_stub import paged_route
+
+
+def _orders(count=25):
+    return [
+        {"salesorder_id": str(i), "salesorder_number": f"SO-{i:03d}", "date": f"2024-01-{i % 28 + 1:02d}", "customer_name": f"Customer {i}", "total": i * 10.0}
+        for i in range(count)
+    ]
+
+
+def _pages(zoho_stub):
+    return [int(request["query"]["page"][0]) for request in zoho_stub.requests if request["path"] == "/salesorders"]
+
+
+def _read_jsonl(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_export_jsonl_and_csv(zoho_stub, tmp_path):
+    zoho_stub.routes[("GET", "/salesorders")] = paged_route(_orders(), "salesorders")
+
+    result = export("salesorders", str(tmp_path / "orders.jsonl"), per_page=10, concurrency=2)
+
+    assert result == {"path": str(tmp_path / "orders.jsonl"), "format": "jsonl", "records": 25, "pages": 3, "resumed_at": None}
+    assert _read_jsonl(tmp_path / "orders.jsonl") == _orders()
+    assert not os.path.exists(state_path(str(tmp_path / "orders.jsonl"))), "A completed export should drop its progress"
+
+    export("salesorders", str(tmp_path / "orders.csv"), params={"cf_region": "north"}, columns=["salesorder_id", "total"], per_page=10)
+    with open(tmp_path / "orders.csv", newline="") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ["salesorder_id", "total"] and len(rows) == 26
+    assert rows[3] == ["2", "20.0"]
+    assert zoho_stub.requests[-1]["query"]["cf_region"] == ["north"]
+
+
+def test_export_resumes_after_the_last_page_written(zoho_stub, tmp_path):
+    orders = _orders()
+    serve = paged_route(orders, "salesorders")
+    failures = [3]
+
+    def route(path, query, body):
+        if int(query["page"][0]) in failures:
+            failures.clear()
+            return {"code": 1, "message": "Injected failure"}
+        return serve(path, query, body)
+
+    zoho_stub.routes[("GET", "/salesorders")] = route
+    path = str(tmp_path / "orders.jsonl")
+    with pytest.raises(RuntimeError):
+        export("salesorders", path, per_page=10, concurrency=1)
+    assert len(_read_jsonl(path)) == 20
+    assert json.load(open(state_path(path)))["page"] == 2
+
+    with pytest.raises(ValueError):
+        export("salesorders", path, per_page=5)
+
+    zoho_stub.requests.clear()
+    result = export("salesorders", path, per_page=10, concurrency=1)
+
+    assert result["resumed_at"] == 3 and result["records"] == 25 and result["pages"] == 1
+    assert _pages(zoho_stub) == [3], "Pages already written should not be fetched again"
+    assert _read_jsonl(path) == orders
+
+
+def test_export_expands_sales_orders(zoho_stub, tmp_path):
+    orders = _orders(3)
+    zoho_stub.routes[("GET", "/salesorders")] = paged_route(orders, "salesorders")
+    for order in orders:
+        zoho_stub.routes[("GET", f"/salesorders/{order['salesorder_id']}")] = {"code": 0, "salesorder": {**order, "line_items": [{"item_id": "1", "quantity": 2}]}}
+
+    main(["salesorders", str(tmp_path / "orders.jsonl"), "--expand", "--per-page", "2"])
+
+    assert [order["line_items"] for order in _read_jsonl(tmp_path / "orders.jsonl")] == [[{"item_id": "1", "quantity": 2}]] * 3
+
+    with pytest.raises(SystemExit):
+        main(["items", str(tmp_path / "items.jsonl"), "--expand"])
+
+
+def test_export_parquet(zoho_stub, tmp_path):
+    zoho_stub.routes[("GET", "/salesorders")] = paged_route(_orders(), "salesorders")
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        with pytest.raises(RuntimeError):
+            export("salesorders", str(tmp_path / "orders.parquet"), per_page=10)
+        return
+
+    export("salesorders", str(tmp_path / "orders.parquet"), per_page=10)
+
+    table = pq.read_table(str(tmp_path / "orders.parquet"))
+    assert table.num_rows == 25
+    assert table.column("salesorder_number").to_pylist()[:2] == ["SO-000", "SO-001"]
@@ -0,0 +1,114 @@
+import json
+
+import pytest
+
+from benchmark import format_report, load_baseline, main as benchmark_main, run_benchmarks, run_startup_benchmark
+from fake_zoho import FakeZoho
+from resources.items import fetch_all_items, list_items
+from resources.salesorders import get_salesorder, list_sales_orders
+from tools.salesorders import create_sales_order
+from utils.auth import token_manager
+from utils.cache import response_cache
+from utils.client import close_client
+from utils.ratelimit import rate_limiter
+from utils.setting import settings
+
+
+@pytest.fixture
+def fake(monkeypatch, tmp_path):
+    """Point the api layer at a FakeZoho with a small data set."""
+    server = FakeZoho(items=450, contacts=20, salesorders=30, composite_items=5).start()
+    close_client()
+    token_manager.reset()
+    response_cache.clear()
+    rate_limiter.reset()
+    monkeypatch.setattr(settings, "RATE_LIMIT_PER_MINUTE", 0)
+    monkeypatch.setattr(settings, "RETRY_BACKOFF_BASE", 0.01)
+    monkeypatch.setattr(settings, "ZOHO_API_BASE_URL", server.url)
+    monkeypatch.setattr(settings, "ZOHO_AUTH_BASE_URL", server.url)
+    monkeypatch.setattr(settings, "ZOHO_CLIENT_ID", "id")
+    monkeypatch.setattr(settings, "ZOHO_CLIENT_SECRET", "secret")
+    monkeypatch.setattr(settings, "ZOHO_REFRESH_TOKEN", "refresh")
+    monkeypatch.setattr(settings, "ZOHO_ORGANIZATION_ID", server.organization_id)
+    monkeypatch.setattr(settings, "TOKEN_CACHE_FILE", str(tmp_path / "token_cach.json"))
+    yield server
+    token_manager.reset()
+    response_cache.clear()
+    rate_limiter.reset()
+    close_client()
+    server.stop()
+
+
+def test_lists_page_search_and_fetch_all(fake):
+    page = list_items(page=3, per_page=200)
+    assert len(page["items"]) == 50
+    assert page["has_more_page"] is False
+    assert page["total"] == 450
+
+    sku = fake.data["/items"][7]["sku"]
+    assert [item["sku"] for item in list_items(search_text=sku)["items"]] == [sku]
+
+    assert len(fetch_all_items(max_records=1000)["items"]) == 450
+    orders = list_sales_orders(per_page=5)["sales_orders"]
+    assert "line_items" not in orders[0], "Lists leave out the detail fields like Zoho"
+
+
+def test_create_then_get_salesorder(fake):
+    contact = fake.data["/contacts"][0]
+    item = fake.data["/items"][0]
+    line_items = [{"item_id": item["item_id"], "quantity": 2, "rate": item["rate"], "item_total": 2 * item["rate"], "tax_id": item["tax_id"]}]
+
+    created = create_sales_order(contact["contact_id"], line_items, po_number="PO-1")
+
+    assert created["message"] == "Sales Order has been created."
+    order = get_salesorder(created["sales_order"]["salesorder_id"])["sales_order"]
+    assert order["customer_id"] == contact["contact_id"]
+    assert order["line_items"][0]["item_id"] == item["item_id"]
+
+    assert create_sales_order("missing", line_items)["sales_order"] == {}
+
+
+def test_injected_errors_are_retried(fake):
+    list_items()
+    fake.fail_next(2, status=503, path="/items")
+
+    assert list_items(page=2)["items"]
+    assert fake.stats()["errors"] == {503: 2}
+
+
+def test_expired_token_is_refreshed(fake):
+    list_items()
+    tokens = fake.stats()["requests"]["/token"]
+    fake.expire_tokens()
+
+    assert list_items(page=2)["items"]
+    assert fake.stats()["requests"]["/token"] == tokens + 1
+
+
+def test_benchmark_and_baseline(tmp_path, capsys):
+    report = run_benchmarks(tools=["list_items", "match_items"], concurrency=[1, 2], calls=4, latency=0, items=100)
+
+    for tool in ("list_items", "match_items"):
+        for level in ("1", "2"):
+            result = report["results"][tool][level]
+            assert result["calls"] == 4
+            assert result["errors"] == 0
+            assert 0 < result["p50_ms"] <= result["p99_ms"]
+
+    baseline = tmp_path / "baseline.json"
+    benchmark_main(["--tools", "get_taxes", "--concurrency", "1", "--calls", "3", "--latency", "0", "--items", "50", "--save", str(baseline)])
+    assert "get_taxes" in json.loads(baseline.read_text())["results"]
+    benchmark_main(["--tools", "get_taxes", "--concurrency", "1", "--calls", "3", "--latency", "0", "--items", "50", "--compare", str(baseline)])
+    assert "p50_ms" in capsys.readouterr().out
+    assert "n/a" in format_report(report, load_baseline(str(baseline)))
+
+    with pytest.raises(ValueError):
+        run_benchmarks(tools=["missing_tool"], calls=1)
+
+
+def test_startup_benchmark():
+    report = run_startup_benchmark(runs=1, latency=0.05, think=0.3)
+
+    cold, warm = report["results"]["cold"], report["results"]["warm"]
+    assert cold["ready_ms"] > 0 and warm["ready_ms"] > 0
+    assert warm["first_call_ms"] < cold["first_call_ms"], "The warm-up should take the token fetch out of the first call"
@@ -0,0 +1,135 @@
+import asyncio
+import threading
+
+import pytest
+
+from resources.cache import get_cache_stats
+from utils.api import zoho_api_request, zoho_api_request_async
+from utils.httpcache import http_cache
+from utils.setting import settings
+
+
+@pytest.fixture
+def disk_cache(zoho_stub, monkeypatch, tmp_path):
+    """An empty on-disk HTTP cache, with the in memory cache expiring every entry at once."""
+    monkeypatch.setattr(settings, "HTTP_CACHE_FILE", str(tmp_path / "http_cache.sqlite3"))
+    monkeypatch.setattr(settings, "CACHE_TTLS", "/items=0,/contacts=0")
+    http_cache.clear()
+    yield http_cache
+    http_cache.clear()
+    http_cache.close()
+
+
+def etag_route(stub, payload: dict, etag: str = '"v1"'):
+    """A route answering a request whose If-None-Match is etag with a 304."""
+    def route(path, query, body):
+        if last_headers(stub, path).get("If-None-Match") == etag:
+            return 304, {}, {"ETag": etag}
+        return 200, payload, {"ETag": etag, "Last-Modified": "Wed, 14 Oct 2026 10:00:00 GMT"}
+    return route
+
+
+def last_headers(stub, path: str) -> dict:
+    return [request for request in stub.requests if request["path"] == path][-1]["headers"]
+
+
+def test_not_modified_is_served_from_disk(zoho_stub, disk_cache):
+    payload = {"code": 0, "items": [{"item_id": "1", "name": "Widget"}]}
+    zoho_stub.routes[("GET", "/items")] = etag_route(zoho_stub, payload)
+
+    assert zoho_api_request("GET", "/items", params={"page": 1}) == payload
+    assert "If-None-Match" not in last_headers(zoho_stub, "/items")
+    assert zoho_api_request("GET", "/items", params={"page": 1}) == payload
+    headers = last_headers(zoho_stub, "/items")
+    assert headers["If-None-Match"] == '"v1"'
+    assert headers["If-Modified-Since"] == "Wed, 14 Oct 2026 10:00:00 GMT"
+    assert asyncio.run(zoho_api_request_async("GET", "/items", params={"page": 1})) == payload
+
+    # a restart opens the file again
+    disk_cache.close()
+    assert zoho_api_request("GET", "/items", params={"page": 1}) == payload
+
+    stats = get_cache_stats()["http_cache"]
+    assert stats["revalidated"] == 3 and stats["stores"] == 1 and stats["entries"] == 1
+
+    assert zoho_api_request("GET", "/items", params={"page": 2}) == payload
+    assert "If-None-Match" not in last_headers(zoho_stub, "/items"), "Other params are another entry"
+
+
+def test_not_modified_with_content_encoding(zoho_stub, disk_cache):
+    payload = {"code": 0, "contact": {"contact_id": "1"}}
+
+    def contact(path, query, body):
+        if last_headers(zoho_stub, path).get("If-None-Match"):
+            return 304, {}, {"ETag": '"v1"', "Content-Encoding": "gzip"}
+        return 200, payload, {"ETag": '"v1"'}
+
+    zoho_stub.routes[("GET", "/contacts/1")] = contact
+
+    zoho_api_request("GET", "/contacts/1")
+    assert zoho_api_request("GET", "/contacts/1") == payload, "The stored body is decoded already"
+    assert asyncio.run(zoho_api_request_async("GET", "/contacts/1")) == payload
+    assert disk_cache.stats()["revalidated"] == 2
+
+
+def test_async_requests_keep_sqlite_off_the_event_loop(zoho_stub, disk_cache, monkeypatch):
+    zoho_stub.routes[("GET", "/items")] = etag_route(zoho_stub, {"code": 0, "items": []})
+    threads = []
+
+    def spy(method):
+        def call(*args, **kwargs):
+            threads.append(threading.get_ident())
+            return method(*args, **kwargs)
+        return call
+
+    for name in ("get", "revalidated_response", "store"):
+        monkeypatch.setattr(disk_cache, name, spy(getattr(disk_cache, name)))
+
+    async def fetch_twice():
+        await zoho_api_request_async("GET", "/items")
+        await zoho_api_request_async("GET", "/items")
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(fetch_twice())
+    assert len(threads) == 5 and loop_thread not in threads
+
+
+def test_unchanged_bodies_without_validators(zoho_stub, disk_cache):
+    contact = {"code": 0, "contact": {"contact_id": "1", "name": "A"}}
+    zoho_stub.routes[("GET", "/contacts/1")] = lambda path, query, body: contact
+
+    zoho_api_request("GET", "/contacts/1")
+    zoho_api_request("GET", "/contacts/1")
+    assert disk_cache.stats()["unchanged"] == 1
+    assert "If-None-Match" not in last_headers(zoho_stub, "/contacts/1")
+
+    contact["contact"]["name"] = "B"
+    assert zoho_api_request("GET", "/contacts/1")["contact"]["name"] == "B"
+    stats = disk_cache.stats()
+    assert stats["unchanged"] == 1 and stats["stores"] == 2 and stats["entries"] == 1
+
+
+def test_errors_and_writes_are_not_stored(zoho_stub, disk_cache):
+    zoho_stub.routes[("GET", "/contacts/2")] = lambda path, query, body: (404, {"code": 1002, "message": "missing"})
+
+    zoho_api_request("GET", "/contacts/2")
+    zoho_api_request("POST", "/contacts", json_data={"name": "A"})
+    zoho_api_request("GET", "/contacts/3", use_cache=False)
+
+    assert disk_cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_are_evicted(zoho_stub, disk_cache, monkeypatch):
+    monkeypatch.setattr(settings, "HTTP_CACHE_MAX_BYTES", 250)
+    for contact_id in "123":
+        zoho_stub.routes[("GET", f"/contacts/{contact_id}")] = {"code": 0, "contact": {"contact_id": contact_id, "notes": "x" * 50}}
+
+    zoho_api_request("GET", "/contacts/1")
+    zoho_api_request("GET", "/contacts/2")
+    zoho_api_request("GET", "/contacts/1")
+    zoho_api_request("GET", "/contacts/3")
+
+    stats = disk_cache.stats()
+    assert stats["evictions"] == 1 and stats["bytes"] <= 250
+    cached = {key for (key,) in disk_cache.connection().execute("SELECT key FROM http_responses")}
+    assert [key for key in cached if "/contacts/2" in key] == [], "The least recently used entry goes first"
@@ -0,0 +1,112 @@
+import asyncio
+
+import httpx
+
+from resources.contacts import get_contact, get_contact_async
+from resources.metrics import get_server_metrics
+from utils.api import zoho_api_request
+from utils.metrics import Histogram, endpoint_label, instrument, metrics, start_metrics_server
+
+
+def test_histogram_quantiles():
+    histogram = Histogram()
+    for ms in range(1, 101):
+        histogram.observe(ms / 1000)
+
+    assert histogram.count == 100
+    assert abs(histogram.sum - 5.05) < 1e-9
+    assert 0.025 <= histogram.quantile(0.5) <= 0.05
+    assert 0.05 <= histogram.quantile(0.99) <= 0.1
+    assert histogram.quantile(1.0) == 0.1
+    assert Histogram().quantile(0.5) == 0.0
+
+
+def test_endpoint_label():
+    assert endpoint_label("/salesorders/4600000012345/attachment") == "/salesorders/{id}/attachment"
+    assert endpoint_label("contacts/123") == "/contacts/{id}"
+    assert endpoint_label("/settings/taxes") == "/settings/taxes"
+
+
+def test_zoho_requests_are_recorded(zoho_stub):
+    zoho_stub.routes[("GET", "/contacts/1")] = {"code": 0, "contact": {"contact_id": "1"}}
+    zoho_stub.routes[("GET", "/contacts/2")] = (lambda path, query, body: (404, {"code": 1002, "message": "missing"}))
+
+    get_contact("1")
+    get_contact("2")
+    zoho_api_request("POST", "/salesorders", json_data={"customer_id": "1"})
+
+    snapshot = get_server_metrics()
+    contacts = snapshot["zoho_requests"]["GET /contacts/{id}"]
+    assert contacts["count"] == 2
+    assert contacts["statuses"] == {"200": 1, "404": 1}
+    assert contacts["bytes_received"] > 0
+    assert snapshot["zoho_requests"]["POST /salesorders"]["bytes_sent"] == len(b'{"customer_id":"1"}')
+    assert snapshot["zoho_requests"]["POST /token"]["count"] == 1
+    assert snapshot["token_refreshes"] == 1
+    assert snapshot["errors"] == {"http:404": 1, "zoho:1002": 1}
+
+
+def test_connection_errors_are_counted(zoho_stub, monkeypatch):
+    monkeypatch.setattr("utils.setting.settings.ZOHO_API_BASE_URL", "http://127.0.0.1:9")
+
+    assert zoho_api_request("GET", "/items") is None
+
+    assert metrics.snapshot()["errors"] == {"exception:ConnectError": 1}
+
+
+def test_instrumented_tools(zoho_stub):
+    zoho_stub.routes[("GET", "/contacts/1")] = {"code": 0, "contact": {"contact_id": "1"}}
+    tool = instrument("get_contact", get_contact_async)
+
+    asyncio.run(tool("1"))
+    asyncio.run(tool("1"))
+    failing = instrument("broken", lambda: None)
+    failing()
+
+    tools = metrics.snapshot()["tools"]
+    assert tools["get_contact"]["count"] == 2
+    assert tools["get_contact"]["errors"] == 0
+    assert tools["get_contact"]["p99_ms"] >= tools["get_contact"]["p50_ms"] > 0
+    assert tools["broken"]["errors"] == 1
+    assert tool.__wrapped__ is get_contact_async
+
+
+def test_prometheus_endpoint(zoho_stub):
+    get_contact("1")
+    server = start_metrics_server(0)
+    try:
+        response = httpx.get(f"http://127.0.0.1:{server.server_address[1]}/metrics")
+        missing = httpx.get(f"http://127.0.0.1:{server.server_address[1]}/other")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert response.status_code == 200
+    assert missing.status_code == 404
+    text = response.text
+    assert "# TYPE zoho_api_request_duration_seconds histogram" in text
+    assert 'zoho_api_request_duration_seconds_count{method="GET",endpoint="/contacts/{id}"} 1' in text
+    assert 'zoho_api_request_duration_seconds_bucket{method="GET",endpoint="/contacts/{id}",le="+Inf"} 1' in text
+    assert 'zoho_api_responses_total{method="GET",endpoint="/contacts/{id}",status="200"} 1' in text
+    assert "zoho_token_refreshes_total 1" in text
+
+
+def test_metrics_can_be_disabled(zoho_stub, monkeypatch):
+    monkeypatch.setattr("utils.setting.settings.METRICS_ENABLED", False)
+
+    get_contact("1")
+
+    assert metrics.snapshot()["zoho_requests"] == {}
+
+
+def test_startup_metrics(zoho_stub):
+    metrics.observe_startup("ready", 0.25)
+    tool = instrument("get_contact", get_contact_async)
+    asyncio.run(tool("1"))
+    first_call = metrics.snapshot()["startup_seconds"]["first_tool_call"]
+    asyncio.run(tool("1"))
+
+    startup = metrics.snapshot()["startup_seconds"]
+    assert startup["ready"] == 0.25
+    assert startup["first_tool_call"] == first_call > 0, "Only the first call should be recorded"
+    assert 'zoho_mcp_startup_seconds{phase="ready"} 0.250000' in metrics.prometheus()
@@ -0,0 +1,123 @@
+import time
+
+import pytest
+
+from resources.contacts import list_contacts, get_contact
+from resources.items import list_items
+from resources.mirror import get_mirror_status
+from resources.salesorders import list_sales_orders, get_salesorder
+from sync import main as sync_main
+from zoho_stub import paged_route
+
+
+def _items(count):
+    return [
+        {
+            "item_id": str(i),
+            "name": f"Widget {i}",
+            "sku": f"K10-{i:05d}",
+            "last_modified_time": f"2024-01-01T00:{i // 60 % 60:02d}:{i % 60:02d}+0000",
+        }
+        for i in range(count)
+    ]
+
+
+def test_full_sync_and_local_list(zoho_stub, mirror_db):
+    items = _items(450)
+    zoho_stub.routes[("GET", "/items")] = paged_route(items, "items")
+
+    written = mirror_db.sync(["items"])
+
+    assert written == {"items": 450}
+    response = list_items(page=1, per_page=10, search_text="K10-0004", source="local")
+    assert [item["item_id"] for item in response["items"]] == [str(i) for i in range(40, 50)]
+    assert response["has_more_page"] is False
+    assert response["total"] == 10
+
+    requests = zoho_stub.count("GET", "/items")
+    list_items(page=2, per_page=100, source="local")
+    assert zoho_stub.count("GET", "/items") == requests, "Local reads should not call Zoho"
+
+
+def test_incremental_sync(zoho_stub, mirror_db):
+    items = _items(300)
+    zoho_stub.routes[("GET", "/items")] = paged_route(items, "items")
+    mirror_db.sync(["items"])
+    requests = zoho_stub.count("GET", "/items")
+
+    items[5] = dict(items[5], name="Renamed widget", last_modified_time="2024-02-01T00:00:00+0000")
+    items.append({"item_id": "new", "name": "New widget", "sku": "NEW-1", "last_modified_time": "2024-02-01T00:00:01+0000"})
+
+    written = mirror_db.sync(["items"])
+
+    assert written["items"] < 10, "Only changed records should be written"
+    assert zoho_stub.count("GET", "/items") - requests == 1, "Only the newest page should be fetched"
+    names = {item["item_id"]: item["name"] for item in list_items(per_page=500, source="local")["items"]}
+    assert names["5"] == "Renamed widget"
+    assert names["new"] == "New widget"
+    assert len(names) == 301
+
+
+def test_full_sync_drops_deleted_records(zoho_stub, mirror_db):
+    items = _items(20)
+    zoho_stub.routes[("GET", "/items")] = paged_route(items, "items")
+    mirror_db.sync(["items"])
+
+    del items[3]
+    mirror_db.sync(["items"], full=True)
+
+    assert list_items(source="local")["total"] == 19
+
+
+def test_local_contacts_and_salesorders(zoho_stub, mirror_db):
+    zoho_stub.routes[("GET", "/contacts")] = paged_route([
+        {"contact_id": "1", "contact_name": "Sam Smith", "email": "sam@example.com", "last_modified_time": "2024-01-01"},
+        {"contact_id": "2", "contact_name": "Alex Jones", "email": "alex@example.com", "last_modified_time": "2024-01-02"},
+    ], "contacts")
+    zoho_stub.routes[("GET", "/salesorders")] = paged_route([
+        {"salesorder_id": "10", "customer_id": "1", "customer_name": "Sam Smith", "date": "2024-01-03", "cf_po_number": "PO-1", "last_modified_time": "2024-01-03"},
+        {"salesorder_id": "11", "customer_id": "2", "customer_name": "Alex Jones", "date": "2024-01-04", "cf_po_number": "PO-2", "last_modified_time": "2024-01-04"},
+    ], "salesorders")
+    mirror_db.sync(["contacts", "salesorders"])
+
+    contacts = list_contacts(query_params={"email": "alex@"}, source="local")["contacts"]
+    assert [contact["contact_id"] for contact in contacts] == ["2"]
+    assert get_contact("1", source="local")["contact"]["contact_name"] == "Sam Smith"
+    assert get_contact("missing", source="local") is None
+
+    orders = list_sales_orders(search_params={"cf_po_number": "PO-2"}, source="local")["sales_orders"]
+    assert [order["salesorder_id"] for order in orders] == ["11"]
+    assert get_salesorder("10", source="local")["sales_order"]["customer_id"] == "1"
+
+
+def test_local_reads_are_fast(zoho_stub, mirror_db):
+    zoho_stub.routes[("GET", "/items")] = paged_route(_items(2000), "items")
+    mirror_db.sync(["items"])
+
+    runs = 200
+    start = time.perf_counter()
+    for _ in range(runs):
+        list_items(page=1, per_page=10, sort_column="name", source="local")
+    elapsed = (time.perf_counter() - start) / runs
+
+    assert elapsed < 0.005, f"Local list_items took {elapsed * 1000:.2f}ms"
+
+
+def test_invalid_source():
+    with pytest.raises(ValueError):
+        list_items(source="cache")
+
+
+def test_mirror_status_and_cli(zoho_stub, mirror_db, capsys):
+    zoho_stub.routes[("GET", "/items")] = paged_route(_items(5), "items")
+
+    status = get_mirror_status()
+    assert status["items"]["last_synced_at"] is None
+
+    sync_main(["items", "--full"])
+
+    status = get_mirror_status()
+    assert status["items"]["records"] == 5
+    assert status["items"]["stale_seconds"] < 5
+    assert status["contacts"]["stale_seconds"] is None
+    assert "items: 5 records written" in capsys.readouterr().out
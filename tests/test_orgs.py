@@ -0,0 +1,87 @@
+import json
+
+import pytest
+
+from resources.contacts import get_contact, list_contacts
+from resources.organizations import list_organizations
+from tools.salesorders import create_sales_orders_bulk
+from utils.api import zoho_api_request
+from utils.orgs import org_registry
+from utils.setting import settings
+
+
+@pytest.fixture
+def orgs(zoho_stub, monkeypatch, tmp_path):
+    """Two more organizations, one of the default account and one with its own credentials."""
+    path = tmp_path / "orgs.json"
+    path.write_text(json.dumps({
+        "eu": {"organization_id": "eu-org"},
+        "partner": {"organization_id": "partner-org", "client_id": "partner-id", "client_secret": "partner-secret", "refresh_token": "partner-refresh"},
+    }))
+    monkeypatch.setattr(settings, "ORGS_FILE", str(path))
+    monkeypatch.setattr(settings, "ZOHO_CLIENT_ID", "default-id")
+    monkeypatch.setattr(settings, "ZOHO_REFRESH_TOKEN", "default-refresh")
+    zoho_stub.routes[("POST", "/token")] = lambda path, query, body: {"access_token": f"token-of-{query['client_id'][0]}", "expires_in": 3600}
+    zoho_stub.routes[("GET", "/contacts/1")] = lambda path, query, body: {"code": 0, "contact": {"contact_id": "1", "org": query["organization_id"][0]}}
+    return path
+
+
+def _requests(zoho_stub, path, method="GET"):
+    return [request for request in zoho_stub.requests if request["method"] == method and request["path"] == path]
+
+
+def test_resolve_organizations(orgs, tmp_path):
+    assert org_registry.get().organization_id == "stub-org"
+    assert org_registry.get("default").is_default
+    assert org_registry.get("stub-org").is_default
+    assert org_registry.get("eu").organization_id == "eu-org"
+    assert org_registry.get("partner-org").name == "partner"
+    assert org_registry.get("eu").token_cache_file == settings.TOKEN_CACHE_FILE, "The default account's orgs share its token"
+    assert org_registry.get("partner").token_cache_file == str(tmp_path / "token_cach.partner.json")
+    with pytest.raises(ValueError):
+        org_registry.get("missing")
+
+    organizations = list_organizations()["organizations"]
+    assert [organization["name"] for organization in organizations] == ["default", "eu", "partner"]
+    assert "refresh_token" not in json.dumps(organizations)
+
+
+def test_requests_go_to_their_organization(zoho_stub, orgs):
+    assert get_contact("1")["contact"]["org"] == "stub-org"
+    assert get_contact("1", org="eu")["contact"]["org"] == "eu-org"
+    assert get_contact("1", org="partner")["contact"]["org"] == "partner-org"
+
+    tokens = [request["query"]["client_id"][0] for request in _requests(zoho_stub, "/token", "POST")]
+    assert tokens == ["default-id", "partner-id"]
+    authorizations = [request["headers"]["Authorization"] for request in _requests(zoho_stub, "/contacts/1")]
+    assert authorizations[0] == authorizations[1], "Organizations of one account share the token"
+    assert authorizations[2] == "Zoho-oauthtoken token-of-partner-id"
+    clients = [request["client"] for request in _requests(zoho_stub, "/contacts/1")]
+    assert len(set(clients)) == 3, "Every organization has its own connection pool"
+
+
+def test_cache_is_per_organization(zoho_stub, orgs):
+    get_contact("1")
+    get_contact("1", org="eu")
+    get_contact("1")
+    get_contact("1", org="eu")
+    assert len(_requests(zoho_stub, "/contacts/1")) == 2
+
+    zoho_api_request("PUT", "/contacts/1", json_data={}, org="eu")
+    get_contact("1")
+    get_contact("1", org="eu")
+
+    orgs_read = [request["query"]["organization_id"][0] for request in _requests(zoho_stub, "/contacts/1")]
+    assert orgs_read == ["stub-org", "eu-org", "eu-org"], "A write only invalidates its own organization"
+
+
+def test_unknown_organization(zoho_stub, orgs):
+    with pytest.raises(ValueError):
+        get_contact("1", org="missing")
+    with pytest.raises(ValueError):
+        zoho_api_request("GET", "/contacts/1", org="missing")
+    with pytest.raises(ValueError):
+        create_sales_orders_bulk([], org="missing")
+    with pytest.raises(ValueError):
+        list_contacts(source="local", org="eu")
+    assert _requests(zoho_stub, "/contacts/1") == []
@@ -0,0 +1,88 @@
+import asyncio
+import time
+
+import pytest
+
+from resources.items import iter_items, fetch_all_items, fetch_all_items_async
+from resources.contacts import fetch_all_contacts
+from utils.pager import iter_records, aiter_records
+from zoho_stub import paged_route
+
+
+def _paged_route(records, with_total=True):
+    return paged_route(records, "items", with_total)
+
+
+@pytest.mark.parametrize("with_total", [True, False])
+def test_iter_records_all_pages_in_order(zoho_stub, with_total):
+    records = [{"item_id": str(i)} for i in range(23)]
+    zoho_stub.routes[("GET", "/items")] = _paged_route(records, with_total)
+
+    result = list(iter_records("/items", "items", per_page=5, concurrency=3))
+
+    assert result == records
+    assert zoho_stub.count("GET", "/items") == 5
+
+
+def test_aiter_records_all_pages_in_order(zoho_stub):
+    records = [{"item_id": str(i)} for i in range(23)]
+    zoho_stub.routes[("GET", "/items")] = _paged_route(records)
+
+    async def run():
+        return [record async for record in aiter_records("/items", "items", per_page=5, concurrency=3)]
+
+    assert asyncio.run(run()) == records
+
+
+def test_pages_fetched_concurrently(zoho_stub):
+    records = [{"item_id": str(i)} for i in range(40)]
+    zoho_stub.routes[("GET", "/items")] = _paged_route(records)
+    list(iter_records("/items", "items", per_page=40))
+    zoho_stub.delay = 0.2
+
+    start = time.perf_counter()
+    result = list(iter_records("/items", "items", per_page=5, concurrency=7))
+    elapsed = time.perf_counter() - start
+
+    assert len(result) == 40
+    # one page on its own, then the other seven together
+    assert elapsed < 0.2 * 4, f"8 pages took {elapsed:.2f}s"
+
+
+def test_iterator_is_lazy(zoho_stub):
+    records = [{"item_id": str(i)} for i in range(100)]
+    zoho_stub.routes[("GET", "/items")] = _paged_route(records)
+
+    records_iter = iter_records("/items", "items", per_page=10, concurrency=2)
+    first = [next(records_iter) for _ in range(12)]
+    records_iter.close()
+
+    assert first == records[:12]
+    assert zoho_stub.count("GET", "/items") <= 4, "Only pages near the consumer should be fetched"
+
+
+def test_iter_items_passes_filters(zoho_stub):
+    zoho_stub.routes[("GET", "/items")] = _paged_route([{"item_id": "1"}])
+
+    assert list(iter_items(search_text="K10")) == [{"item_id": "1"}]
+    assert zoho_stub.requests[-1]["query"]["search_text"] == ["K10"]
+
+
+def test_fetch_all_items_caps_records(zoho_stub):
+    records = [{"item_id": str(i)} for i in range(30)]
+    zoho_stub.routes[("GET", "/items")] = _paged_route(records)
+
+    result = fetch_all_items(max_records=25)
+    assert result["count"] == 25
+    assert result["truncated"] is True
+    assert result["items"] == records[:25]
+
+    result = asyncio.run(fetch_all_items_async(max_records=100))
+    assert result["count"] == 30
+    assert result["truncated"] is False
+
+
+def test_fetch_all_reports_errors(zoho_stub):
+    zoho_stub.routes[("GET", "/contacts")] = {"code": 57, "message": "You are not authorized"}
+
+    assert fetch_all_contacts() is None
@@ -0,0 +1,58 @@
+import json
+
+import pytest
+
+from resources.contacts import get_contact
+from resources.items import list_items
+from resources.salesorders import fetch_all_sales_orders
+from utils.projection import COMPACT_FIELDS, shape_record, shape_records
+
+ITEMS = [
+    {"item_id": str(i), "name": f"Item {i}", "sku": f"SKU-{i}", "rate": i * 1.5, "status": "active",
+     "description": "A long description " * 10, "custom_fields": [{"label": "Color", "value": "red"}] * 5}
+    for i in range(100)
+]
+
+
+def test_shape_records():
+    assert shape_records(ITEMS, "items") is ITEMS
+    assert shape_records(ITEMS[:2], "items", ["item_id", "rate", "missing"]) == [{"item_id": "0", "rate": 0.0}, {"item_id": "1", "rate": 1.5}]
+    compact = shape_records(ITEMS[:2], "items", compact=True)
+    assert compact["columns"] == COMPACT_FIELDS["items"]
+    assert compact["rows"][1][:3] == ["1", "Item 1", "SKU-1"]
+    assert shape_records([], "items", ["name"], compact=True) == {"columns": ["name"], "rows": []}
+    assert shape_record(ITEMS[0], "items", compact=True) == {"item_id": "0", "name": "Item 0", "sku": "SKU-0", "rate": 0.0, "status": "active"}
+    assert shape_record(None, "items", ["name"]) is None
+
+
+def test_list_items_fields_and_compact(zoho_stub):
+    zoho_stub.routes[("GET", "/items")] = {"code": 0, "items": ITEMS, "page_context": {"has_more_page": False}}
+
+    full = list_items()
+    projected = list_items(fields=["item_id", "name"])
+    compact = list_items(compact=True)
+
+    assert projected["items"][5] == {"item_id": "5", "name": "Item 5"}
+    assert compact["items"]["rows"][5][compact["items"]["columns"].index("rate")] == 7.5
+    full_size, compact_size = len(json.dumps(full)), len(json.dumps(compact))
+    assert compact_size < full_size / 5, f"compact {compact_size} bytes vs full {full_size} bytes"
+    assert len(json.dumps(projected)) < full_size / 10
+
+
+def test_get_and_fetch_all(zoho_stub):
+    zoho_stub.routes[("GET", "/contacts/1")] = {"code": 0, "contact": {"contact_id": "1", "contact_name": "Ada", "addresses": [{}] * 3}}
+    zoho_stub.routes[("GET", "/salesorders")] = {"code": 0, "salesorders": [{"salesorder_id": "9", "total": 10, "line_items": []}]}
+
+    assert get_contact("1", fields=["contact_name"])["contact"] == {"contact_name": "Ada"}
+    assert get_contact("1", compact=True)["contact"] == {"contact_id": "1", "contact_name": "Ada"}
+    result = fetch_all_sales_orders(compact=True, fields=["salesorder_id", "total"])
+    assert result["sales_orders"] == {"columns": ["salesorder_id", "total"], "rows": [["9", 10]]}
+    assert result["count"] == 1
+
+
+def test_invalid_fields(zoho_stub):
+    with pytest.raises(ValueError):
+        list_items(fields="name")
+    with pytest.raises(ValueError):
+        fetch_all_sales_orders(fields=["", "total"])
+    assert zoho_stub.requests == []
@@ -0,0 +1,155 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from utils.api import zoho_api_request
+from utils.ratelimit import RateLimitError, TokenBucket, rate_limiter
+from utils.setting import settings
+
+
+def _drain(bucket, priority):
+    taken = 0
+    while bucket.try_acquire(priority) == 0:
+        taken += 1
+    return taken
+
+
+def test_bulk_requests_leave_reserve_for_interactive():
+    bucket = TokenBucket("org", per_minute=60, burst=10, reserve=0.2)
+
+    assert _drain(bucket, "bulk") == 8
+    assert bucket.try_acquire("interactive") == 0
+    assert bucket.try_acquire("interactive") == 0
+    assert bucket.try_acquire("interactive") > 0
+
+
+def test_daily_limit():
+    bucket = TokenBucket("org", per_minute=600, burst=10, per_day=3)
+
+    for _ in range(3):
+        bucket.acquire()
+    with pytest.raises(RateLimitError):
+        bucket.acquire()
+
+
+def test_buckets_share_state_file(tmp_path):
+    state_file = str(tmp_path / "ratelimit.json")
+    # two buckets on the same file behave like two processes sharing a budget
+    bucket1 = TokenBucket("org", per_minute=60, burst=6, reserve=0, state_file=state_file)
+    bucket2 = TokenBucket("org", per_minute=60, burst=6, reserve=0, state_file=state_file)
+
+    assert _drain(bucket1, "interactive") + _drain(bucket2, "interactive") == 6
+
+
+def test_per_org_limits(monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_PER_MINUTE", 100)
+    monkeypatch.setattr(settings, "RATE_LIMITS", "big=1000/50000")
+    rate_limiter.reset()
+
+    assert rate_limiter.bucket("big").rate == 1000 / 60
+    assert rate_limiter.bucket("big").per_day == 50000
+    assert rate_limiter.bucket("other").rate == 100 / 60
+    assert rate_limiter.bucket("big") is not rate_limiter.bucket("other")
+    rate_limiter.reset()
+
+
+def test_retry_after_is_honored(zoho_stub):
+    calls = []
+
+    def items(path, query, body):
+        calls.append(time.perf_counter())
+        if len(calls) == 1:
+            return 429, {"code": 44, "message": "too many requests"}, {"Retry-After": "0.3"}
+        return {"code": 0, "items": []}
+
+    zoho_stub.routes[("GET", "/items")] = items
+
+    response = zoho_api_request("GET", "/items")
+
+    assert response == {"code": 0, "items": []}
+    assert calls[1] - calls[0] >= 0.3
+
+
+def test_server_errors_are_retried_with_backoff(zoho_stub, monkeypatch):
+    monkeypatch.setattr(settings, "RETRY_BACKOFF_BASE", 0.01)
+    attempts = []
+
+    def items(path, query, body):
+        attempts.append(1)
+        if len(attempts) < 3:
+            return 503, {"code": 1, "message": "unavailable"}
+        return {"code": 0, "items": []}
+
+    zoho_stub.routes[("GET", "/items")] = items
+
+    assert zoho_api_request("GET", "/items") == {"code": 0, "items": []}
+    assert len(attempts) == 3
+
+    monkeypatch.setattr(settings, "RETRY_MAX_ATTEMPTS", 1)
+    attempts.clear()
+    zoho_api_request("GET", "/items", params={"page": 2})
+    assert len(attempts) == 2, "Retries should stop after RETRY_MAX_ATTEMPTS"
+
+
+def test_server_errors_of_writes_are_not_retried(zoho_stub, monkeypatch):
+    monkeypatch.setattr(settings, "RETRY_BACKOFF_BASE", 0.01)
+    zoho_stub.routes[("POST", "/salesorders")] = lambda path, query, body: (502, {"code": 1, "message": "bad gateway"})
+    throttled = []
+
+    def contacts(path, query, body):
+        throttled.append(1)
+        if len(throttled) == 1:
+            return 429, {"code": 44, "message": "too many requests"}, {"Retry-After": "0"}
+        return {"code": 0, "contact": {}}
+
+    zoho_stub.routes[("POST", "/contacts")] = contacts
+
+    zoho_api_request("POST", "/salesorders", json_data={"customer_id": "1"})
+    assert zoho_stub.count("POST", "/salesorders") == 1, "Zoho may have created the order before the 502"
+
+    assert zoho_api_request("POST", "/contacts", json_data={"contact_name": "A"}) == {"code": 0, "contact": {}}
+    assert len(throttled) == 2, "A 429 was rejected before processing and is retried"
+
+
+def test_sustained_throughput_under_quota(zoho_stub, monkeypatch):
+    per_second = 20
+    burst = 5
+    # the stub rejects anything over the quota in a sliding one second window,
+    # with a little slack for requests bunching up on the way to the stub
+    quota = per_second + burst + 2
+    window = deque()
+    lock = threading.Lock()
+    rejected = []
+
+    def items(path, query, body):
+        now = time.monotonic()
+        with lock:
+            while window and now - window[0] > 1:
+                window.popleft()
+            if len(window) >= quota:
+                rejected.append(now)
+                return 429, {"code": 44, "message": "too many requests"}
+            window.append(now)
+        return {"code": 0, "items": []}
+
+    zoho_stub.routes[("GET", "/items")] = items
+    zoho_api_request("GET", "/items", use_cache=False)
+    monkeypatch.setattr(settings, "RATE_LIMIT_PER_MINUTE", per_second * 60)
+    monkeypatch.setattr(settings, "RATE_LIMIT_BURST", burst)
+    monkeypatch.setattr(settings, "RETRY_MAX_ATTEMPTS", 0)
+    rate_limiter.reset()
+    time.sleep(1.1)
+
+    calls = 45
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda page: zoho_api_request("GET", "/items", params={"page": page}, use_cache=False), range(calls)))
+    elapsed = time.perf_counter() - start
+
+    assert rejected == [], "The limiter should keep requests under the quota"
+    assert all(result == {"code": 0, "items": []} for result in results)
+    throughput = calls / elapsed
+    assert per_second * 0.8 < throughput < quota, f"throughput was {throughput:.1f}/s"
@@ -0,0 +1,116 @@
+import asyncio
+
+import pytest
+from mcp.server.fastmcp import FastMCP
+from mcp.server.fastmcp.exceptions import ToolError
+
+from benchmark import format_replay_report, main as benchmark_main, run_replay
+from fake_zoho import FakeZoho
+from resources.contacts import get_contact
+from server import register_resources, register_tools
+from utils.api import zoho_api_request
+from utils.recorder import REDACTED, TraceRecorder, read_trace, redact, trace_recorder
+
+
+@pytest.fixture
+def recorder():
+    yield trace_recorder
+    trace_recorder.stop()
+
+
+def test_redact():
+    value = {"refresh_token": "r", "nested": [{"client_secret": "s", "name": "n"}], "Authorization": "t", "rate": 1}
+
+    assert redact(value) == {"refresh_token": REDACTED, "nested": [{"client_secret": REDACTED, "name": "n"}], "Authorization": REDACTED, "rate": 1}
+
+
+def test_tool_calls_and_zoho_requests_are_recorded(zoho_stub, recorder, tmp_path):
+    zoho_stub.routes[("GET", "/contacts/1")] = {"code": 0, "contact": {"contact_id": "1"}}
+    zoho_stub.routes[("GET", "/contacts/2")] = (lambda path, query, body: (404, {"code": 1002, "message": "missing"}))
+    mcp_server = FastMCP(name="test")
+    register_tools(mcp_server)
+    register_resources(mcp_server)
+    path = str(tmp_path / "trace.jsonl.gz")
+
+    recorder.start(path)
+    asyncio.run(mcp_server.call_tool("get_contact", {"contact_id": "1"}))
+    # the tool returns None, which the MCP server turns into an error
+    with pytest.raises(ToolError):
+        asyncio.run(mcp_server.call_tool("get_contact", {"contact_id": "2"}))
+    zoho_api_request("POST", "/salesorders", json_data={"customer_id": "1", "api_key": "k"})
+    recorder.stop()
+    get_contact("1")
+
+    header, *entries = read_trace(path)
+    assert header["type"] == "trace" and header["responses"] is True
+    tools = [entry for entry in entries if entry["type"] == "tool"]
+    assert [(entry["tool"], entry["args"]["contact_id"], entry["ok"]) for entry in tools] == [("get_contact", "1", True), ("get_contact", "2", False)]
+    assert tools[0]["args"]["source"] == "remote", "The arguments the server filled in are recorded too"
+    assert tools[0]["ms"] > 0 and tools[0]["bytes"] > 0 and tools[1]["t"] >= tools[0]["t"]
+
+    zoho = {(entry["method"], entry["endpoint"]): entry for entry in entries if entry["type"] == "zoho"}
+    assert len(zoho) == 3, "The token refresh isn't a Zoho API request and the call after stop isn't recorded"
+    first = zoho["GET", "/contacts/1"]
+    assert first["call"] == tools[0]["id"] and first["status"] == 200
+    assert first["response"]["contact"] == {"contact_id": "1"}
+    assert zoho["GET", "/contacts/2"]["status"] == 404
+    assert zoho["POST", "/salesorders"]["call"] is None
+    assert zoho["POST", "/salesorders"]["body"] == {"customer_id": "1", "api_key": REDACTED}
+
+
+def test_recording_without_responses(zoho_stub, monkeypatch, tmp_path):
+    zoho_stub.routes[("GET", "/contacts/1")] = {"code": 0, "contact": {"contact_id": "1"}}
+    monkeypatch.setattr("utils.setting.settings.RECORD_RESPONSES", False)
+    recorder = TraceRecorder()
+    path = str(tmp_path / "trace.jsonl")
+
+    recorder.start(path)
+    recorder.wrap("get_contact", get_contact)(contact_id="1")
+    recorder.stop()
+
+    entries = list(read_trace(path))
+    assert [entry["type"] for entry in entries] == ["trace", "tool"]
+    assert entries[1]["args"] == {"contact_id": "1"} and entries[1]["ok"] is True
+
+
+def test_fake_serves_recorded_responses():
+    fake = FakeZoho(items=10, contacts=2, salesorders=2, composite_items=1)
+    loaded = fake.load_recorded([
+        {"type": "trace"},
+        {"type": "zoho", "method": "GET", "endpoint": "/contacts/x", "params": {"organization_id": "other", "page": 1}, "status": 200, "response": {"code": 0, "contact": {"contact_id": "x"}}},
+        {"type": "zoho", "method": "GET", "endpoint": "/contacts/y", "params": {}, "status": 200},
+    ])
+
+    assert loaded == 1
+    assert fake._route("GET", "/contacts/x", {"page": ["1"], "organization_id": [fake.organization_id]}, b"") == (200, {"code": 0, "contact": {"contact_id": "x"}})
+    assert fake._route("GET", "/contacts/x", {}, b"")[0] == 404
+
+
+def test_replay(zoho_stub, recorder, tmp_path, capsys):
+    zoho_stub.routes[("GET", "/contacts/recorded")] = {"code": 0, "contact": {"contact_id": "recorded"}}
+    mcp_server = FastMCP(name="test")
+    register_tools(mcp_server)
+    register_resources(mcp_server)
+    path = str(tmp_path / "trace.jsonl")
+    recorder.start(path)
+    for _ in range(3):
+        asyncio.run(mcp_server.call_tool("get_contact", {"contact_id": "recorded"}))
+    asyncio.run(mcp_server.call_tool("get_taxes", {}))
+    recorder.stop()
+
+    report = run_replay(path, speed=None, concurrency=[1, 2], latency=0, items=20)
+
+    assert report["config"]["calls"] == 4
+    contact = report["results"]["get_contact"]["2"]
+    assert contact["calls"] == 3 and contact["errors"] == 0, "The fake has no contact 'recorded', it must come from the trace"
+    assert contact["recorded_p50_ms"] > 0
+    assert report["results"]["all"]["1"]["calls"] == 4
+    assert "recorded p50 ms: get_contact" in format_replay_report(report)
+
+    benchmark_main(["--replay", path, "--speed", "10", "--concurrency", "1", "--latency", "0", "--items", "20"])
+    assert "replayed 4 calls at 10x speed" in capsys.readouterr().out
+
+    empty = tmp_path / "empty.jsonl"
+    empty.write_text('{"type": "trace"}\n')
+    with pytest.raises(ValueError):
+        run_replay(str(empty))
@@ -0,0 +1,107 @@
+import asyncio
+import random
+import string
+import time
+
+from resources.items import match_items, match_items_async
+from utils.search import ItemIndex, item_index
+from zoho_stub import paged_route
+
+
+def _catalog():
+    return [
+        {"item_id": "1", "name": "Hex Bolt M8 x 40 Zinc", "sku": "HB-M8-40", "description": "Grade 8.8 hex head bolt", "rate": 0.4, "last_modified_time": "2024-01-01T00:00:01+0000"},
+        {"item_id": "2", "name": "Hex Nut M8 Zinc", "sku": "HN-M8", "description": "Hex nut for M8 bolts", "rate": 0.1, "last_modified_time": "2024-01-01T00:00:02+0000"},
+        {"item_id": "3", "name": "Flat Washer M8", "sku": "FW-M8", "description": "Zinc plated flat washer", "rate": 0.05, "last_modified_time": "2024-01-01T00:00:03+0000"},
+        {"item_id": "4", "name": "Butterfly Valve DN50", "sku": "BV-50", "description": "Cast iron wafer valve with EPDM seat", "rate": 42.0, "last_modified_time": "2024-01-01T00:00:04+0000"},
+    ]
+
+
+def test_match_items_ranks_candidates(zoho_stub):
+    zoho_stub.routes[("GET", "/items")] = paged_route(_catalog(), "items")
+
+    response = match_items(["hb m8 40", "hex bolt m8x40", "buterfly valve", "epdm wafer", "nothing like it"], limit=2)
+
+    best = [match["candidates"][0]["item_id"] if match["candidates"] else None for match in response["matches"]]
+    assert best == ["1", "1", "4", "4", None]
+    assert response["matches"][0]["candidates"][0]["score"] == 1.0, "An exact SKU ignoring separators should score 1"
+    assert response["matches"][0]["candidates"][0]["rate"] == 0.4
+    assert response["indexed_items"] == 4
+
+    requests = zoho_stub.count("GET", "/items")
+    match_items(["hex nut"])
+    assert zoho_stub.count("GET", "/items") == requests, "Matching should not call Zoho while the index is fresh"
+
+
+def test_match_items_async(zoho_stub):
+    zoho_stub.routes[("GET", "/items")] = paged_route(_catalog(), "items")
+
+    response = asyncio.run(match_items_async(["flat washer"]))
+
+    assert response["matches"][0]["candidates"][0]["item_id"] == "3"
+
+
+def test_incremental_refresh(zoho_stub):
+    items = _catalog()
+    zoho_stub.routes[("GET", "/items")] = paged_route(items, "items")
+    item_index.refresh()
+    requests = zoho_stub.count("GET", "/items")
+
+    items[1] = dict(items[1], name="Nyloc Nut M8", sku="NN-M8", last_modified_time="2024-02-01T00:00:00+0000")
+    item_index.refresh()
+
+    assert zoho_stub.count("GET", "/items") - requests == 1
+    assert item_index.match("nyloc nut")[0]["item_id"] == "2"
+    assert item_index.match("HN-M8")[0]["score"] < 1, "The old SKU should be gone"
+    assert len(item_index) == 4
+
+
+def test_updates_replace_and_compact():
+    index = ItemIndex()
+    index.add({"item_id": str(i), "name": f"Part {i}", "sku": f"P-{i}"} for i in range(100))
+    for version in range(30):
+        index.add({"item_id": str(i), "name": f"Part {i} rev {version}", "sku": f"P-{i}"} for i in range(100))
+    index.remove("5")
+
+    assert len(index) == 99
+    assert index.stats()["dead_slots"] <= 1000 / 4
+    assert index.match("part 7 rev 29")[0]["item_id"] == "7"
+    assert all(candidate["item_id"] != "5" for candidate in index.match("part 5 rev 29"))
+
+
+def test_match_is_sub_millisecond_on_100k_items():
+    rnd = random.Random(7)
+    vocabulary = ["".join(rnd.choices(string.ascii_lowercase, k=rnd.randint(3, 9))) for _ in range(2000)]
+    items = [
+        {
+            "item_id": str(i),
+            "name": " ".join(rnd.choices(vocabulary, k=3)) + f" {rnd.randint(1, 500)}mm",
+            "sku": f"{rnd.choice('ABCDEFG')}{rnd.randint(10, 99)}-{i:06d}",
+            "description": " ".join(rnd.choices(vocabulary, k=6)),
+        }
+        for i in range(100_000)
+    ]
+    index = ItemIndex()
+    index.add(items)
+
+    queries = []
+    for item in rnd.sample(items, 100):
+        words = item["name"].split()
+        queries += [(item["item_id"], item["name"]), (item["item_id"], item["sku"].replace("-", "")), (item["item_id"], words[0] + "x " + " ".join(words[1:]))]
+
+    found = sum(
+        any(candidate["item_id"] == item_id for candidate in index.match(query))
+        for item_id, query in queries
+    )
+    assert found / len(queries) > 0.95
+
+    # best of three rounds, to not fail on a noisy machine
+    medians = []
+    for _ in range(3):
+        timings = []
+        for _, query in queries:
+            start = time.perf_counter()
+            index.match(query)
+            timings.append(time.perf_counter() - start)
+        medians.append(sorted(timings)[len(timings) // 2])
+    assert min(medians) < 0.001, f"median match took {min(medians) * 1000:.2f}ms"
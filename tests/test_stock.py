@@ -0,0 +1,133 @@
+import asyncio
+import math
+import time
+from array import array
+from datetime import date, timedelta
+
+import pytest
+
+from resources.stock import stock_report, stock_report_async
+from utils.catalog import Catalog
+from utils.stock import stock_report as compute_stock_report, units_sold
+from zoho_stub import paged_route
+
+
+def _days_ago(days):
+    return (date.today() - timedelta(days=days)).isoformat()
+
+
+def _items():
+    return [
+        # 20 units left at a reorder level of 50, sells 3 a day
+        {"item_id": "1", "name": "Hex Bolt M8", "sku": "HB-M8", "rate": 2.0, "stock_on_hand": 30, "available_stock": 20, "reorder_level": 50,
+         "warehouses": [{"warehouse_name": "Main", "warehouse_stock_on_hand": 20}, {"warehouse_name": "East", "warehouse_stock_on_hand": 10}]},
+        # no available stock sent, 100 on hand less 95 committed, sells 1 a day
+        {"item_id": "2", "name": "Hex Nut M8", "sku": "HN-M8", "rate": 1.0, "stock_on_hand": 100, "committed_stock": 95, "reorder_level": 10},
+        # plenty of stock and no reorder level
+        {"item_id": "3", "name": "Flat Washer M8", "sku": "FW-M8", "rate": 0.5, "stock_on_hand": 1000, "available_stock": 1000},
+        # nothing known
+        {"item_id": "4", "name": "Spring Washer M8", "sku": "SW-M8"},
+    ]
+
+
+def _orders():
+    return [
+        {"salesorder_id": "o1", "date": _days_ago(1), "status": "confirmed", "line_items": [{"item_id": "1", "quantity": 60}, {"item_id": "2", "quantity": 20}]},
+        {"salesorder_id": "o2", "date": _days_ago(2), "status": "draft", "line_items": [{"item_id": "1", "quantity": 500}]},
+        {"salesorder_id": "o3", "date": _days_ago(15), "status": "fulfilled", "line_items": [{"item_id": "1", "quantity": 30}]},
+        {"salesorder_id": "o4", "date": _days_ago(40), "status": "fulfilled", "line_items": [{"item_id": "3", "quantity": 900}]},
+    ]
+
+
+def _stub(zoho_stub, orders):
+    zoho_stub.routes[("GET", "/items")] = paged_route(_items(), "items")
+    zoho_stub.routes[("GET", "/compositeitems")] = paged_route([], "composite_items")
+    # the list leaves out the line items, like Zoho
+    zoho_stub.routes[("GET", "/salesorders")] = paged_route([{key: value for key, value in order.items() if key != "line_items"} for order in orders], "salesorders")
+    for order in orders:
+        zoho_stub.routes[("GET", f"/salesorders/{order['salesorder_id']}")] = {"code": 0, "salesorder": order}
+
+
+def test_units_sold_skips_drafts_and_void_orders():
+    orders = _orders() + [{"status": "void", "line_items": [{"item_id": "2", "quantity": 7}]}, {"line_items": [{"item_id": "2", "quantity": "bad"}]}]
+    assert units_sold(orders) == {"1": 90.0, "2": 20.0, "3": 900.0}
+
+
+def test_compute_stock_report():
+    store = Catalog()
+    store.add(_items())
+
+    report = compute_stock_report(store.columns(), {"1": 90.0, "2": 30.0}, days=30, cover_days=14, limit=10)
+
+    assert report["items"] == 4
+    assert report["below_reorder"]["count"] == 2
+    assert report["below_reorder"]["rows"] == [
+        ["1", "HB-M8", "Hex Bolt M8", 20.0, 50.0, 30.0, 6.67],
+        ["2", "HN-M8", "Hex Nut M8", 5.0, 10.0, 5.0, 5.0],
+    ]
+    assert report["low_cover"]["rows"] == [
+        ["2", "HN-M8", "Hex Nut M8", 5.0, 1.0, 5.0],
+        ["1", "HB-M8", "Hex Bolt M8", 20.0, 3.0, 6.67],
+    ]
+    assert report["stock_value"] == {"total": 660.0, "by_warehouse": {"East": 20.0, "Main": 40.0, "unallocated": 600.0}}
+    assert report["velocity"] == {"days": 30, "items_sold": 2, "units_sold": 120.0}
+
+    assert compute_stock_report(store.columns(), {}, days=30, cover_days=14, limit=1)["below_reorder"]["rows"][0][-1] is None, \
+        "Items that don't sell have no days of cover"
+
+
+def test_stock_report(zoho_stub):
+    _stub(zoho_stub, _orders())
+
+    report = stock_report(days=30)
+
+    # o2 is a draft and o4 is older than 30 days, only o1 and o3 are fetched
+    assert zoho_stub.count("GET", "/salesorders/o1") == 1 and zoho_stub.count("GET", "/salesorders/o3") == 1
+    assert zoho_stub.count("GET", "/salesorders/o2") == 0 and zoho_stub.count("GET", "/salesorders/o4") == 0
+    assert report["velocity"] == {"days": 30, "items_sold": 2, "units_sold": 110.0, "orders_read": 2, "orders_failed": 0, "truncated": False}
+    assert [row[0] for row in report["below_reorder"]["rows"]] == ["1", "2"]
+    assert report["low_cover"]["count"] == 2
+
+    limited = asyncio.run(stock_report_async(days=30, max_orders=1, limit=1))
+    assert limited["velocity"]["orders_read"] == 1 and limited["velocity"]["truncated"]
+    assert len(limited["below_reorder"]["rows"]) == 1 and limited["below_reorder"]["count"] == 2
+
+    with pytest.raises(ValueError):
+        stock_report(days=0)
+    with pytest.raises(ValueError):
+        stock_report(cover_days=-1)
+
+
+def test_stock_report_over_100k_items():
+    items = 100000
+    columns = {
+        "item_id": [str(row) for row in range(items)],
+        "name": [f"Item {row}" for row in range(items)],
+        "sku": [f"SKU-{row}" for row in range(items)],
+        "rate": array("d", (1.0 + row % 100 for row in range(items))),
+        "stock_on_hand": array("d", (row % 1000 for row in range(items))),
+        "available_stock": array("d", (row % 1000 - row % 7 for row in range(items))),
+        "committed_stock": array("d", [math.nan]) * items,
+        "reorder_level": array("d", (row % 300 for row in range(items))),
+        "warehouses": {str(row): (("Main", row % 1000),) for row in range(0, items, 2)},
+    }
+    sold = {str(row): float(row % 50) for row in range(0, items, 3)}
+
+    start = time.perf_counter()
+    report = compute_stock_report(columns, sold, days=30, cover_days=14, limit=50)
+    elapsed = time.perf_counter() - start
+
+    assert elapsed < 5, f"The report over {items} items took {elapsed:.1f}s"
+    assert report["items"] == items
+    assert len(report["below_reorder"]["rows"]) == 50 and report["below_reorder"]["count"] > 50
+    assert set(report["stock_value"]["by_warehouse"]) == {"Main", "unallocated"}
+
+
+def test_failed_order_fetches_are_counted_apart(zoho_stub):
+    _stub(zoho_stub, _orders())
+    zoho_stub.routes[("GET", "/salesorders/o1")] = lambda path, query, body: (404, {"code": 1002, "message": "missing"})
+
+    for report in (stock_report(days=30), asyncio.run(stock_report_async(days=30))):
+        velocity = report["velocity"]
+        assert velocity["orders_read"] == 1 and velocity["orders_failed"] == 1
+        assert velocity["units_sold"] == 30.0, "Only o3 is counted"
@@ -0,0 +1,98 @@
+import asyncio
+import json
+import socket
+import threading
+import time
+
+import pytest
+import uvicorn
+from mcp import ClientSession
+from mcp.client.streamable_http import streamable_http_client
+from mcp.server.fastmcp import FastMCP
+
+from server import conigure_server, register_resources, register_tools
+from transport import _get_transport_handler, build_http_app
+from utils.setting import settings
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def http_server(zoho_stub, monkeypatch):
+    """Serve the MCP server over streamable HTTP on a free port."""
+    monkeypatch.setattr(settings, "MCP_TRANSPORT", "streamable-http")
+    monkeypatch.setattr(settings, "MCP_PORT", _free_port())
+    # every call should reach the stub
+    monkeypatch.setattr(settings, "CACHE_ENABLED", False)
+    mcp_server = FastMCP(**conigure_server(args={}))
+    register_tools(mcp_server)
+    register_resources(mcp_server)
+    server = uvicorn.Server(uvicorn.Config(build_http_app(mcp_server, "streamable-http"), host="127.0.0.1", port=settings.MCP_PORT, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.time() + 10
+    while not server.started and time.time() < deadline:
+        time.sleep(0.02)
+    yield f"http://127.0.0.1:{settings.MCP_PORT}/mcp"
+    server.should_exit = True
+    thread.join(10)
+
+
+async def _call_concurrently(url: str, calls: int) -> list[dict]:
+    async with streamable_http_client(url) as (read, write, _):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            results = await asyncio.gather(*(session.call_tool("get_contact", {"contact_id": "1"}) for _ in range(calls)))
+    return [json.loads(result.content[0].text) for result in results]
+
+
+def test_sessions_share_the_token_and_pool(zoho_stub, http_server):
+    zoho_stub.routes[("GET", "/contacts/1")] = {"code": 0, "contact": {"contact_id": "1"}}
+
+    async def main():
+        return await asyncio.gather(*(_call_concurrently(http_server, 3) for _ in range(3)))
+
+    sessions = asyncio.run(main())
+    # agents connecting one after another
+    for _ in range(3):
+        asyncio.run(_call_concurrently(http_server, 1))
+
+    assert [len(results) for results in sessions] == [3, 3, 3]
+    assert all(result["contact"]["contact_id"] == "1" for results in sessions for result in results)
+    assert zoho_stub.count("POST", "/token") == 1, "All sessions should share one token"
+    clients = [request["client"] for request in zoho_stub.requests if request["path"] == "/contacts/1"]
+    assert set(clients[-3:]) <= set(clients[:9]), "Later sessions should reuse the pooled connections"
+
+
+def test_per_session_concurrency_limit(zoho_stub, http_server, monkeypatch):
+    monkeypatch.setattr(settings, "MCP_SESSION_MAX_CONCURRENCY", 1)
+    zoho_stub.routes[("GET", "/contacts/1")] = {"code": 0, "contact": {"contact_id": "1"}}
+    asyncio.run(_call_concurrently(http_server, 1))
+    zoho_stub.delay = 0.2
+
+    start = time.perf_counter()
+    asyncio.run(_call_concurrently(http_server, 3))
+    one_session = time.perf_counter() - start
+
+    async def main():
+        await asyncio.gather(*(_call_concurrently(http_server, 1) for _ in range(3)))
+
+    start = time.perf_counter()
+    asyncio.run(main())
+    three_sessions = time.perf_counter() - start
+
+    assert one_session >= 0.6, "Calls of one session should run one at a time"
+    assert three_sessions < one_session, "Other sessions should not wait for each other"
+
+
+def test_transport_handlers():
+    for transport_type in ("stdio", "sse", "streamable-http"):
+        assert callable(_get_transport_handler(transport_type))
+    with pytest.raises(ValueError):
+        _get_transport_handler("websocket")
+    with pytest.raises(ValueError):
+        build_http_app(FastMCP(), "stdio")
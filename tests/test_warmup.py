@@ -0,0 +1,47 @@
+import asyncio
+
+from resources.taxes import get_taxes_async
+from utils.metrics import metrics
+from utils.setting import settings
+from utils.warmup import warm_up, warm_up_in_background
+
+
+def test_warm_up_loads_token_connects_and_primes_the_cache(zoho_stub, monkeypatch):
+    monkeypatch.setattr(settings, "ZOHO_CLIENT_ID", "id")
+    monkeypatch.setattr(settings, "ZOHO_REFRESH_TOKEN", "refresh")
+    monkeypatch.setattr(settings, "WARMUP_ENDPOINTS", "/settings/taxes?page=1&per_page=100")
+    zoho_stub.routes[("GET", "/settings/taxes")] = {"code": 0, "taxes": [{"tax_id": "1"}]}
+
+    async def main():
+        await warm_up()
+        return await get_taxes_async()
+
+    result = asyncio.run(main())
+
+    assert result["taxes"] == [{"tax_id": "1"}]
+    assert zoho_stub.count("POST", "/token") == 1
+    assert zoho_stub.count("GET", "/") == 1
+    assert "Authorization" not in zoho_stub.requests[1]["headers"], "The connection request should not carry the token"
+    assert zoho_stub.count("GET", "/settings/taxes") == 1, "The first call should be served from the primed cache"
+    assert metrics.snapshot()["startup_seconds"]["warmup"] > 0
+
+
+def test_warm_up_in_background(zoho_stub, monkeypatch):
+    monkeypatch.setattr(settings, "WARMUP_ENABLED", False)
+
+    async def disabled():
+        async with warm_up_in_background() as task:
+            return task
+
+    assert asyncio.run(disabled()) is None
+
+    monkeypatch.setattr(settings, "WARMUP_ENABLED", True)
+    zoho_stub.delay = 1
+
+    async def cancelled():
+        async with warm_up_in_background() as task:
+            await asyncio.sleep(0.05)
+        return task
+
+    task = asyncio.run(cancelled())
+    assert task.cancelled(), "A warm-up still running at shutdown should be cancelled"
@@ -0,0 +1,130 @@
+import json
+
+import httpx
+import pytest
+
+from resources.items import list_items
+from resources.mirror import get_mirror_status
+from utils.search import item_index
+from utils.setting import settings
+from utils.webhooks import SIGNATURE_HEADER, sign, start_webhook_server, verify, webhook_receiver
+from zoho_stub import paged_route
+
+
+def _items():
+    return [
+        {"item_id": str(i), "name": f"Widget {i}", "sku": f"W-{i}", "last_modified_time": f"2024-01-01T00:00:0{i}+0000"}
+        for i in range(1, 4)
+    ]
+
+
+@pytest.fixture
+def webhooks(zoho_stub, mirror_db, monkeypatch):
+    """A synced mirror, a built item index and a cached item list, with the webhook server running."""
+    monkeypatch.setattr(settings, "WEBHOOK_SECRET", "s3cret")
+    items = _items()
+    zoho_stub.routes[("GET", "/items")] = paged_route(items, "items")
+    mirror_db.sync(["items"])
+    item_index.refresh(full=True)
+    list_items()
+    webhook_receiver.reset()
+    server = start_webhook_server(0)
+    yield f"http://127.0.0.1:{server.server_address[1]}{settings.WEBHOOK_PATH}", items
+    server.shutdown()
+    server.server_close()
+
+
+def _post(url: str, payload: dict, secret: str = "s3cret", **kwargs) -> httpx.Response:
+    body = json.dumps(payload).encode()
+    headers = {"Content-Type": "application/json", SIGNATURE_HEADER: sign(body, secret)}
+    return httpx.post(url, content=body, headers=headers, **kwargs)
+
+
+def test_verify(monkeypatch):
+    monkeypatch.setattr(settings, "WEBHOOK_SECRET", "s3cret")
+    body = b'{"item": {}}'
+
+    assert verify(body, signature=sign(body, "s3cret"))
+    assert verify(body, token="s3cret")
+    assert not verify(body, signature=sign(body, "other"))
+    assert not verify(body, signature=sign(b"{}", "s3cret"))
+    assert not verify(body, token="wrong")
+    assert not verify(body, token="s3crét")
+    assert not verify(body)
+
+    monkeypatch.setattr(settings, "WEBHOOK_SECRET", "")
+    assert not verify(body, token="")
+    with pytest.raises(ValueError):
+        start_webhook_server(0)
+
+
+def test_update_and_delete_events(zoho_stub, mirror_db, webhooks):
+    url, _ = webhooks
+    requests = zoho_stub.count("GET", "/items")
+
+    updated = {"item_id": "2", "name": "Butterfly Valve", "sku": "BV-50", "last_modified_time": "2024-02-01T00:00:00+0000"}
+    response = _post(url, {"event_type": "item_updated", "item": updated})
+
+    assert response.status_code == 200
+    assert response.json() == {"table": "items", "id": "2", "deleted": False}
+    assert mirror_db.get_record("items", "2")["name"] == "Butterfly Valve"
+    assert item_index.match("butterfly valve")[0]["item_id"] == "2"
+    list_items()
+    assert zoho_stub.count("GET", "/items") == requests + 1, "The event should invalidate the cached item lists"
+
+    response = _post(url, {"event_type": "item_deleted", "item": {"item_id": "3"}})
+
+    assert response.json()["deleted"] is True
+    assert mirror_db.get_record("items", "3") is None
+    assert "3" not in [match["item_id"] for match in item_index.match("widget 3", min_score=0)]
+    assert zoho_stub.count("GET", "/items") == requests + 1, "Events should not call Zoho"
+
+    stats = get_mirror_status()["webhooks"]
+    assert stats["received"] == 2
+    assert stats["applied"] == {"items": 2}
+    assert stats["last_event_at"] is not None
+
+
+def test_form_payload_with_token_and_org(mirror_db, webhooks):
+    url, _ = webhooks
+    form = {"JSONString": json.dumps({"contact": {"contact_id": "7", "contact_name": "Acme"}})}
+
+    response = httpx.post(url, data=form, params={"token": "s3cret", "org": "stub-org"})
+
+    assert response.status_code == 200
+    assert response.json()["table"] == "contacts"
+    assert mirror_db.get_record("contacts", "7") is None, "A table that was never synced should not be written"
+
+
+def test_rejected_and_invalid_requests(webhooks):
+    url, _ = webhooks
+
+    assert _post(url, {"item": {"item_id": "1"}}, secret="wrong").status_code == 401
+    assert httpx.post(url, content=b'{"item": {"item_id": "1"}}').status_code == 401
+    assert httpx.post(url, content=b'{"item": {"item_id": "1"}}', params={"token": "s3crét"}).status_code == 401
+    assert httpx.post(url, content=b'{"item": {"item_id": "1"}}', headers={SIGNATURE_HEADER: "é".encode()}).status_code == 401
+    assert httpx.post(url, content=b"not json", params={"token": "s3cret"}).status_code == 400
+    assert _post(url, {"invoice": {"invoice_id": "1"}}).status_code == 400
+    assert _post(url, {"item": {"name": "no id"}}).status_code == 400
+    assert _post(url, {"item": {"item_id": "1"}}, params={"org": "unknown"}).status_code == 400
+    assert _post(url.replace(settings.WEBHOOK_PATH, "/other"), {"item": {"item_id": "1"}}).status_code == 404
+
+    stats = webhook_receiver.stats()
+    assert stats["rejected"] == 4
+    assert stats["invalid"] == 4
+    assert stats["applied"] == {}
+
+
+def test_reconcile_catches_missed_events(zoho_stub, mirror_db, webhooks):
+    _, items = webhooks
+    # changes whose webhooks never arrived
+    del items[0]
+    items[0]["name"] = "Renamed"
+
+    result = webhook_receiver.reconcile()
+
+    assert result == {"mirror": {"items": 2}, "item_indexes": {"default": 2}}
+    assert mirror_db.get_record("items", "1") is None
+    assert mirror_db.get_record("items", "2")["name"] == "Renamed"
+    assert len(item_index) == 2
+    assert webhook_receiver.stats()["last_reconcile_at"] is not None
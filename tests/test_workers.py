@@ -0,0 +1,126 @@
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+import pytest
+from mcp import ClientSession
+from mcp.client.streamable_http import streamable_http_client
+
+from utils.cache import ResponseCache
+from utils.setting import settings
+
+SRC = os.path.join(os.path.dirname(__file__), "..", "src")
+
+
+@pytest.fixture
+def shared_cache(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "CACHE_SHARED_FILE", str(tmp_path / "cache.sqlite3"))
+    return ResponseCache(), ResponseCache()
+
+
+def test_shared_cache_between_processes(shared_cache):
+    first, second = shared_cache
+    key = first.key("GET", "/contacts/1", {"organization_id": "1"})
+    other = first.key("GET", "/items", {"organization_id": "1"})
+
+    first.set(key, "/contacts/1", b'{"code": 0, "contact": {"contact_id": "1"}}')
+    first.set(other, "/items", b'{"code": 0, "items": []}')
+
+    assert second.get(key)["contact"]["contact_id"] == "1"
+    assert second.stats()["entries"] == 2
+    assert second.invalidate("/contacts") == 1
+    assert first.get(key) is None
+    assert first.get(other) == {"code": 0, "items": []}
+    assert first.stats()["hits"] == 1
+    assert first.stats()["misses"] == 1
+
+
+def test_shared_cache_expiry_and_budget(shared_cache, monkeypatch):
+    first, second = shared_cache
+    monkeypatch.setattr(settings, "CACHE_TTLS", "/items=0.1")
+    key = first.key("GET", "/items", {})
+    first.set(key, "/items", b"{}")
+    time.sleep(0.15)
+
+    assert second.get(key) is None
+    assert second.stats()["expirations"] == 1
+
+    monkeypatch.setattr(settings, "CACHE_MAX_BYTES", 250)
+    for i in range(5):
+        first.set(first.key("GET", f"/contacts/{i}", {}), f"/contacts/{i}", b'"' + b"x" * 98 + b'"')
+
+    stats = second.stats()
+    assert stats["bytes"] <= 250
+    assert stats["entries"] == 2
+    assert first.stats()["evictions"] == 3
+    assert second.get(first.key("GET", "/contacts/4", {})) is not None, "The newest entry should be kept"
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def workers(zoho_stub, tmp_path):
+    """Run the server with two worker processes against the stub."""
+    port = _free_port()
+    env = {
+        **os.environ,
+        "ZOHO_MCP_TRANSPORT": "streamable-http",
+        "ZOHO_MCP_WORKERS": "2",
+        "ZOHO_MCP_PORT": str(port),
+        "ZOHO_API_BASE_URL": zoho_stub.url,
+        "ZOHO_AUTH_BASE_URL": zoho_stub.url,
+        "ZOHO_CLIENT_ID": "id",
+        "ZOHO_CLIENT_SECRET": "secret",
+        "ZOHO_REFRESH_TOKEN": "refresh",
+        "ZOHO_ORGANIZATION_ID": "stub-org",
+        "ZOHO_TOKEN_CACHE_FILE": str(tmp_path / "token_cach.json"),
+        "ZOHO_CACHE_SHARED_FILE": str(tmp_path / "cache.sqlite3"),
+        "ZOHO_RATE_LIMIT_STATE_FILE": str(tmp_path / "rate_limit_state.json"),
+        "ZOHO_LOG_LEVEL": "WARNING",
+    }
+    process = subprocess.Popen([sys.executable, "server.py"], cwd=SRC, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}/mcp"
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            httpx.get(url, timeout=1)
+            break
+        except httpx.TransportError:
+            time.sleep(0.1)
+    yield url, tmp_path
+    process.terminate()
+    process.wait(10)
+
+
+async def _get_contact(url: str) -> dict:
+    async with streamable_http_client(url) as (read, write, _):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            result = await session.call_tool("get_contact", {"contact_id": "1"})
+    return json.loads(result.content[0].text)
+
+
+def test_workers_share_token_cache_and_rate_limit(zoho_stub, workers):
+    url, tmp_path = workers
+    zoho_stub.routes[("GET", "/contacts/1")] = {"code": 0, "contact": {"contact_id": "1"}}
+    assert asyncio.run(_get_contact(url))["contact"]["contact_id"] == "1"
+
+    async def main():
+        return await asyncio.gather(*(_get_contact(url) for _ in range(8)))
+
+    results = asyncio.run(main())
+
+    assert all(result["contact"]["contact_id"] == "1" for result in results)
+    assert zoho_stub.count("POST", "/token") == 1, "Workers should share the token"
+    assert zoho_stub.count("GET", "/contacts/1") == 1, "Workers should share the response cache"
+    state = json.loads((tmp_path / "rate_limit_state.json").read_text())
+    assert state["stub-org"]["day_count"] == 1, "Workers should share the rate limit budget"
@@ -0,0 +1,121 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Union
+from urllib.parse import parse_qs, urlparse
+
+Route = Union[dict[str, Any], Callable[[str, dict[str, list[str]], bytes], Any]]
+
+
+class ZohoStub:
+    """
+    A tiny local stand-in for the Zoho API used by the tests.
+
+    Routes are keyed by (method, path) and map to either a JSON payload or a
+    callable taking (path, query, body) and returning a payload or a
+    (status, payload[, headers]) tuple. Every request is recorded.
+    """
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.routes: dict[tuple[str, str], Route] = {
+            ("POST", "/token"): {"access_token": "stub-token", "expires_in": 3600},
+        }
+        self.requests: list[dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "ZohoStub":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def count(self, method: str, path: str) -> int:
+        with self._lock:
+            return sum(1 for r in self.requests if r["method"] == method and r["path"] == path)
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _respond(self):
+                parsed = urlparse(self.path)
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                query = parse_qs(parsed.query)
+                with stub._lock:
+                    stub.requests.append({
+                        "method": self.command,
+                        "path": parsed.path,
+                        "query": query,
+                        "headers": dict(self.headers),
+                        "body": body,
+                        "client": self.client_address,
+                    })
+                if stub.delay:
+                    time.sleep(stub.delay)
+
+                route = stub.routes.get((self.command, parsed.path))
+                status, headers = 200, {}
+                if route is None:
+                    payload = {"code": 0, "message": "success"}
+                elif callable(route):
+                    payload = route(parsed.path, query, body)
+                    if isinstance(payload, tuple):
+                        status, payload, *rest = payload
+                        headers = rest[0] if rest else {}
+                else:
+                    payload = route
+
+                # a 304 has no body
+                data = json.dumps(payload).encode() if status != 304 else b""
+                self.send_response(status)
+                if status != 304:
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(data)))
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = _respond
+            do_POST = _respond
+            do_PUT = _respond
+            do_DELETE = _respond
+
+        return Handler
+
+
+def paged_route(records: list[dict[str, Any]], record_key: str, with_total: bool = True):
+    """A stub route serving records in pages, sorted like Zoho does."""
+
+    def route(path, query, body):
+        page = int(query.get("page", ["1"])[0])
+        per_page = int(query.get("per_page", ["200"])[0])
+        rows = records
+        if "sort_column" in query:
+            column = query["sort_column"][0]
+            rows = sorted(records, key=lambda r: r.get(column) or "", reverse=query.get("sort_order", ["A"])[0] == "D")
+        chunk = rows[(page - 1) * per_page:page * per_page]
+        page_context = {"page": page, "per_page": per_page, "has_more_page": page * per_page < len(rows)}
+        if with_total:
+            page_context["total"] = len(rows)
+        return {"code": 0, "message": "success", record_key: chunk, "page_context": page_context}
+
+    return route